@@ -536,6 +536,15 @@ class CryptographicUsageMask(Integer):
             value, Tags.CRYPTOGRAPHIC_USAGE_MASK)
 
 
+# 3.22
+class State(Enumeration):
+
+    ENUM_TYPE = enums.State
+
+    def __init__(self, value=None):
+        super(State, self).__init__(value, Tags.STATE)
+
+
 # 3.33
 class ObjectGroup(TextString):
 
@@ -39,6 +39,103 @@ class ConfigHelper(object):
     # Timeout measured in seconds
     DEFAULT_TIMEOUT = 30
 
+    # Maximum number of request messages in flight on a pipelined connection
+    DEFAULT_PIPELINE_WINDOW = 8
+
+    # Number of times a request is sent again on a new connection after a
+    # timeout or a broken connection
+    DEFAULT_RETRIES = 0
+
+    DEFAULT_WIRE_TRACE_FILE = 'kmip_wire_trace.log'
+
+    # Server worker threads and the number of accepted connections that may
+    # wait for a free worker
+    DEFAULT_MAX_WORKERS = 8
+    DEFAULT_MAX_QUEUED = 64
+
+    # Seconds an accepted connection may wait for a free server worker
+    # before it is closed
+    DEFAULT_QUEUE_TIMEOUT = 5
+
+    # Seconds a server waits for requests in progress when it is drained or
+    # shut down
+    DEFAULT_SHUTDOWN_TIMEOUT = 10
+
+    # Seconds a server worker waits for a client to complete the TLS handshake
+    DEFAULT_HANDSHAKE_TIMEOUT = 10
+
+    # Server listen backlog, limit on open connections (the threaded server
+    # also never holds more than max_workers + max_queued), the seconds an idle
+    # connection is kept open and the seconds a server waits for the rest of
+    # a message once it has started to arrive
+    DEFAULT_BACKLOG = 128
+    DEFAULT_MAX_CONNECTIONS = 1024
+    DEFAULT_IDLE_TIMEOUT = 60
+    DEFAULT_READ_TIMEOUT = 30
+
+    # Server threads shared by batches that allow out-of-order processing
+    # (1, the default, processes every batch on its connection's thread)
+    DEFAULT_BATCH_PARALLELISM = 1
+
+    # Server threads running operations requested asynchronously, and the
+    # number of pending or uncollected asynchronous operations kept
+    DEFAULT_ASYNC_WORKERS = 2
+    DEFAULT_MAX_ASYNC_JOBS = 256
+
+    # Pre-generated symmetric keys kept per algorithm and length for Create
+    # (0, the default, disables the pool), and the level below which the
+    # pool is refilled
+    DEFAULT_KEY_POOL_SIZE = 0
+    DEFAULT_KEY_POOL_LOW_WATER_MARK = 0
+
+    # Worker processes generating key pairs for CreateKeyPair and
+    # ReKeyKeyPair (0 generates them on the server thread), and the
+    # pre-generated key pairs kept per algorithm and length (0, the default,
+    # disables the pool) with the level below which the pool is refilled
+    DEFAULT_KEY_PAIR_WORKERS = 2
+    DEFAULT_KEY_PAIR_POOL_SIZE = 0
+    DEFAULT_KEY_PAIR_LOW_WATER_MARK = 0
+
+    # Encoded Get responses kept in memory, by count and by total size in
+    # bytes (a size of 0, the default, disables the cache)
+    DEFAULT_GET_CACHE_SIZE = 0
+    DEFAULT_GET_CACHE_MAX_BYTES = 4194304
+
+    # Address of the HTTP endpoint serving server metrics (no port disables
+    # the endpoint)
+    DEFAULT_METRICS_HOST = '127.0.0.1'
+    DEFAULT_METRICS_PORT = None
+
+    # Inherited listening socket descriptor a server takes over instead of
+    # binding its own (None binds a new socket)
+    DEFAULT_LISTEN_FD = None
+
+    # Cost each client may spend per second (0 disables rate limiting) and
+    # at once, the cost of operations heavier than the default of 1, and
+    # the number of requests processed at once, shared fairly between
+    # clients (0, the default, disables the fair queue)
+    DEFAULT_RATE_LIMIT = 0
+    DEFAULT_RATE_LIMIT_BURST = 50
+    DEFAULT_OPERATION_WEIGHTS = 'LOCATE:4,CREATE_KEY_PAIR:16,REKEY_KEY_PAIR:16'
+    DEFAULT_FAIR_QUEUE_SLOTS = 0
+
+    # Request profiling mode (cprofile, stack or None to disable), the
+    # share of requests profiled (one in N), the seconds between stack
+    # samples and the path prefix of the dumped profiles
+    DEFAULT_PROFILE_MODE = None
+    DEFAULT_PROFILE_SAMPLE_RATE = 100
+    DEFAULT_PROFILE_INTERVAL = 0.01
+    DEFAULT_PROFILE_FILE = 'kmip_profile'
+
+    # Encoded size in bytes a server response may not exceed, whatever the
+    # client's MaximumResponseSize (None removes the server limit)
+    DEFAULT_MAX_RESPONSE_SIZE = 16777216
+
+    # Answered batch items kept to answer retries, by count and by the number
+    # of seconds each is kept (a size of 0, the default, disables the cache)
+    DEFAULT_IDEMPOTENCY_CACHE_SIZE = 0
+    DEFAULT_IDEMPOTENCY_CACHE_TTL = 300
+
     def __init__(self):
         self.logger = logging.getLogger(__name__)
 
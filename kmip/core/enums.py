@@ -500,6 +500,16 @@ class KeyRoleType(Enum):
     PVKOTH    = 0x00000015
 
 
+# 9.1.3.2.18
+class State(Enum):
+    PRE_ACTIVE            = 0x00000001
+    ACTIVE                = 0x00000002
+    DEACTIVATED           = 0x00000003
+    COMPROMISED           = 0x00000004
+    DESTROYED             = 0x00000005
+    DESTROYED_COMPROMISED = 0x00000006
+
+
 # 9.1.3.2.24
 class QueryFunction(Enum):
     QUERY_OPERATIONS             = 0x00000001
@@ -509,6 +519,15 @@ class QueryFunction(Enum):
     QUERY_EXTENSION_LIST         = 0x00000005
     QUERY_EXTENSION_MAP          = 0x00000006
 
+
+# 9.1.3.2.25
+class CancellationResult(Enum):
+    CANCELED          = 0x00000001
+    UNABLE_TO_CANCEL  = 0x00000002
+    COMPLETED         = 0x00000003
+    FAILED            = 0x00000004
+    UNAVAILABLE       = 0x00000005
+
 # 9.1.3.2.27
 class Operation(Enum):
     CREATE               = 0x00000001
@@ -31,6 +31,7 @@ from kmip.core.attributes import ObjectGroup
 from kmip.core.attributes import UniqueIdentifier
 from kmip.core.attributes import ObjectType
 from kmip.core.attributes import OperationPolicyName
+from kmip.core.attributes import State
 from kmip.core.attributes import HashingAlgorithm
 
 from kmip.core import utils
@@ -234,7 +235,7 @@ class AttributeValueFactory(object):
         raise NotImplementedError()
 
     def _create_state(self, state):
-        raise NotImplementedError()
+        return State(state)
 
     def _create_initial_date(self, date):
         return DateTime(value=date, tag=Tags.INITIAL_DATE)
@@ -16,6 +16,7 @@
 from kmip.core.factories.payloads import PayloadFactory
 
 from kmip.core.messages.payloads import activate
+from kmip.core.messages.payloads import cancel
 from kmip.core.messages.payloads import create
 from kmip.core.messages.payloads import create_key_pair
 from kmip.core.messages.payloads import destroy
@@ -62,3 +63,6 @@ class ResponsePayloadFactory(PayloadFactory):
 
     def _create_revoke_payload(self):
         return revoke.RevokeResponsePayload()
+
+    def _create_cancel_payload(self):
+        return cancel.CancelResponsePayload()
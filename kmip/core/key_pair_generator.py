@@ -0,0 +1,176 @@
+# Copyright (c) 2015 Hewlett Packard Development Company, L.P.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import logging
+import threading
+
+try:
+    from concurrent import futures
+    from concurrent.futures.process import BrokenProcessPool
+except ImportError:
+    futures = None
+    BrokenProcessPool = None
+
+try:
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+except ImportError:
+    rsa = None
+
+from kmip.core.enums import CryptographicAlgorithm
+from kmip.core.key_pool import KeyPool
+
+PUBLIC_EXPONENT = 65537
+
+
+def generate_key_pair(algorithm, length):
+    """
+    Generate an asymmetric key pair.
+
+    The function is run in the worker processes of a KeyPairGenerator, so it
+    is defined at module level where it can be pickled.
+
+    Args:
+        algorithm (CryptographicAlgorithm): The algorithm of the key pair.
+            Only RSA is supported.
+        length (int): The length of the modulus in bits.
+
+    Returns:
+        tuple: The PKCS#1 DER encodings of the public and the private key.
+    """
+    if rsa is None:
+        raise NotImplementedError('the cryptography package is not installed')
+    if algorithm is not CryptographicAlgorithm.RSA:
+        raise ValueError('unsupported key pair algorithm: {0}'.format(
+            algorithm))
+
+    private_key = rsa.generate_private_key(public_exponent=PUBLIC_EXPONENT,
+                                           key_size=length,
+                                           backend=default_backend())
+    private_bytes = private_key.private_bytes(
+        serialization.Encoding.DER,
+        serialization.PrivateFormat.TraditionalOpenSSL,
+        serialization.NoEncryption())
+    public_bytes = private_key.public_key().public_bytes(
+        serialization.Encoding.DER,
+        serialization.PublicFormat.PKCS1)
+    return public_bytes, private_bytes
+
+
+class KeyPairGenerator(object):
+    """
+    Generates key pairs in a pool of worker processes.
+
+    RSA key generation takes tens to hundreds of milliseconds of CPU time
+    and holds the interpreter lock throughout, so it is handed to a process
+    pool started on first use rather than run on a server thread. With
+    workers set to 0, key pairs are generated on the calling thread.
+
+    When pool_size is set, key pairs are also taken from a KeyPool of
+    pre-generated pairs, so a burst of requests does not queue behind the
+    worker processes.
+    """
+
+    SUPPORTED_ALGORITHMS = (CryptographicAlgorithm.RSA,)
+    SUPPORTED_LENGTHS = (1024, 2048, 3072, 4096)
+
+    def __init__(self, workers=2, pool_size=0, low_water_mark=0,
+                 function=None):
+        """
+        Construct a KeyPairGenerator.
+
+        Args:
+            workers (int): The number of worker processes. Optional, defaults
+                to 2.
+            pool_size (int): The number of pre-generated key pairs kept for
+                each algorithm and length. Optional, defaults to 0 (no pool).
+            low_water_mark (int): The number of pooled key pairs below which
+                the pool is refilled. Optional, defaults to 0, in which case
+                the pool is refilled once it is empty.
+            function (callable): Called with an algorithm and a length to
+                generate a key pair. Optional, defaults to generate_key_pair,
+                which requires the cryptography package.
+        """
+        self.logger = logging.getLogger(__name__)
+        if function is None:
+            function = generate_key_pair
+            self.available = rsa is not None
+        else:
+            self.available = True
+
+        self.workers = workers
+        self._function = function
+        self._executor = None
+        self._lock = threading.Lock()
+
+        self.pool = None
+        if pool_size > 0 and self.available:
+            self.pool = KeyPool(self._generate, size=pool_size,
+                                low_water_mark=low_water_mark)
+
+    def generate(self, algorithm, length):
+        """
+        Get a new key pair.
+
+        Args:
+            algorithm (CryptographicAlgorithm): The algorithm of the key pair.
+            length (int): The length of the key pair in bits.
+
+        Returns:
+            tuple: The encoded public and private keys, as returned by the
+                generation function.
+        """
+        if self.pool is not None:
+            return self.pool.get(algorithm, length)
+        return self._generate(algorithm, length)
+
+    def close(self):
+        """
+        Stop refilling the pool and shut down the worker processes.
+        """
+        if self.pool is not None:
+            self.pool.close()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _generate(self, algorithm, length):
+        executor = self._get_executor()
+        if executor is None:
+            return self._function(algorithm, length)
+        try:
+            return executor.submit(self._function, algorithm,
+                                   length).result()
+        except Exception as e:
+            # A worker that died takes the whole pool down with it; the next
+            # request starts a fresh one.
+            if BrokenProcessPool is not None and \
+                    isinstance(e, BrokenProcessPool):
+                with self._lock:
+                    if self._executor is executor:
+                        self._executor = None
+            raise
+
+    def _get_executor(self):
+        if futures is None or self.workers < 1:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self.logger.debug('starting {0} key pair workers'.format(
+                    self.workers))
+                self._executor = futures.ProcessPoolExecutor(self.workers)
+            return self._executor
@@ -0,0 +1,180 @@
+# Copyright (c) 2015 Hewlett Packard Development Company, L.P.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import collections
+import logging
+import threading
+
+
+class KeyPool(object):
+    """
+    A pool of pre-generated keys or key pairs, refilled in the background.
+
+    Keys are kept per (algorithm, length) combination. A combination gets its
+    own pool the first time a key of that kind is requested, or when it is
+    warmed. Whenever a pool drops below low_water_mark keys, or runs empty, a
+    background thread tops it up to size keys, so bursts of requests take
+    ready keys instead of generating them inline. If a pool runs dry, keys
+    are generated on the calling thread.
+
+    Every key is handed out at most once.
+    """
+
+    def __init__(self, generator, size=64, low_water_mark=16):
+        """
+        Construct a KeyPool.
+
+        Args:
+            generator (callable): Called with an algorithm and a length in
+                bits; returns a new key.
+            size (int): The number of keys each pool is filled to. Optional,
+                defaults to 64.
+            low_water_mark (int): The number of keys below which a pool is
+                refilled. Optional, defaults to 16. With 0, a pool is only
+                refilled once it is empty.
+        """
+        if size < 1:
+            raise ValueError('a key pool must hold at least one key')
+        if low_water_mark < 0 or low_water_mark > size:
+            raise ValueError('the low-water mark must be between 0 and the '
+                             'pool size')
+
+        self.logger = logging.getLogger(__name__)
+        self.generator = generator
+        self.size = size
+        self.low_water_mark = low_water_mark
+
+        self._pools = {}
+        self._hits = 0
+        self._misses = 0
+        self._closed = False
+        self._refill_requested = False
+        self._refiller = None
+        self._condition = threading.Condition()
+
+    def get(self, algorithm, length):
+        """
+        Take a key out of the pool.
+
+        Args:
+            algorithm (CryptographicAlgorithm): The algorithm of the key.
+            length (int): The length of the key in bits.
+
+        Returns:
+            The new key, as built by the generator.
+        """
+        kind = (algorithm, length)
+        with self._condition:
+            pool = self._pools.setdefault(kind, collections.deque())
+            key = pool.popleft() if pool else None
+            if key is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+            if len(pool) < max(self.low_water_mark, 1):
+                self._start_refill()
+
+        if key is None:
+            key = self.generator(algorithm, length)
+        return key
+
+    def warm(self, algorithm, length):
+        """
+        Create the pool for a kind of key and start filling it.
+
+        Args:
+            algorithm (CryptographicAlgorithm): The algorithm of the keys.
+            length (int): The length of the keys in bits.
+        """
+        with self._condition:
+            self._pools.setdefault((algorithm, length), collections.deque())
+            self._start_refill()
+
+    def close(self):
+        """
+        Stop the background refill and drop the pooled keys.
+        """
+        with self._condition:
+            self._closed = True
+            self._pools.clear()
+            self._condition.notify_all()
+
+    def get_statistics(self):
+        """
+        Get the number of keys served from the pool and generated inline.
+
+        Returns:
+            dict: A dictionary with the hits, the misses and the number of
+                keys currently pooled.
+
+        Example:
+            >>> pool.get_statistics()
+            {'hits': 950, 'misses': 50, 'pooled': 60}
+        """
+        with self._condition:
+            pooled = sum(len(pool) for pool in self._pools.values())
+            return {'hits': self._hits, 'misses': self._misses,
+                    'pooled': pooled}
+
+    def _start_refill(self):
+        # Called with the condition held
+        if self._closed:
+            return
+        self._refill_requested = True
+        if self._refiller is None:
+            self._refiller = threading.Thread(target=self._refill)
+            self._refiller.daemon = True
+            self._refiller.start()
+        self._condition.notify()
+
+    def _next_kind(self):
+        # Called with the condition held; returns a kind of key to top up,
+        # favouring the emptiest pool.
+        kind = None
+        for candidate, pool in self._pools.items():
+            if len(pool) < self.size:
+                if kind is None or len(pool) < len(self._pools[kind]):
+                    kind = candidate
+        return kind
+
+    def _refill(self):
+        while True:
+            # A refill tops every pool up to size, then waits until a pool
+            # drops below the low-water mark again.
+            with self._condition:
+                kind = None
+                while not self._closed:
+                    if self._refill_requested:
+                        kind = self._next_kind()
+                        if kind is not None:
+                            break
+                        self._refill_requested = False
+                    self._condition.wait()
+                if self._closed:
+                    return
+
+            try:
+                key = self.generator(*kind)
+            except Exception as e:
+                self.logger.error(
+                    'key pool refill failed for {0}: {1}'.format(kind, e))
+                with self._condition:
+                    self._pools.pop(kind, None)
+                continue
+
+            with self._condition:
+                pool = self._pools.get(kind)
+                if pool is not None and len(pool) < self.size:
+                    pool.append(key)
@@ -199,8 +199,14 @@ class RequestBatchItem(Struct):
 
         # Dynamically create the response payload class that belongs to the
         # operation
-        self.request_payload = self.payload_factory.create(
-            self.operation.enum)
+        try:
+            self.request_payload = self.payload_factory.create(
+                self.operation.enum)
+        except NotImplementedError:
+            # The payload of an unsupported operation cannot be decoded; it
+            # is skipped so that only this batch item has to be rejected.
+            self.request_payload = None
+            return
         self.request_payload.read(tstream)
 
         # Read the message extension if it is present
@@ -290,8 +296,11 @@ class ResponseBatchItem(Struct):
 
         # Dynamically create the response payload class that belongs to the
         # operation
-        expected = self.payload_factory.create(self.operation.enum)
-        if self.is_tag_next(expected.tag, tstream):
+        try:
+            expected = self.payload_factory.create(self.operation.enum)
+        except NotImplementedError:
+            expected = None
+        if expected is not None and self.is_tag_next(expected.tag, tstream):
             self.response_payload = expected
             self.response_payload.read(tstream)
 
@@ -56,8 +56,9 @@ class ActivateRequestPayload(Struct):
         super(ActivateRequestPayload, self).read(istream)
         tstream = BytearrayStream(istream.read(self.length))
 
-        self.unique_identifier = attributes.UniqueIdentifier()
-        self.unique_identifier.read(tstream)
+        if self.is_tag_next(enums.Tags.UNIQUE_IDENTIFIER, tstream):
+            self.unique_identifier = attributes.UniqueIdentifier()
+            self.unique_identifier.read(tstream)
 
         self.is_oversized(tstream)
         self.validate()
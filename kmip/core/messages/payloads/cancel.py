@@ -0,0 +1,189 @@
+# Copyright (c) 2015 Hewlett Packard Development Company, L.P.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from kmip.core import enums
+
+from kmip.core.messages.contents import AsynchronousCorrelationValue
+
+from kmip.core.misc import CancellationResult
+
+from kmip.core.primitives import Struct
+
+from kmip.core.utils import BytearrayStream
+
+
+class CancelRequestPayload(Struct):
+    """
+    A request payload for the Cancel operation.
+
+    The payload contains the correlation value of an asynchronous operation
+    that the server should cancel. See Section 4.26 of the KMIP 1.1
+    specification for more information.
+
+    Attributes:
+        asynchronous_correlation_value: The correlation value returned with
+            the pending result of the operation.
+    """
+    def __init__(self, asynchronous_correlation_value=None):
+        """
+        Construct a CancelRequestPayload object.
+
+        Args:
+            asynchronous_correlation_value (AsynchronousCorrelationValue): The
+                correlation value of the pending operation. Optional,
+                defaults to None.
+        """
+        super(CancelRequestPayload, self).__init__(
+            tag=enums.Tags.REQUEST_PAYLOAD)
+        self.asynchronous_correlation_value = asynchronous_correlation_value
+        self.validate()
+
+    def read(self, istream):
+        """
+        Read the data encoding the CancelRequestPayload object and decode it
+        into its constituent parts.
+
+        Args:
+            istream (Stream): A data stream containing encoded object data,
+                supporting a read method; usually a BytearrayStream object.
+        """
+        super(CancelRequestPayload, self).read(istream)
+        tstream = BytearrayStream(istream.read(self.length))
+
+        if self.is_tag_next(enums.Tags.ASYNCHRONOUS_CORRELATION_VALUE,
+                            tstream):
+            self.asynchronous_correlation_value = \
+                AsynchronousCorrelationValue()
+            self.asynchronous_correlation_value.read(tstream)
+
+        self.is_oversized(tstream)
+        self.validate()
+
+    def write(self, ostream):
+        """
+        Write the data encoding the CancelRequestPayload object to a stream.
+
+        Args:
+            ostream (Stream): A data stream in which to encode object data,
+                supporting a write method; usually a BytearrayStream object.
+        """
+        tstream = BytearrayStream()
+
+        if self.asynchronous_correlation_value is not None:
+            self.asynchronous_correlation_value.write(tstream)
+
+        self.length = tstream.length()
+        super(CancelRequestPayload, self).write(ostream)
+        ostream.write(tstream.buffer)
+
+    def validate(self):
+        """
+        Error check the attributes of the CancelRequestPayload object.
+        """
+        if self.asynchronous_correlation_value is not None:
+            if not isinstance(self.asynchronous_correlation_value,
+                              AsynchronousCorrelationValue):
+                msg = "invalid asynchronous correlation value"
+                raise TypeError(msg)
+
+
+class CancelResponsePayload(Struct):
+    """
+    A response payload for the Cancel operation.
+
+    The payload contains the correlation value of the asynchronous operation
+    and the outcome of the cancellation. See Section 4.26 of the KMIP 1.1
+    specification for more information.
+
+    Attributes:
+        asynchronous_correlation_value: The correlation value of the
+            operation.
+        cancellation_result: What happened to the operation.
+    """
+    def __init__(self, asynchronous_correlation_value=None,
+                 cancellation_result=None):
+        """
+        Construct a CancelResponsePayload object.
+
+        Args:
+            asynchronous_correlation_value (AsynchronousCorrelationValue): The
+                correlation value of the operation. Optional, defaults to
+                None.
+            cancellation_result (CancellationResult): The outcome of the
+                cancellation. Optional, defaults to None.
+        """
+        super(CancelResponsePayload, self).__init__(
+            tag=enums.Tags.RESPONSE_PAYLOAD)
+        self.asynchronous_correlation_value = asynchronous_correlation_value
+        self.cancellation_result = cancellation_result
+        self.validate()
+
+    def read(self, istream):
+        """
+        Read the data encoding the CancelResponsePayload object and decode it
+        into its constituent parts.
+
+        Args:
+            istream (Stream): A data stream containing encoded object data,
+                supporting a read method; usually a BytearrayStream object.
+        """
+        super(CancelResponsePayload, self).read(istream)
+        tstream = BytearrayStream(istream.read(self.length))
+
+        if self.is_tag_next(enums.Tags.ASYNCHRONOUS_CORRELATION_VALUE,
+                            tstream):
+            self.asynchronous_correlation_value = \
+                AsynchronousCorrelationValue()
+            self.asynchronous_correlation_value.read(tstream)
+
+        if self.is_tag_next(enums.Tags.CANCELLATION_RESULT, tstream):
+            self.cancellation_result = CancellationResult()
+            self.cancellation_result.read(tstream)
+
+        self.is_oversized(tstream)
+        self.validate()
+
+    def write(self, ostream):
+        """
+        Write the data encoding the CancelResponsePayload object to a stream.
+
+        Args:
+            ostream (Stream): A data stream in which to encode object data,
+                supporting a write method; usually a BytearrayStream object.
+        """
+        tstream = BytearrayStream()
+
+        if self.asynchronous_correlation_value is not None:
+            self.asynchronous_correlation_value.write(tstream)
+        if self.cancellation_result is not None:
+            self.cancellation_result.write(tstream)
+
+        self.length = tstream.length()
+        super(CancelResponsePayload, self).write(ostream)
+        ostream.write(tstream.buffer)
+
+    def validate(self):
+        """
+        Error check the attributes of the CancelResponsePayload object.
+        """
+        if self.asynchronous_correlation_value is not None:
+            if not isinstance(self.asynchronous_correlation_value,
+                              AsynchronousCorrelationValue):
+                msg = "invalid asynchronous correlation value"
+                raise TypeError(msg)
+        if self.cancellation_result is not None:
+            if not isinstance(self.cancellation_result, CancellationResult):
+                msg = "invalid cancellation result"
+                raise TypeError(msg)
@@ -71,8 +71,9 @@ class RevokeRequestPayload(Struct):
         super(RevokeRequestPayload, self).read(istream)
         tstream = BytearrayStream(istream.read(self.length))
 
-        self.unique_identifier = attributes.UniqueIdentifier()
-        self.unique_identifier.read(tstream)
+        if self.is_tag_next(enums.Tags.UNIQUE_IDENTIFIER, tstream):
+            self.unique_identifier = attributes.UniqueIdentifier()
+            self.unique_identifier.read(tstream)
 
         self.revocation_reason = objects.RevocationReason()
         self.revocation_reason.read(tstream)
@@ -13,6 +13,7 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+from kmip.core.enums import CancellationResult as CancellationResultEnum
 from kmip.core.enums import KeyFormatType as KeyFormatTypeEnum
 from kmip.core.enums import Tags
 from kmip.core.enums import QueryFunction as QueryFunctionEnum
@@ -90,6 +91,29 @@ class QueryFunction(Enumeration):
         super(QueryFunction, self).__init__(value, Tags.QUERY_FUNCTION)
 
 
+class CancellationResult(Enumeration):
+    """
+    An encodeable wrapper for the CancellationResult enumeration.
+
+    Returned by KMIP servers in response to a Cancel request to indicate what
+    happened to the asynchronous operation. See Sections 4.26 and 9.1.3.2.25
+    of the KMIP 1.1 specification for more information.
+    """
+    ENUM_TYPE = CancellationResultEnum
+
+    def __init__(self, value=None):
+        """
+        Construct a CancellationResult object.
+
+        Args:
+            value (CancellationResult enum): A CancellationResult enumeration
+                value, (e.g., CancellationResult.CANCELED). Optional, default
+                to None.
+        """
+        super(CancellationResult, self).__init__(
+            value, Tags.CANCELLATION_RESULT)
+
+
 class VendorIdentification(TextString):
     """
     A text string uniquely identifying a KMIP vendor.
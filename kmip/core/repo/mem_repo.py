@@ -13,6 +13,9 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import contextlib
+import threading
+
 from kmip.core.repo.repo import ManagedObjectRepo
 
 
@@ -21,31 +24,48 @@ class MemRepo(ManagedObjectRepo):
     def __init__(self):
         self.repo = {}
         self.uuid = 1
+        # Guards the UUID counter and the check-then-act sequences below so
+        # the repo can be shared by concurrent connection handlers.
+        self._lock = threading.RLock()
 
     def save(self, managed_object, attributes):
         # TODO (nate) verify the parameters
-        uuid = "{0}".format(self.uuid)
-        self.repo[uuid] = (managed_object, attributes)
-        self.uuid += 1
+        with self._lock:
+            uuid = "{0}".format(self.uuid)
+            self.repo[uuid] = (managed_object, attributes)
+            self.uuid += 1
         return uuid
 
     def get(self, uuid):
-        if uuid is None or uuid not in self.repo:
-            return (None, None)
-        return self.repo[uuid]
+        with self._lock:
+            if uuid is None or uuid not in self.repo:
+                return (None, None)
+            return self.repo[uuid]
 
     def update(self, uuid, managed_object, attributes):
-        if uuid is None:
-            return False
-        self.repo[uuid] = (managed_object, attributes)
+        with self._lock:
+            if uuid is None or uuid not in self.repo:
+                return False
+            self.repo[uuid] = (managed_object, attributes)
         return True
 
     def delete(self, uuid):
-        if uuid is None or uuid not in self.repo:
-            return False
-        del self.repo[uuid]
+        with self._lock:
+            if uuid is None or uuid not in self.repo:
+                return False
+            del self.repo[uuid]
         return True
 
+    @contextlib.contextmanager
+    def transaction(self):
+        with self._lock:
+            yield
+
     def locate(self, maximum_items, storage_status_mask,
                object_group_member, attributes):
-        raise NotImplementedError
+        with self._lock:
+            entries = list(self.repo.items())
+        uuids = [uuid for uuid, (_, object_attributes)
+                 in sorted(entries, key=lambda entry: int(entry[0]))
+                 if self._matches(object_attributes, attributes)]
+        return self._limit(uuids, maximum_items)
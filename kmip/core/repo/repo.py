@@ -13,6 +13,10 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import contextlib
+
+from kmip.core.utils import BytearrayStream
+
 
 class ManagedObjectRepo(object):
     """Stores and manages KMIP managed objects.
@@ -71,3 +75,54 @@ class ManagedObjectRepo(object):
         :returns: True if successfully deleted, False if not found
         """
         raise NotImplementedError
+
+    def locate(self, maximum_items, storage_status_mask,
+               object_group_member, attributes):
+        """Find managed objects by their attributes
+
+        Returns the UUIDs of the objects holding every attribute in the
+        attributes list, in the order the objects were saved. Storage
+        status and object group membership are not tracked, so every
+        object is taken to be online and the matching ignores both.
+        :param maximum_items: the largest number of UUIDs to return, or None
+        :param storage_status_mask: ignored
+        :param object_group_member: ignored
+        :param attributes: list of attributes the objects must hold
+        :returns: a list of UUID strings
+        """
+        raise NotImplementedError
+
+    def _matches(self, attributes, criteria):
+        # Attribute values are compared by their encoding, since not every
+        # attribute value type defines equality.
+        encoded = [(attribute.attribute_name.value,
+                    self._encode_value(attribute))
+                   for attribute in attributes]
+        for criterion in criteria or []:
+            if (criterion.attribute_name.value,
+                    self._encode_value(criterion)) not in encoded:
+                return False
+        return True
+
+    def _encode_value(self, attribute):
+        stream = BytearrayStream()
+        attribute.attribute_value.write(stream)
+        return bytes(stream.buffer)
+
+    def _limit(self, uuids, maximum_items):
+        if maximum_items is None:
+            return uuids
+        return uuids[:maximum_items.value]
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Apply a sequence of repository calls as one unit
+
+        The get, update and delete calls made by the current thread inside
+        the returned context manager are isolated from other threads and
+        processes using the repository, so a read-modify-write cannot undo
+        a concurrent delete. Repositories without concurrent users can keep
+        this default, which does nothing.
+        :returns: a context manager
+        """
+        yield
@@ -0,0 +1,170 @@
+# Copyright (c) 2014 The Johns Hopkins University/Applied Physics Laboratory
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import contextlib
+import os
+import sqlite3
+import threading
+
+from kmip.core.enums import ObjectType
+from kmip.core.factories.secrets import SecretFactory
+from kmip.core.objects import Attribute
+from kmip.core.repo.repo import ManagedObjectRepo
+from kmip.core.utils import BytearrayStream
+
+
+class SQLiteRepo(ManagedObjectRepo):
+    """Stores managed objects in an SQLite database file.
+
+    Managed objects and their attributes are stored in their TTLV encoding.
+    SQLite locks the database file across processes, so several server
+    processes, each with their own worker threads, can share one repository.
+    Every thread opens its own database connection.
+    """
+
+    def __init__(self, path, timeout=30):
+        self.path = path
+        self.timeout = timeout
+        self.secret_factory = SecretFactory()
+        self._local = threading.local()
+
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS managed_objects ('
+            'uuid INTEGER PRIMARY KEY AUTOINCREMENT, '
+            'object_type TEXT NOT NULL, '
+            'managed_object BLOB NOT NULL, '
+            'attributes BLOB NOT NULL)')
+
+    def save(self, managed_object, attributes):
+        row = self._encode(managed_object, attributes)
+        cursor = self._connection().execute(
+            'INSERT INTO managed_objects '
+            '(object_type, managed_object, attributes) VALUES (?, ?, ?)',
+            row)
+        return "{0}".format(cursor.lastrowid)
+
+    def get(self, uuid):
+        key = self._get_key(uuid)
+        if key is None:
+            return (None, None)
+
+        cursor = self._connection().execute(
+            'SELECT object_type, managed_object, attributes '
+            'FROM managed_objects WHERE uuid = ?', (key,))
+        row = cursor.fetchone()
+        if row is None:
+            return (None, None)
+        return self._decode(*row)
+
+    def update(self, uuid, managed_object, attributes):
+        key = self._get_key(uuid)
+        if key is None:
+            return False
+
+        row = self._encode(managed_object, attributes)
+        cursor = self._connection().execute(
+            'UPDATE managed_objects SET object_type = ?, '
+            'managed_object = ?, attributes = ? WHERE uuid = ?',
+            row + (key,))
+        return cursor.rowcount > 0
+
+    def delete(self, uuid):
+        key = self._get_key(uuid)
+        if key is None:
+            return False
+
+        cursor = self._connection().execute(
+            'DELETE FROM managed_objects WHERE uuid = ?', (key,))
+        return cursor.rowcount > 0
+
+    @contextlib.contextmanager
+    def transaction(self):
+        if getattr(self._local, 'transaction', False):
+            yield
+            return
+
+        # BEGIN IMMEDIATE takes the database write lock up front, so other
+        # processes cannot change the objects read inside the transaction.
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        self._local.transaction = True
+        try:
+            yield
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        else:
+            connection.execute('COMMIT')
+        finally:
+            self._local.transaction = False
+
+    def locate(self, maximum_items, storage_status_mask,
+               object_group_member, attributes):
+        # Attributes are stored encoded, so every object is read and matched
+        # in turn.
+        cursor = self._connection().execute(
+            'SELECT uuid, object_type, managed_object, attributes '
+            'FROM managed_objects ORDER BY uuid')
+        uuids = []
+        for row in cursor.fetchall():
+            _, object_attributes = self._decode(*row[1:])
+            if self._matches(object_attributes, attributes):
+                uuids.append("{0}".format(row[0]))
+        return self._limit(uuids, maximum_items)
+
+    def _connection(self):
+        # Connections must not cross a fork, so they are tied to the process
+        # as well as the thread that opened them.
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            # Each statement commits on its own unless it is run inside
+            # transaction()
+            connection = sqlite3.connect(self.path, timeout=self.timeout,
+                                         isolation_level=None)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _get_key(self, uuid):
+        try:
+            return int(uuid)
+        except (TypeError, ValueError):
+            return None
+
+    def _encode(self, managed_object, attributes):
+        object_stream = BytearrayStream()
+        managed_object.write(object_stream)
+
+        attribute_stream = BytearrayStream()
+        for attribute in attributes:
+            attribute.write(attribute_stream)
+
+        object_type = ObjectType[managed_object.tag.name].name
+        return (object_type,
+                sqlite3.Binary(bytes(object_stream.buffer)),
+                sqlite3.Binary(bytes(attribute_stream.buffer)))
+
+    def _decode(self, object_type, encoded_object, encoded_attributes):
+        managed_object = self.secret_factory.create(ObjectType[object_type])
+        managed_object.read(BytearrayStream(bytes(encoded_object)))
+
+        attributes = []
+        stream = BytearrayStream(bytes(encoded_attributes))
+        while stream.length() > 0:
+            attribute = Attribute()
+            attribute.read(stream)
+            attributes.append(attribute)
+
+        return (managed_object, attributes)
@@ -13,41 +13,68 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import collections
+import contextlib
 import logging
 import os
+import threading
+import time
 
 from kmip.core.attributes import CryptographicLength
 from kmip.core.attributes import CryptographicAlgorithm
 from kmip.core.attributes import ObjectType
+from kmip.core.attributes import PrivateKeyUniqueIdentifier
+from kmip.core.attributes import PublicKeyUniqueIdentifier
 from kmip.core.attributes import UniqueIdentifier
 from kmip.core.enums import AttributeType as AT
 from kmip.core.enums import CryptographicAlgorithm as CA
 from kmip.core.enums import KeyFormatType as KeyFormatTypeEnum
 from kmip.core.enums import ObjectType as OT
+from kmip.core.enums import QueryFunction as QueryFunctionEnum
 from kmip.core.enums import ResultReason as ResultReasonEnum
 from kmip.core.enums import ResultStatus as RS
+from kmip.core.enums import RevocationReasonCode
+from kmip.core.enums import State as StateEnum
 from kmip.core.factories.attributes import AttributeFactory
 from kmip.core.factories.keys import KeyFactory
 from kmip.core.factories.secrets import SecretFactory
+from kmip.core.key_pair_generator import KeyPairGenerator
+from kmip.core.key_pool import KeyPool
 
+from kmip.core.messages.contents import ProtocolVersion
 from kmip.core.messages.contents import ResultStatus
 from kmip.core.messages.contents import ResultReason
 from kmip.core.messages.contents import ResultMessage
 
 from kmip.core.misc import KeyFormatType
+from kmip.core.misc import VendorIdentification
 
 from kmip.core.objects import KeyBlock
 from kmip.core.objects import KeyMaterial
 from kmip.core.objects import KeyValue
 from kmip.core.objects import TemplateAttribute
 from kmip.core.repo.mem_repo import MemRepo
+from kmip.core.secrets import PrivateKey
+from kmip.core.secrets import PublicKey
 from kmip.core.secrets import SymmetricKey
+from kmip.services.results import ActivateResult
+from kmip.services.results import CreateKeyPairResult
 from kmip.services.results import CreateResult
 from kmip.services.results import DestroyResult
+from kmip.services.results import DiscoverVersionsResult
 from kmip.services.results import GetResult
 from kmip.services.results import OperationResult
+from kmip.services.results import QueryResult
 from kmip.services.results import RegisterResult
+from kmip.services.results import RekeyKeyPairResult
 from kmip.services.results import LocateResult
+from kmip.services.results import RevokeResult
+
+# A validation rule for a request attribute: the attribute name, the values
+# accepted (empty accepts any value), the message returned for other values
+# and whether the attribute must be supplied
+AttributeRule = collections.namedtuple(
+    'AttributeRule', ['name', 'values', 'message', 'required'])
 
 
 class KMIP(object):
@@ -60,7 +87,7 @@ class KMIP(object):
 
     def create_key_pair(self, common_template_attribute,
                         private_key_template_attribute,
-                        public_key_template_attribute):
+                        public_key_template_attribute, credential=None):
         raise NotImplementedError()
 
     def register(self, object_type, template_attribute, secret,
@@ -70,7 +97,7 @@ class KMIP(object):
     def rekey_key_pair(self, private_key_unique_identifier,
                        offset, common_template_attribute,
                        private_key_template_attribute,
-                       public_key_template_attribute):
+                       public_key_template_attribute, credential=None):
         raise NotImplementedError()
 
     def get(self, uuid=None, key_format_type=None, key_compression_type=None,
@@ -85,20 +112,102 @@ class KMIP(object):
                credential=None):
         raise NotImplementedError()
 
+    def activate(self, uuid, credential=None):
+        raise NotImplementedError()
+
+    def revoke(self, revocation_reason, uuid=None, compromise_date=None,
+               credential=None):
+        raise NotImplementedError()
+
+    def query(self, query_functions=None, credential=None):
+        raise NotImplementedError()
+
+    def discover_versions(self, protocol_versions=None, credential=None):
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
 
 class KMIPImpl(KMIP):
 
-    def __init__(self):
+    VENDOR_IDENTIFICATION = 'PyKMIP'
+    PROTOCOL_VERSIONS = ((1, 1), (1, 0))
+    # Attributes of a private key that are not carried over to its
+    # replacement by ReKeyKeyPair
+    REKEY_EXCLUDED_ATTRIBUTES = frozenset([
+        AT.UNIQUE_IDENTIFIER.value, AT.STATE.value, AT.INITIAL_DATE.value,
+        AT.ACTIVATION_DATE.value, AT.DEACTIVATION_DATE.value,
+        AT.COMPROMISE_OCCURRENCE_DATE.value, AT.COMPROMISE_DATE.value,
+        AT.REVOCATION_REASON.value])
+
+    # Attribute rules for the supported operations, checked by
+    # _validate_attributes
+    CREATE_RULES = (
+        AttributeRule(AT.CRYPTOGRAPHIC_ALGORITHM.value,
+                      frozenset([CA.AES.value]), 'unsupported algorithm',
+                      True),
+        AttributeRule(AT.CRYPTOGRAPHIC_LENGTH.value,
+                      frozenset([128, 256, 512]), 'unsupported key length',
+                      False),
+        AttributeRule(AT.CRYPTOGRAPHIC_USAGE_MASK.value, frozenset(), '',
+                      True))
+    REGISTER_RULES = (
+        AttributeRule(AT.CRYPTOGRAPHIC_ALGORITHM.value,
+                      frozenset([CA.AES.value]), 'unsupported algorithm',
+                      True),
+        AttributeRule(AT.CRYPTOGRAPHIC_LENGTH.value,
+                      frozenset([128, 256, 512]), 'unsupported key length',
+                      True),
+        AttributeRule(AT.CRYPTOGRAPHIC_USAGE_MASK.value, frozenset(), '',
+                      True))
+    KEY_PAIR_RULES = (
+        AttributeRule(AT.CRYPTOGRAPHIC_ALGORITHM.value,
+                      frozenset(algorithm.value for algorithm in
+                                KeyPairGenerator.SUPPORTED_ALGORITHMS),
+                      'unsupported algorithm', True),
+        AttributeRule(AT.CRYPTOGRAPHIC_LENGTH.value,
+                      frozenset(KeyPairGenerator.SUPPORTED_LENGTHS),
+                      'unsupported key length', True),
+        AttributeRule(AT.CRYPTOGRAPHIC_USAGE_MASK.value, frozenset(), '',
+                      True))
+
+    def __init__(self, repo=None, key_pool_size=0, key_pool_low_water_mark=0,
+                 key_pair_generator=None):
         super(KMIPImpl, self).__init__()
         self.logger = logging.getLogger(__name__)
         self.key_factory = KeyFactory()
         self.secret_factory = SecretFactory()
         self.attribute_factory = AttributeFactory()
-        self.repo = MemRepo()
+        if repo is None:
+            repo = MemRepo()
+        self.repo = repo
+        # Serializes the read-modify-write of object state attributes with
+        # each other and with Destroy
+        self._state_lock = threading.Lock()
+
+        # Keys for Create are taken from a pool refilled in the background
+        # rather than generated on the request path.
+        self.key_pool = None
+        if key_pool_size > 0:
+            self.key_pool = KeyPool(
+                self._gen_pooled_key, size=key_pool_size,
+                low_water_mark=key_pool_low_water_mark)
+
+        # Key pairs are generated in worker processes, off the server threads
+        if key_pair_generator is None:
+            key_pair_generator = KeyPairGenerator()
+        self.key_pair_generator = key_pair_generator
+
+    def close(self):
+        # Stop refilling the key pools and shut down the key pair workers
+        if self.key_pool is not None:
+            self.key_pool.close()
+        self.key_pair_generator.close()
 
     def create(self, object_type, template_attribute, credential=None):
         self.logger.debug('create() called')
-        self.logger.debug('object type = %s' % object_type)
+        self.logger.debug('object type = %s', object_type)
         bit_length = 256
         attributes = template_attribute.attributes
         ret_attributes = []
@@ -106,24 +215,13 @@ class KMIPImpl(KMIP):
             self.logger.debug('invalid object type')
             return self._get_invalid_field_result('invalid object type')
         try:
-            alg_attr =\
-                self._validate_req_field(attributes,
-                                         AT.CRYPTOGRAPHIC_ALGORITHM.value,
-                                         (CA.AES.value,),
-                                         'unsupported algorithm')
-            len_attr = self._validate_req_field(attributes,
-                                                AT.CRYPTOGRAPHIC_LENGTH.value,
-                                                (128, 256, 512),
-                                                'unsupported key length',
-                                                False)
-            self._validate_req_field(attributes,
-                                     AT.CRYPTOGRAPHIC_USAGE_MASK.value,
-                                     (),
-                                     '')
+            found = self._validate_attributes(attributes, self.CREATE_RULES)
         except InvalidFieldException as e:
             self.logger.debug('InvalidFieldException raised')
             return e.result
 
+        alg_attr = found[AT.CRYPTOGRAPHIC_ALGORITHM.value]
+        len_attr = found[AT.CRYPTOGRAPHIC_LENGTH.value]
         crypto_alg = CryptographicAlgorithm(CA(alg_attr.attribute_value.value))
 
         if len_attr is None:
@@ -136,7 +234,10 @@ class KMIPImpl(KMIP):
         else:
             bit_length = len_attr.attribute_value.value
 
-        key = self._gen_symmetric_key(bit_length, crypto_alg)
+        if self.key_pool is not None:
+            key = self.key_pool.get(crypto_alg.enum, bit_length)
+        else:
+            key = self._gen_symmetric_key(bit_length, crypto_alg)
         s_uuid, uuid_attribute = self._save(key, attributes)
         ret_attributes.append(uuid_attribute)
         template_attribute = TemplateAttribute(attributes=ret_attributes)
@@ -146,13 +247,26 @@ class KMIPImpl(KMIP):
 
     def create_key_pair(self, common_template_attribute,
                         private_key_template_attribute,
-                        public_key_template_attribute):
-        raise NotImplementedError()
+                        public_key_template_attribute, credential=None):
+        self.logger.debug('create_key_pair() called')
+        if not self.key_pair_generator.available:
+            self.logger.debug('key pair generation is not available')
+            raise NotImplementedError()
+
+        common = self._get_template_attributes(common_template_attribute)
+        private_attributes = self._merge_attributes(
+            common, self._get_template_attributes(
+                private_key_template_attribute))
+        public_attributes = self._merge_attributes(
+            common, self._get_template_attributes(
+                public_key_template_attribute))
+        return self._create_key_pair(private_attributes, public_attributes,
+                                     CreateKeyPairResult)
 
     def register(self, object_type, template_attribute, secret,
                  credential=None):
         self.logger.debug('register() called')
-        self.logger.debug('object type = %s' % object_type)
+        self.logger.debug('object type = %s', object_type)
         attributes = template_attribute.attributes
         ret_attributes = []
         if object_type is None:
@@ -173,18 +287,7 @@ class KMIPImpl(KMIP):
 
         self.logger.debug('Verifying all attributes are valid and set')
         try:
-            self._validate_req_field(attributes,
-                                     AT.CRYPTOGRAPHIC_ALGORITHM.value,
-                                     (CA.AES.value,),
-                                     'unsupported algorithm')
-            self._validate_req_field(attributes,
-                                     AT.CRYPTOGRAPHIC_LENGTH.value,
-                                     (128, 256, 512),
-                                     'unsupported key length')
-            self._validate_req_field(attributes,
-                                     AT.CRYPTOGRAPHIC_USAGE_MASK.value,
-                                     (),
-                                     '')
+            self._validate_attributes(attributes, self.REGISTER_RULES)
         except InvalidFieldException as e:
             self.logger.debug('InvalidFieldException raised')
             return RegisterResult(e.result.result_status,
@@ -201,8 +304,53 @@ class KMIPImpl(KMIP):
     def rekey_key_pair(self, private_key_unique_identifier,
                        offset, common_template_attribute,
                        private_key_template_attribute,
-                       public_key_template_attribute):
-        raise NotImplementedError()
+                       public_key_template_attribute, credential=None):
+        self.logger.debug('rekey_key_pair() called')
+        if not self.key_pair_generator.available:
+            self.logger.debug('key pair generation is not available')
+            raise NotImplementedError()
+
+        ret_value = RS.OPERATION_FAILED
+        if offset is not None:
+            self.logger.debug('offset is not None')
+            reason = ResultReason(ResultReasonEnum.FEATURE_NOT_SUPPORTED)
+            message = ResultMessage('offset is not currently supported')
+            return RekeyKeyPairResult(ResultStatus(ret_value), reason,
+                                      message)
+
+        uuid = private_key_unique_identifier
+        managed_object = None
+        if uuid is not None and hasattr(uuid, 'value'):
+            managed_object, attributes = self.repo.get(uuid.value)
+        if managed_object is None:
+            self.logger.debug('private key not found in repo')
+            reason = ResultReason(ResultReasonEnum.ITEM_NOT_FOUND)
+            message = ResultMessage('')
+            return RekeyKeyPairResult(ResultStatus(ret_value), reason,
+                                      message)
+        if not isinstance(managed_object, PrivateKey):
+            result = self._get_invalid_field_result('object is not a '
+                                                    'private key')
+            return RekeyKeyPairResult(result.result_status,
+                                      result.result_reason,
+                                      result.result_message)
+
+        # The new pair takes the attributes of the old private key, less its
+        # identity and life cycle, overridden by the supplied templates.
+        inherited = [attribute for attribute in attributes
+                     if attribute.attribute_name.value not in
+                     self.REKEY_EXCLUDED_ATTRIBUTES]
+        common = self._merge_attributes(
+            inherited, self._get_template_attributes(
+                common_template_attribute))
+        private_attributes = self._merge_attributes(
+            common, self._get_template_attributes(
+                private_key_template_attribute))
+        public_attributes = self._merge_attributes(
+            common, self._get_template_attributes(
+                public_key_template_attribute))
+        return self._create_key_pair(private_attributes, public_attributes,
+                                     RekeyKeyPairResult)
 
     def get(self,
             uuid=None,
@@ -217,15 +365,6 @@ class KMIPImpl(KMIP):
             reason = ResultReason(ResultReasonEnum.ITEM_NOT_FOUND)
             message = ResultMessage('')
             return GetResult(ResultStatus(ret_value), reason, message)
-        if key_format_type is None:
-            self.logger.debug('key format type is None, setting to raw')
-            key_format_type = KeyFormatType(KeyFormatTypeEnum.RAW)
-        if key_format_type.enum != KeyFormatTypeEnum.RAW:
-            self.logger.debug('key format type is not raw')
-            reason = ResultReason(ResultReasonEnum.
-                                  KEY_FORMAT_TYPE_NOT_SUPPORTED)
-            message = ResultMessage('')
-            return GetResult(ResultStatus(ret_value), reason, message)
         if key_compression_type is not None:
             self.logger.debug('key compression type is not None')
             reason = ResultReason(ResultReasonEnum.
@@ -247,8 +386,18 @@ class KMIPImpl(KMIP):
             message = ResultMessage('')
             return GetResult(ResultStatus(ret_value), reason, message)
 
-        # currently only symmetric keys are supported, fix this in future
-        object_type = ObjectType(OT.SYMMETRIC_KEY)
+        # Keys are returned in the format they are stored in; symmetric keys
+        # are raw and key pairs are PKCS#1.
+        if key_format_type is not None and \
+                key_format_type.enum != \
+                managed_object.key_block.key_format_type.enum:
+            self.logger.debug('key format type does not match')
+            reason = ResultReason(ResultReasonEnum.
+                                  KEY_FORMAT_TYPE_NOT_SUPPORTED)
+            message = ResultMessage('')
+            return GetResult(ResultStatus(ret_value), reason, message)
+
+        object_type = ObjectType(OT[managed_object.tag.name])
         ret_value = RS.SUCCESS
         return GetResult(ResultStatus(ret_value), object_type=object_type,
                          uuid=uuid, secret=managed_object)
@@ -264,7 +413,9 @@ class KMIPImpl(KMIP):
 
         msg = 'deleting object from repo: {0}'.format(uuid)
         self.logger.debug(msg)
-        if not self.repo.delete(uuid.value):
+        with self._changing_state():
+            deleted = self.repo.delete(uuid.value)
+        if not deleted:
             self.logger.debug('repo did not find and delete managed object')
             reason = ResultReason(ResultReasonEnum.ITEM_NOT_FOUND)
             message = ResultMessage('')
@@ -282,44 +433,267 @@ class KMIPImpl(KMIP):
         try:
             uuids = self.repo.locate(maximum_items, storage_status_mask,
                                      object_group_member, attributes)
-            return LocateResult(ResultStatus(RS.SUCCESS), uuids=uuids)
+            return LocateResult(ResultStatus(RS.SUCCESS),
+                                uuids=[UniqueIdentifier(uuid)
+                                       for uuid in uuids])
         except NotImplementedError:
             msg = ResultMessage('Locate Operation Not Supported')
             reason = ResultReason(ResultReasonEnum.OPERATION_NOT_SUPPORTED)
             return LocateResult(ResultStatus(RS.OPERATION_FAILED),
                                 result_reason=reason, result_message=msg)
 
-    def _validate_req_field(self, attrs, name, expected, msg, required=True):
-        self.logger.debug('Validating attribute %s' % name)
-        seen = False
-        found_attr = None
-        for attr in attrs:
-            if self._validate_field(attr, name, expected, msg):
-                if seen:
-                    # TODO check what spec says to do on this
-                    msg = 'duplicate attribute: %s' % name
-                    self.logger.debug(msg)
-                    result = self._get_duplicate_attribute_result(name)
-                    raise InvalidFieldException(result)
-                seen = True
-                found_attr = attr
-        if required and not seen:
-            result = self._get_missing_field_result(name)
-            raise InvalidFieldException(result)
-        return found_attr
-
-    def _validate_field(self, attr, name, expected, msg):
-        if attr.attribute_name.value == name:
-            self.logger.debug('validating attribute %s' % name)
-            if not expected or attr.attribute_value.value in expected:
-                self.logger.debug('attribute validated')
-                return True
+    def activate(self, uuid, credential=None):
+        self.logger.debug('activate() called')
+        ret_value = RS.OPERATION_FAILED
+        if uuid is None or not hasattr(uuid, 'value'):
+            self.logger.debug('no uuid provided')
+            reason = ResultReason(ResultReasonEnum.ITEM_NOT_FOUND)
+            message = ResultMessage('')
+            return ActivateResult(ResultStatus(ret_value), reason, message)
+
+        with self._changing_state():
+            managed_object, attributes = self.repo.get(uuid.value)
+            if managed_object is None:
+                self.logger.debug('object not found in repo')
+                reason = ResultReason(ResultReasonEnum.ITEM_NOT_FOUND)
+                message = ResultMessage('')
+                return ActivateResult(ResultStatus(ret_value), reason,
+                                      message)
+
+            if self._get_state(attributes) is not StateEnum.PRE_ACTIVE:
+                self.logger.debug('object is not pre-active')
+                reason = ResultReason(ResultReasonEnum.PERMISSION_DENIED)
+                message = ResultMessage('object is not pre-active')
+                return ActivateResult(ResultStatus(ret_value), reason,
+                                      message)
+
+            self._set_attribute(attributes, AT.STATE, StateEnum.ACTIVE)
+            self._set_attribute(attributes, AT.ACTIVATION_DATE,
+                                int(time.time()))
+            if not self.repo.update(uuid.value, managed_object, attributes):
+                self.logger.debug('object not found in repo')
+                reason = ResultReason(ResultReasonEnum.ITEM_NOT_FOUND)
+                message = ResultMessage('')
+                return ActivateResult(ResultStatus(ret_value), reason,
+                                      message)
+
+        ret_value = RS.SUCCESS
+        return ActivateResult(ResultStatus(ret_value), uuid=uuid)
+
+    def revoke(self, revocation_reason, uuid=None, compromise_date=None,
+               credential=None):
+        self.logger.debug('revoke() called')
+        ret_value = RS.OPERATION_FAILED
+        if uuid is None or not hasattr(uuid, 'value'):
+            self.logger.debug('no uuid provided')
+            reason = ResultReason(ResultReasonEnum.ITEM_NOT_FOUND)
+            message = ResultMessage('')
+            return RevokeResult(ResultStatus(ret_value), reason, message)
+
+        code = revocation_reason.revocation_code.enum
+        compromised = code in (RevocationReasonCode.KEY_COMPROMISE,
+                               RevocationReasonCode.CA_COMPROMISE)
+
+        with self._changing_state():
+            managed_object, attributes = self.repo.get(uuid.value)
+            if managed_object is None:
+                self.logger.debug('object not found in repo')
+                reason = ResultReason(ResultReasonEnum.ITEM_NOT_FOUND)
+                message = ResultMessage('')
+                return RevokeResult(ResultStatus(ret_value), reason, message)
+
+            now = int(time.time())
+            if compromised:
+                self._set_attribute(attributes, AT.STATE,
+                                    StateEnum.COMPROMISED)
+                self._set_attribute(attributes, AT.COMPROMISE_DATE, now)
+                if compromise_date is not None:
+                    self._set_attribute(attributes,
+                                        AT.COMPROMISE_OCCURRENCE_DATE,
+                                        compromise_date.value)
             else:
-                self.logger.debug('attribute not validated')
-                result = self._get_invalid_field_result(msg)
+                if self._get_state(attributes) is not StateEnum.ACTIVE:
+                    self.logger.debug('object is not active')
+                    reason = ResultReason(ResultReasonEnum.PERMISSION_DENIED)
+                    message = ResultMessage('object is not active')
+                    return RevokeResult(ResultStatus(ret_value), reason,
+                                        message)
+                self._set_attribute(attributes, AT.STATE,
+                                    StateEnum.DEACTIVATED)
+                self._set_attribute(attributes, AT.DEACTIVATION_DATE, now)
+            if not self.repo.update(uuid.value, managed_object, attributes):
+                self.logger.debug('object not found in repo')
+                reason = ResultReason(ResultReasonEnum.ITEM_NOT_FOUND)
+                message = ResultMessage('')
+                return RevokeResult(ResultStatus(ret_value), reason, message)
+
+        ret_value = RS.SUCCESS
+        return RevokeResult(ResultStatus(ret_value), unique_identifier=uuid)
+
+    def query(self, query_functions=None, credential=None):
+        self.logger.debug('query() called')
+        functions = set()
+        if query_functions is not None:
+            functions = set(function.enum for function in query_functions)
+
+        object_types = None
+        vendor_identification = None
+        if QueryFunctionEnum.QUERY_OBJECTS in functions:
+            object_types = [ObjectType(OT.SYMMETRIC_KEY)]
+        if QueryFunctionEnum.QUERY_SERVER_INFORMATION in functions:
+            vendor_identification = VendorIdentification(
+                self.VENDOR_IDENTIFICATION)
+
+        # Supported operations depend on the message processor and are
+        # filled in by it.
+        return QueryResult(ResultStatus(RS.SUCCESS),
+                           object_types=object_types,
+                           vendor_identification=vendor_identification)
+
+    def discover_versions(self, protocol_versions=None, credential=None):
+        self.logger.debug('discover_versions() called')
+        supported = [ProtocolVersion.create(major, minor)
+                     for major, minor in self.PROTOCOL_VERSIONS]
+        if protocol_versions:
+            supported = [version for version in protocol_versions
+                         if version in supported]
+        return DiscoverVersionsResult(ResultStatus(RS.SUCCESS),
+                                      protocol_versions=supported)
+
+    def _create_key_pair(self, private_attributes, public_attributes,
+                         result_class):
+        try:
+            algorithm, length = self._validate_key_pair_attributes(
+                private_attributes)
+            if (algorithm, length) != self._validate_key_pair_attributes(
+                    public_attributes):
+                result = self._get_invalid_field_result(
+                    'private and public key attributes do not match')
                 raise InvalidFieldException(result)
-        else:
-            return False
+        except InvalidFieldException as e:
+            self.logger.debug('InvalidFieldException raised')
+            return result_class(e.result.result_status,
+                                e.result.result_reason,
+                                e.result.result_message)
+
+        try:
+            public_bytes, private_bytes = self.key_pair_generator.generate(
+                algorithm, length)
+        except NotImplementedError:
+            raise
+        except Exception as e:
+            self.logger.error('key pair generation failed: {0}'.format(e))
+            status = ResultStatus(RS.OPERATION_FAILED)
+            reason = ResultReason(ResultReasonEnum.GENERAL_FAILURE)
+            message = ResultMessage('key pair generation failed')
+            return result_class(status, reason, message)
+
+        private_key = PrivateKey(self._get_key_pair_key_block(
+            private_bytes, algorithm, length))
+        public_key = PublicKey(self._get_key_pair_key_block(
+            public_bytes, algorithm, length))
+        private_uuid, _ = self._save(private_key, private_attributes)
+        public_uuid, _ = self._save(public_key, public_attributes)
+        return result_class(
+            ResultStatus(RS.SUCCESS),
+            private_key_uuid=PrivateKeyUniqueIdentifier(private_uuid),
+            public_key_uuid=PublicKeyUniqueIdentifier(public_uuid))
+
+    def _validate_key_pair_attributes(self, attributes):
+        found = self._validate_attributes(attributes, self.KEY_PAIR_RULES)
+        alg_attr = found[AT.CRYPTOGRAPHIC_ALGORITHM.value]
+        len_attr = found[AT.CRYPTOGRAPHIC_LENGTH.value]
+        return (CA(alg_attr.attribute_value.value),
+                len_attr.attribute_value.value)
+
+    def _get_template_attributes(self, template_attribute):
+        if template_attribute is None or template_attribute.attributes is None:
+            return []
+        return template_attribute.attributes
+
+    def _merge_attributes(self, attributes, overrides):
+        # Attributes in overrides replace those of the same name
+        names = set(attribute.attribute_name.value for attribute in overrides)
+        merged = [attribute for attribute in attributes
+                  if attribute.attribute_name.value not in names]
+        merged.extend(overrides)
+        return merged
+
+    @contextlib.contextmanager
+    def _changing_state(self):
+        # The lock orders state changes within this process; the repository
+        # transaction makes them atomic for a repository shared with other
+        # processes.
+        with self._state_lock:
+            with self.repo.transaction():
+                yield
+
+    def _get_state(self, attributes):
+        # Objects created before state tracking have no State attribute and
+        # are treated as pre-active, the initial state of new objects.
+        for attribute in attributes:
+            if attribute.attribute_name.value == AT.STATE.value:
+                return attribute.attribute_value.enum
+        return StateEnum.PRE_ACTIVE
+
+    def _set_attribute(self, attributes, attribute_type, value):
+        attribute = self.attribute_factory.create_attribute(attribute_type,
+                                                            value)
+        for i, existing in enumerate(attributes):
+            if existing.attribute_name.value == attribute_type.value:
+                attributes[i] = attribute
+                return
+        attributes.append(attribute)
+
+    def _index_attributes(self, attributes):
+        # Maps each attribute name to the attributes of that name, in the
+        # order they were supplied
+        index = {}
+        for attribute in attributes:
+            index.setdefault(attribute.attribute_name.value,
+                             []).append(attribute)
+        return index
+
+    def _validate_attributes(self, attributes, rules):
+        """
+        Check request attributes against a table of rules.
+
+        The attributes are indexed by name once, so each rule is a lookup
+        rather than a scan of the whole list.
+
+        Args:
+            attributes (list): The Attribute objects of the request.
+            rules (tuple): The AttributeRules to check.
+
+        Returns:
+            dict: The attribute found for each rule, keyed by attribute name;
+                None for optional attributes that were not supplied.
+
+        Raises:
+            InvalidFieldException: if an attribute is missing, has a value
+                the rule does not accept or is supplied more than once.
+        """
+        index = self._index_attributes(attributes)
+        found = {}
+        for rule in rules:
+            self.logger.debug('validating attribute %s', rule.name)
+            matches = index.get(rule.name, ())
+            for i, attribute in enumerate(matches):
+                if rule.values and \
+                        attribute.attribute_value.value not in rule.values:
+                    result = self._get_invalid_field_result(rule.message)
+                    raise InvalidFieldException(result)
+                if i > 0:
+                    result = self._get_duplicate_attribute_result(rule.name)
+                    raise InvalidFieldException(result)
+            if not matches:
+                if rule.required:
+                    result = self._get_missing_field_result(rule.name)
+                    raise InvalidFieldException(result)
+                found[rule.name] = None
+            else:
+                found[rule.name] = matches[0]
+        return found
 
     def _get_invalid_field_result(self, msg):
         status = ResultStatus(RS.OPERATION_FAILED)
@@ -352,9 +726,20 @@ class KMIPImpl(KMIP):
                              crypto_length, None)
         return SymmetricKey(key_block)
 
+    def _get_key_pair_key_block(self, key_bytes, algorithm, bit_length):
+        key_format_type = KeyFormatType(KeyFormatTypeEnum.PKCS_1)
+        key_value = KeyValue(KeyMaterial(key_bytes))
+        return KeyBlock(key_format_type, None, key_value,
+                        CryptographicAlgorithm(algorithm),
+                        CryptographicLength(bit_length), None)
+
+    def _gen_pooled_key(self, algorithm, bit_length):
+        return self._gen_symmetric_key(bit_length,
+                                       CryptographicAlgorithm(algorithm))
+
     def _save(self, key, attributes):
         s_uuid = self.repo.save(key, attributes)
-        self.logger.debug('creating object with uuid = %s' % s_uuid)
+        self.logger.debug('creating object with uuid = %s', s_uuid)
         attribute_type = AT.UNIQUE_IDENTIFIER
         attribute = self.attribute_factory.create_attribute(attribute_type,
                                                             s_uuid)
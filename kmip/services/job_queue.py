@@ -0,0 +1,182 @@
+# Copyright (c) 2015 Hewlett Packard Development Company, L.P.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import collections
+import copy
+import logging
+import threading
+import uuid
+
+from multiprocessing.pool import ThreadPool
+
+from kmip.core.enums import CancellationResult
+
+PENDING = 'pending'
+RUNNING = 'running'
+COMPLETED = 'completed'
+
+
+class Job(object):
+    """
+    An operation run in the background by a JobQueue.
+
+    Attributes:
+        operation: The operation being run.
+        state: PENDING, RUNNING or COMPLETED.
+        result: The return value of the job function once completed.
+        error: The exception raised by the job function, if any.
+    """
+
+    def __init__(self, operation):
+        self.operation = operation
+        self.state = PENDING
+        self.result = None
+        self.error = None
+
+
+class JobQueue(object):
+    """
+    Runs operations on a pool of worker threads and keeps their results until
+    they are collected.
+
+    Every job is identified by a random correlation value. Completed jobs are
+    kept until they are polled; when max_jobs jobs are held, the oldest
+    uncollected result is dropped to make room for a new job. If every job is
+    still pending or running, no new job is accepted.
+    """
+
+    def __init__(self, workers=2, max_jobs=256):
+        """
+        Construct a JobQueue.
+
+        Args:
+            workers (int): The number of worker threads. Optional, defaults
+                to 2.
+            max_jobs (int): The maximum number of jobs held at once, pending,
+                running or completed. Optional, defaults to 256.
+        """
+        if workers < 1:
+            raise ValueError('a job queue needs at least one worker')
+
+        self.logger = logging.getLogger(__name__)
+        self.max_jobs = max_jobs
+        self._pool = ThreadPool(workers)
+        self._jobs = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, operation, function, *args):
+        """
+        Queue a function to run in the background.
+
+        Args:
+            operation (Operation): The operation run by the function.
+            function (callable): The function to call with args.
+
+        Returns:
+            bytes: The correlation value of the job, or None if the queue is
+                full.
+        """
+        with self._lock:
+            if len(self._jobs) >= self.max_jobs and not self._evict():
+                return None
+
+            correlation_value = uuid.uuid4().bytes
+            job = Job(operation)
+            self._jobs[correlation_value] = job
+
+        self._pool.apply_async(self._run, (job, function, args))
+        return correlation_value
+
+    def poll(self, correlation_value):
+        """
+        Get the status of a job. A completed job is removed from the queue,
+        so its result is returned only once.
+
+        Args:
+            correlation_value (bytes): The correlation value of the job.
+
+        Returns:
+            Job: A snapshot of the job, or None if there is no such job.
+        """
+        with self._lock:
+            job = self._jobs.get(correlation_value)
+            if job is None:
+                return None
+            if job.state is COMPLETED:
+                del self._jobs[correlation_value]
+            return copy.copy(job)
+
+    def cancel(self, correlation_value):
+        """
+        Cancel a job that has not started yet.
+
+        Args:
+            correlation_value (bytes): The correlation value of the job.
+
+        Returns:
+            CancellationResult: CANCELED if the job was dropped before it
+                started, UNABLE_TO_CANCEL if it is running, COMPLETED or
+                FAILED if it has finished (its result can still be polled),
+                and UNAVAILABLE if there is no such job.
+        """
+        with self._lock:
+            job = self._jobs.get(correlation_value)
+            if job is None:
+                return CancellationResult.UNAVAILABLE
+            if job.state is PENDING:
+                del self._jobs[correlation_value]
+                job.state = COMPLETED
+                return CancellationResult.CANCELED
+            if job.state is RUNNING:
+                return CancellationResult.UNABLE_TO_CANCEL
+            if job.error is not None:
+                return CancellationResult.FAILED
+            return CancellationResult.COMPLETED
+
+    def close(self):
+        """
+        Stop the worker threads. Jobs that have not started are dropped.
+        """
+        self._pool.terminate()
+
+    def _evict(self):
+        for correlation_value, job in self._jobs.items():
+            if job.state is COMPLETED:
+                del self._jobs[correlation_value]
+                self.logger.warning(
+                    'Dropping uncollected result of {0} job'.format(
+                        job.operation))
+                return True
+        return False
+
+    def _run(self, job, function, args):
+        with self._lock:
+            # Cancelled jobs are marked completed before they start
+            if job.state is not PENDING:
+                return
+            job.state = RUNNING
+
+        result = None
+        error = None
+        try:
+            result = function(*args)
+        except Exception as e:
+            self.logger.error('{0} job failed: {1}'.format(job.operation, e))
+            error = e
+
+        with self._lock:
+            job.result = result
+            job.error = error
+            job.state = COMPLETED
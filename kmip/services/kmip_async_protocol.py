@@ -0,0 +1,147 @@
+# Copyright (c) 2014 The Johns Hopkins University/Applied Physics Laboratory
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from struct import unpack
+
+import asyncio
+import logging
+
+from kmip.core.utils import BytearrayStream
+
+from kmip.services import wire_trace
+
+
+class KMIPAsyncProtocol(object):
+    """
+    An asyncio counterpart of KMIPProtocol.
+
+    The protocol reads and writes framed TTLV messages over an asyncio
+    StreamReader/StreamWriter pair. Each message starts with an 8-byte TTLV
+    header whose last four bytes give the length of the message body, which
+    is used to size the read of the rest of the message. Writes wait on the
+    writer's drain() so that a slow peer applies backpressure to the caller.
+
+    This module requires Python 3.5 or newer.
+    """
+    HEADER_SIZE = 8
+
+    def __init__(self, reader, writer, idle_timeout=None, read_timeout=None):
+        """
+        Construct a KMIPAsyncProtocol.
+
+        Args:
+            reader (StreamReader): The stream to read request or response
+                messages from.
+            writer (StreamWriter): The stream to write encoded messages to.
+            idle_timeout (float): The number of seconds to wait for the next
+                message to start. Optional, defaults to None (no limit).
+            read_timeout (float): The number of seconds to wait for the rest
+                of a message once it has started. Optional, defaults to None
+                (no limit).
+        """
+        self.reader = reader
+        self.writer = writer
+        self.logger = logging.getLogger(__name__)
+        self.connection_id = wire_trace.next_connection_id()
+        self.idle_timeout = idle_timeout
+        self.read_timeout = read_timeout
+
+    async def read(self):
+        """
+        Read one framed TTLV message.
+
+        Returns:
+            BytearrayStream: The complete encoding of the message, header
+                included.
+
+        Raises:
+            IncompleteReadError: if the stream ends before the message is
+                complete. The partial attribute is empty if the peer closed
+                the connection cleanly between messages.
+            TimeoutError: if the idle or read timeout expires.
+        """
+        if self.idle_timeout is None and self.read_timeout is None:
+            header = await self.reader.readexactly(self.HEADER_SIZE)
+            msg_size = unpack('!I', header[4:])[0]
+            payload = await self.reader.readexactly(msg_size)
+        else:
+            header = await asyncio.wait_for(
+                self.reader.readexactly(1), self.idle_timeout)
+            header += await asyncio.wait_for(
+                self.reader.readexactly(self.HEADER_SIZE - 1),
+                self.read_timeout)
+            msg_size = unpack('!I', header[4:])[0]
+            payload = await asyncio.wait_for(
+                self.reader.readexactly(msg_size), self.read_timeout)
+        frame = header + payload
+        tracer = wire_trace.tracer
+        if tracer is not None:
+            tracer.record(self.connection_id, wire_trace.RECV, frame)
+        return BytearrayStream(frame)
+
+    async def write(self, data):
+        """
+        Write encoded message data and wait until the transport buffer has
+        drained below its high-water mark.
+
+        Args:
+            data (bytes): The encoded message.
+        """
+        if len(data) > 0:
+            sbuffer = bytes(data)
+            tracer = wire_trace.tracer
+            if tracer is not None:
+                tracer.record(self.connection_id, wire_trace.SEND, sbuffer)
+            self.writer.write(sbuffer)
+            await self.writer.drain()
+
+    async def read_message(self, message_class):
+        """
+        Read one framed message and decode it.
+
+        Args:
+            message_class (class): The message class to decode into, usually
+                RequestMessage or ResponseMessage.
+
+        Returns:
+            Struct: The decoded message.
+        """
+        stream = await self.read()
+        message = message_class()
+        message.read(stream)
+        return message
+
+    async def write_message(self, message):
+        """
+        Encode a message and write it.
+
+        Args:
+            message (Struct): The message to encode, usually a RequestMessage
+                or ResponseMessage.
+        """
+        stream = BytearrayStream()
+        message.write(stream)
+        await self.write(stream.buffer)
+
+    def close(self):
+        self.writer.close()
+
+
+class KMIPAsyncProtocolFactory(object):
+
+    def getProtocol(self, reader, writer, idle_timeout=None,
+                    read_timeout=None):
+        return KMIPAsyncProtocol(reader, writer, idle_timeout=idle_timeout,
+                                 read_timeout=read_timeout)
@@ -0,0 +1,201 @@
+# Copyright (c) 2014 The Johns Hopkins University/Applied Physics Laboratory
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import asyncio
+import concurrent.futures
+import sys
+
+from kmip.services.kmip_async_protocol import KMIPAsyncProtocolFactory
+from kmip.services.kmip_server import KMIPServer
+
+
+def _current_task():
+    current_task = getattr(asyncio, 'current_task', None)
+    if current_task is None:
+        current_task = asyncio.Task.current_task
+    return current_task()
+
+
+class KMIPAsyncServer(KMIPServer):
+    """
+    An asyncio counterpart of KMIPServer.
+
+    Every connection is served by a coroutine instead of a thread, so idle
+    connections only cost their stream buffers and TLS state. Decoding,
+    processing and encoding a request, which may block on the repository,
+    run in a thread pool of max_workers threads while the event loop keeps
+    serving other connections.
+
+    The server takes the same settings as KMIPServer. On close() or drain(),
+    it stops accepting connections, closes idle ones and waits up to
+    shutdown_timeout seconds for requests in progress to be answered.
+
+    This module requires Python 3.5 or newer.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(KMIPAsyncServer, self).__init__(*args, **kwargs)
+
+        self._loop = None
+        self._stopping = None
+        self._executor = None
+        self._clients = set()
+        self._idle_clients = set()
+
+    def serve(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self.serve_async())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+
+    async def serve_async(self):
+        """
+        Serve connections on the running event loop until close() is called.
+        """
+        self._loop = asyncio.get_event_loop()
+        self._stopping = asyncio.Event()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_workers)
+
+        options = {}
+        if sys.version_info >= (3, 7):
+            # Handshakes already run on the event loop without blocking it;
+            # the timeout drops clients that stall during the handshake.
+            options['ssl_handshake_timeout'] = self.handshake_timeout
+
+        server = await asyncio.start_server(
+            self._handle_client, sock=self.socket, ssl=self._ssl_context,
+            backlog=self.backlog, **options)
+        self.logger.info('KMIPAsyncServer serving on {0}:{1}'.format(
+            self.host, self.port))
+        self._start_metrics_server()
+
+        try:
+            await self._stopping.wait()
+        finally:
+            server.close()
+            await self._close_clients()
+            await server.wait_closed()
+            self._executor.shutdown(wait=True)
+            self._processor.close()
+            self._stop_metrics_server()
+            self.logger.info('KMIPAsyncServer stopped')
+
+    def _get_connection_limit(self):
+        # Connections are served by coroutines rather than worker threads,
+        # so only max_connections limits them.
+        return self.max_connections
+
+    def close(self):
+        """
+        Stop the server gracefully. The method can be called from any thread
+        or from a signal handler.
+        """
+        loop = self._loop
+        if loop is None:
+            super(KMIPAsyncServer, self).close()
+        elif not loop.is_closed():
+            loop.call_soon_threadsafe(self._stopping.set)
+
+    def drain(self, signum=None, frame=None):
+        """
+        Stop the server gracefully, like close(). The method returns right
+        away; serve_async() returns once the connections are closed.
+        """
+        self.close()
+
+    def request_drain(self, signum=None, frame=None):
+        """
+        Stop the server gracefully, like drain(). The method can be
+        registered directly as a signal handler.
+        """
+        self.close()
+
+    async def _close_clients(self):
+        # Idle connections have no request in progress and are dropped right
+        # away; busy ones finish their current request before closing.
+        for task in list(self._idle_clients):
+            task.cancel()
+
+        if self._clients:
+            done, pending = await asyncio.wait(
+                list(self._clients), timeout=self.shutdown_timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                self.logger.warning(
+                    'KMIPAsyncServer cancelled {0} requests still in '
+                    'progress at shutdown'.format(len(pending)))
+                await asyncio.wait(pending)
+
+    async def _handle_client(self, reader, writer):
+        if not self._admit_connection():
+            self._refuse_connection(writer, writer.get_extra_info('peername'))
+            return
+
+        task = _current_task()
+        self._clients.add(task)
+        self._idle_clients.add(task)
+
+        client = self._get_client_identity(writer.get_extra_info('peercert'))
+        factory = KMIPAsyncProtocolFactory()
+        protocol = factory.getProtocol(reader, writer,
+                                       idle_timeout=self.idle_timeout,
+                                       read_timeout=self.read_timeout)
+
+        try:
+            while not self._stopping.is_set():
+                try:
+                    stream = await protocol.read()
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.TimeoutError:
+                    self.logger.info(
+                        'KMIPAsyncServer closing timed out connection from '
+                        '{0}'.format(writer.get_extra_info('peername')))
+                    break
+
+                self._idle_clients.discard(task)
+                response = await self._loop.run_in_executor(
+                    self._executor, self._processor.process_stream, stream,
+                    client)
+                if response is not None:
+                    await protocol.write(response)
+                self._idle_clients.add(task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.logger.error('KMIPAsyncServer {0} {1}'.format(type(e), e))
+        finally:
+            self._clients.discard(task)
+            self._idle_clients.discard(task)
+            self._release_connection()
+            protocol.close()
+
+    def _build_ssl_context(self):
+        context = super(KMIPAsyncServer, self)._build_ssl_context()
+        # The listener keeps the context it was started with, so each
+        # handshake switches to the current context to pick up reloads.
+        if hasattr(context, 'sni_callback'):
+            context.sni_callback = self._select_ssl_context
+        return context
+
+    def _select_ssl_context(self, ssl_object, server_name, context):
+        current = self._ssl_context
+        if current is not context:
+            ssl_object.context = current
@@ -14,6 +14,7 @@
 # under the License.
 
 from kmip.services.results import ActivateResult
+from kmip.services.results import CancelResult
 from kmip.services.results import CreateResult
 from kmip.services.results import CreateKeyPairResult
 from kmip.services.results import DestroyResult
@@ -37,20 +38,25 @@ from kmip.core.factories.credentials import CredentialFactory
 from kmip.core import objects
 from kmip.core.server import KMIP
 
+from kmip.core.messages.contents import AsynchronousCorrelationValue
+from kmip.core.messages.contents import AsynchronousIndicator
 from kmip.core.messages.contents import Authentication
 from kmip.core.messages.contents import BatchCount
 from kmip.core.messages.contents import Operation
 from kmip.core.messages.contents import ProtocolVersion
+from kmip.core.messages.contents import UniqueBatchItemID
 
 from kmip.core.messages import messages
 
 from kmip.core.messages.payloads import activate
+from kmip.core.messages.payloads import cancel
 from kmip.core.messages.payloads import create
 from kmip.core.messages.payloads import create_key_pair
 from kmip.core.messages.payloads import destroy
 from kmip.core.messages.payloads import discover_versions
 from kmip.core.messages.payloads import get
 from kmip.core.messages.payloads import locate
+from kmip.core.messages.payloads import poll
 from kmip.core.messages.payloads import query
 from kmip.core.messages.payloads import rekey_key_pair
 from kmip.core.messages.payloads import register
@@ -62,11 +68,14 @@ from kmip.core.config_helper import ConfigHelper
 
 from kmip.core.utils import BytearrayStream
 
+import copy
 import logging
 import logging.config
 import os
 import socket
 import ssl
+import threading
+import uuid
 
 FILE_PATH = os.path.dirname(os.path.abspath(__file__))
 CONFIG_FILE = os.path.normpath(os.path.join(FILE_PATH, '../kmipconfig.ini'))
@@ -74,11 +83,22 @@ CONFIG_FILE = os.path.normpath(os.path.join(FILE_PATH, '../kmipconfig.ini'))
 
 class KMIPProxy(KMIP):
 
+    # SSL contexts are shared by every proxy built from the same settings so
+    # that the CA and certificate files are only loaded once per process. The
+    # last TLS session negotiated with each endpoint under each context is kept
+    # so that a later connection can resume it instead of paying for a full
+    # handshake.
+    _ssl_contexts = {}
+    _ssl_sessions = {}
+    _tls_statistics = {}
+    _ssl_lock = threading.Lock()
+
     def __init__(self, host=None, port=None, keyfile=None, certfile=None,
                  cert_reqs=None, ssl_version=None, ca_certs=None,
                  do_handshake_on_connect=None,
                  suppress_ragged_eofs=None,
-                 username=None, password=None, timeout=30, config='client'):
+                 username=None, password=None, timeout=30, config='client',
+                 pipeline_window=None, retries=None):
         super(KMIPProxy, self).__init__()
         self.logger = logging.getLogger(__name__)
         self.credential_factory = CredentialFactory()
@@ -87,7 +107,8 @@ class KMIPProxy(KMIP):
         self._set_variables(host, port, keyfile, certfile,
                             cert_reqs, ssl_version, ca_certs,
                             do_handshake_on_connect, suppress_ragged_eofs,
-                            username, password, timeout)
+                            username, password, timeout, pipeline_window,
+                            retries)
         self.batch_items = []
 
         self.conformance_clauses = [
@@ -192,6 +213,8 @@ class KMIPProxy(KMIP):
 
     def open(self):
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # Small pipelined requests must not be held back by Nagle's algorithm
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
         self.logger.debug("KMIPProxy keyfile: {0}".format(self.keyfile))
         self.logger.debug("KMIPProxy certfile: {0}".format(self.certfile))
@@ -207,15 +230,30 @@ class KMIPProxy(KMIP):
         self.logger.debug("KMIPProxy suppress_ragged_eofs: {0}".format(
             self.suppress_ragged_eofs))
 
-        self.socket = ssl.wrap_socket(
-            sock,
-            keyfile=self.keyfile,
-            certfile=self.certfile,
-            cert_reqs=self.cert_reqs,
-            ssl_version=self.ssl_version,
-            ca_certs=self.ca_certs,
-            do_handshake_on_connect=self.do_handshake_on_connect,
-            suppress_ragged_eofs=self.suppress_ragged_eofs)
+        if hasattr(ssl, 'SSLContext'):
+            context = self._get_ssl_context()
+            kwargs = {}
+            # SSL sessions can only be resumed from Python 3.6 onwards
+            if hasattr(ssl, 'SSLSession'):
+                with self._ssl_lock:
+                    kwargs['session'] = self._ssl_sessions.get(
+                        self._get_ssl_session_key())
+
+            self.socket = context.wrap_socket(
+                sock,
+                do_handshake_on_connect=self.do_handshake_on_connect,
+                suppress_ragged_eofs=self.suppress_ragged_eofs,
+                **kwargs)
+        else:
+            self.socket = ssl.wrap_socket(
+                sock,
+                keyfile=self.keyfile,
+                certfile=self.certfile,
+                cert_reqs=self.cert_reqs,
+                ssl_version=self.ssl_version,
+                ca_certs=self.ca_certs,
+                do_handshake_on_connect=self.do_handshake_on_connect,
+                suppress_ragged_eofs=self.suppress_ragged_eofs)
         self.protocol = KMIPProtocol(self.socket)
 
         self.socket.settimeout(self.timeout)
@@ -226,6 +264,10 @@ class KMIPProxy(KMIP):
             self.logger.error("timeout occurred while connecting to appliance")
             raise e
 
+        if self.do_handshake_on_connect:
+            self._record_handshake()
+            self._save_ssl_session()
+
     def __del__(self):
         # Close the socket properly, helpful in case close() is not called.
         self.close()
@@ -233,15 +275,105 @@ class KMIPProxy(KMIP):
     def close(self):
         # Shutdown and close the socket.
         if self.socket:
+            # TLS 1.3 servers send session tickets after the handshake, so
+            # save the session again now that the connection has been used.
+            self._save_ssl_session()
             self.socket.shutdown(socket.SHUT_RDWR)
             self.socket.close()
             self.socket = None
 
-    def create(self, object_type, template_attribute, credential=None):
+    def get_tls_statistics(self):
+        """
+        Get the TLS handshake statistics for the endpoint of this client.
+
+        The statistics are shared by every client connecting to the same
+        host and port and cover the handshakes completed by open().
+
+        Returns:
+            dict: A dictionary with the number of completed handshakes, the
+                number of handshakes that resumed a previous session and the
+                resulting resumption rate.
+
+        Example:
+            >>> client.get_tls_statistics()
+            {'handshakes': 4, 'resumed': 3, 'resumption_rate': 0.75}
+        """
+        with self._ssl_lock:
+            handshakes, resumed = self._tls_statistics.get(
+                (self.host, self.port), (0, 0))
+
+        rate = 0.0
+        if handshakes > 0:
+            rate = float(resumed) / handshakes
+
+        return {'handshakes': handshakes,
+                'resumed': resumed,
+                'resumption_rate': rate}
+
+    def _get_ssl_context_key(self):
+        return (self.config, self.keyfile, self.certfile, self.cert_reqs,
+                self.ssl_version, self.ca_certs)
+
+    def _get_ssl_session_key(self):
+        # A session can only be resumed by the context that negotiated it
+        return self._get_ssl_context_key() + (self.host, self.port)
+
+    def _get_ssl_context(self):
+        key = self._get_ssl_context_key()
+
+        with self._ssl_lock:
+            context = self._ssl_contexts.get(key)
+            if context is None:
+                context = ssl.SSLContext(self.ssl_version)
+                context.verify_mode = self.cert_reqs
+                if self.certfile is not None:
+                    context.load_cert_chain(self.certfile, self.keyfile)
+                if self.ca_certs is not None:
+                    context.load_verify_locations(self.ca_certs)
+                self._ssl_contexts[key] = context
+
+        return context
+
+    def _record_handshake(self):
+        endpoint = (self.host, self.port)
+        reused = bool(getattr(self.socket, 'session_reused', False))
+
+        with self._ssl_lock:
+            handshakes, resumed = self._tls_statistics.get(endpoint, (0, 0))
+            if reused:
+                resumed += 1
+            self._tls_statistics[endpoint] = (handshakes + 1, resumed)
+
+        self.logger.debug("KMIPProxy TLS session reused: {0}".format(reused))
+
+    def _save_ssl_session(self):
+        session = getattr(self.socket, 'session', None)
+        if session is not None:
+            with self._ssl_lock:
+                self._ssl_sessions[self._get_ssl_session_key()] = session
+
+    def create(self, object_type, template_attribute, credential=None,
+               unique_batch_item_id=None):
+        """
+        Send a Create request to the server.
+
+        Args:
+            object_type (ObjectType): The type of the object to create.
+            template_attribute (TemplateAttribute): The attributes of the
+                object to create.
+            credential (Credential): A Credential object containing
+                authentication information for the server. Optional, defaults
+                to None.
+            unique_batch_item_id (bytes): The UniqueBatchItemID of the
+                request. Optional, defaults to None, in which case a random
+                one is used. Passing the ID of an earlier call marks the
+                request as a retry of that call.
+        """
         object_type = attr.ObjectType(object_type)
         return self._create(object_type=object_type,
                             template_attribute=template_attribute,
-                            credential=credential)
+                            credential=credential,
+                            unique_batch_item_id=unique_batch_item_id)
 
     def create_key_pair(self, batch=False, common_template_attribute=None,
                         private_key_template_attribute=None,
@@ -291,12 +423,29 @@ class KMIPProxy(KMIP):
                              credential=credential)
 
     def register(self, object_type, template_attribute, secret,
-                 credential=None):
+                 credential=None, unique_batch_item_id=None):
+        """
+        Send a Register request to the server.
+
+        Args:
+            object_type (ObjectType): The type of the object to register.
+            template_attribute (TemplateAttribute): The attributes of the
+                object to register.
+            secret: The managed object to register.
+            credential (Credential): A Credential object containing
+                authentication information for the server. Optional, defaults
+                to None.
+            unique_batch_item_id (bytes): The UniqueBatchItemID of the
+                request. Optional, defaults to None, in which case a random
+                one is used. Passing the ID of an earlier call marks the
+                request as a retry of that call.
+        """
         object_type = attr.ObjectType(object_type)
         return self._register(object_type=object_type,
                               template_attribute=template_attribute,
                               secret=secret,
-                              credential=credential)
+                              credential=credential,
+                              unique_batch_item_id=unique_batch_item_id)
 
     def rekey_key_pair(self, batch=False, private_key_uuid=None, offset=None,
                        common_template_attribute=None,
@@ -321,6 +470,97 @@ class KMIPProxy(KMIP):
                             object_group_member=object_group_member,
                             attributes=attributes, credential=credential)
 
+    def create_and_activate(self, object_type, template_attribute,
+                            credential=None):
+        """
+        Create a managed object and activate it in a single request.
+
+        The Activate batch item leaves out the unique identifier, so the
+        server activates the object the Create batch item produced.
+
+        Args:
+            object_type (ObjectType): The type of the object to create.
+            template_attribute (TemplateAttribute): The attributes of the
+                object to create.
+            credential (Credential): A Credential object containing
+                authentication information for the server. Optional, defaults
+                to None.
+
+        Returns:
+            list: The CreateResult and the ActivateResult. The Activate is
+                left out if the Create failed.
+        """
+        object_type = attr.ObjectType(object_type)
+        return self._send_batch_items(credential, [
+            self._build_create_batch_item(object_type, template_attribute),
+            self._build_activate_batch_item()])
+
+    def register_and_activate(self, object_type, template_attribute, secret,
+                              credential=None):
+        """
+        Register a managed object and activate it in a single request.
+
+        Args:
+            object_type (ObjectType): The type of the object to register.
+            template_attribute (TemplateAttribute): The attributes of the
+                object to register.
+            secret (Struct): The object to register.
+            credential (Credential): A Credential object containing
+                authentication information for the server. Optional, defaults
+                to None.
+
+        Returns:
+            list: The RegisterResult and the ActivateResult. The Activate is
+                left out if the Register failed.
+        """
+        object_type = attr.ObjectType(object_type)
+        return self._send_batch_items(credential, [
+            self._build_register_batch_item(object_type, template_attribute,
+                                            secret),
+            self._build_activate_batch_item()])
+
+    def locate_and_get(self, maximum_items=None, storage_status_mask=None,
+                       object_group_member=None, attributes=None,
+                       key_format_type=None, key_compression_type=None,
+                       key_wrapping_specification=None, credential=None):
+        """
+        Locate a managed object and get it in a single request.
+
+        The Get only applies to the located object if exactly one object
+        matched; otherwise it fails as it names no object.
+
+        Args:
+            maximum_items (int): The maximum number of objects to locate.
+                Optional, defaults to None.
+            storage_status_mask (int): The storage status mask of the
+                objects to locate. Optional, defaults to None.
+            object_group_member (ObjectGroupMember): The object group
+                membership of the objects to locate. Optional, defaults to
+                None.
+            attributes (list): The attributes of the objects to locate.
+                Optional, defaults to None.
+            key_format_type (KeyFormatType): The format to get the key in.
+                Optional, defaults to None.
+            key_compression_type (KeyCompressionType): The compression to get
+                the key with. Optional, defaults to None.
+            key_wrapping_specification (KeyWrappingSpecification): How to
+                wrap the key. Optional, defaults to None.
+            credential (Credential): A Credential object containing
+                authentication information for the server. Optional, defaults
+                to None.
+
+        Returns:
+            list: The LocateResult and the GetResult. The Get is left out if
+                the Locate failed.
+        """
+        return self._send_batch_items(credential, [
+            self._build_locate_batch_item(maximum_items, storage_status_mask,
+                                          object_group_member, attributes),
+            self._build_get_batch_item(
+                key_format_type=key_format_type,
+                key_compression_type=key_compression_type,
+                key_wrapping_specification=key_wrapping_specification)])
+
     def query(self, batch=False, query_functions=None, credential=None):
         """
         Send a Query request to the server.
@@ -359,10 +599,156 @@ class KMIPProxy(KMIP):
             results = self._process_batch_items(response)
             return results[0]
 
+    def send_pipelined(self, batches, window=None, credential=None):
+        """
+        Send several request messages over the open connection without
+        waiting for each response before sending the next request.
+
+        Up to window request messages are written back-to-back before the
+        oldest response is read. The server answers messages in the order it
+        receives them, so responses are matched to requests by position.
+
+        Batch items without a UniqueBatchItemID are sent with a new random
+        one each time; set it on a batch item to have the server recognize
+        a resent batch item as a retry.
+
+        Args:
+            batches (list): A list of lists of RequestBatchItem objects. Each
+                inner list is sent as one RequestMessage.
+            window (int): The maximum number of request messages in flight.
+                Optional, defaults to the configured pipeline window.
+            credential (Credential): A Credential object containing
+                authentication information for the server. Optional, defaults
+                to None.
+
+        Returns:
+            list: The ResponseMessage objects, in the order of the batches.
+        """
+        if window is None:
+            window = self.pipeline_window
+        if window < 1:
+            raise ValueError('pipeline window must be at least 1')
+
+        responses = []
+        pending = 0
+
+        for batch_items in batches:
+            if pending >= window:
+                responses.append(self._receive_response())
+                pending -= 1
+            request = self._build_request_message(credential, batch_items)
+            self._send_message(request)
+            pending += 1
+
+        while pending > 0:
+            responses.append(self._receive_response())
+            pending -= 1
+
+        return responses
+
+    def send_asynchronous(self, batch_items, credential=None):
+        """
+        Send a request message asking the server to run long operations in
+        the background.
+
+        Operations the server runs in the background are answered with an
+        Operation Pending result and an AsynchronousCorrelationValue, which
+        identifies the operation to poll() and cancel(). Other operations are
+        answered as usual. Batch items without a UniqueBatchItemID are sent
+        with a new random one each time.
+
+        Args:
+            batch_items (list): A list of RequestBatchItem objects.
+            credential (Credential): A Credential object containing
+                authentication information for the server. Optional, defaults
+                to None.
+
+        Returns:
+            list: The ResponseBatchItem objects of the response.
+        """
+        request = self._build_request_message(credential, batch_items,
+                                              asynchronous=True)
+        response = self._send_and_receive_message(request)
+        return response.batch_items
+
+    def poll(self, correlation_value, credential=None):
+        """
+        Check on an operation the server runs in the background.
+
+        Args:
+            correlation_value (AsynchronousCorrelationValue): The correlation
+                value returned with the pending result of the operation. A
+                byte string is also accepted.
+            credential (Credential): A Credential object containing
+                authentication information for the server. Optional, defaults
+                to None.
+
+        Returns:
+            ResponseBatchItem: The response to the operation if it has
+                finished, or another Operation Pending result.
+        """
+        correlation_value = self._build_correlation_value(correlation_value)
+        batch_item = messages.RequestBatchItem(
+            operation=Operation(OperationEnum.POLL),
+            request_payload=poll.PollRequestPayload(correlation_value))
+        request = self._build_request_message(credential, [batch_item])
+        response = self._send_and_receive_message(request)
+        return response.batch_items[0]
+
+    def cancel(self, correlation_value, credential=None):
+        """
+        Cancel an operation the server runs in the background.
+
+        Args:
+            correlation_value (AsynchronousCorrelationValue): The correlation
+                value returned with the pending result of the operation. A
+                byte string is also accepted.
+            credential (Credential): A Credential object containing
+                authentication information for the server. Optional, defaults
+                to None.
+
+        Returns:
+            CancelResult: The result of the Cancel operation, whose
+                cancellation_result tells whether the operation was stopped.
+        """
+        correlation_value = self._build_correlation_value(correlation_value)
+        batch_item = messages.RequestBatchItem(
+            operation=Operation(OperationEnum.CANCEL),
+            request_payload=cancel.CancelRequestPayload(correlation_value))
+        request = self._build_request_message(credential, [batch_item])
+        response = self._send_and_receive_message(request)
+        batch_item = response.batch_items[0]
+        payload = batch_item.response_payload
+
+        payload_correlation_value = None
+        payload_cancellation_result = None
+        if payload is not None:
+            payload_correlation_value = payload.asynchronous_correlation_value
+            payload_cancellation_result = payload.cancellation_result
+
+        return CancelResult(batch_item.result_status,
+                            batch_item.result_reason,
+                            batch_item.result_message,
+                            payload_correlation_value,
+                            payload_cancellation_result)
+
+    def _build_correlation_value(self, correlation_value):
+        if isinstance(correlation_value, AsynchronousCorrelationValue):
+            return correlation_value
+        return AsynchronousCorrelationValue(correlation_value)
+
     def _create(self,
                 object_type=None,
                 template_attribute=None,
-                credential=None):
+                credential=None,
+                unique_batch_item_id=None):
+        batch_item = self._build_create_batch_item(object_type,
+                                                   template_attribute)
+        self._set_unique_batch_item_id(batch_item, unique_batch_item_id)
+        return self._send_batch_items(credential, [batch_item])[0]
+
+    def _build_create_batch_item(self, object_type=None,
+                                 template_attribute=None):
         operation = Operation(OperationEnum.CREATE)
 
         if object_type is None:
@@ -371,16 +757,10 @@ class KMIPProxy(KMIP):
         req_pl = create.CreateRequestPayload(
             object_type=object_type,
             template_attribute=template_attribute)
-        batch_item = messages.RequestBatchItem(operation=operation,
-                                               request_payload=req_pl)
+        return messages.RequestBatchItem(operation=operation,
+                                         request_payload=req_pl)
 
-        message = self._build_request_message(credential, [batch_item])
-        self._send_message(message)
-        message = messages.ResponseMessage()
-        data = self._receive_message()
-        message.read(data)
-        batch_items = message.batch_items
-        batch_item = batch_items[0]
+    def _process_create_batch_item(self, batch_item):
         payload = batch_item.response_payload
 
         if payload is None:
@@ -453,8 +833,28 @@ class KMIPProxy(KMIP):
             results.append(result)
         return results
 
+    def _set_unique_batch_item_id(self, batch_item, unique_batch_item_id):
+        if unique_batch_item_id is not None:
+            batch_item.unique_batch_item_id = UniqueBatchItemID(
+                unique_batch_item_id)
+
+    def _send_batch_items(self, credential, batch_items):
+        request = self._build_request_message(credential, batch_items)
+        response = self._send_and_receive_message(request)
+        return self._process_batch_items(response)
+
     def _get_batch_item_processor(self, operation):
-        if operation == OperationEnum.CREATE_KEY_PAIR:
+        if operation == OperationEnum.CREATE:
+            return self._process_create_batch_item
+        elif operation == OperationEnum.REGISTER:
+            return self._process_register_batch_item
+        elif operation == OperationEnum.ACTIVATE:
+            return self._process_activate_batch_item
+        elif operation == OperationEnum.GET:
+            return self._process_get_batch_item
+        elif operation == OperationEnum.LOCATE:
+            return self._process_locate_batch_item
+        elif operation == OperationEnum.CREATE_KEY_PAIR:
             return self._process_create_key_pair_batch_item
         elif operation == OperationEnum.REKEY_KEY_PAIR:
             return self._process_rekey_key_pair_batch_item
@@ -540,6 +940,15 @@ class KMIPProxy(KMIP):
              key_compression_type=None,
              key_wrapping_specification=None,
              credential=None):
+        batch_item = self._build_get_batch_item(
+            unique_identifier, key_format_type, key_compression_type,
+            key_wrapping_specification)
+        return self._send_batch_items(credential, [batch_item])[0]
+
+    def _build_get_batch_item(self, unique_identifier=None,
+                              key_format_type=None,
+                              key_compression_type=None,
+                              key_wrapping_specification=None):
         operation = Operation(OperationEnum.GET)
 
         uuid = None
@@ -562,15 +971,10 @@ class KMIPProxy(KMIP):
                                        key_compression_type=kct,
                                        key_wrapping_specification=kws)
 
-        batch_item = messages.RequestBatchItem(operation=operation,
-                                               request_payload=req_pl)
-        message = self._build_request_message(credential, [batch_item])
-        self._send_message(message)
-        message = messages.ResponseMessage()
-        data = self._receive_message()
-        message.read(data)
-        batch_items = message.batch_items
-        batch_item = batch_items[0]
+        return messages.RequestBatchItem(operation=operation,
+                                         request_payload=req_pl)
+
+    def _process_get_batch_item(self, batch_item):
         payload = batch_item.response_payload
 
         if payload is None:
@@ -591,6 +995,10 @@ class KMIPProxy(KMIP):
         return result
 
     def _activate(self, unique_identifier=None, credential=None):
+        batch_item = self._build_activate_batch_item(unique_identifier)
+        return self._send_batch_items(credential, [batch_item])[0]
+
+    def _build_activate_batch_item(self, unique_identifier=None):
         operation = Operation(OperationEnum.ACTIVATE)
 
         uuid = None
@@ -599,15 +1007,10 @@ class KMIPProxy(KMIP):
 
         payload = activate.ActivateRequestPayload(unique_identifier=uuid)
 
-        batch_item = messages.RequestBatchItem(operation=operation,
-                                               request_payload=payload)
-        message = self._build_request_message(credential, [batch_item])
-        self._send_message(message)
-        message = messages.ResponseMessage()
-        data = self._receive_message()
-        message.read(data)
-        batch_items = message.batch_items
-        batch_item = batch_items[0]
+        return messages.RequestBatchItem(operation=operation,
+                                         request_payload=payload)
+
+    def _process_activate_batch_item(self, batch_item):
         payload = batch_item.response_payload
 
         if payload is None:
@@ -695,7 +1098,15 @@ class KMIPProxy(KMIP):
                   object_type=None,
                   template_attribute=None,
                   secret=None,
-                  credential=None):
+                  credential=None,
+                  unique_batch_item_id=None):
+        batch_item = self._build_register_batch_item(
+            object_type, template_attribute, secret)
+        self._set_unique_batch_item_id(batch_item, unique_batch_item_id)
+        return self._send_batch_items(credential, [batch_item])[0]
+
+    def _build_register_batch_item(self, object_type=None,
+                                   template_attribute=None, secret=None):
         operation = Operation(OperationEnum.REGISTER)
 
         if object_type is None:
@@ -705,16 +1116,10 @@ class KMIPProxy(KMIP):
             object_type=object_type,
             template_attribute=template_attribute,
             secret=secret)
-        batch_item = messages.RequestBatchItem(operation=operation,
-                                               request_payload=req_pl)
+        return messages.RequestBatchItem(operation=operation,
+                                         request_payload=req_pl)
 
-        message = self._build_request_message(credential, [batch_item])
-        self._send_message(message)
-        message = messages.ResponseMessage()
-        data = self._receive_message()
-        message.read(data)
-        batch_items = message.batch_items
-        batch_item = batch_items[0]
+    def _process_register_batch_item(self, batch_item):
         payload = batch_item.response_payload
 
         if payload is None:
@@ -733,7 +1138,14 @@ class KMIPProxy(KMIP):
 
     def _locate(self, maximum_items=None, storage_status_mask=None,
                 object_group_member=None, attributes=[], credential=None):
-
+        batch_item = self._build_locate_batch_item(
+            maximum_items, storage_status_mask, object_group_member,
+            attributes)
+        return self._send_batch_items(credential, [batch_item])[0]
+
+    def _build_locate_batch_item(self, maximum_items=None,
+                                 storage_status_mask=None,
+                                 object_group_member=None, attributes=[]):
         operation = Operation(OperationEnum.LOCATE)
 
         mxi = None
@@ -754,17 +1166,10 @@ class KMIPProxy(KMIP):
                                               object_group_member=objgrp,
                                               attributes=attributes)
 
-        batch_item = messages.RequestBatchItem(operation=operation,
-                                               request_payload=payload)
+        return messages.RequestBatchItem(operation=operation,
+                                         request_payload=payload)
 
-        message = self._build_request_message(credential, [batch_item])
-        self._send_message(message)
-        message = messages.ResponseMessage()
-        data = self._receive_message()
-
-        message.read(data)
-        batch_items = message.batch_items
-        batch_item = batch_items[0]
+    def _process_locate_batch_item(self, batch_item):
         payload = batch_item.response_payload
 
         if payload is None:
@@ -795,7 +1200,8 @@ class KMIPProxy(KMIP):
             credential_value)
         return credential
 
-    def _build_request_message(self, credential, batch_items):
+    def _build_request_message(self, credential, batch_items,
+                               asynchronous=False):
         protocol_version = ProtocolVersion.create(1, 1)
 
         if credential is None:
@@ -805,13 +1211,31 @@ class KMIPProxy(KMIP):
         if credential is not None:
             authentication = Authentication(credential)
 
+        asynchronous_indicator = None
+        if asynchronous:
+            asynchronous_indicator = AsynchronousIndicator(True)
+
+        # Identifiers are set on copies of the batch items, so every request
+        # built from the same items is a new request. Sending the returned
+        # message again, or items that already carry an identifier, lets the
+        # server recognize a retry.
+        stamped_items = []
+        for batch_item in batch_items:
+            if batch_item.unique_batch_item_id is None:
+                batch_item = copy.copy(batch_item)
+                batch_item.unique_batch_item_id = UniqueBatchItemID(
+                    uuid.uuid4().bytes)
+            stamped_items.append(batch_item)
+
         batch_count = BatchCount(len(batch_items))
-        req_header = messages.RequestHeader(protocol_version=protocol_version,
-                                            authentication=authentication,
-                                            batch_count=batch_count)
+        req_header = messages.RequestHeader(
+            protocol_version=protocol_version,
+            asynchronous_indicator=asynchronous_indicator,
+            authentication=authentication,
+            batch_count=batch_count)
 
         return messages.RequestMessage(request_header=req_header,
-                                       batch_items=batch_items)
+                                       batch_items=stamped_items)
 
     def _send_message(self, message):
         stream = BytearrayStream()
@@ -821,17 +1245,42 @@ class KMIPProxy(KMIP):
     def _receive_message(self):
         return self.protocol.read()
 
-    def _send_and_receive_message(self, request):
-        self._send_message(request)
+    def _receive_response(self):
         response = messages.ResponseMessage()
         data = self._receive_message()
         response.read(data)
         return response
 
+    def _send_and_receive_message(self, request):
+        # After a timeout or a broken connection the same message, with the
+        # same UniqueBatchItemIDs, is sent again on a new connection, so a
+        # server replaying answered batch items does not run them twice.
+        attempt = 0
+        while True:
+            try:
+                self._send_message(request)
+                return self._receive_response()
+            except socket.error as e:
+                if attempt >= self.retries:
+                    raise
+                attempt += 1
+                self.logger.warning(
+                    "request failed ({0}), retrying ({1} of {2})".format(
+                        e, attempt, self.retries))
+                self._reconnect()
+
+    def _reconnect(self):
+        # The failed connection is dropped without a TLS shutdown.
+        if self.socket:
+            self.socket.close()
+            self.socket = None
+        self.open()
+
     def _set_variables(self, host, port, keyfile, certfile,
                        cert_reqs, ssl_version, ca_certs,
                        do_handshake_on_connect, suppress_ragged_eofs,
-                       username, password, timeout):
+                       username, password, timeout, pipeline_window,
+                       retries):
         conf = ConfigHelper()
 
         self.host = conf.get_valid_value(
@@ -883,3 +1332,10 @@ class KMIPProxy(KMIP):
                 "resetting to safe default of {0} seconds".format(
                     conf.DEFAULT_TIMEOUT))
             self.timeout = conf.DEFAULT_TIMEOUT
+
+        self.pipeline_window = int(conf.get_valid_value(
+            pipeline_window, self.config, 'pipeline_window',
+            conf.DEFAULT_PIPELINE_WINDOW))
+
+        self.retries = int(conf.get_valid_value(
+            retries, self.config, 'retries', conf.DEFAULT_RETRIES))
@@ -20,29 +20,59 @@ import logging
 
 from kmip.core.utils import BytearrayStream
 
+from kmip.services import wire_trace
+
 
 class KMIPProtocol(object):
     HEADER_SIZE = 8
 
-    def __init__(self, socket, buffer_size=1024):
+    def __init__(self, socket, buffer_size=1024, idle_timeout=None,
+                 read_timeout=None):
         self.socket = socket
         self.logger = logging.getLogger(__name__)
+        self.connection_id = wire_trace.next_connection_id()
+        self.idle_timeout = idle_timeout
+        self.read_timeout = read_timeout
+        self._timed = idle_timeout is not None or read_timeout is not None
 
     def write(self, data):
         if len(data) > 0:
             sbuffer = bytes(data)
-            self.logger.debug('KMIPProtocol.write: {0}'.format(
-                binascii.hexlify(sbuffer)))
+            tracer = wire_trace.tracer
+            if tracer is not None:
+                tracer.record(self.connection_id, wire_trace.SEND, sbuffer)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug('KMIPProtocol.write: {0}'.format(
+                    binascii.hexlify(sbuffer)))
             self.socket.sendall(sbuffer)
 
     def read(self):
-        header = self._recv_all(self.HEADER_SIZE)
+        if self._timed:
+            header = self._recv_first(self.HEADER_SIZE)
+        else:
+            header = self._recv_all(self.HEADER_SIZE)
         msg_size = unpack('!I', header[4:])[0]
         payload = self._recv_all(msg_size)
-        data = BytearrayStream(header + payload)
-        self.logger.debug('KMIPProtocol.read: {0}'.format(
-            binascii.hexlify(bytes(data.buffer))))
-        return data
+        frame = header + payload
+        tracer = wire_trace.tracer
+        if tracer is not None:
+            tracer.record(self.connection_id, wire_trace.RECV, frame)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('KMIPProtocol.read: {0}'.format(
+                binascii.hexlify(frame)))
+        return BytearrayStream(frame)
+
+    def _recv_first(self, total_bytes_to_be_read):
+        # Waiting for the next message is bounded by the idle timeout; once
+        # it starts to arrive, every further read is bounded by the read
+        # timeout.
+        self.socket.settimeout(self.idle_timeout)
+        msg = self.socket.recv(total_bytes_to_be_read)
+        self.socket.settimeout(self.read_timeout)
+        if not msg:
+            raise Exception("Expected {0} bytes, Received 0 bytes"
+                            .format(total_bytes_to_be_read))
+        return msg + self._recv_all(total_bytes_to_be_read - len(msg))
 
     def _recv_all(self, total_bytes_to_be_read):
         bytes_read = 0
@@ -61,5 +91,6 @@ class KMIPProtocol(object):
 
 class KMIPProtocolFactory(object):
 
-    def getProtocol(self, socket):
-        return KMIPProtocol(socket)
+    def getProtocol(self, socket, idle_timeout=None, read_timeout=None):
+        return KMIPProtocol(socket, idle_timeout=idle_timeout,
+                            read_timeout=read_timeout)
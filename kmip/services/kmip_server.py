@@ -13,90 +13,899 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import errno
 import logging
 import os
+import signal
+import six
 import socket
 import ssl
+import subprocess
+import threading
+import time
+
+from six.moves import queue
 
 from kmip.core.config_helper import ConfigHelper
+from kmip.core.enums import Operation
+from kmip.core.key_pair_generator import KeyPairGenerator
+from kmip.core.repo.sqlite_repo import SQLiteRepo
 from kmip.core.server import KMIPImpl
 
+from kmip.services import metrics
+from kmip.services import profiling
+from kmip.services import wire_trace
 from kmip.services.kmip_protocol import KMIPProtocolFactory
 from kmip.services.processor import Processor
 
 FILE_PATH = os.path.dirname(os.path.abspath(__file__))
 
 
+class _ServedConnection(object):
+    # Stands in for the protocol of a connection served by a worker, and
+    # tracks whether the connection is waiting for its next request or busy
+    # with one, so a drain can close idle connections without dropping a
+    # request that is already being processed.
+
+    def __init__(self, connection, protocol, lock):
+        self.connection = connection
+        self.protocol = protocol
+        self.busy = False
+        self.closing = False
+        self._lock = lock
+
+    def read(self):
+        stream = self.protocol.read()
+        with self._lock:
+            # A request that arrives as the connection is being closed is
+            # never processed, since its response could not be sent.
+            if self.closing:
+                raise socket.error(errno.ECONNABORTED,
+                                   'connection closed by the server')
+            self.busy = True
+        return stream
+
+    def write(self, data):
+        self.protocol.write(data)
+
+    def shutdown(self):
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except (socket.error, ValueError):
+            pass
+
+
+class _ConnectionQueue(queue.Queue):
+    # A queue of accepted connections that records when each connection was
+    # queued, so connections that wait too long for a worker can be dropped.
+
+    def _put(self, item):
+        self.queue.append((time.time(), item))
+
+    def _get(self):
+        return self.queue.popleft()[1]
+
+    def expire(self, max_wait):
+        deadline = time.time() - max_wait
+        expired = []
+        with self.not_full:
+            while self.queue and self.queue[0][0] <= deadline:
+                expired.append(self.queue.popleft()[1])
+            if expired:
+                self.not_full.notify(len(expired))
+        for _ in expired:
+            self.task_done()
+        return expired
+
+
 class KMIPServer(object):
 
+    # Settings read again by reload_config()
+    RELOADABLE_SETTINGS = ('keyfile', 'certfile', 'cert_reqs', 'ca_certs',
+                           'ciphers', 'session_tickets', 'handshake_timeout',
+                           'max_connections', 'idle_timeout', 'read_timeout')
+    # Seconds accept() waits before serve() checks for a requested drain
+    ACCEPT_TIMEOUT = 0.5
+
     def __init__(self, host=None, port=None, keyfile=None, certfile=None,
                  cert_reqs=None, ssl_version=None, ca_certs=None,
-                 do_handshake_on_connect=None, suppress_ragged_eofs=None):
+                 do_handshake_on_connect=None, suppress_ragged_eofs=None,
+                 ciphers=None, session_tickets=None, wire_trace_size=None,
+                 wire_trace_file=None, max_workers=None, max_queued=None,
+                 reuse_port=None, database_path=None,
+                 handshake_timeout=None, backlog=None, max_connections=None,
+                 idle_timeout=None, read_timeout=None,
+                 batch_parallelism=None, async_workers=None,
+                 max_async_jobs=None, key_pool_size=None,
+                 key_pool_low_water_mark=None, key_pair_workers=None,
+                 key_pair_pool_size=None, key_pair_low_water_mark=None,
+                 get_cache_size=None, get_cache_max_bytes=None,
+                 metrics_host=None, metrics_port=None, shutdown_timeout=None,
+                 listen_fd=None, rate_limit=None, rate_limit_burst=None,
+                 operation_weights=None, fair_queue_slots=None,
+                 profile_mode=None, profile_sample_rate=None,
+                 profile_interval=None, profile_file=None,
+                 max_response_size=None, idempotency_cache_size=None,
+                 idempotency_cache_ttl=None, coalesce_reads=None,
+                 queue_timeout=None):
         self.logger = logging.getLogger(__name__)
 
         self._set_variables(host, port, keyfile, certfile, cert_reqs,
                             ssl_version, ca_certs, do_handshake_on_connect,
-                            suppress_ragged_eofs)
+                            suppress_ragged_eofs, ciphers, session_tickets,
+                            wire_trace_size, wire_trace_file, max_workers,
+                            max_queued, reuse_port, database_path,
+                            handshake_timeout, backlog, max_connections,
+                            idle_timeout, read_timeout, batch_parallelism,
+                            async_workers, max_async_jobs, key_pool_size,
+                            key_pool_low_water_mark, key_pair_workers,
+                            key_pair_pool_size, key_pair_low_water_mark,
+                            get_cache_size, get_cache_max_bytes,
+                            metrics_host, metrics_port, shutdown_timeout,
+                            listen_fd, rate_limit, rate_limit_burst,
+                            operation_weights, fair_queue_slots,
+                            profile_mode, profile_sample_rate,
+                            profile_interval, profile_file,
+                            max_response_size, idempotency_cache_size,
+                            idempotency_cache_ttl, coalesce_reads,
+                            queue_timeout)
+
+        if self.wire_trace_size > 0:
+            wire_trace.enable(self.wire_trace_size)
 
-        handler = KMIPImpl()
-        self._processor = Processor(handler)
+        if self.profile_mode is not None:
+            profiling.enable(self.profile_mode, self.profile_sample_rate,
+                             self.profile_interval)
 
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.socket.bind((self.host, self.port))
+        repo = None
+        if self.database_path is not None:
+            repo = SQLiteRepo(self.database_path)
+
+        key_pair_generator = KeyPairGenerator(
+            workers=self.key_pair_workers,
+            pool_size=self.key_pair_pool_size,
+            low_water_mark=self.key_pair_low_water_mark)
+        handler = KMIPImpl(
+            repo=repo, key_pool_size=self.key_pool_size,
+            key_pool_low_water_mark=self.key_pool_low_water_mark,
+            key_pair_generator=key_pair_generator)
+        self._processor = Processor(
+            handler, batch_parallelism=self.batch_parallelism,
+            async_workers=self.async_workers,
+            max_async_jobs=self.max_async_jobs,
+            get_cache_size=self.get_cache_size,
+            get_cache_max_bytes=self.get_cache_max_bytes,
+            rate_limit=self.rate_limit,
+            rate_limit_burst=self.rate_limit_burst,
+            operation_weights=self.operation_weights,
+            fair_queue_slots=self.fair_queue_slots,
+            max_response_size=self.max_response_size,
+            idempotency_cache_size=self.idempotency_cache_size,
+            idempotency_cache_ttl=self.idempotency_cache_ttl,
+            coalesce_reads=self.coalesce_reads)
+
+        # The SSL context is built once and shared by every connection, so
+        # the key and certificate files are only parsed at startup and on
+        # an explicit reload.
+        self._ssl_context = self._build_ssl_context()
+
+        if self.listen_fd is not None:
+            # Takes over a listening socket inherited from another process
+            # (e.g., the server being replaced, or a service manager), so
+            # connections queued on it are not refused during a restart.
+            self.socket = socket.fromfd(
+                self.listen_fd, socket.AF_INET, socket.SOCK_STREAM)
+            os.close(self.listen_fd)
+        else:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if self.reuse_port:
+                if not hasattr(socket, 'SO_REUSEPORT'):
+                    raise NotImplementedError(
+                        'SO_REUSEPORT is not supported on this platform')
+                # Lets several server processes bind the same address; the
+                # kernel balances new connections across their accept
+                # queues.
+                self.socket.setsockopt(
+                    socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            self.socket.bind((self.host, self.port))
+        self._listening = True
+
+        # Accepted connections wait in a bounded queue until one of the
+        # worker threads is free to serve them, for at most queue_timeout
+        # seconds.
+        self._connections = _ConnectionQueue(maxsize=self.max_queued)
+        self._workers = []
+
+        self._handshake_statistics = {
+            'handshakes': 0,
+            'failures': 0,
+            'timeouts': 0,
+            'total_latency': 0.0,
+            'max_latency': 0.0}
+        self._statistics_lock = threading.Lock()
+
+        # Counts admitted connections, queued or served; the condition is
+        # notified whenever one is released.
+        self._active_connections = 0
+        self._refused_connections = 0
+        self._connection_lock = threading.Condition()
+        self._served_connections = set()
+        self._draining = False
+        self._drain_requested = False
+        # Set once another process shares the listening socket, which must
+        # then be closed without being shut down.
+        self._handed_off = False
+
+        self._register_metrics()
+        self._metrics_server = None
 
     def close(self):
-        self.socket.shutdown(socket.SHUT_RDWR)
-        self.socket.close()
+        self._stop_metrics_server()
+        self._close_listener()
+        self._processor.close()
+
+    def drain(self, signum=None, frame=None):
+        """
+        Stop the server gracefully.
+
+        The server stops accepting connections and closes the idle ones right
+        away. Connections with a request in progress are closed once their
+        response has been sent. Connections still open after shutdown_timeout
+        seconds are closed regardless. serve() returns once the listening
+        socket is closed. The method blocks until the connections are closed,
+        so signal handlers should call request_drain() instead.
+
+        Args:
+            signum (int): The number of the signal that triggered the drain.
+                Optional, defaults to None.
+            frame (frame): The interrupted stack frame. Optional, defaults to
+                None.
+
+        Returns:
+            bool: True if every connection was closed before the deadline,
+                False otherwise.
+        """
+        deadline = time.time() + self.shutdown_timeout
+        with self._connection_lock:
+            self._draining = True
+            idle = [served for served in self._served_connections
+                    if not served.busy]
+            for served in idle:
+                served.closing = True
+
+        self.logger.info('KMIPServer draining {0} connections'.format(
+            self.get_connection_statistics()['active']))
+        self._close_listener()
+        for served in idle:
+            served.shutdown()
+        self._close_queued_connections()
+
+        with self._connection_lock:
+            while self._active_connections > 0:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._connection_lock.wait(remaining)
+            remaining = list(self._served_connections)
+
+        if remaining:
+            self.logger.warning(
+                'KMIPServer closing {0} connections still in progress after '
+                'the drain timeout'.format(len(remaining)))
+            for served in remaining:
+                served.shutdown()
+
+        self._stop_metrics_server()
+        self._processor.close()
+        self.logger.info('KMIPServer drained')
+        return not remaining
+
+    def request_drain(self, signum=None, frame=None):
+        """
+        Ask serve() to drain the server, as drain() does.
+
+        The method only sets a flag and returns right away; serve() notices
+        it within ACCEPT_TIMEOUT seconds and drains the server before
+        returning. The signature allows the method to be registered directly
+        as a signal handler (e.g., for SIGTERM).
+
+        Args:
+            signum (int): The number of the signal that triggered the drain.
+                Optional, defaults to None.
+            frame (frame): The interrupted stack frame. Optional, defaults to
+                None.
+        """
+        self._drain_requested = True
+
+    def start_successor(self, args):
+        """
+        Start a server process that takes over the listening socket.
+
+        The new process inherits the listening socket, so connections keep
+        being accepted while this server drains; the new server takes the
+        socket over by setting listen_fd. Every argument is formatted with
+        the descriptor of the socket as listen_fd, e.g.
+        ['python', 'server.py', '--listen_fd', '{listen_fd}']. Once the new
+        process has started, closing this server no longer shuts the socket
+        down, which would stop the new server from accepting as well.
+
+        Args:
+            args (list): The command line of the new server process.
+
+        Returns:
+            Popen: The new server process.
+        """
+        fd = self.socket.fileno()
+        options = {}
+        if six.PY2:
+            options['close_fds'] = False
+        else:
+            # Sockets are not inheritable from Python 3.4 onwards; pass_fds
+            # keeps this one open, and inheritable, in the new process.
+            options['pass_fds'] = (fd,)
+        process = subprocess.Popen(
+            [arg.format(listen_fd=fd) for arg in args], **options)
+        self._handed_off = True
+        self.logger.info('KMIPServer started successor {0} on listening '
+                         'socket {1}'.format(process.pid, fd))
+        return process
+
+    def reload_config(self, signum=None, frame=None):
+        """
+        Re-read the server settings that can change while the server runs
+        and rebuild the SSL context.
+
+        The key, certificate and CA files, cert_reqs, ciphers,
+        session_tickets, handshake_timeout, max_connections, idle_timeout and
+        read_timeout are read again from the config file, unless they were
+        passed to the constructor. Connections accepted afterwards use the
+        new settings; established connections keep theirs. If the new SSL
+        context cannot be built, every setting is left unchanged. The
+        signature allows the method to be registered directly as a signal
+        handler (e.g., for SIGHUP).
+
+        Args:
+            signum (int): The number of the signal that triggered the reload.
+                Optional, defaults to None.
+            frame (frame): The interrupted stack frame. Optional, defaults to
+                None.
+
+        Returns:
+            bool: True if the settings were reloaded, False otherwise.
+        """
+        previous = dict((name, getattr(self, name))
+                        for name in self.RELOADABLE_SETTINGS)
+
+        self._set_reloadable_variables(*self._reloadable_values)
+        if not self.reload_ssl_context():
+            for name, value in previous.items():
+                setattr(self, name, value)
+            return False
+
+        self.logger.info('KMIPServer reloaded settings')
+        return True
+
+    def reload_ssl_context(self, signum=None, frame=None):
+        """
+        Rebuild the server SSL context from the configured key, certificate
+        and CA files.
+
+        The new context replaces the old one in a single assignment, so
+        connections accepted after the reload use the new certificates while
+        established connections are left untouched. If the new context cannot
+        be built, the current one is kept. The signature allows the method to
+        be registered directly as a signal handler (e.g., for SIGHUP).
+
+        Args:
+            signum (int): The number of the signal that triggered the reload.
+                Optional, defaults to None.
+            frame (frame): The interrupted stack frame. Optional, defaults to
+                None.
+
+        Returns:
+            bool: True if the context was replaced, False otherwise.
+        """
+        try:
+            context = self._build_ssl_context()
+        except (IOError, OSError, ssl.SSLError) as e:
+            self.logger.error(
+                'KMIPServer failed to reload SSL context: {0}'.format(e))
+            return False
+
+        self._ssl_context = context
+        self.logger.info('KMIPServer reloaded SSL context')
+        return True
+
+    def dump_wire_trace(self, signum=None, frame=None):
+        """
+        Write the frames captured by the wire trace to the configured wire
+        trace file. The signature allows the method to be registered directly
+        as a signal handler.
+
+        Args:
+            signum (int): The number of the signal that triggered the dump.
+                Optional, defaults to None.
+            frame (frame): The interrupted stack frame. Optional, defaults to
+                None.
+
+        Returns:
+            int: The number of frames written, or None if tracing is disabled.
+        """
+        tracer = wire_trace.tracer
+        if tracer is None:
+            self.logger.warning('KMIPServer wire trace is not enabled')
+            return None
+
+        count = tracer.dump(self.wire_trace_file)
+        self.logger.info('KMIPServer dumped {0} frames to {1}'.format(
+            count, self.wire_trace_file))
+        return count
+
+    def toggle_profiling(self, signum=None, frame=None):
+        """
+        Start profiling requests, or dump the profile and stop profiling if
+        it is already running. Profiling uses the configured profile_mode,
+        or cProfile if none is configured. The signature allows the method
+        to be registered directly as a signal handler.
+
+        Args:
+            signum (int): The number of the signal that triggered the toggle.
+                Optional, defaults to None.
+            frame (frame): The interrupted stack frame. Optional, defaults to
+                None.
+
+        Returns:
+            bool: True if profiling was started, False if it was stopped.
+        """
+        if profiling.profiler is None:
+            mode = self.profile_mode or profiling.CPROFILE
+            profiling.enable(mode, self.profile_sample_rate,
+                             self.profile_interval)
+            self.logger.info('KMIPServer started {0} profiling'.format(mode))
+            return True
+
+        self.dump_profile()
+        profiling.disable()
+        self.logger.info('KMIPServer stopped profiling')
+        return False
+
+    def dump_profile(self, signum=None, frame=None):
+        """
+        Write the statistics gathered by the profiler to files named after
+        the configured profile file: one pstats file per operation in
+        cProfile mode, or one collapsed stack file in stack mode. The
+        signature allows the method to be registered directly as a signal
+        handler.
+
+        Args:
+            signum (int): The number of the signal that triggered the dump.
+                Optional, defaults to None.
+            frame (frame): The interrupted stack frame. Optional, defaults to
+                None.
+
+        Returns:
+            int: The number of pstats files or distinct stacks written, or
+                None if profiling is disabled.
+        """
+        profiler = profiling.profiler
+        if profiler is None:
+            self.logger.warning('KMIPServer profiling is not enabled')
+            return None
+
+        count = profiler.dump(self.profile_file)
+        self.logger.info('KMIPServer dumped profile of {0} to {1}'.format(
+            ', '.join(profiler.labels()), self.profile_file))
+        return count
+
+    def get_handshake_statistics(self):
+        """
+        Get the statistics of the TLS handshakes performed by the workers.
+
+        Returns:
+            dict: A dictionary with the number of completed, failed and timed
+                out handshakes, and the average and maximum latency of the
+                completed handshakes in seconds.
+
+        Example:
+            >>> server.get_handshake_statistics()
+            {'handshakes': 4, 'failures': 1, 'timeouts': 0,
+             'average_latency': 0.004, 'max_latency': 0.007}
+        """
+        with self._statistics_lock:
+            statistics = dict(self._handshake_statistics)
+
+        total_latency = statistics.pop('total_latency')
+        statistics['average_latency'] = 0.0
+        if statistics['handshakes'] > 0:
+            statistics['average_latency'] = (
+                total_latency / statistics['handshakes'])
+
+        return statistics
+
+    def get_connection_statistics(self):
+        """
+        Get the number of open connections and of connections refused
+        because the server was at capacity.
+
+        Returns:
+            dict: A dictionary with the number of active and refused
+                connections.
+
+        Example:
+            >>> server.get_connection_statistics()
+            {'active': 12, 'refused': 3}
+        """
+        with self._connection_lock:
+            return {'active': self._active_connections,
+                    'refused': self._refused_connections}
+
+    def get_metrics(self):
+        """
+        Get the current value of every server metric.
+
+        Returns:
+            dict: A dictionary mapping metric names to their values, as
+                returned by Metrics.snapshot().
+        """
+        return self._processor.metrics.snapshot()
 
     def serve(self):
-        self.socket.listen(0)
+        self._start_metrics_server()
+        self._start_workers()
+        self.socket.listen(self.backlog)
+        # accept() wakes up regularly, so a drain requested from a signal
+        # handler runs here rather than inside the handler.
+        self.socket.settimeout(self.ACCEPT_TIMEOUT)
         while True:
-            connection, address = self.socket.accept()
-            connection = ssl.wrap_socket(
+            if self._drain_requested and not self._draining:
+                self.drain()
+            try:
+                connection, address = self.socket.accept()
+            except socket.timeout:
+                continue
+            except socket.error as e:
+                if self._draining:
+                    return
+                # Python 2 interrupts accept() when a signal arrives
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            if not self._admit_connection():
+                self._refuse_connection(connection, address)
+                continue
+
+            # Responses to pipelined requests are small and written
+            # back-to-back; do not let Nagle's algorithm delay them.
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            # The TLS handshake is left to the workers, so a client that
+            # stalls during the handshake cannot hold up the accept loop.
+            # When every worker is busy and the queue is full, the
+            # connection is refused rather than left waiting.
+            try:
+                self._connections.put_nowait((connection, address))
+            except queue.Full:
+                self._release_connection()
+                self._refuse_connection(connection, address)
+
+    def _get_connection_limit(self):
+        # A connection is either served by a worker or waiting in the queue,
+        # so the server cannot hold more than max_workers + max_queued.
+        return min(self.max_connections, self.max_workers + self.max_queued)
+
+    def _admit_connection(self):
+        with self._connection_lock:
+            if self._active_connections >= self._get_connection_limit():
+                return False
+            self._active_connections += 1
+            return True
+
+    def _release_connection(self):
+        with self._connection_lock:
+            self._active_connections -= 1
+            self._connection_lock.notify_all()
+
+    def _close_listener(self):
+        with self._connection_lock:
+            if not self._listening:
+                return
+            self._listening = False
+        if not self._handed_off:
+            try:
+                self.socket.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                # The socket was never put in the listening state.
+                pass
+        self.socket.close()
+
+    def _close_queued_connections(self):
+        # Connections still waiting for a worker have not completed the TLS
+        # handshake, so no request of theirs can be in progress.
+        while True:
+            try:
+                connection, address = self._connections.get_nowait()
+            except queue.Empty:
+                return
+            connection.close()
+            self._release_connection()
+            self._connections.task_done()
+
+    def _refuse_connection(self, connection, address):
+        with self._connection_lock:
+            self._refused_connections += 1
+        self.logger.warning(
+            'KMIPServer at capacity, refusing connection from {0}'.format(
+                address))
+        connection.close()
+
+    def _start_workers(self):
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(
+                target=self._run_worker,
+                name='KMIPServerWorker-{0}'.format(len(self._workers)))
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+        reaper = threading.Thread(target=self._run_queue_reaper,
+                                  name='KMIPServerQueueReaper')
+        reaper.daemon = True
+        reaper.start()
+
+    def _run_queue_reaper(self):
+        interval = min(1.0, self.queue_timeout)
+        while self._listening:
+            time.sleep(interval)
+            self._expire_queued_connections()
+
+    def _expire_queued_connections(self):
+        # Clients that have waited queue_timeout seconds for a worker are
+        # disconnected rather than left waiting without a handshake.
+        for connection, address in self._connections.expire(
+                self.queue_timeout):
+            self._release_connection()
+            with self._connection_lock:
+                self._refused_connections += 1
+            self.logger.warning(
+                'KMIPServer closing connection from {0} after waiting {1} '
+                'seconds for a worker'.format(address, self.queue_timeout))
+            connection.close()
+
+    def _run_worker(self):
+        while True:
+            connection, address = self._connections.get()
+            try:
+                if self._draining:
+                    connection.close()
+                else:
+                    self._handle_connection(connection, address)
+            finally:
+                self._release_connection()
+                self._connections.task_done()
+
+    def _handle_connection(self, connection, address):
+        try:
+            connection = self._handshake(connection)
+        except (socket.error, ssl.SSLError) as e:
+            self.logger.warning('KMIPServer TLS handshake with {0} failed: '
+                                '{1}'.format(address, e))
+            return
+
+        # Each connection gets its own protocol; the processor and handler
+        # are shared by all workers.
+        factory = KMIPProtocolFactory()
+        protocol = factory.getProtocol(connection,
+                                       idle_timeout=self.idle_timeout,
+                                       read_timeout=self.read_timeout)
+        served = _ServedConnection(connection, protocol,
+                                   self._connection_lock)
+        client = self._get_client_identity(self._get_peer_certificate(
+            connection))
+
+        with self._connection_lock:
+            if self._draining:
+                connection.close()
+                return
+            self._served_connections.add(served)
+
+        try:
+            while self._finish_request(served):
+                self._processor.process(served, served, client)
+        except socket.timeout:
+            self.logger.info('KMIPServer closing timed out connection from '
+                             '{0}'.format(address))
+        except Exception as e:
+            if self._draining:
+                self.logger.info('KMIPServer closed connection from {0} '
+                                 'while draining'.format(address))
+            else:
+                self.logger.error('KMIPServer {0} {1}'.format(type(e), e))
+        finally:
+            with self._connection_lock:
+                self._served_connections.discard(served)
+            connection.close()
+
+    def _get_peer_certificate(self, connection):
+        try:
+            return connection.getpeercert()
+        except ValueError:
+            # The handshake has not completed yet.
+            return None
+
+    def _get_client_identity(self, certificate):
+        # Clients are told apart by the subject of their TLS certificate,
+        # e.g. 'commonName=client,organizationName=Example'. Without a
+        # certificate, the processor falls back to the request credential.
+        if not certificate:
+            return None
+        subject = certificate.get('subject', ())
+        identity = ','.join('{0}={1}'.format(name, value)
+                            for rdn in subject for name, value in rdn)
+        return identity or None
+
+    def _finish_request(self, served):
+        # Marks the connection idle between requests; while draining, the
+        # connection is closed instead of waiting for another request.
+        with self._connection_lock:
+            served.busy = False
+            if self._draining:
+                served.closing = True
+                return False
+            return True
+
+    def _handshake(self, connection):
+        start = time.time()
+        try:
+            connection = self._ssl_context.wrap_socket(
                 connection,
-                keyfile=self.keyfile,
-                certfile=self.certfile,
                 server_side=True,
-                cert_reqs=self.cert_reqs,
-                ssl_version=self.ssl_version,
-                ca_certs=self.ca_certs,
-                do_handshake_on_connect=self.do_handshake_on_connect,
+                do_handshake_on_connect=False,
                 suppress_ragged_eofs=self.suppress_ragged_eofs)
+            if not self.do_handshake_on_connect:
+                return connection
 
-            factory = KMIPProtocolFactory()
-            protocol = factory.getProtocol(connection)
+            connection.settimeout(self.handshake_timeout)
+            connection.do_handshake()
+            connection.settimeout(None)
+        except socket.timeout:
+            self._record_handshake('timeouts')
+            connection.close()
+            raise
+        except (socket.error, ssl.SSLError):
+            self._record_handshake('failures')
+            connection.close()
+            raise
 
-            try:
-                while True:
-                    self._processor.process(protocol, protocol)
-            except Exception as e:
-                self.logger.error('KMIPServer {0} {1}'.format(type(e), e))
-                connection.close()
+        self._record_handshake('handshakes', time.time() - start)
+        return connection
+
+    def _register_metrics(self):
+        registry = self._processor.metrics
+
+        def statistic(function, name):
+            return lambda: function()[name]
+
+        registry.register_gauge(
+            'kmip_connections_active',
+            statistic(self.get_connection_statistics, 'active'),
+            'Open client connections')
+        registry.register_gauge(
+            'kmip_connections_refused_total',
+            statistic(self.get_connection_statistics, 'refused'),
+            'Connections refused at capacity', metrics.COUNTER)
+        for name, outcome, description in (
+                ('kmip_tls_handshakes_total', 'handshakes',
+                 'Completed TLS handshakes'),
+                ('kmip_tls_handshake_failures_total', 'failures',
+                 'Failed TLS handshakes'),
+                ('kmip_tls_handshake_timeouts_total', 'timeouts',
+                 'Timed out TLS handshakes')):
+            registry.register_gauge(
+                name, statistic(self.get_handshake_statistics, outcome),
+                description, metrics.COUNTER)
+        registry.describe('kmip_handshake_seconds', metrics.HISTOGRAM,
+                          'Time spent in completed TLS handshakes')
+
+        key_pool = self._processor._handler.key_pool
+        if key_pool is not None:
+            for name in ('hits', 'misses'):
+                registry.register_gauge(
+                    'kmip_key_pool_{0}_total'.format(name),
+                    statistic(key_pool.get_statistics, name),
+                    'Create keys taken from the pool ({0})'.format(name),
+                    metrics.COUNTER)
+            registry.register_gauge(
+                'kmip_key_pool_keys',
+                statistic(key_pool.get_statistics, 'pooled'),
+                'Pre-generated keys in the pool')
+
+    def _start_metrics_server(self):
+        if self.metrics_port is None or self._metrics_server is not None:
+            return
+        try:
+            self._metrics_server = metrics.MetricsServer(
+                self._processor.metrics, self.metrics_host, self.metrics_port)
+        except socket.error as e:
+            # Several server processes cannot share one metrics port; the
+            # server keeps running without the endpoint.
+            self.logger.warning(
+                'KMIPServer could not serve metrics on {0}:{1}: {2}'.format(
+                    self.metrics_host, self.metrics_port, e))
+            return
+        self._metrics_server.start()
+        self.logger.info('KMIPServer serving metrics on {0}:{1}'.format(
+            self.metrics_host, self.metrics_port))
+
+    def _stop_metrics_server(self):
+        if self._metrics_server is not None:
+            self._metrics_server.close()
+            self._metrics_server = None
+
+    def _record_handshake(self, outcome, latency=None):
+        if latency is not None:
+            self._processor.metrics.observe('kmip_handshake_seconds',
+                                            latency)
+        with self._statistics_lock:
+            statistics = self._handshake_statistics
+            statistics[outcome] += 1
+            if latency is not None:
+                statistics['total_latency'] += latency
+                statistics['max_latency'] = max(
+                    statistics['max_latency'], latency)
+
+    def _build_ssl_context(self):
+        context = ssl.SSLContext(self.ssl_version)
+        context.options |= ssl.OP_NO_SSLv2 | ssl.OP_NO_SSLv3
+        context.options |= getattr(ssl, 'OP_NO_COMPRESSION', 0)
+        context.options |= getattr(ssl, 'OP_CIPHER_SERVER_PREFERENCE', 0)
+        if not self.session_tickets:
+            context.options |= getattr(ssl, 'OP_NO_TICKET', 0)
+
+        context.verify_mode = self.cert_reqs
+        if self.ciphers is not None:
+            context.set_ciphers(self.ciphers)
+
+        context.load_cert_chain(self.certfile, self.keyfile)
+        if self.ca_certs is not None:
+            context.load_verify_locations(self.ca_certs)
+
+        return context
 
     def _set_variables(self, host, port, keyfile, certfile, cert_reqs,
                        ssl_version, ca_certs, do_handshake_on_connect,
-                       suppress_ragged_eofs):
+                       suppress_ragged_eofs, ciphers, session_tickets,
+                       wire_trace_size, wire_trace_file, max_workers,
+                       max_queued, reuse_port, database_path,
+                       handshake_timeout, backlog, max_connections,
+                       idle_timeout, read_timeout, batch_parallelism,
+                       async_workers, max_async_jobs, key_pool_size,
+                       key_pool_low_water_mark, key_pair_workers,
+                       key_pair_pool_size, key_pair_low_water_mark,
+                       get_cache_size, get_cache_max_bytes, metrics_host,
+                       metrics_port, shutdown_timeout, listen_fd, rate_limit,
+                       rate_limit_burst, operation_weights,
+                       fair_queue_slots, profile_mode, profile_sample_rate,
+                       profile_interval, profile_file, max_response_size,
+                       idempotency_cache_size, idempotency_cache_ttl,
+                       coalesce_reads, queue_timeout):
         conf = ConfigHelper()
         self.host = conf.get_valid_value(host, 'server',
                                          'host', conf.DEFAULT_HOST)
         self.port = int(conf.get_valid_value(port, 'server',
                                              'port', conf.DEFAULT_PORT))
-        self.keyfile = conf.get_valid_value(
-            keyfile, 'server', 'keyfile', conf.DEFAULT_KEYFILE)
 
-        self.certfile = conf.get_valid_value(
-            certfile, 'server', 'certfile', conf.DEFAULT_CERTFILE)
-
-        self.cert_reqs = getattr(ssl, conf.get_valid_value(
-            cert_reqs, 'server', 'cert_reqs', 'CERT_NONE'))
+        # Kept so that reload_config() can tell settings passed to the
+        # constructor, which always win, from those read from the config.
+        self._reloadable_values = (keyfile, certfile, cert_reqs, ca_certs,
+                                   ciphers, session_tickets,
+                                   handshake_timeout, max_connections,
+                                   idle_timeout, read_timeout)
+        self._set_reloadable_variables(*self._reloadable_values)
 
         self.ssl_version = getattr(ssl, conf.get_valid_value(
             ssl_version, 'server', 'ssl_version', conf.DEFAULT_SSL_VERSION))
 
-        self.ca_certs = conf.get_valid_value(
-            ca_certs, 'server', 'ca_certs', None)
-
         if conf.get_valid_value(
                 do_handshake_on_connect, 'server',
                 'do_handshake_on_connect', 'True') == 'True':
@@ -110,3 +919,338 @@ class KMIPServer(object):
             self.suppress_ragged_eofs = True
         else:
             self.suppress_ragged_eofs = False
+
+        self.wire_trace_size = int(conf.get_valid_value(
+            wire_trace_size, 'server', 'wire_trace_size', 0))
+
+        self.wire_trace_file = conf.get_valid_value(
+            wire_trace_file, 'server', 'wire_trace_file',
+            conf.DEFAULT_WIRE_TRACE_FILE)
+
+        self.max_workers = int(conf.get_valid_value(
+            max_workers, 'server', 'max_workers', conf.DEFAULT_MAX_WORKERS))
+        if self.max_workers < 1:
+            self.logger.warning(
+                "Invalid max_workers value specified, "
+                "resetting to default of {0} workers".format(
+                    conf.DEFAULT_MAX_WORKERS))
+            self.max_workers = conf.DEFAULT_MAX_WORKERS
+
+        self.max_queued = int(conf.get_valid_value(
+            max_queued, 'server', 'max_queued', conf.DEFAULT_MAX_QUEUED))
+
+        self.queue_timeout = float(conf.get_valid_value(
+            queue_timeout, 'server', 'queue_timeout',
+            conf.DEFAULT_QUEUE_TIMEOUT))
+
+        if conf.get_valid_value(
+                reuse_port, 'server', 'reuse_port', 'False') == 'True':
+            self.reuse_port = True
+        else:
+            self.reuse_port = False
+
+        self.database_path = conf.get_valid_value(
+            database_path, 'server', 'database_path', None)
+
+        self.backlog = int(conf.get_valid_value(
+            backlog, 'server', 'backlog', conf.DEFAULT_BACKLOG))
+
+        self.batch_parallelism = int(conf.get_valid_value(
+            batch_parallelism, 'server', 'batch_parallelism',
+            conf.DEFAULT_BATCH_PARALLELISM))
+
+        self.async_workers = int(conf.get_valid_value(
+            async_workers, 'server', 'async_workers',
+            conf.DEFAULT_ASYNC_WORKERS))
+
+        self.max_async_jobs = int(conf.get_valid_value(
+            max_async_jobs, 'server', 'max_async_jobs',
+            conf.DEFAULT_MAX_ASYNC_JOBS))
+
+        self.key_pool_size = int(conf.get_valid_value(
+            key_pool_size, 'server', 'key_pool_size',
+            conf.DEFAULT_KEY_POOL_SIZE))
+
+        self.key_pool_low_water_mark = int(conf.get_valid_value(
+            key_pool_low_water_mark, 'server', 'key_pool_low_water_mark',
+            conf.DEFAULT_KEY_POOL_LOW_WATER_MARK))
+        if self.key_pool_low_water_mark > self.key_pool_size:
+            self.logger.warning(
+                "Invalid key_pool_low_water_mark value specified, "
+                "resetting to the pool size of {0} keys".format(
+                    self.key_pool_size))
+            self.key_pool_low_water_mark = self.key_pool_size
+
+        self.key_pair_workers = int(conf.get_valid_value(
+            key_pair_workers, 'server', 'key_pair_workers',
+            conf.DEFAULT_KEY_PAIR_WORKERS))
+
+        self.key_pair_pool_size = int(conf.get_valid_value(
+            key_pair_pool_size, 'server', 'key_pair_pool_size',
+            conf.DEFAULT_KEY_PAIR_POOL_SIZE))
+
+        self.key_pair_low_water_mark = int(conf.get_valid_value(
+            key_pair_low_water_mark, 'server', 'key_pair_low_water_mark',
+            conf.DEFAULT_KEY_PAIR_LOW_WATER_MARK))
+        if self.key_pair_low_water_mark > self.key_pair_pool_size:
+            self.logger.warning(
+                "Invalid key_pair_low_water_mark value specified, "
+                "resetting to the pool size of {0} key pairs".format(
+                    self.key_pair_pool_size))
+            self.key_pair_low_water_mark = self.key_pair_pool_size
+
+        self.get_cache_size = int(conf.get_valid_value(
+            get_cache_size, 'server', 'get_cache_size',
+            conf.DEFAULT_GET_CACHE_SIZE))
+
+        self.get_cache_max_bytes = int(conf.get_valid_value(
+            get_cache_max_bytes, 'server', 'get_cache_max_bytes',
+            conf.DEFAULT_GET_CACHE_MAX_BYTES))
+
+        # Objects in a shared database can change in other server processes,
+        # which this process's cache would not notice.
+        if self.database_path is not None and self.get_cache_size > 0:
+            self.logger.info("Disabling the Get response cache for the "
+                             "shared database {0}".format(self.database_path))
+            self.get_cache_size = 0
+
+        self.metrics_host = conf.get_valid_value(
+            metrics_host, 'server', 'metrics_host', conf.DEFAULT_METRICS_HOST)
+
+        self.metrics_port = conf.get_valid_value(
+            metrics_port, 'server', 'metrics_port', conf.DEFAULT_METRICS_PORT)
+        if self.metrics_port is not None:
+            self.metrics_port = int(self.metrics_port)
+
+        self.shutdown_timeout = float(conf.get_valid_value(
+            shutdown_timeout, 'server', 'shutdown_timeout',
+            conf.DEFAULT_SHUTDOWN_TIMEOUT))
+
+        self.listen_fd = conf.get_valid_value(
+            listen_fd, 'server', 'listen_fd', conf.DEFAULT_LISTEN_FD)
+        if self.listen_fd is not None:
+            self.listen_fd = int(self.listen_fd)
+
+        self.rate_limit = float(conf.get_valid_value(
+            rate_limit, 'server', 'rate_limit', conf.DEFAULT_RATE_LIMIT))
+
+        self.rate_limit_burst = float(conf.get_valid_value(
+            rate_limit_burst, 'server', 'rate_limit_burst',
+            conf.DEFAULT_RATE_LIMIT_BURST))
+
+        self.operation_weights = self._parse_operation_weights(
+            conf.get_valid_value(
+                operation_weights, 'server', 'operation_weights',
+                conf.DEFAULT_OPERATION_WEIGHTS))
+
+        self.fair_queue_slots = int(conf.get_valid_value(
+            fair_queue_slots, 'server', 'fair_queue_slots',
+            conf.DEFAULT_FAIR_QUEUE_SLOTS))
+
+        self.profile_mode = conf.get_valid_value(
+            profile_mode, 'server', 'profile_mode', conf.DEFAULT_PROFILE_MODE)
+        if self.profile_mode not in (None, profiling.CPROFILE,
+                                     profiling.STACK):
+            self.logger.warning(
+                "Invalid profile_mode value '{0}' specified, disabling "
+                "profiling".format(self.profile_mode))
+            self.profile_mode = None
+
+        self.profile_sample_rate = int(conf.get_valid_value(
+            profile_sample_rate, 'server', 'profile_sample_rate',
+            conf.DEFAULT_PROFILE_SAMPLE_RATE))
+
+        self.profile_interval = float(conf.get_valid_value(
+            profile_interval, 'server', 'profile_interval',
+            conf.DEFAULT_PROFILE_INTERVAL))
+
+        self.profile_file = conf.get_valid_value(
+            profile_file, 'server', 'profile_file', conf.DEFAULT_PROFILE_FILE)
+
+        self.max_response_size = conf.get_valid_value(
+            max_response_size, 'server', 'max_response_size',
+            conf.DEFAULT_MAX_RESPONSE_SIZE)
+        if self.max_response_size is not None:
+            self.max_response_size = int(self.max_response_size)
+
+        self.idempotency_cache_size = int(conf.get_valid_value(
+            idempotency_cache_size, 'server', 'idempotency_cache_size',
+            conf.DEFAULT_IDEMPOTENCY_CACHE_SIZE))
+
+        self.idempotency_cache_ttl = float(conf.get_valid_value(
+            idempotency_cache_ttl, 'server', 'idempotency_cache_ttl',
+            conf.DEFAULT_IDEMPOTENCY_CACHE_TTL))
+
+        if conf.get_valid_value(
+                coalesce_reads, 'server', 'coalesce_reads', 'False') == 'True':
+            self.coalesce_reads = True
+        else:
+            self.coalesce_reads = False
+
+    def _parse_operation_weights(self, value):
+        # Weights are given as a comma-separated list of OPERATION:weight
+        # pairs, e.g. LOCATE:4,CREATE_KEY_PAIR:16.
+        if value is None:
+            return {}
+        if isinstance(value, dict):
+            return dict(value)
+
+        weights = {}
+        for entry in value.split(','):
+            entry = entry.strip()
+            if not entry:
+                continue
+            name, _, weight = entry.partition(':')
+            try:
+                weights[Operation[name.strip().upper()]] = float(weight)
+            except (KeyError, ValueError):
+                self.logger.warning(
+                    "Invalid operation_weights entry '{0}' ignored".format(
+                        entry))
+        return weights
+
+    def _set_reloadable_variables(self, keyfile, certfile, cert_reqs,
+                                  ca_certs, ciphers, session_tickets,
+                                  handshake_timeout, max_connections,
+                                  idle_timeout, read_timeout):
+        conf = ConfigHelper()
+        self.keyfile = conf.get_valid_value(
+            keyfile, 'server', 'keyfile', conf.DEFAULT_KEYFILE)
+
+        self.certfile = conf.get_valid_value(
+            certfile, 'server', 'certfile', conf.DEFAULT_CERTFILE)
+
+        self.cert_reqs = getattr(ssl, conf.get_valid_value(
+            cert_reqs, 'server', 'cert_reqs', 'CERT_NONE'))
+
+        self.ca_certs = conf.get_valid_value(
+            ca_certs, 'server', 'ca_certs', None)
+
+        self.ciphers = conf.get_valid_value(
+            ciphers, 'server', 'ciphers', None)
+
+        if conf.get_valid_value(
+                session_tickets, 'server',
+                'session_tickets', 'True') == 'True':
+            self.session_tickets = True
+        else:
+            self.session_tickets = False
+
+        self.handshake_timeout = float(conf.get_valid_value(
+            handshake_timeout, 'server', 'handshake_timeout',
+            conf.DEFAULT_HANDSHAKE_TIMEOUT))
+
+        self.max_connections = int(conf.get_valid_value(
+            max_connections, 'server', 'max_connections',
+            conf.DEFAULT_MAX_CONNECTIONS))
+
+        self.idle_timeout = conf.get_valid_value(
+            idle_timeout, 'server', 'idle_timeout', conf.DEFAULT_IDLE_TIMEOUT)
+        if self.idle_timeout is not None:
+            self.idle_timeout = float(self.idle_timeout)
+
+        self.read_timeout = conf.get_valid_value(
+            read_timeout, 'server', 'read_timeout',
+            conf.DEFAULT_READ_TIMEOUT)
+        if self.read_timeout is not None:
+            self.read_timeout = float(self.read_timeout)
+
+
+class KMIPServerSupervisor(object):
+    """
+    A pre-fork launcher running several KMIPServer processes.
+
+    Each worker process builds its own KMIPServer, which binds the shared
+    port with SO_REUSEPORT and runs its own accept loop, worker threads and
+    Processor. The supervisor restarts workers that exit while it is running
+    and stops all of them on SIGTERM or SIGINT; each worker drains its
+    connections before exiting.
+
+    The workers do not share memory, so the servers must be configured with a
+    shared repository backend (e.g., a database_path).
+    """
+
+    def __init__(self, server_factory, processes, restart_delay=1.0):
+        """
+        Construct a KMIPServerSupervisor.
+
+        Args:
+            server_factory (callable): Called with no arguments in each worker
+                process to build the KMIPServer it runs. The server should be
+                built with reuse_port enabled.
+            processes (int): The number of worker processes.
+            restart_delay (float): The number of seconds to wait before
+                restarting a worker that exited. Optional, defaults to 1.0.
+        """
+        if processes < 1:
+            raise ValueError('at least one server process is required')
+
+        self.logger = logging.getLogger(__name__)
+        self.server_factory = server_factory
+        self.processes = processes
+        self.restart_delay = restart_delay
+
+        self._workers = {}
+        self._running = False
+
+    def serve(self):
+        self._running = True
+        signal.signal(signal.SIGTERM, self.close)
+        signal.signal(signal.SIGINT, self.close)
+
+        for slot in range(self.processes):
+            self._spawn(slot)
+
+        while self._workers:
+            try:
+                pid, status = os.wait()
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                if e.errno == errno.ECHILD:
+                    break
+                raise
+
+            slot = self._workers.pop(pid, None)
+            if slot is None or not self._running:
+                continue
+
+            self.logger.warning(
+                'KMIPServer worker {0} exited with status {1}, '
+                'restarting'.format(pid, status))
+            time.sleep(self.restart_delay)
+            if self._running:
+                self._spawn(slot)
+
+    def close(self, signum=None, frame=None):
+        """
+        Stop restarting workers and terminate the running ones. The signature
+        allows the method to be registered directly as a signal handler.
+        """
+        self._running = False
+        for pid in list(self._workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError as e:
+                if e.errno != errno.ESRCH:
+                    raise
+
+    def _spawn(self, slot):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            exit_code = 0
+            try:
+                server = self.server_factory()
+                signal.signal(signal.SIGTERM, server.request_drain)
+                server.serve()
+            except Exception as e:
+                self.logger.error('KMIPServer worker {0} {1}'.format(
+                    type(e), e))
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+
+        self.logger.info('Started KMIPServer worker {0}'.format(pid))
+        self._workers[pid] = slot
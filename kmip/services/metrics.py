@@ -0,0 +1,350 @@
+# Copyright (c) 2015 Hewlett Packard Development Company, L.P.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import bisect
+import logging
+import threading
+
+from six.moves import BaseHTTPServer
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+# Upper bounds, in seconds, of the latency histogram buckets
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram(object):
+    """
+    Counts observed values in buckets with fixed upper bounds.
+
+    Attributes:
+        buckets: The upper bounds of the buckets, in increasing order.
+        counts: The number of values in each bucket, with one extra bucket
+            for values above the last bound.
+        count: The number of observed values.
+        sum: The sum of the observed values.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def get_cumulative_counts(self):
+        """
+        Get the number of values at or below each bound.
+
+        Returns:
+            list: (bound, count) tuples, ending with a bound of None that
+                counts every value.
+        """
+        cumulative = []
+        total = 0
+        for bound, count in zip(self.buckets + (None,), self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+
+class Metrics(object):
+    """
+    A registry of counters, gauges and histograms.
+
+    Counters and histograms are updated by the code they measure; each is
+    identified by a metric name and a tuple of (label, value) pairs. Gauges
+    are functions called whenever the metrics are read, so values that are
+    already tracked elsewhere (e.g., open connections) cost nothing between
+    reads.
+
+    Updates take a single short lock and do no formatting, which keeps the
+    metrics cheap enough to leave enabled.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Construct a Metrics registry.
+
+        Args:
+            buckets (tuple): The upper bounds of the histogram buckets.
+                Optional, defaults to DEFAULT_BUCKETS.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.buckets = tuple(buckets)
+
+        self._kinds = {}
+        self._help = {}
+        self._values = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, kind, description):
+        """
+        Set the type and the help text of a metric.
+
+        Args:
+            name (string): The name of the metric.
+            kind (string): COUNTER, GAUGE or HISTOGRAM.
+            description (string): A one-line description of the metric.
+        """
+        with self._lock:
+            self._kinds[name] = kind
+            self._help[name] = description
+
+    def increment(self, name, labels=(), amount=1):
+        """
+        Add to a counter.
+
+        Args:
+            name (string): The name of the counter.
+            labels (tuple): The (label, value) pairs of the counter.
+                Optional, defaults to no labels.
+            amount (int): The amount to add. Optional, defaults to 1.
+        """
+        with self._lock:
+            values = self._values.setdefault(name, {})
+            values[labels] = values.get(labels, 0) + amount
+
+    def observe(self, name, value, labels=()):
+        """
+        Add a value to a histogram.
+
+        Args:
+            name (string): The name of the histogram.
+            value (float): The observed value, usually a latency in seconds.
+            labels (tuple): The (label, value) pairs of the histogram.
+                Optional, defaults to no labels.
+        """
+        with self._lock:
+            values = self._values.setdefault(name, {})
+            histogram = values.get(labels)
+            if histogram is None:
+                histogram = values[labels] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def register_gauge(self, name, function, description=None, kind=GAUGE):
+        """
+        Add a metric whose value is read from a function.
+
+        Args:
+            name (string): The name of the metric.
+            function (callable): Called without arguments when the metrics
+                are read; returns the current value.
+            description (string): A one-line description of the metric.
+                Optional, defaults to None.
+            kind (string): GAUGE, or COUNTER for a value that only grows.
+                Optional, defaults to GAUGE.
+        """
+        with self._lock:
+            self._gauges[name] = function
+            self._kinds[name] = kind
+            if description is not None:
+                self._help[name] = description
+
+    def snapshot(self):
+        """
+        Get the current value of every metric.
+
+        Returns:
+            dict: A dictionary mapping metric names to dictionaries keyed by
+                label tuples. Counters and gauges map to numbers, histograms
+                to dictionaries with the count, the sum and the cumulative
+                bucket counts.
+
+        Example:
+            >>> metrics.snapshot()['kmip_handler_seconds']
+            {(('operation', 'GET'),): {'count': 2, 'sum': 0.0003,
+                                       'buckets': [(0.0001, 0), ...]}}
+        """
+        snapshot = {}
+        for name, (kind, values) in self._collect().items():
+            if kind == HISTOGRAM:
+                values = dict(
+                    (labels, {'count': histogram.count,
+                              'sum': histogram.sum,
+                              'buckets': histogram.get_cumulative_counts()})
+                    for labels, histogram in values.items())
+            snapshot[name] = values
+        return snapshot
+
+    def render(self):
+        """
+        Format every metric in the Prometheus text exposition format.
+
+        Returns:
+            string: The formatted metrics.
+        """
+        lines = []
+        collected = self._collect()
+        for name in sorted(collected):
+            kind, values = collected[name]
+            description = self._help.get(name)
+            if description is not None:
+                lines.append('# HELP {0} {1}'.format(name, description))
+            lines.append('# TYPE {0} {1}'.format(name, kind))
+            for labels in sorted(values):
+                value = values[labels]
+                if kind == HISTOGRAM:
+                    lines.extend(self._render_histogram(name, labels, value))
+                else:
+                    lines.append('{0}{1} {2}'.format(
+                        name, self._format_labels(labels), value))
+        lines.append('')
+        return '\n'.join(lines)
+
+    def _collect(self):
+        with self._lock:
+            collected = {}
+            for name, values in self._values.items():
+                kind = self._kinds.get(name)
+                if kind is None:
+                    kind = COUNTER
+                    for value in values.values():
+                        if isinstance(value, Histogram):
+                            kind = HISTOGRAM
+                        break
+                if kind == HISTOGRAM:
+                    values = dict(
+                        (labels, self._copy_histogram(histogram))
+                        for labels, histogram in values.items())
+                else:
+                    values = dict(values)
+                collected[name] = (kind, values)
+            gauges = list(self._gauges.items())
+
+        # Gauge functions may take other locks, so they are called after
+        # the registry lock is released.
+        for name, function in gauges:
+            try:
+                value = function()
+            except Exception as e:
+                self.logger.error('failed to read metric {0}: {1}'.format(
+                    name, e))
+                continue
+            if value is not None:
+                collected[name] = (self._kinds[name], {(): value})
+        return collected
+
+    def _copy_histogram(self, histogram):
+        copy = Histogram(histogram.buckets)
+        copy.counts = list(histogram.counts)
+        copy.count = histogram.count
+        copy.sum = histogram.sum
+        return copy
+
+    def _render_histogram(self, name, labels, histogram):
+        lines = []
+        for bound, count in histogram.get_cumulative_counts():
+            le = '+Inf' if bound is None else repr(float(bound))
+            lines.append('{0}_bucket{1} {2}'.format(
+                name, self._format_labels(labels + (('le', le),)), count))
+        lines.append('{0}_sum{1} {2}'.format(
+            name, self._format_labels(labels), histogram.sum))
+        lines.append('{0}_count{1} {2}'.format(
+            name, self._format_labels(labels), histogram.count))
+        return lines
+
+    def _format_labels(self, labels):
+        if not labels:
+            return ''
+        return '{' + ','.join(
+            '{0}="{1}"'.format(label, self._escape(value))
+            for label, value in labels) + '}'
+
+    def _escape(self, value):
+        return '{0}'.format(value).replace('\\', '\\\\').replace(
+            '"', '\\"').replace('\n', '\\n')
+
+
+class MetricsServer(object):
+    """
+    Serves the metrics of a registry over HTTP for scraping.
+
+    GET /metrics answers with the metrics in the Prometheus text exposition
+    format; every other path is answered with 404. Requests are served by a
+    single background thread, apart from the KMIP server workers.
+    """
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self, metrics, host='127.0.0.1', port=9696):
+        """
+        Construct a MetricsServer and bind its socket.
+
+        Args:
+            metrics (Metrics): The registry to serve.
+            host (string): The address to listen on. Optional, defaults to
+                127.0.0.1, so the metrics are only reachable locally.
+            port (int): The port to listen on; 0 picks a free port.
+                Optional, defaults to 9696.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.metrics = metrics
+        self._server = BaseHTTPServer.HTTPServer(
+            (host, port), self._build_handler())
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    def start(self):
+        """
+        Start serving requests on a background thread.
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='KMIPMetricsServer')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        """
+        Stop serving requests and close the socket.
+        """
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def _build_handler(self):
+        server = self
+
+        class MetricsRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+
+                body = server.metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', server.CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                server.logger.debug(format % args)
+
+        return MetricsRequestHandler
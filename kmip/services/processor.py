@@ -13,66 +13,418 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import copy
+import hashlib
 import logging
+import threading
 import time
 
+from multiprocessing.pool import ThreadPool
+
+from kmip.core.attributes import PrivateKeyUniqueIdentifier
+from kmip.core.attributes import PublicKeyUniqueIdentifier
+from kmip.core.attributes import UniqueIdentifier
+
 from kmip.core.messages.messages import RequestMessage
 from kmip.core.messages.messages import ResponseMessage
 from kmip.core.messages.messages import ResponseBatchItem
 from kmip.core.messages.messages import ResponseHeader
 
+from kmip.core.messages import contents
+from kmip.core.messages.contents import AsynchronousCorrelationValue
 from kmip.core.messages.contents import AsynchronousIndicator
 from kmip.core.messages.contents import BatchErrorContinuationOption
 from kmip.core.messages.contents import BatchCount
+from kmip.core.messages.contents import ResultMessage
+from kmip.core.messages.contents import ResultReason
+from kmip.core.messages.contents import ResultStatus
 from kmip.core.messages.contents import TimeStamp
 
+from kmip.core.misc import CancellationResult
+
 from kmip.core.primitives import Base
 
+from kmip.core.messages.payloads.activate import ActivateResponsePayload
+from kmip.core.messages.payloads.cancel import CancelResponsePayload
 from kmip.core.messages.payloads.create import CreateResponsePayload
+from kmip.core.messages.payloads.create_key_pair import \
+    CreateKeyPairResponsePayload
+from kmip.core.messages.payloads.rekey_key_pair import \
+    RekeyKeyPairResponsePayload
+from kmip.core.messages.payloads.discover_versions import \
+    DiscoverVersionsResponsePayload
 from kmip.core.messages.payloads.get import GetResponsePayload
 from kmip.core.messages.payloads.destroy import DestroyResponsePayload
+from kmip.core.messages.payloads.query import QueryResponsePayload
 from kmip.core.messages.payloads.register import RegisterResponsePayload
 from kmip.core.messages.payloads.locate import LocateResponsePayload
+from kmip.core.messages.payloads.revoke import RevokeResponsePayload
 
+from kmip.core.enums import CancellationResult as CancellationResultEnum
 from kmip.core.enums import Operation
+from kmip.core.enums import QueryFunction
+from kmip.core.enums import ResultReason as ResultReasonEnum
 from kmip.core.enums import ResultStatus as RS
 from kmip.core.enums import Tags
 from kmip.core.enums import BatchErrorContinuationOption as BECO
 
 from kmip.core.utils import BytearrayStream
 
+from kmip.services.job_queue import COMPLETED
+from kmip.services.job_queue import JobQueue
+from kmip.services import metrics as metrics_module
+from kmip.services import profiling
+from kmip.services.response_cache import EncodedBatchItem
+from kmip.services.response_cache import EncodedPayload
+from kmip.services.response_cache import IdempotencyCache
+from kmip.services.response_cache import RequestCoalescer
+from kmip.services.response_cache import ResponseCache
+from kmip.services.scheduling import FairQueue
+from kmip.services.scheduling import RateLimiter
+from kmip.services.results import CancelResult
+from kmip.services.results import EncodedGetResult
+
 
 class Processor(object):
-    def __init__(self, handler):
+    # Operations that can be run speculatively in an unordered batch
+    READ_ONLY_OPERATIONS = frozenset([Operation.GET, Operation.LOCATE])
+    # Operations queued in the background when a request sets the
+    # AsynchronousIndicator
+    ASYNCHRONOUS_OPERATIONS = frozenset([Operation.CREATE_KEY_PAIR,
+                                         Operation.REKEY_KEY_PAIR,
+                                         Operation.LOCATE])
+    # Operations that change or remove the object named in their request;
+    # cached Get responses for that object are dropped
+    INVALIDATING_OPERATIONS = frozenset([Operation.ACTIVATE,
+                                         Operation.REVOKE,
+                                         Operation.DESTROY])
+    # Operations that add objects, which searches in progress may miss
+    CREATING_OPERATIONS = frozenset([Operation.CREATE,
+                                     Operation.CREATE_KEY_PAIR,
+                                     Operation.REKEY_KEY_PAIR,
+                                     Operation.REGISTER])
+    # Operations with side effects; their answered batch items are kept so
+    # that a retried batch item is answered without running it again
+    REPLAYED_OPERATIONS = frozenset([Operation.CREATE,
+                                     Operation.CREATE_KEY_PAIR,
+                                     Operation.REKEY_KEY_PAIR,
+                                     Operation.REGISTER,
+                                     Operation.ACTIVATE,
+                                     Operation.REVOKE,
+                                     Operation.DESTROY])
+    # Request payload fields that, when left out, refer to the unique
+    # identifier produced by an earlier batch item of the request
+    ID_PLACEHOLDER_FIELDS = {
+        Operation.GET: ('unique_identifier', UniqueIdentifier),
+        Operation.ACTIVATE: ('unique_identifier', UniqueIdentifier),
+        Operation.REVOKE: ('unique_identifier', UniqueIdentifier),
+        Operation.DESTROY: ('unique_identifier', UniqueIdentifier),
+        Operation.REKEY_KEY_PAIR: ('private_key_uuid',
+                                   PrivateKeyUniqueIdentifier)}
+    # Optional response payload fields left out when a successful
+    # side-effecting batch item would not fit in the response otherwise
+    TEMPLATE_ATTRIBUTE_FIELDS = ('template_attribute',
+                                 'private_key_template_attribute',
+                                 'public_key_template_attribute')
+
+    def __init__(self, handler, batch_parallelism=1, async_workers=0,
+                 max_async_jobs=256, get_cache_size=0,
+                 get_cache_max_bytes=4194304, metrics=None, rate_limit=0,
+                 rate_limit_burst=50, operation_weights=None,
+                 fair_queue_slots=0, max_response_size=None,
+                 idempotency_cache_size=0, idempotency_cache_ttl=300,
+                 coalesce_reads=False):
         self.logger = logging.getLogger(__name__)
         self._handler = handler
 
-    def process(self, istream, ostream):
+        # Responses are kept within the smaller of this limit and the
+        # MaximumResponseSize of the request; None leaves them unbounded
+        # unless the client sets a limit.
+        self._max_response_size = max_response_size
+        # The encoded size of a response without batch items: its header and
+        # the 8-byte tag, type and length of the message itself.
+        self._response_overhead = self._encode(ResponseHeader(
+            protocol_version=contents.ProtocolVersion.create(1, 1),
+            time_stamp=TimeStamp(0),
+            batch_count=BatchCount(0))).length() + 8
+
+        # Each request costs the sum of the weights of its batch items;
+        # operations without a weight cost 1.
+        self._operation_weights = dict(operation_weights or {})
+
+        # Requests beyond a client's rate limit are rejected before any of
+        # their batch items run.
+        self._rate_limiter = None
+        if rate_limit > 0:
+            self._rate_limiter = RateLimiter(rate_limit, rate_limit_burst)
+
+        # Limits the requests running at once and shares the slots fairly
+        # between clients.
+        self._fair_queue = None
+        if fair_queue_slots > 0:
+            self._fair_queue = FairQueue(fair_queue_slots)
+
+        if metrics is None:
+            metrics = metrics_module.Metrics()
+        self.metrics = metrics
+
+        # Without asynchronous workers the AsynchronousIndicator is ignored
+        # and every operation is answered right away.
+        self._jobs = None
+        if async_workers > 0:
+            self._jobs = JobQueue(async_workers, max_async_jobs)
+
+        # Batches sent with BatchOrderOption set to False are spread over a
+        # shared pool of threads; ordered batches run on the calling thread.
+        self._pool = None
+        if batch_parallelism > 1:
+            self._pool = ThreadPool(batch_parallelism)
+
+        # Successful Get responses are kept encoded, so repeated Gets of an
+        # object skip the repository and the payload encoding.
+        self._get_cache = None
+        if get_cache_size > 0:
+            self._get_cache = ResponseCache(get_cache_size,
+                                            get_cache_max_bytes)
+
+        # Identical Gets and Locates running at the same time share one call
+        # to the handler, so a burst of clients reading a new key costs one
+        # repository read.
+        self._coalescer = None
+        if coalesce_reads:
+            self._coalescer = RequestCoalescer()
+
+        # Batch items with a UniqueBatchItemID are remembered by client, so a
+        # client retrying a request after a timeout gets the original
+        # response instead of, say, a second key.
+        self._idempotency_cache = None
+        if idempotency_cache_size > 0:
+            self._idempotency_cache = IdempotencyCache(idempotency_cache_size,
+                                                       idempotency_cache_ttl)
+        self._describe_metrics()
+
+        self._operations = {}
+        self._operation_statistics = {}
+        self._statistics_lock = threading.Lock()
+
+        self.register_operation(Operation.CREATE, self._create,
+                                self._build_create_response)
+        self.register_operation(Operation.CREATE_KEY_PAIR,
+                                self._create_key_pair,
+                                self._build_create_key_pair_response)
+        self.register_operation(Operation.REKEY_KEY_PAIR,
+                                self._rekey_key_pair,
+                                self._build_rekey_key_pair_response)
+        self.register_operation(Operation.REGISTER, self._register,
+                                self._build_register_response)
+        self.register_operation(Operation.LOCATE, self._locate,
+                                self._build_locate_response)
+        self.register_operation(Operation.GET, self._get,
+                                self._build_get_response)
+        self.register_operation(Operation.ACTIVATE, self._activate,
+                                self._build_activate_response)
+        self.register_operation(Operation.REVOKE, self._revoke,
+                                self._build_revoke_response)
+        self.register_operation(Operation.DESTROY, self._destroy,
+                                self._build_destroy_response)
+        self.register_operation(Operation.QUERY, self._query,
+                                self._build_query_response)
+        self.register_operation(Operation.DISCOVER_VERSIONS,
+                                self._discover_versions,
+                                self._build_discover_versions_response)
+        if self._jobs is not None:
+            self.register_operation(Operation.CANCEL, self._cancel,
+                                    self._build_cancel_response)
+
+    def register_operation(self, operation, handler, response_builder):
+        """
+        Add or replace the processing of an operation.
+
+        Args:
+            operation (Operation): The operation enumeration.
+            handler (callable): Called with the decoded request payload;
+                returns the OperationResult of the operation. Raising
+                NotImplementedError rejects the batch item as an unsupported
+                operation.
+            response_builder (callable): Called with a successful
+                OperationResult; returns the response payload.
+        """
+        self._operations[operation] = (handler, response_builder)
+
+    def get_operation_statistics(self):
+        """
+        Get the number of calls and the latency of every processed
+        operation. Rejected operations are not counted.
+
+        Returns:
+            dict: A dictionary mapping operation names to dictionaries with
+                the number of calls and the average and maximum latency in
+                seconds.
+
+        Example:
+            >>> processor.get_operation_statistics()
+            {'GET': {'count': 10, 'average_latency': 0.0002,
+                     'max_latency': 0.0009}}
+        """
+        with self._statistics_lock:
+            statistics = dict(self._operation_statistics)
+
+        return dict(
+            (op.name, {'count': count,
+                       'average_latency': total / count,
+                       'max_latency': maximum})
+            for op, (count, total, maximum) in statistics.items())
+
+    def get_cache_statistics(self):
+        """
+        Get the statistics of the encoded Get response cache.
+
+        Returns:
+            dict: The hits, the misses, the number of cached entries and
+                their size in bytes, or None if the cache is disabled.
+        """
+        if self._get_cache is None:
+            return None
+        return self._get_cache.get_statistics()
+
+    def get_idempotency_statistics(self):
+        """
+        Get the statistics of the cache of answered batch items.
+
+        Returns:
+            dict: The hits, the misses and the number of cached batch items,
+                or None if the cache is disabled.
+        """
+        if self._idempotency_cache is None:
+            return None
+        return self._idempotency_cache.get_statistics()
+
+    def close(self):
+        """
+        Stop the batch threads, the asynchronous workers and the background
+        work of the handler. Calling it again has no effect.
+        """
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.terminate()
+        if self._jobs is not None:
+            self._jobs.close()
+        self._handler.close()
+
+    def _describe_metrics(self):
+        describe = self.metrics.describe
+        describe('kmip_requests_total', metrics_module.COUNTER,
+                 'Request messages processed, by batch operation')
+        describe('kmip_results_total', metrics_module.COUNTER,
+                 'Batch items answered, by operation, status and reason')
+        describe('kmip_received_bytes_total', metrics_module.COUNTER,
+                 'Bytes of request messages received')
+        describe('kmip_sent_bytes_total', metrics_module.COUNTER,
+                 'Bytes of response messages sent')
+        describe('kmip_decode_seconds', metrics_module.HISTOGRAM,
+                 'Time spent decoding request messages')
+        describe('kmip_handler_seconds', metrics_module.HISTOGRAM,
+                 'Time spent running operations')
+        describe('kmip_encode_seconds', metrics_module.HISTOGRAM,
+                 'Time spent encoding response messages')
+        describe('kmip_rate_limited_total', metrics_module.COUNTER,
+                 'Request messages rejected by a client rate limit')
+        describe('kmip_fair_queue_seconds', metrics_module.HISTOGRAM,
+                 'Time requests waited for a processing slot')
+        describe('kmip_replayed_total', metrics_module.COUNTER,
+                 'Retried batch items answered without running them again')
+        if self._fair_queue is not None:
+            self.metrics.register_gauge(
+                'kmip_fair_queue_waiting',
+                lambda: self._fair_queue.get_statistics()['waiting'],
+                'Requests waiting for a processing slot')
+        if self._coalescer is not None:
+            self.metrics.register_gauge(
+                'kmip_coalesced_reads_total',
+                lambda: self._coalescer.get_statistics()['shared'],
+                'Get and Locate requests that shared an identical request '
+                'in progress', metrics_module.COUNTER)
+        if self._get_cache is not None:
+            self.metrics.register_gauge(
+                'kmip_get_cache_hits_total',
+                lambda: self._get_cache.get_statistics()['hits'],
+                'Get requests answered from the response cache',
+                metrics_module.COUNTER)
+            self.metrics.register_gauge(
+                'kmip_get_cache_misses_total',
+                lambda: self._get_cache.get_statistics()['misses'],
+                'Get requests not found in the response cache',
+                metrics_module.COUNTER)
+            self.metrics.register_gauge(
+                'kmip_get_cache_bytes',
+                lambda: self._get_cache.get_statistics()['bytes'],
+                'Size of the cached Get responses')
+
+    def process(self, istream, ostream, client=None):
         stream = istream.read()
+        response = self.process_stream(stream, client)
+        if response is not None:
+            ostream.write(response)
+
+    def process_stream(self, stream, client=None):
+        """
+        Decode and process one encoded message.
+
+        Args:
+            stream (BytearrayStream): The encoded request or response message.
+            client (string): The identity the client authenticated with at
+                the transport level, such as the subject of its TLS
+                certificate. Optional, defaults to None, in which case the
+                credential in the request header is used.
 
+        Returns:
+            bytearray: The encoded response message for a request, or None
+                for a response.
+        """
         if Base.is_tag_next(Tags.REQUEST_MESSAGE, stream):
-            message = RequestMessage()
-            message.read(stream)
+            profiler = profiling.profiler
+            if profiler is None:
+                return self._process_request_stream(stream, client)
+
+            sample = profiler.begin()
+            if sample is None:
+                return self._process_request_stream(stream, client)
+
+            # The sample is labelled once the request has been decoded.
+            state = {'label': 'UNKNOWN'}
             try:
-                result = self._process_request(message)
-            except Exception as e:
-                raise e
-            tstream = BytearrayStream()
-            result.write(tstream)
-            ostream.write(tstream.buffer)
+                return self._process_request_stream(stream, client, state)
+            finally:
+                profiler.end(sample, state['label'])
         elif Base.is_tag_next(Tags.RESPONSE_MESSAGE, stream):
             message = ResponseMessage()
             message.read(stream)
             self._process_response(message)
+            return None
         else:
             raise ValueError('Processing error: stream contains unknown '
                              'message type')
 
-    def _process_request(self, message):
+    def _process_request_stream(self, stream, client, state=None):
+        received = stream.length()
+        start = time.time()
+        message = RequestMessage()
+        message.read(stream)
+        decoded = time.time()
+        if state is not None:
+            state['label'] = self._get_message_label(message)
+        result = self._process_request(message, client)
+        processed = time.time()
+        tstream = BytearrayStream()
+        result.write(tstream)
+        encoded = time.time()
+        self._record_message(message, received, tstream.length(),
+                             decoded - start, encoded - processed)
+        return tstream.buffer
+
+    def _process_request(self, message, client=None):
         header = message.request_header
 
-        protocol_version = header.protocol_version
-#        maximum_response_size = header.maximum_response_size
         asynchronous_indicator = header.asynchronous_indicator
 #        authentication = header.authentication
         batch_error_cont_option = header.batch_error_cont_option
@@ -88,50 +440,91 @@ class Processor(object):
         if batch_error_cont_option is None:
             batch_error_cont_option = BatchErrorContinuationOption(BECO.STOP)
 
-        request_batch_items = message.batch_items
+        request_batch_items = message.batch_items[:request_batch_count]
         response_batch_items = []
 
-        for i in range(request_batch_count):
-            request_batch_item = request_batch_items[i]
-            failure_occurred = False
+        asynchronous = bool(asynchronous_indicator.value)
 
-            operation = request_batch_item.operation
-            ubi_id = request_batch_item.unique_batch_item_id
-            payload = request_batch_item.request_payload
-            message_extension = request_batch_item.message_extension
+        client = self._get_client_identity(header, client)
+        cost = self._get_request_cost(request_batch_items)
+        if (self._rate_limiter is not None and
+                not self._rate_limiter.acquire(client, cost)):
+            return self._reject_request(header, request_batch_items, client)
 
-            result = self._process_operation(operation, payload)
+        # The ID placeholder holds the unique identifier produced by the
+        # last batch item that produced one; items that leave their unique
+        # identifier out use it, so they can act on an object created
+        # earlier in the same request. The response size is the encoded
+        # size of the items answered so far.
+        size_limit = self._get_response_size_limit(header)
+        state = {'id_placeholder': None,
+                 'response_size': self._response_overhead}
 
-            result_status = result[0]
-            result_reason = result[1]
-            result_message = result[2]
-            asyn_cv = None
-            response_payload = None
-            message_extension = None
-
-            if result_status.enum is RS.SUCCESS:
-                response_payload = result[3]
-            elif result_status.enum is RS.OPERATION_FAILED:
-                failure_occurred = True
-                result_reason = result[1]
-            elif result_status.enum is RS.OPERATION_PENDING:
-                # TODO (peter-hamilton) Need to add a way to track async
-                # TODO (peter-hamilton) operations.
-                asyn_cv = b'\x00'
-            elif result_status.enum is RS.OPERATION_UNDONE:
-                result_reason = result[1]
+        def process(item):
+            self._use_id_placeholder(item, state['id_placeholder'])
+            budget = None
+            if size_limit is not None:
+                budget = size_limit - state['response_size']
+            result = self._process_batch_item(item, asynchronous, client,
+                                              budget)
+            uuid = self._get_id_placeholder(result[0])
+            # A Locate that does not find exactly one object clears it
+            if uuid is not None or item.operation.enum is Operation.LOCATE:
+                state['id_placeholder'] = uuid
+            return result
+
+        if self._fair_queue is not None:
+            start = time.time()
+            self._fair_queue.acquire(client, cost)
+            self.metrics.observe('kmip_fair_queue_seconds',
+                                 time.time() - start)
+        try:
+            if self._can_process_in_parallel(header, request_batch_items,
+                                             batch_error_cont_option,
+                                             size_limit):
+                results = self._pool.map(process, request_batch_items)
             else:
-                msg = 'Unrecognized operation result status: {0}'
-                raise RuntimeError(msg.format(result_status))
-
-            resp_bi = ResponseBatchItem(operation=operation,
-                                        unique_batch_item_id=ubi_id,
-                                        result_status=result_status,
-                                        result_reason=result_reason,
-                                        result_message=result_message,
-                                        async_correlation_value=asyn_cv,
-                                        response_payload=response_payload,
-                                        message_extension=message_extension)
+                # Evaluated lazily, so items after a failure that stops the
+                # batch are never run.
+                results = (process(item) for item in request_batch_items)
+
+            self._collect_results(results, response_batch_items,
+                                  batch_error_cont_option, size_limit,
+                                  state)
+        finally:
+            if self._fair_queue is not None:
+                self._fair_queue.release()
+
+        return self._build_response_message(header, response_batch_items)
+
+    def _collect_results(self, results, response_batch_items,
+                         batch_error_cont_option, size_limit=None,
+                         state=None):
+        # With a size limit, every batch item is encoded as soon as it is
+        # answered and only its encoding is kept. An item that would push
+        # the response over the limit is answered with Response Too Large
+        # instead, and handled like any other failed item. The size reached
+        # is kept in the state, so batch items run later know what is left.
+        size = self._response_overhead
+        for resp_bi, failure_occurred in results:
+            if size_limit is not None:
+                encoded = self._encode(resp_bi)
+                if size + encoded.length() > size_limit:
+                    resp_bi = self._build_response_too_large(resp_bi)
+                    failure_occurred = True
+                    encoded = self._encode(resp_bi)
+                    # When not even the failure fits, the response ends
+                    # here; the first item is always answered.
+                    if (response_batch_items and
+                            size + encoded.length() > size_limit):
+                        break
+                size += encoded.length()
+                if state is not None:
+                    state['response_size'] = size
+
+            self._record_result(resp_bi)
+            if size_limit is not None:
+                resp_bi = EncodedPayload(encoded.buffer)
             response_batch_items.append(resp_bi)
 
             if failure_occurred:
@@ -147,132 +540,645 @@ class Processor(object):
                     msg = 'Unrecognized batch error continuation option: {0}'
                     raise RuntimeError(msg.format(batch_error_cont_option))
 
+    def _get_response_size_limit(self, header):
+        limit = self._max_response_size
+        if header.maximum_response_size is not None:
+            requested = header.maximum_response_size.value
+            if limit is None or requested < limit:
+                limit = requested
+        return limit
+
+    def _encode(self, struct):
+        stream = BytearrayStream()
+        struct.write(stream)
+        return stream
+
+    def _build_response_too_large(self, resp_bi):
+        # The result message is left out to keep the failure small.
+        return ResponseBatchItem(
+            operation=resp_bi.operation,
+            unique_batch_item_id=resp_bi.unique_batch_item_id,
+            result_status=ResultStatus(RS.OPERATION_FAILED),
+            result_reason=ResultReason(ResultReasonEnum.RESPONSE_TOO_LARGE))
+
+    def _build_response_message(self, header, response_batch_items):
         response_batch_count = BatchCount(len(response_batch_items))
         response_time_stamp = TimeStamp(int(time.time()))
-        response_header = ResponseHeader(protocol_version=protocol_version,
-                                         time_stamp=response_time_stamp,
-                                         batch_count=response_batch_count)
+        response_header = ResponseHeader(
+            protocol_version=header.protocol_version,
+            time_stamp=response_time_stamp,
+            batch_count=response_batch_count)
 
         response_message = ResponseMessage(response_header=response_header,
                                            batch_items=response_batch_items)
         return response_message
 
+    def _get_client_identity(self, header, client):
+        # A transport identity, checked during the TLS handshake, takes
+        # precedence over the credential the request claims.
+        if client is not None:
+            return client
+
+        authentication = header.authentication
+        if authentication is None or authentication.credential is None:
+            return None
+        value = authentication.credential.credential_value
+        for name in ('username', 'device_identifier', 'device_serial_number'):
+            field = getattr(value, name, None)
+            if field is not None and field.value:
+                return field.value
+        return None
+
+    def _get_request_cost(self, request_batch_items):
+        return sum(self._operation_weights.get(item.operation.enum, 1)
+                   for item in request_batch_items)
+
+    def _reject_request(self, header, request_batch_items, client):
+        self.logger.debug('rate limit exceeded by client {0}'.format(
+            client))
+        self.metrics.increment('kmip_rate_limited_total')
+
+        # KMIP has no result reason for throttling; none of the batch items
+        # was run, so the client can send the request again later.
+        result = (ResultStatus(RS.OPERATION_FAILED),
+                  ResultReason(ResultReasonEnum.GENERAL_FAILURE),
+                  ResultMessage('rate limit exceeded, retry later'),
+                  None)
+        response_batch_items = [
+            self._build_response_batch_item(item, item.operation, result)[0]
+            for item in request_batch_items]
+        for resp_bi in response_batch_items:
+            self._record_result(resp_bi)
+        return self._build_response_message(header, response_batch_items)
+
+    def _can_process_in_parallel(self, header, request_batch_items,
+                                 batch_error_cont_option, size_limit=None):
+        if self._pool is None or len(request_batch_items) < 2:
+            return False
+
+        # Items with side effects may only run once the room left in a
+        # limited response is known.
+        if size_limit is not None and not all(
+                item.operation.enum in self.READ_ONLY_OPERATIONS
+                for item in request_batch_items):
+            return False
+
+        # Items may only run concurrently if the client does not need them
+        # to run in order.
+        batch_order_option = header.batch_order_option
+        if batch_order_option is None or batch_order_option.value:
+            return False
+
+        # Items using the ID placeholder depend on the items before them.
+        if any(self._uses_id_placeholder(item)
+               for item in request_batch_items):
+            return False
+
+        # Running every item is only equivalent to running them one by one
+        # if a failure does not stop the batch, or if the items that would
+        # have been skipped have no side effects.
+        if batch_error_cont_option.enum is BECO.CONTINUE:
+            return True
+        return all(item.operation.enum in self.READ_ONLY_OPERATIONS
+                   for item in request_batch_items)
+
+    def _process_batch_item(self, request_batch_item, asynchronous=False,
+                            client=None, budget=None):
+        key = self._get_idempotency_key(request_batch_item, client)
+        if key is None:
+            return self._run_batch_item(request_batch_item, asynchronous,
+                                        budget)
+
+        resp_bi = self._idempotency_cache.claim(key)
+        if resp_bi is not None:
+            self.metrics.increment('kmip_replayed_total', (
+                ('operation', resp_bi.operation.enum.name),))
+            return (resp_bi, False)
+
+        stored = False
+        try:
+            resp_bi, failure_occurred = self._run_batch_item(
+                request_batch_item, asynchronous, budget)
+            # Failed items changed nothing and are run again when retried.
+            if resp_bi.result_status.enum in (RS.SUCCESS,
+                                              RS.OPERATION_PENDING):
+                resp_bi = self._encode_batch_item(resp_bi)
+                self._idempotency_cache.put(key, resp_bi)
+                stored = True
+            return (resp_bi, failure_occurred)
+        finally:
+            if not stored:
+                self._idempotency_cache.release(key)
+
+    def _get_idempotency_key(self, request_batch_item, client):
+        ubi_id = request_batch_item.unique_batch_item_id
+        operation = request_batch_item.operation.enum
+        payload = request_batch_item.request_payload
+        # Clients without a certificate or credential cannot be told apart,
+        # so their batch items are never answered from the cache.
+        if (self._idempotency_cache is None or client is None or
+                ubi_id is None or payload is None or
+                operation not in self.REPLAYED_OPERATIONS):
+            return None
+
+        # The digest of the payload keeps a client that reuses identifiers,
+        # such as one numbering the items of each batch from 1, from being
+        # answered with the response to another request.
+        digest = hashlib.sha256(self._encode(payload).buffer).digest()
+        return (client, ubi_id.value, operation, digest)
+
+    def _encode_batch_item(self, resp_bi):
+        return EncodedBatchItem(self._encode(resp_bi).buffer,
+                                resp_bi.operation,
+                                resp_bi.unique_batch_item_id,
+                                resp_bi.result_status,
+                                resp_bi.result_reason,
+                                self._get_id_placeholder(resp_bi))
+
+    def _uses_id_placeholder(self, request_batch_item):
+        field = self.ID_PLACEHOLDER_FIELDS.get(
+            request_batch_item.operation.enum)
+        payload = request_batch_item.request_payload
+        return (field is not None and payload is not None and
+                getattr(payload, field[0]) is None)
+
+    def _use_id_placeholder(self, request_batch_item, id_placeholder):
+        if (id_placeholder is None or
+                not self._uses_id_placeholder(request_batch_item)):
+            return
+        name, field_class = self.ID_PLACEHOLDER_FIELDS[
+            request_batch_item.operation.enum]
+        setattr(request_batch_item.request_payload, name,
+                field_class(id_placeholder))
+
+    def _get_id_placeholder(self, resp_bi):
+        # Returns the unique identifier a batch item produced, if any
+        if isinstance(resp_bi, EncodedBatchItem):
+            return resp_bi.id_placeholder
+
+        payload = resp_bi.response_payload
+        if resp_bi.result_status.enum is not RS.SUCCESS or payload is None:
+            return None
+
+        op = resp_bi.operation.enum
+        uuid = None
+        if op in (Operation.CREATE, Operation.REGISTER):
+            uuid = payload.unique_identifier
+        elif op in (Operation.CREATE_KEY_PAIR, Operation.REKEY_KEY_PAIR):
+            uuid = payload.private_key_uuid
+        elif (op is Operation.LOCATE and
+              len(payload.unique_identifiers) == 1):
+            uuid = payload.unique_identifiers[0]
+        if uuid is None:
+            return None
+        return uuid.value
+
+    def _run_batch_item(self, request_batch_item, asynchronous,
+                        budget=None):
+        # With a limited response, an item with side effects is only run if
+        # the room left can hold its smallest successful answer, so nothing
+        # is changed without the client being told.
+        if budget is not None and not self._fits_minimal_response(
+                request_batch_item, budget):
+            resp_bi = self._build_response_too_large(ResponseBatchItem(
+                operation=request_batch_item.operation,
+                unique_batch_item_id=request_batch_item.unique_batch_item_id))
+            return (resp_bi, True)
+
+        operation = request_batch_item.operation
+        payload = request_batch_item.request_payload
+
+        if asynchronous and self._can_defer(operation, payload):
+            result = self._defer(operation, payload)
+        elif operation.enum is Operation.POLL and self._jobs is not None:
+            # A finished job is answered as the operation it ran
+            operation, result = self._poll(payload)
+        else:
+            result = self._process_operation(operation, payload)
+
+        resp_bi, failure_occurred = self._build_response_batch_item(
+            request_batch_item, operation, result)
+        if budget is not None:
+            resp_bi = self._trim_response(resp_bi, budget)
+        return (resp_bi, failure_occurred)
+
+    def _fits_minimal_response(self, request_batch_item, budget):
+        op = request_batch_item.operation.enum
+        payload = request_batch_item.request_payload
+        if op not in self.REPLAYED_OPERATIONS or payload is None:
+            return True
+
+        # The smallest answer holds the identifiers the item produces or
+        # acts on; new identifiers are taken to be as long as a UUID. The
+        # answers to Activate, Revoke and Destroy are encoded alike.
+        uuid = '0' * 36
+        if op is Operation.CREATE:
+            response_payload = CreateResponsePayload(
+                object_type=payload.object_type,
+                unique_identifier=UniqueIdentifier(uuid))
+        elif op is Operation.REGISTER:
+            response_payload = RegisterResponsePayload(
+                unique_identifier=UniqueIdentifier(uuid))
+        elif op in (Operation.CREATE_KEY_PAIR, Operation.REKEY_KEY_PAIR):
+            response_payload = CreateKeyPairResponsePayload(
+                private_key_uuid=PrivateKeyUniqueIdentifier(uuid),
+                public_key_uuid=PublicKeyUniqueIdentifier(uuid))
+        else:
+            unique_identifier = payload.unique_identifier
+            if unique_identifier is None:
+                unique_identifier = UniqueIdentifier(uuid)
+            response_payload = DestroyResponsePayload(
+                unique_identifier=unique_identifier)
+
+        resp_bi = ResponseBatchItem(
+            operation=request_batch_item.operation,
+            unique_batch_item_id=request_batch_item.unique_batch_item_id,
+            result_status=ResultStatus(RS.SUCCESS),
+            response_payload=response_payload)
+        return self._encode(resp_bi).length() <= budget
+
+    def _trim_response(self, resp_bi, budget):
+        # A successful item with side effects that does not fit is answered
+        # without its template attributes rather than with Response Too
+        # Large, so the client learns what was created.
+        if (resp_bi.operation.enum not in self.REPLAYED_OPERATIONS or
+                resp_bi.result_status.enum is not RS.SUCCESS or
+                resp_bi.response_payload is None or
+                self._encode(resp_bi).length() <= budget):
+            return resp_bi
+
+        payload = copy.copy(resp_bi.response_payload)
+        for name in self.TEMPLATE_ATTRIBUTE_FIELDS:
+            if hasattr(payload, name):
+                setattr(payload, name, None)
+        trimmed = copy.copy(resp_bi)
+        trimmed.response_payload = payload
+        return trimmed
+
+    def _build_response_batch_item(self, request_batch_item, operation,
+                                   result):
+        failure_occurred = False
+        ubi_id = request_batch_item.unique_batch_item_id
+
+        result_status = result[0]
+        result_reason = result[1]
+        result_message = result[2]
+        asyn_cv = None
+        response_payload = None
+        message_extension = None
+
+        if result_status.enum is RS.SUCCESS:
+            response_payload = result[3]
+        elif result_status.enum is RS.OPERATION_FAILED:
+            failure_occurred = True
+            result_reason = result[1]
+        elif result_status.enum is RS.OPERATION_PENDING:
+            # Pending results carry their correlation value instead of a
+            # response payload.
+            asyn_cv = result[3]
+        elif result_status.enum is RS.OPERATION_UNDONE:
+            result_reason = result[1]
+        else:
+            msg = 'Unrecognized operation result status: {0}'
+            raise RuntimeError(msg.format(result_status))
+
+        resp_bi = ResponseBatchItem(operation=operation,
+                                    unique_batch_item_id=ubi_id,
+                                    result_status=result_status,
+                                    result_reason=result_reason,
+                                    result_message=result_message,
+                                    async_correlation_value=asyn_cv,
+                                    response_payload=response_payload,
+                                    message_extension=message_extension)
+        return (resp_bi, failure_occurred)
+
+    def _record_result(self, resp_bi):
+        reason = ''
+        if resp_bi.result_reason is not None:
+            reason = resp_bi.result_reason.enum.name
+        self.metrics.increment('kmip_results_total', (
+            ('operation', resp_bi.operation.enum.name),
+            ('status', resp_bi.result_status.enum.name),
+            ('reason', reason)))
+
     def _process_response(self, message):
         raise NotImplementedError()
 
     def _process_operation(self, operation, payload):
         op = operation.enum
+        entry = self._operations.get(op)
+        if entry is None or payload is None:
+            return self._get_not_supported_result(op)
 
-        if op is Operation.CREATE:
-            return self._process_create_request(payload)
-        elif op is Operation.GET:
-            return self._process_get_request(payload)
-        elif op is Operation.DESTROY:
-            return self._process_destroy_request(payload)
-        elif op is Operation.REGISTER:
-            return self._process_register_request(payload)
-        elif op is Operation.LOCATE:
-            return self._process_locate_request(payload)
-        else:
-            raise NotImplementedError()
+        handler, response_builder = entry
+        written = self._get_written_caches(op, payload)
+        for cache, uuid in written:
+            cache.begin_write(uuid)
+        start = time.time()
+        try:
+            result = handler(payload)
+        except NotImplementedError:
+            return self._get_not_supported_result(op)
+        finally:
+            for cache, uuid in written:
+                cache.end_write(uuid)
+        self._record_operation(op, time.time() - start)
 
-    def _process_create_request(self, payload):
-        object_type = payload.object_type
-        template_attribute = payload.template_attribute
-        result = self._handler.create(object_type, template_attribute)
+        response_payload = None
+        if result.result_status.enum is RS.SUCCESS:
+            response_payload = response_builder(result)
 
-        result_status = result.result_status
-        result_reason = result.result_reason
-        result_message = result.result_message
-        created_type = result.object_type
-        uuid = result.uuid
-        template_attribute = result.template_attribute
+        return (result.result_status, result.result_reason,
+                result.result_message, response_payload)
 
-        resp_pl = CreateResponsePayload(object_type=created_type,
-                                        unique_identifier=uuid,
-                                        template_attribute=template_attribute)
+    def _can_defer(self, operation, payload):
+        return (self._jobs is not None and payload is not None and
+                operation.enum in self.ASYNCHRONOUS_OPERATIONS and
+                operation.enum in self._operations)
 
-        return (result_status, result_reason, result_message, resp_pl)
+    def _defer(self, operation, payload):
+        correlation_value = self._jobs.submit(
+            operation.enum, self._process_operation, operation, payload)
+        if correlation_value is None:
+            self.logger.warning('job queue full, running {0} '
+                                'synchronously'.format(operation.enum))
+            return self._process_operation(operation, payload)
 
-    def _process_get_request(self, payload):
-        uuid = None
-        kft = None
-        kct = None
+        return (ResultStatus(RS.OPERATION_PENDING), None, None,
+                AsynchronousCorrelationValue(correlation_value))
 
-        unique_identifier = payload.unique_identifier
-        key_format_type = payload.key_format_type
-        key_compression_type = payload.key_compression_type
-        key_wrapping_specification = payload.key_wrapping_specification
+    def _poll(self, payload):
+        operation = contents.Operation(Operation.POLL)
+        if payload is None:
+            return operation, self._get_not_supported_result(Operation.POLL)
+
+        correlation_value = payload.asynchronous_correlation_value
+        job = None
+        if correlation_value is not None:
+            job = self._jobs.poll(correlation_value.value)
+        if job is None:
+            return operation, (
+                ResultStatus(RS.OPERATION_FAILED),
+                ResultReason(ResultReasonEnum.ITEM_NOT_FOUND),
+                ResultMessage('no such asynchronous operation'),
+                None)
+
+        operation = contents.Operation(job.operation)
+        if job.state is not COMPLETED:
+            return operation, (ResultStatus(RS.OPERATION_PENDING), None, None,
+                               correlation_value)
+        if job.error is not None:
+            return operation, (
+                ResultStatus(RS.OPERATION_FAILED),
+                ResultReason(ResultReasonEnum.GENERAL_FAILURE),
+                ResultMessage('{0}'.format(job.error)),
+                None)
+        return operation, job.result
+
+    def _get_not_supported_result(self, op):
+        self.logger.debug('operation not supported: {0}'.format(op))
+        return (ResultStatus(RS.OPERATION_FAILED),
+                ResultReason(ResultReasonEnum.OPERATION_NOT_SUPPORTED),
+                ResultMessage('{0} is not supported'.format(op.name)),
+                None)
+
+    def _get_message_label(self, message):
+        # Messages are labelled with the operation of the batch, or MIXED
+        # when the batch holds several operations.
+        operations = set(item.operation.enum.name
+                         for item in message.batch_items)
+        return operations.pop() if len(operations) == 1 else 'MIXED'
+
+    def _record_message(self, message, received, sent, decode_latency,
+                        encode_latency):
+        labels = (('operation', self._get_message_label(message)),)
+
+        self.metrics.increment('kmip_requests_total', labels)
+        self.metrics.increment('kmip_received_bytes_total', amount=received)
+        self.metrics.increment('kmip_sent_bytes_total', amount=sent)
+        self.metrics.observe('kmip_decode_seconds', decode_latency, labels)
+        self.metrics.observe('kmip_encode_seconds', encode_latency, labels)
+
+    def _record_operation(self, op, latency):
+        self.metrics.observe('kmip_handler_seconds', latency,
+                             (('operation', op.name),))
+        with self._statistics_lock:
+            count, total, maximum = self._operation_statistics.get(
+                op, (0, 0.0, 0.0))
+            self._operation_statistics[op] = (
+                count + 1, total + latency, max(maximum, latency))
+
+    def _create(self, payload):
+        return self._handler.create(payload.object_type,
+                                    payload.template_attribute)
+
+    def _build_create_response(self, result):
+        return CreateResponsePayload(
+            object_type=result.object_type,
+            unique_identifier=result.uuid,
+            template_attribute=result.template_attribute)
+
+    def _create_key_pair(self, payload):
+        return self._handler.create_key_pair(
+            payload.common_template_attribute,
+            payload.private_key_template_attribute,
+            payload.public_key_template_attribute)
+
+    def _build_create_key_pair_response(self, result):
+        return CreateKeyPairResponsePayload(
+            private_key_uuid=result.private_key_uuid,
+            public_key_uuid=result.public_key_uuid,
+            private_key_template_attribute=(
+                result.private_key_template_attribute),
+            public_key_template_attribute=(
+                result.public_key_template_attribute))
 
-        if unique_identifier is not None:
-            uuid = unique_identifier
+    def _rekey_key_pair(self, payload):
+        return self._handler.rekey_key_pair(
+            payload.private_key_uuid,
+            payload.offset,
+            payload.common_template_attribute,
+            payload.private_key_template_attribute,
+            payload.public_key_template_attribute)
+
+    def _build_rekey_key_pair_response(self, result):
+        return RekeyKeyPairResponsePayload(
+            private_key_uuid=result.private_key_uuid,
+            public_key_uuid=result.public_key_uuid,
+            private_key_template_attribute=(
+                result.private_key_template_attribute),
+            public_key_template_attribute=(
+                result.public_key_template_attribute))
+
+    def _get(self, payload):
+        key = self._get_request_key(payload)
+        if key is None or (self._get_cache is None and
+                           self._coalescer is None):
+            return self._handler.get(payload.unique_identifier,
+                                     payload.key_format_type,
+                                     payload.key_compression_type,
+                                     payload.key_wrapping_specification)
+
+        generation = None
+        if self._get_cache is not None:
+            encoded, generation = self._get_cache.get(key)
+            if encoded is not None:
+                return EncodedGetResult(ResultStatus(RS.SUCCESS),
+                                        encoded_payload=encoded)
+
+        if self._coalescer is None:
+            return self._load_get_response(payload, key, generation)
+        return self._coalescer.call(key, self._load_get_response, payload,
+                                    key, generation)
+
+    def _load_get_response(self, payload, key, generation):
+        result = self._handler.get(payload.unique_identifier,
+                                   payload.key_format_type,
+                                   payload.key_compression_type,
+                                   payload.key_wrapping_specification)
+        if result.result_status.enum is not RS.SUCCESS:
+            return result
+
+        stream = BytearrayStream()
+        self._build_get_response(result).write(stream)
+        encoded = stream.buffer
+        if self._get_cache is not None:
+            self._get_cache.put(key, encoded, generation)
+
+        return EncodedGetResult(ResultStatus(RS.SUCCESS),
+                                encoded_payload=encoded)
+
+    def _build_get_response(self, result):
+        if isinstance(result, EncodedGetResult):
+            return EncodedPayload(result.encoded_payload)
+        return GetResponsePayload(object_type=result.object_type,
+                                  unique_identifier=result.uuid,
+                                  secret=result.secret)
+
+    def _get_request_key(self, payload):
+        # Gets of wrapped keys are neither cached nor shared
+        if (payload.unique_identifier is None or
+                payload.key_wrapping_specification is not None):
+            return None
+
+        key_format_type = payload.key_format_type
         if key_format_type is not None:
-            kft = key_format_type
+            key_format_type = key_format_type.enum
+        key_compression_type = payload.key_compression_type
         if key_compression_type is not None:
-            kct = key_compression_type
+            key_compression_type = key_compression_type.enum
+        return (payload.unique_identifier.value, key_format_type,
+                key_compression_type)
 
-        result = self._handler.get(uuid, kft, kct,
-                                   key_wrapping_specification)
+    def _get_written_caches(self, op, payload):
+        # Cached and coalesced responses of an object are dropped before it
+        # is written, so a read arriving during the write can neither be
+        # answered from the cache nor join a read that started before it,
+        # and again afterwards, to drop responses read before the write.
+        # Added objects only change the results of searches.
+        if op in self.INVALIDATING_OPERATIONS:
+            caches = (self._get_cache, self._coalescer)
+            uuid = getattr(payload, 'unique_identifier', None)
+            if uuid is not None:
+                uuid = uuid.value
+        elif op in self.CREATING_OPERATIONS:
+            caches = (self._coalescer,)
+            uuid = None
+        else:
+            return []
+        return [(cache, uuid) for cache in caches if cache is not None]
+
+    def _destroy(self, payload):
+        return self._handler.destroy(payload.unique_identifier)
 
-        result_status = result.result_status
-        result_reason = result.result_reason
-        result_message = result.result_message
-        retrieved_type = result.object_type
-        uuid = result.uuid
-        secret = result.secret
+    def _build_destroy_response(self, result):
+        return DestroyResponsePayload(unique_identifier=result.uuid)
 
-        resp_pl = GetResponsePayload(object_type=retrieved_type,
-                                     unique_identifier=uuid,
-                                     secret=secret)
+    def _register(self, payload):
+        return self._handler.register(payload.object_type,
+                                      payload.template_attribute,
+                                      payload.secret)
 
-        return (result_status, result_reason, result_message, resp_pl)
+    def _build_register_response(self, result):
+        return RegisterResponsePayload(
+            unique_identifier=result.uuid,
+            template_attribute=result.template_attribute)
 
-    def _process_destroy_request(self, payload):
-        uuid = payload.unique_identifier
-        result = self._handler.destroy(uuid)
+    def _locate(self, payload):
+        if self._coalescer is None:
+            return self._handler.locate(payload.maximum_items,
+                                        payload.storage_status_mask,
+                                        payload.object_group_member,
+                                        payload.attributes)
 
-        result_status = result.result_status
-        result_reason = result.result_reason
-        result_message = result.result_message
-        uuid = result.uuid
+        # Searches are keyed by their encoded criteria
+        key = (None, bytes(self._encode(payload).buffer))
+        return self._coalescer.call(
+            key, self._handler.locate, payload.maximum_items,
+            payload.storage_status_mask, payload.object_group_member,
+            payload.attributes)
 
-        payload = DestroyResponsePayload(unique_identifier=uuid)
+    def _build_locate_response(self, result):
+        return LocateResponsePayload(unique_identifiers=result.uuids)
 
-        return (result_status, result_reason, result_message, payload)
+    def _activate(self, payload):
+        return self._handler.activate(payload.unique_identifier)
 
-    def _process_register_request(self, payload):
-        object_type = payload.object_type
-        template_attribute = payload.template_attribute
-        secret = payload.secret
-        result = self._handler.register(object_type, template_attribute,
-                                        secret)
+    def _build_activate_response(self, result):
+        return ActivateResponsePayload(unique_identifier=result.uuid)
 
-        result_status = result.result_status
-        result_reason = result.result_reason
-        result_message = result.result_message
-        uuid = result.uuid
-        template_attr = result.template_attribute
+    def _revoke(self, payload):
+        return self._handler.revoke(payload.revocation_reason,
+                                    payload.unique_identifier,
+                                    payload.compromise_date)
 
-        resp_pl = RegisterResponsePayload(unique_identifier=uuid,
-                                          template_attribute=template_attr)
+    def _build_revoke_response(self, result):
+        return RevokeResponsePayload(
+            unique_identifier=result.unique_identifier)
 
-        return (result_status, result_reason, result_message, resp_pl)
+    def _query(self, payload):
+        result = self._handler.query(payload.query_functions)
 
-    def _process_locate_request(self, payload):
-        max_items = payload.maximum_items
-        storage_mask = payload.status_storage_mask
-        objgrp_member = payload.object_group_member
-        attributes = payload.attributes
+        functions = set(function.enum for function in payload.query_functions)
+        if (result.result_status.enum is RS.SUCCESS and
+                QueryFunction.QUERY_OPERATIONS in functions):
+            operations = set(self._operations)
+            if self._jobs is not None:
+                operations.add(Operation.POLL)
+            result.operations = [
+                contents.Operation(op) for op in
+                sorted(operations, key=lambda op: op.value)]
+        return result
 
-        result = self._handler.locate(max_items, storage_mask,
-                                      objgrp_member, attributes)
+    def _build_query_response(self, result):
+        return QueryResponsePayload(
+            operations=result.operations,
+            object_types=result.object_types,
+            vendor_identification=result.vendor_identification,
+            server_information=result.server_information,
+            application_namespaces=result.application_namespaces,
+            extension_information=result.extension_information)
 
-        result_status = result.result_status
-        result_reason = result.result_reason
-        result_message = result.result_message
+    def _discover_versions(self, payload):
+        return self._handler.discover_versions(payload.protocol_versions)
 
-        uuids = result.uuids
+    def _build_discover_versions_response(self, result):
+        return DiscoverVersionsResponsePayload(
+            protocol_versions=result.protocol_versions)
 
-        resp_pl = LocateResponsePayload(unique_identifiers=uuids)
+    def _cancel(self, payload):
+        correlation_value = payload.asynchronous_correlation_value
+        if correlation_value is None:
+            cancellation_result = CancellationResultEnum.UNAVAILABLE
+        else:
+            cancellation_result = self._jobs.cancel(correlation_value.value)
+        return CancelResult(
+            ResultStatus(RS.SUCCESS),
+            asynchronous_correlation_value=correlation_value,
+            cancellation_result=CancellationResult(cancellation_result))
 
-        return (result_status, result_reason, result_message, resp_pl)
+    def _build_cancel_response(self, result):
+        return CancelResponsePayload(
+            asynchronous_correlation_value=(
+                result.asynchronous_correlation_value),
+            cancellation_result=result.cancellation_result)
@@ -0,0 +1,297 @@
+# Copyright (c) 2015 Hewlett Packard Development Company, L.P.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import collections
+import cProfile
+import itertools
+import os
+import pstats
+import sys
+import threading
+
+CPROFILE = 'cprofile'
+STACK = 'stack'
+
+# The active profiler, or None when profiling is disabled. The processor
+# checks this module attribute for every request, so disabled profiling
+# costs a single attribute lookup per message.
+profiler = None
+
+_lock = threading.Lock()
+
+
+class CProfileSampler(object):
+    """
+    Runs one request in sample_rate under cProfile.
+
+    The statistics of the sampled requests are aggregated per label, usually
+    the operation of the request, and dumped as pstats files. Only one
+    request is profiled at a time; a request due for sampling while another
+    one is being profiled is skipped. cProfile only sees the thread it was
+    enabled on, so batch items run in the parallel batch pool are not
+    included.
+    """
+
+    def __init__(self, sample_rate=100):
+        """
+        Construct a CProfileSampler.
+
+        Args:
+            sample_rate (int): Profile one request in sample_rate. Optional,
+                defaults to 100.
+        """
+        if sample_rate < 1:
+            raise ValueError('sample rate must be at least 1')
+
+        self.sample_rate = sample_rate
+        self._requests = itertools.count()
+        self._profiling = threading.Lock()
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def begin(self):
+        """
+        Start profiling the current request if it is sampled.
+
+        Returns:
+            object: The sample to pass to end(), or None if the request is
+                not sampled.
+        """
+        if next(self._requests) % self.sample_rate:
+            return None
+        if not self._profiling.acquire(False):
+            return None
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active in this process.
+            self._profiling.release()
+            return None
+        return profile
+
+    def end(self, sample, label):
+        """
+        Stop profiling a request and add its statistics to those of its
+        label.
+
+        Args:
+            sample (object): The sample returned by begin().
+            label (string): The label the statistics are aggregated under.
+        """
+        sample.disable()
+        self._profiling.release()
+        with self._lock:
+            stats = self._stats.get(label)
+            if stats is None:
+                self._stats[label] = pstats.Stats(sample)
+            else:
+                stats.add(sample)
+
+    def labels(self):
+        with self._lock:
+            return sorted(self._stats)
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+
+    def dump(self, path):
+        """
+        Write the statistics of every label to its own pstats file, named
+        after path and the label (e.g., kmip_profile.GET.pstats).
+
+        Args:
+            path (string): The path prefix of the files to write.
+
+        Returns:
+            int: The number of files written.
+        """
+        with self._lock:
+            for label, stats in self._stats.items():
+                stats.dump_stats('{0}.{1}.pstats'.format(path, label))
+            return len(self._stats)
+
+    def close(self):
+        pass
+
+
+class StackSampler(object):
+    """
+    Samples the stacks of threads processing requests at a fixed interval.
+
+    A background thread looks at the stack of every thread that is
+    processing a sampled request every interval seconds. Stacks are counted
+    per label, usually the operation of the request, and dumped in the
+    collapsed format read by flame graph tools: one line per distinct stack,
+    with the label and the frames from the outermost to the innermost
+    separated by semicolons, followed by the number of samples.
+    """
+
+    def __init__(self, sample_rate=1, interval=0.01):
+        """
+        Construct a StackSampler.
+
+        Args:
+            sample_rate (int): Sample the stacks of one request in
+                sample_rate. Optional, defaults to 1.
+            interval (float): The number of seconds between two samples.
+                Optional, defaults to 0.01.
+        """
+        if sample_rate < 1:
+            raise ValueError('sample rate must be at least 1')
+
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self._requests = itertools.count()
+        self._threads = {}
+        self._stacks = collections.Counter()
+        self._lock = threading.Lock()
+
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run,
+                                        name='KMIPStackSampler')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def begin(self):
+        """
+        Start sampling the stack of the current thread if the request is
+        sampled. Frames of the caller and above are left out of the stacks.
+
+        Returns:
+            object: The sample to pass to end(), or None if the request is
+                not sampled.
+        """
+        if next(self._requests) % self.sample_rate:
+            return None
+
+        # [thread id, caller frame, stacks seen so far]
+        sample = [threading.current_thread().ident, sys._getframe(1), []]
+        with self._lock:
+            self._threads[sample[0]] = sample
+        return sample
+
+    def end(self, sample, label):
+        """
+        Stop sampling the stack of a request and count its stacks under its
+        label.
+
+        Args:
+            sample (object): The sample returned by begin().
+            label (string): The label the stacks are counted under.
+        """
+        with self._lock:
+            self._threads.pop(sample[0], None)
+            for stack in sample[2]:
+                self._stacks[(label,) + stack] += 1
+
+    def labels(self):
+        with self._lock:
+            return sorted(set(stack[0] for stack in self._stacks))
+
+    def clear(self):
+        with self._lock:
+            self._stacks.clear()
+
+    def dump(self, path):
+        """
+        Write the counted stacks in the collapsed stack format to a file
+        named after path (e.g., kmip_profile.folded).
+
+        Args:
+            path (string): The path prefix of the file to write.
+
+        Returns:
+            int: The number of distinct stacks written.
+        """
+        with self._lock:
+            stacks = sorted(self._stacks.items())
+        with open('{0}.folded'.format(path), 'w') as dump_file:
+            for stack, count in stacks:
+                dump_file.write('{0} {1}\n'.format(';'.join(stack), count))
+        return len(stacks)
+
+    def close(self):
+        self._stopped.set()
+
+    def sample(self):
+        """
+        Take one sample of the stacks of the threads processing a sampled
+        request.
+        """
+        frames = sys._current_frames()
+        with self._lock:
+            for ident, sample in self._threads.items():
+                frame = frames.get(ident)
+                if frame is not None:
+                    sample[2].append(self._collapse(frame, sample[1]))
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def _collapse(self, frame, root):
+        names = []
+        while frame is not None and frame is not root:
+            code = frame.f_code
+            names.append('{0}:{1}'.format(
+                os.path.basename(code.co_filename), code.co_name))
+            frame = frame.f_back
+        names.reverse()
+        return tuple(names)
+
+
+def enable(mode=CPROFILE, sample_rate=100, interval=0.01):
+    """
+    Start profiling requests with a new profiler, replacing the active one.
+
+    Args:
+        mode (string): CPROFILE to run sampled requests under cProfile, or
+            STACK to sample the stacks of the threads processing them.
+            Optional, defaults to CPROFILE.
+        sample_rate (int): Profile one request in sample_rate. Optional,
+            defaults to 100.
+        interval (float): The number of seconds between two stack samples
+            in STACK mode. Optional, defaults to 0.01.
+
+    Returns:
+        object: The active profiler.
+    """
+    global profiler
+    if mode == CPROFILE:
+        new_profiler = CProfileSampler(sample_rate)
+    elif mode == STACK:
+        new_profiler = StackSampler(sample_rate, interval)
+    else:
+        raise ValueError('unknown profiling mode: {0}'.format(mode))
+
+    with _lock:
+        old_profiler, profiler = profiler, new_profiler
+    if old_profiler is not None:
+        old_profiler.close()
+    return new_profiler
+
+
+def disable():
+    """
+    Stop profiling requests and discard the active profiler.
+    """
+    global profiler
+    with _lock:
+        old_profiler, profiler = profiler, None
+    if old_profiler is not None:
+        old_profiler.close()
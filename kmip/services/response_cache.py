@@ -0,0 +1,514 @@
+# Copyright (c) 2015 Hewlett Packard Development Company, L.P.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import collections
+import threading
+import time
+
+
+class EncodedPayload(object):
+    """
+    A response payload that has already been encoded.
+
+    It stands in for a payload object in a response batch item, or for a
+    whole batch item in a response message, and writes its bytes as they
+    are.
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    def write(self, ostream):
+        ostream.write(self.data)
+
+
+class EncodedBatchItem(EncodedPayload):
+    """
+    A response batch item that has already been encoded.
+
+    Along with its bytes, it keeps the fields of the batch item that are read
+    while a response is assembled, and the unique identifier the batch item
+    produced, if any, which later batch items may refer to.
+    """
+
+    def __init__(self, data, operation, unique_batch_item_id, result_status,
+                 result_reason=None, id_placeholder=None):
+        super(EncodedBatchItem, self).__init__(data)
+        self.operation = operation
+        self.unique_batch_item_id = unique_batch_item_id
+        self.result_status = result_status
+        self.result_reason = result_reason
+        self.id_placeholder = id_placeholder
+
+
+class ResponseCache(object):
+    """
+    A least-recently-used cache of encoded response payloads.
+
+    Entries are keyed by a tuple whose first element is the unique
+    identifier of the managed object the payload describes, so every entry
+    of an object can be dropped when the object changes. The cache holds at
+    most max_entries entries and max_bytes bytes of payload data.
+
+    Lookups return a generation number along with the cached data. Storing
+    a payload that was built after a lookup only succeeds if no object was
+    invalidated in between, so a response built from an object that has
+    since changed never enters the cache. While an object is being written,
+    between begin_write() and end_write(), no payload of it is stored.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=4194304):
+        """
+        Construct a ResponseCache.
+
+        Args:
+            max_entries (int): The maximum number of cached payloads.
+                Optional, defaults to 1024.
+            max_bytes (int): The maximum total size of the cached payloads.
+                Optional, defaults to 4194304 (4 MiB).
+        """
+        if max_entries < 1:
+            raise ValueError('a response cache must hold at least one entry')
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries = collections.OrderedDict()
+        self._keys = {}
+        self._size = 0
+        self._generation = 0
+        self._writes = {}
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Look up an encoded payload.
+
+        Args:
+            key (tuple): The cache key; its first element is the unique
+                identifier of the object.
+
+        Returns:
+            tuple: The cached bytes, or None on a miss, and the generation
+                number to pass to put().
+        """
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                # Mark the entry as the most recently used
+                del self._entries[key]
+                self._entries[key] = data
+            return data, self._generation
+
+    def put(self, key, data, generation):
+        """
+        Store an encoded payload.
+
+        Args:
+            key (tuple): The cache key; its first element is the unique
+                identifier of the object.
+            data (bytes): The encoded payload.
+            generation (int): The generation number returned by the get()
+                that missed.
+
+        Returns:
+            bool: True if the payload was stored, False otherwise.
+        """
+        if len(data) > self.max_bytes:
+            return False
+
+        with self._lock:
+            if (generation != self._generation or None in self._writes or
+                    key[0] in self._writes):
+                return False
+
+            self._remove(key)
+            self._entries[key] = data
+            self._keys.setdefault(key[0], set()).add(key)
+            self._size += len(data)
+
+            while (len(self._entries) > self.max_entries or
+                   self._size > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+            return True
+
+    def invalidate(self, uuid):
+        """
+        Drop every cached payload of an object.
+
+        Args:
+            uuid (string): The unique identifier of the object.
+        """
+        with self._lock:
+            self._drop(uuid)
+
+    def clear(self):
+        """
+        Drop every cached payload.
+        """
+        with self._lock:
+            self._drop(None)
+
+    def begin_write(self, uuid=None):
+        """
+        Drop every cached payload of an object about to be written, and store
+        none of its payloads until the matching end_write().
+
+        Args:
+            uuid (string): The unique identifier of the object. Optional,
+                defaults to None, in which case every object is written.
+        """
+        with self._lock:
+            self._writes[uuid] = self._writes.get(uuid, 0) + 1
+            self._drop(uuid)
+
+    def end_write(self, uuid=None):
+        """
+        Drop every payload of a written object cached from a read that
+        started before the write, and store its payloads again.
+
+        Args:
+            uuid (string): The unique identifier passed to begin_write().
+                Optional, defaults to None.
+        """
+        with self._lock:
+            remaining = self._writes.pop(uuid) - 1
+            if remaining > 0:
+                self._writes[uuid] = remaining
+            self._drop(uuid)
+
+    def get_statistics(self):
+        """
+        Get the hit and miss counts and the size of the cache.
+
+        Returns:
+            dict: A dictionary with the hits, the misses, the number of
+                cached entries and their total size in bytes.
+
+        Example:
+            >>> cache.get_statistics()
+            {'hits': 900, 'misses': 100, 'entries': 100, 'bytes': 12800}
+        """
+        with self._lock:
+            return {'hits': self._hits, 'misses': self._misses,
+                    'entries': len(self._entries), 'bytes': self._size}
+
+    def _drop(self, uuid):
+        # Called with the lock held
+        self._generation += 1
+        if uuid is None:
+            self._entries.clear()
+            self._keys.clear()
+            self._size = 0
+        else:
+            for key in list(self._keys.get(uuid, ())):
+                self._remove(key)
+
+    def _remove(self, key):
+        # Called with the lock held
+        data = self._entries.pop(key, None)
+        if data is None:
+            return
+        self._size -= len(data)
+        keys = self._keys[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self._keys[key[0]]
+
+
+class IdempotencyCache(object):
+    """
+    A cache of answered batch items, used to answer a retried batch item
+    without running it again.
+
+    Entries expire ttl seconds after they are stored, and the cache holds at
+    most max_entries entries, dropping the oldest first. A batch item is
+    claimed before it runs, so a retry that arrives while the item is still
+    running waits for its response instead of running it a second time.
+    """
+
+    def __init__(self, max_entries=4096, ttl=300, clock=time.time):
+        """
+        Construct an IdempotencyCache.
+
+        Args:
+            max_entries (int): The maximum number of cached batch items.
+                Optional, defaults to 4096.
+            ttl (float): The number of seconds a batch item is kept.
+                Optional, defaults to 300.
+            clock (callable): Returns the current time in seconds. Optional,
+                defaults to time.time.
+        """
+        if max_entries < 1:
+            raise ValueError('an idempotency cache must hold at least one '
+                             'entry')
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._clock = clock
+        self._entries = collections.OrderedDict()
+        self._pending = set()
+        self._hits = 0
+        self._misses = 0
+        self._condition = threading.Condition()
+
+    def claim(self, key):
+        """
+        Look up the response of a batch item, or claim the batch item if it
+        has not been answered.
+
+        Args:
+            key (tuple): The key identifying the batch item.
+
+        Returns:
+            object: The cached response, or None if the batch item is now
+                claimed by the caller, which must run it and then call put()
+                or release() with the same key.
+        """
+        with self._condition:
+            while key in self._pending:
+                self._condition.wait()
+
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._hits += 1
+                return entry[1]
+
+            self._misses += 1
+            self._pending.add(key)
+            return None
+
+    def put(self, key, value):
+        """
+        Store the response of a claimed batch item.
+
+        Args:
+            key (tuple): The key passed to claim().
+            value (object): The response of the batch item.
+        """
+        with self._condition:
+            self._pending.discard(key)
+            self._entries.pop(key, None)
+            self._entries[key] = (self._clock() + self.ttl, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._condition.notify_all()
+
+    def release(self, key):
+        """
+        Give up the claim on a batch item without storing a response, so a
+        retry runs it again.
+
+        Args:
+            key (tuple): The key passed to claim().
+        """
+        with self._condition:
+            self._pending.discard(key)
+            self._condition.notify_all()
+
+    def get_statistics(self):
+        """
+        Get the hit and miss counts and the size of the cache.
+
+        Returns:
+            dict: A dictionary with the hits, the misses and the number of
+                cached entries.
+
+        Example:
+            >>> cache.get_statistics()
+            {'hits': 2, 'misses': 500, 'entries': 480}
+        """
+        with self._condition:
+            self._expire()
+            return {'hits': self._hits, 'misses': self._misses,
+                    'entries': len(self._entries)}
+
+    def _expire(self):
+        # Called with the lock held. Entries are kept in the order they were
+        # stored, which is also the order they expire in.
+        now = self._clock()
+        while self._entries:
+            key, (expiry, _) = next(iter(self._entries.items()))
+            if expiry > now:
+                break
+            del self._entries[key]
+
+
+class _Flight(object):
+    # A call in progress, shared by the callers that asked for it
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RequestCoalescer(object):
+    """
+    Lets concurrent identical read requests share one execution.
+
+    The first caller of a key runs the request; callers with the same key
+    that arrive while it runs wait for it and share its result, or its
+    exception. Keys are tuples whose first element is the unique identifier
+    of the object read, or None for a search that may match any object.
+
+    A write to an object detaches the calls in progress for it and for every
+    search, so callers arriving after the write run the request again
+    instead of sharing a result read before the write. Between begin_write()
+    and end_write(), calls for the object and searches run on their own.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._writes = {}
+        self._executions = 0
+        self._shared = 0
+        self._lock = threading.Lock()
+
+    def call(self, key, function, *args):
+        """
+        Run a request, or wait for an identical request in progress.
+
+        Args:
+            key (tuple): The key identifying the request.
+            function (callable): Called with args to run the request.
+            *args: The arguments of the request.
+
+        Returns:
+            object: The result of the request.
+        """
+        with self._lock:
+            if self._is_written(key[0]):
+                # A result read during a write is not shared, since the
+                # write may land between the read and a later caller.
+                self._executions += 1
+                flight = None
+            else:
+                flight = self._flights.get(key)
+                if flight is None:
+                    flight = _Flight()
+                    self._flights[key] = flight
+                    self._executions += 1
+                    owner = True
+                else:
+                    self._shared += 1
+                    owner = False
+
+        if flight is None:
+            return function(*args)
+
+        if not owner:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = function(*args)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+
+    def invalidate(self, uuid=None):
+        """
+        Detach the calls in progress for an object and for every search.
+
+        Args:
+            uuid (string): The unique identifier of the object written.
+                Optional, defaults to None, in which case only searches are
+                detached, as when an object is added.
+        """
+        with self._lock:
+            self._detach(uuid)
+
+    def clear(self):
+        """
+        Detach every call in progress.
+        """
+        with self._lock:
+            self._flights.clear()
+
+    def begin_write(self, uuid=None):
+        """
+        Detach the calls in progress for an object about to be written and
+        for every search. Until the matching end_write(), calls for them run
+        on their own instead of sharing a result.
+
+        Args:
+            uuid (string): The unique identifier of the object written.
+                Optional, defaults to None, in which case only searches are
+                affected, as when an object is added.
+        """
+        with self._lock:
+            self._writes[uuid] = self._writes.get(uuid, 0) + 1
+            self._detach(uuid)
+
+    def end_write(self, uuid=None):
+        """
+        Detach the calls for a written object and for every search that
+        started before the write ended, and let such calls share results
+        again.
+
+        Args:
+            uuid (string): The unique identifier passed to begin_write().
+                Optional, defaults to None.
+        """
+        with self._lock:
+            remaining = self._writes.pop(uuid) - 1
+            if remaining > 0:
+                self._writes[uuid] = remaining
+            self._detach(uuid)
+
+    def _is_written(self, uuid):
+        # Called with the lock held; any write may change search results
+        if not self._writes:
+            return False
+        return uuid is None or uuid in self._writes
+
+    def _detach(self, uuid):
+        # Called with the lock held
+        for key in list(self._flights):
+            if key[0] is None or key[0] == uuid:
+                del self._flights[key]
+
+    def get_statistics(self):
+        """
+        Get the number of requests run and shared.
+
+        Returns:
+            dict: A dictionary with the number of requests run, the number of
+                requests that shared the result of another, and the number
+                of requests in progress.
+
+        Example:
+            >>> coalescer.get_statistics()
+            {'executions': 10, 'shared': 390, 'in_flight': 1}
+        """
+        with self._lock:
+            return {'executions': self._executions, 'shared': self._shared,
+                    'in_flight': len(self._flights)}
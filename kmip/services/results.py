@@ -158,6 +158,18 @@ class GetResult(OperationResult):
             self.secret = None
 
 
+class EncodedGetResult(OperationResult):
+
+    def __init__(self,
+                 result_status,
+                 result_reason=None,
+                 result_message=None,
+                 encoded_payload=None):
+        super(EncodedGetResult, self).__init__(
+            result_status, result_reason, result_message)
+        self.encoded_payload = encoded_payload
+
+
 class DestroyResult(OperationResult):
 
     def __init__(self,
@@ -261,3 +273,17 @@ class RevokeResult(OperationResult):
         super(RevokeResult, self).__init__(
             result_status, result_reason, result_message)
         self.unique_identifier = unique_identifier
+
+
+class CancelResult(OperationResult):
+
+    def __init__(self,
+                 result_status,
+                 result_reason=None,
+                 result_message=None,
+                 asynchronous_correlation_value=None,
+                 cancellation_result=None):
+        super(CancelResult, self).__init__(
+            result_status, result_reason, result_message)
+        self.asynchronous_correlation_value = asynchronous_correlation_value
+        self.cancellation_result = cancellation_result
@@ -0,0 +1,236 @@
+# Copyright (c) 2015 Hewlett Packard Development Company, L.P.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import collections
+import heapq
+import itertools
+import threading
+import time
+
+
+class TokenBucket(object):
+    """
+    A token bucket refilled at a constant rate.
+
+    The bucket holds at most burst tokens and starts full. Taking more
+    tokens than the bucket can hold succeeds once it is full and empties it,
+    so a request costing more than the burst is slowed down rather than
+    refused forever.
+    """
+
+    def __init__(self, rate, burst, clock=time.time):
+        """
+        Construct a TokenBucket.
+
+        Args:
+            rate (float): The number of tokens added per second.
+            burst (float): The maximum number of tokens in the bucket.
+            clock (callable): Returns the current time in seconds.
+                Optional, defaults to time.time.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self._clock = clock
+        self._updated = clock()
+
+    def consume(self, tokens):
+        """
+        Take tokens from the bucket if it holds enough of them.
+
+        Args:
+            tokens (float): The number of tokens to take.
+
+        Returns:
+            bool: True if the tokens were taken, False otherwise.
+        """
+        now = self._clock()
+        self.tokens = min(
+            self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+        tokens = min(tokens, self.burst)
+        if tokens > self.tokens:
+            return False
+        self.tokens -= tokens
+        return True
+
+
+class RateLimiter(object):
+    """
+    Token bucket rate limits kept per client.
+
+    Buckets of the max_clients most recently seen clients are kept; a client
+    whose bucket was dropped starts again with a full bucket.
+    """
+
+    def __init__(self, rate, burst, max_clients=4096, clock=time.time):
+        """
+        Construct a RateLimiter.
+
+        Args:
+            rate (float): The cost each client may spend per second.
+            burst (float): The cost each client may spend at once.
+            max_clients (int): The number of client buckets kept. Optional,
+                defaults to 4096.
+            clock (callable): Returns the current time in seconds.
+                Optional, defaults to time.time.
+        """
+        if rate <= 0 or burst <= 0:
+            raise ValueError('rate and burst must be positive')
+
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._clock = clock
+
+        self._buckets = collections.OrderedDict()
+        self._allowed = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, client, cost=1):
+        """
+        Charge a request to the bucket of a client.
+
+        Args:
+            client (string): The client identity; None for clients without
+                one, which share a bucket.
+            cost (float): The cost of the request. Optional, defaults to 1.
+
+        Returns:
+            bool: True if the request is within the client's rate limit,
+                False if it must be rejected.
+        """
+        with self._lock:
+            bucket = self._buckets.pop(client, None)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst, self._clock)
+                if len(self._buckets) >= self.max_clients:
+                    self._buckets.popitem(last=False)
+            self._buckets[client] = bucket
+
+            if bucket.consume(cost):
+                self._allowed += 1
+                return True
+            self._rejected += 1
+            return False
+
+    def get_statistics(self):
+        """
+        Get the number of allowed and rejected requests.
+
+        Returns:
+            dict: The allowed and rejected requests and the number of
+                clients with a bucket.
+        """
+        with self._lock:
+            return {'allowed': self._allowed,
+                    'rejected': self._rejected,
+                    'clients': len(self._buckets)}
+
+
+class FairQueue(object):
+    """
+    A weighted fair queue limiting how many requests run at once.
+
+    At most slots requests hold a slot at the same time. When every slot is
+    taken, waiting requests are granted in the order of their virtual finish
+    time: the later of the queue's virtual time and the client's previous
+    finish time, plus the cost of the request. A client sending many or
+    costly requests therefore waits behind clients sending few or cheap
+    ones, instead of holding every slot in turn.
+    """
+
+    def __init__(self, slots, max_clients=1024):
+        """
+        Construct a FairQueue.
+
+        Args:
+            slots (int): The number of requests that may run at once.
+            max_clients (int): The number of client finish times kept before
+                those of idle clients are dropped. Optional, defaults to 1024.
+        """
+        if slots < 1:
+            raise ValueError('a fair queue needs at least one slot')
+
+        self.slots = slots
+        self.max_clients = max_clients
+
+        self._running = 0
+        self._waiting = []
+        self._finish_times = {}
+        self._virtual_time = 0.0
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    def acquire(self, client, cost=1):
+        """
+        Wait for a slot.
+
+        Args:
+            client (string): The client identity; None for clients without
+                one, which are scheduled as a single client.
+            cost (float): The cost of the request. Optional, defaults to 1.
+        """
+        with self._condition:
+            start = max(self._virtual_time,
+                        self._finish_times.get(client, 0.0))
+            finish = start + cost
+            self._finish_times[client] = finish
+
+            if self._running < self.slots:
+                self._running += 1
+                self._virtual_time = start
+                return
+
+            # [start, granted]; release() hands its slot over directly.
+            entry = [start, False]
+            heapq.heappush(self._waiting,
+                           (finish, next(self._sequence), entry))
+            while not entry[1]:
+                self._condition.wait()
+
+    def release(self):
+        """
+        Give up a slot taken with acquire().
+        """
+        with self._condition:
+            if not self._waiting:
+                self._running -= 1
+                return
+
+            entry = heapq.heappop(self._waiting)[2]
+            entry[1] = True
+            self._virtual_time = max(self._virtual_time, entry[0])
+            self._condition.notify_all()
+
+            # A client whose finish time has been passed is scheduled the
+            # same way as a client never seen before.
+            if len(self._finish_times) > self.max_clients:
+                for client, finish in list(self._finish_times.items()):
+                    if finish <= self._virtual_time:
+                        del self._finish_times[client]
+
+    def get_statistics(self):
+        """
+        Get the number of running and waiting requests.
+
+        Returns:
+            dict: The requests holding a slot and those waiting for one.
+        """
+        with self._condition:
+            return {'running': self._running,
+                    'waiting': len(self._waiting)}
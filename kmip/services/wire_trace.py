@@ -0,0 +1,132 @@
+# Copyright (c) 2014 The Johns Hopkins University/Applied Physics Laboratory
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import binascii
+import collections
+import datetime
+import itertools
+import threading
+import time
+
+SEND = 'send'
+RECV = 'recv'
+
+# The active trace, or None when tracing is disabled. Protocols check this
+# module attribute before recording, so a disabled trace costs a single
+# attribute lookup per message.
+tracer = None
+
+_connection_ids = itertools.count(1)
+_lock = threading.Lock()
+
+
+class WireTrace(object):
+    """
+    A bounded, in-memory capture of raw KMIP frames.
+
+    Frames are stored as raw bytes together with a timestamp, the id of the
+    connection they were seen on and their direction. Once the capacity is
+    reached the oldest frames are discarded. Frames are only hex-encoded when
+    the trace is dumped.
+    """
+
+    def __init__(self, capacity=1024):
+        """
+        Construct a WireTrace.
+
+        Args:
+            capacity (int): The maximum number of frames kept. Optional,
+                defaults to 1024.
+        """
+        if capacity < 1:
+            raise ValueError('wire trace capacity must be at least 1')
+
+        self.capacity = capacity
+        self._frames = collections.deque(maxlen=capacity)
+
+    def record(self, connection_id, direction, data):
+        """
+        Record one raw frame.
+
+        Args:
+            connection_id (int): The id of the connection the frame was seen
+                on.
+            direction (string): SEND or RECV.
+            data (bytes): The raw frame.
+        """
+        # deque.append is atomic, so no lock is needed on the hot path
+        self._frames.append((time.time(), connection_id, direction, data))
+
+    def frames(self):
+        """
+        Get a snapshot of the recorded frames.
+
+        Returns:
+            list: (timestamp, connection id, direction, data) tuples, oldest
+                first.
+        """
+        return list(self._frames)
+
+    def clear(self):
+        self._frames.clear()
+
+    def dump(self, path):
+        """
+        Write the recorded frames to a file, one frame per line.
+
+        Args:
+            path (string): The path of the file to write.
+
+        Returns:
+            int: The number of frames written.
+        """
+        frames = self.frames()
+        with open(path, 'w') as dump_file:
+            for timestamp, connection_id, direction, data in frames:
+                stamp = datetime.datetime.utcfromtimestamp(timestamp)
+                dump_file.write('{0} {1} {2} {3}\n'.format(
+                    stamp.isoformat(), connection_id, direction,
+                    binascii.hexlify(data).decode('ascii')))
+        return len(frames)
+
+
+def enable(capacity=1024):
+    """
+    Start capturing frames into a new ring buffer.
+
+    Args:
+        capacity (int): The maximum number of frames kept. Optional, defaults
+            to 1024.
+
+    Returns:
+        WireTrace: The active trace.
+    """
+    global tracer
+    with _lock:
+        tracer = WireTrace(capacity)
+    return tracer
+
+
+def disable():
+    """
+    Stop capturing frames and discard the active trace.
+    """
+    global tracer
+    with _lock:
+        tracer = None
+
+
+def next_connection_id():
+    return next(_connection_ids)
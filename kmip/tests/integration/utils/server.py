@@ -16,24 +16,59 @@
 import logging
 import optparse
 import os
+import signal
 import sys
 
 from kmip.core.config_helper import ConfigHelper
 
 from kmip.services.kmip_server import KMIPServer
+from kmip.services.kmip_server import KMIPServerSupervisor
 
 FILE_PATH = os.path.dirname(os.path.abspath(__file__))
 
 
 def run_server(host, port, certfile, keyfile, cert_reqs, ssl_version,
-               ca_certs, do_handshake_on_connect, suppress_ragged_eofs):
+               ca_certs, do_handshake_on_connect, suppress_ragged_eofs,
+               processes=1, database_path=None, use_asyncio=False,
+               listen_fd=None):
     logger = logging.getLogger(__name__)
 
-    server = KMIPServer(host=host, port=port, keyfile=keyfile,
-                        certfile=certfile, cert_reqs=cert_reqs,
-                        ssl_version=ssl_version, ca_certs=ca_certs,
-                        do_handshake_on_connect=do_handshake_on_connect,
-                        suppress_ragged_eofs=suppress_ragged_eofs)
+    if processes > 1:
+        if database_path is None:
+            raise ValueError('running more than one server process requires '
+                             'a shared database (--database_path)')
+
+        def build_server():
+            server = KMIPServer(
+                host=host, port=port, keyfile=keyfile, certfile=certfile,
+                cert_reqs=cert_reqs, ssl_version=ssl_version,
+                ca_certs=ca_certs,
+                do_handshake_on_connect=do_handshake_on_connect,
+                suppress_ragged_eofs=suppress_ragged_eofs,
+                reuse_port='True', database_path=database_path)
+            _register_signals(server)
+            return server
+
+        supervisor = KMIPServerSupervisor(build_server, processes)
+
+        logger.info('Starting {0} KMIP server processes'.format(processes))
+        supervisor.serve()
+        logger.info('Shutting down KMIP server processes')
+        return
+
+    server_class = KMIPServer
+    if use_asyncio:
+        from kmip.services.kmip_async_server import KMIPAsyncServer
+        server_class = KMIPAsyncServer
+
+    server = server_class(host=host, port=port, keyfile=keyfile,
+                          certfile=certfile, cert_reqs=cert_reqs,
+                          ssl_version=ssl_version, ca_certs=ca_certs,
+                          do_handshake_on_connect=do_handshake_on_connect,
+                          suppress_ragged_eofs=suppress_ragged_eofs,
+                          database_path=database_path, listen_fd=listen_fd)
+    _register_signals(server)
+    signal.signal(signal.SIGTERM, server.request_drain)
 
     logger.info('Starting the KMIP server')
 
@@ -49,6 +84,13 @@ def run_server(host, port, certfile, keyfile, cert_reqs, ssl_version,
     logger.info('Shutting down KMIP server')
 
 
+def _register_signals(server):
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, server.reload_config)
+    if hasattr(signal, 'SIGUSR2'):
+        signal.signal(signal.SIGUSR2, server.dump_wire_trace)
+
+
 def build_cli_parser():
     parser = optparse.OptionParser(usage="%prog [options]",
                                    description="Run KMIP Server")
@@ -76,6 +118,21 @@ def build_cli_parser():
                       default="True", dest="do_handshake_on_connect")
     parser.add_option("-e", "--suppress_ragged_eofs", action="store",
                       default="True", dest="suppress_ragged_eofs")
+    parser.add_option("-w", "--processes", action="store", type="int",
+                      default=1, dest="processes",
+                      help="Number of server processes sharing the port")
+    parser.add_option("-b", "--database_path", action="store",
+                      default=None, dest="database_path",
+                      help="SQLite database file storing managed objects; "
+                      "required when running more than one process")
+    parser.add_option("-y", "--asyncio", action="store_true",
+                      default=False, dest="use_asyncio",
+                      help="Serve connections from an asyncio event loop "
+                      "(Python 3.5+)")
+    parser.add_option("-l", "--listen_fd", action="store", type="int",
+                      default=None, dest="listen_fd",
+                      help="Inherited listening socket descriptor to serve "
+                      "on instead of binding the port")
 
     return parser
 
@@ -92,4 +149,8 @@ if __name__ == '__main__':
                ssl_version=opts.ssl_version,
                ca_certs=opts.ca_certs,
                do_handshake_on_connect=opts.do_handshake_on_connect,
-               suppress_ragged_eofs=opts.suppress_ragged_eofs)
+               suppress_ragged_eofs=opts.suppress_ragged_eofs,
+               processes=opts.processes,
+               database_path=opts.database_path,
+               use_asyncio=opts.use_asyncio,
+               listen_fd=opts.listen_fd)
@@ -82,6 +82,17 @@ class TestActivateRequestPayload(TestCase):
             expected, observed)
         self.assertEqual(expected, observed, msg)
 
+    def test_read_without_uuid(self):
+        """
+        Test that a ActivateRequestPayload object without a UUID, which refers
+        to the ID placeholder, can be read from a data stream.
+        """
+        payload = activate.ActivateRequestPayload()
+        payload.read(utils.BytearrayStream(
+            b'\x42\x00\x79\x01\x00\x00\x00\x00'))
+
+        self.assertIsNone(payload.unique_identifier)
+
     def test_write_with_known_uuid(self):
         """
         Test that a ActivateRequestPayload object with a known UUID can be
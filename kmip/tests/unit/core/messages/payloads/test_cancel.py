@@ -0,0 +1,145 @@
+# Copyright (c) 2015 Hewlett Packard Development Company, L.P.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from testtools import TestCase
+
+from kmip.core import utils
+
+from kmip.core.enums import CancellationResult as CancellationResultEnum
+
+from kmip.core.messages.contents import AsynchronousCorrelationValue
+from kmip.core.messages.payloads import cancel
+
+from kmip.core.misc import CancellationResult
+
+
+class TestCancelRequestPayload(TestCase):
+    """
+    Test suite for the CancelRequestPayload class.
+    """
+
+    def setUp(self):
+        super(TestCancelRequestPayload, self).setUp()
+
+        self.correlation_value = AsynchronousCorrelationValue(
+            b'\x01\x02\x03\x04\x05\x06\x07\x08')
+
+        self.encoding = utils.BytearrayStream((
+            b'\x42\x00\x79\x01\x00\x00\x00\x10\x42\x00\x06\x08\x00\x00\x00\x08'
+            b'\x01\x02\x03\x04\x05\x06\x07\x08'))
+
+    def tearDown(self):
+        super(TestCancelRequestPayload, self).tearDown()
+
+    def test_init_with_none(self):
+        """
+        Test that a CancelRequestPayload object can be constructed with no
+        specified value.
+        """
+        cancel.CancelRequestPayload()
+
+    def test_validate_with_bad_correlation_value_type(self):
+        """
+        Test that a TypeError exception is raised when an invalid correlation
+        value type is used to construct a CancelRequestPayload object.
+        """
+        self.assertRaisesRegexp(
+            TypeError, "invalid asynchronous correlation value",
+            cancel.CancelRequestPayload, b'\x01')
+
+    def test_read(self):
+        """
+        Test that a CancelRequestPayload object can be read from a data
+        stream.
+        """
+        payload = cancel.CancelRequestPayload()
+        payload.read(self.encoding)
+
+        self.assertEqual(self.correlation_value,
+                         payload.asynchronous_correlation_value)
+
+    def test_write(self):
+        """
+        Test that a CancelRequestPayload object can be written to a data
+        stream.
+        """
+        payload = cancel.CancelRequestPayload(self.correlation_value)
+        stream = utils.BytearrayStream()
+        payload.write(stream)
+
+        self.assertEqual(self.encoding.buffer, stream.buffer)
+
+
+class TestCancelResponsePayload(TestCase):
+    """
+    Test suite for the CancelResponsePayload class.
+    """
+
+    def setUp(self):
+        super(TestCancelResponsePayload, self).setUp()
+
+        self.correlation_value = AsynchronousCorrelationValue(
+            b'\x01\x02\x03\x04\x05\x06\x07\x08')
+        self.cancellation_result = CancellationResult(
+            CancellationResultEnum.CANCELED)
+
+        self.encoding = utils.BytearrayStream((
+            b'\x42\x00\x7C\x01\x00\x00\x00\x20\x42\x00\x06\x08\x00\x00\x00\x08'
+            b'\x01\x02\x03\x04\x05\x06\x07\x08\x42\x00\x12\x05\x00\x00\x00\x04'
+            b'\x00\x00\x00\x01\x00\x00\x00\x00'))
+
+    def tearDown(self):
+        super(TestCancelResponsePayload, self).tearDown()
+
+    def test_init_with_none(self):
+        """
+        Test that a CancelResponsePayload object can be constructed with no
+        specified value.
+        """
+        cancel.CancelResponsePayload()
+
+    def test_validate_with_bad_cancellation_result_type(self):
+        """
+        Test that a TypeError exception is raised when an invalid cancellation
+        result type is used to construct a CancelResponsePayload object.
+        """
+        self.assertRaisesRegexp(
+            TypeError, "invalid cancellation result",
+            cancel.CancelResponsePayload, self.correlation_value, 'invalid')
+
+    def test_read(self):
+        """
+        Test that a CancelResponsePayload object can be read from a data
+        stream.
+        """
+        payload = cancel.CancelResponsePayload()
+        payload.read(self.encoding)
+
+        self.assertEqual(self.correlation_value,
+                         payload.asynchronous_correlation_value)
+        self.assertEqual(self.cancellation_result,
+                         payload.cancellation_result)
+
+    def test_write(self):
+        """
+        Test that a CancelResponsePayload object can be written to a data
+        stream.
+        """
+        payload = cancel.CancelResponsePayload(self.correlation_value,
+                                               self.cancellation_result)
+        stream = utils.BytearrayStream()
+        payload.write(stream)
+
+        self.assertEqual(self.encoding.buffer, stream.buffer)
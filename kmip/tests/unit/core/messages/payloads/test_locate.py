@@ -12,3 +12,42 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+
+from testtools import TestCase
+
+from kmip.core import enums
+from kmip.core import utils
+
+from kmip.core.messages.payloads import locate
+
+
+class TestLocateRequestPayload(TestCase):
+    """
+    Test suite for the LocateRequestPayload class.
+    """
+
+    def setUp(self):
+        super(TestLocateRequestPayload, self).setUp()
+
+    def tearDown(self):
+        super(TestLocateRequestPayload, self).tearDown()
+
+    def test_read_and_write(self):
+        """
+        Test that a LocateRequestPayload object written to a data stream
+        reads back with the same values.
+        """
+        stream = utils.BytearrayStream()
+        locate.LocateRequestPayload(
+            maximum_items=locate.LocateRequestPayload.MaximumItems(1),
+            storage_status_mask=locate.LocateRequestPayload.StorageStatusMask(
+                enums.StorageStatusMask.ONLINE_STORAGE)).write(stream)
+
+        payload = locate.LocateRequestPayload()
+        payload.read(stream)
+
+        self.assertEqual(1, payload.maximum_items.value)
+        self.assertEqual(enums.StorageStatusMask.ONLINE_STORAGE,
+                         payload.storage_status_mask.enum)
+        self.assertIsNone(payload.object_group_member)
+        self.assertEqual([], payload.attributes)
@@ -0,0 +1,85 @@
+# Copyright (c) 2015 Hewlett Packard Development Company, L.P.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from testtools import TestCase
+
+from kmip.core import utils
+
+from kmip.core.messages.contents import AsynchronousCorrelationValue
+from kmip.core.messages.payloads import poll
+
+
+class TestPollRequestPayload(TestCase):
+    """
+    Test suite for the PollRequestPayload class.
+    """
+
+    def setUp(self):
+        super(TestPollRequestPayload, self).setUp()
+
+        self.correlation_value = AsynchronousCorrelationValue(
+            b'\x01\x02\x03\x04\x05\x06\x07\x08')
+
+        self.encoding = utils.BytearrayStream((
+            b'\x42\x00\x79\x01\x00\x00\x00\x10\x42\x00\x06\x08\x00\x00\x00\x08'
+            b'\x01\x02\x03\x04\x05\x06\x07\x08'))
+
+    def tearDown(self):
+        super(TestPollRequestPayload, self).tearDown()
+
+    def test_init_with_none(self):
+        """
+        Test that a PollRequestPayload object can be constructed with no
+        specified value.
+        """
+        poll.PollRequestPayload()
+
+    def test_init_with_args(self):
+        """
+        Test that a PollRequestPayload object can be constructed with valid
+        values.
+        """
+        poll.PollRequestPayload(
+            asynchronous_correlation_value=self.correlation_value)
+
+    def test_validate_with_bad_correlation_value_type(self):
+        """
+        Test that a TypeError exception is raised when an invalid correlation
+        value type is used to construct a PollRequestPayload object.
+        """
+        self.assertRaisesRegexp(
+            TypeError, "invalid asynchronous correlation value",
+            poll.PollRequestPayload, b'\x01')
+
+    def test_read(self):
+        """
+        Test that a PollRequestPayload object can be read from a data stream.
+        """
+        payload = poll.PollRequestPayload()
+        payload.read(self.encoding)
+
+        self.assertEqual(self.correlation_value,
+                         payload.asynchronous_correlation_value)
+
+    def test_write(self):
+        """
+        Test that a PollRequestPayload object can be written to a data
+        stream.
+        """
+        payload = poll.PollRequestPayload(self.correlation_value)
+        stream = utils.BytearrayStream()
+        payload.write(stream)
+
+        self.assertEqual(self.encoding.buffer, stream.buffer)
@@ -107,6 +107,22 @@ class TestRevokeRequestPayload(TestCase):
             expected, observed)
         self.assertEqual(expected, observed, msg)
 
+    def test_read_without_uuid(self):
+        """
+        Test that a RevokeRequestPayload object without a UUID, which refers
+        to the ID placeholder, can be read from a data stream.
+        """
+        payload = revoke.RevokeRequestPayload()
+        payload.read(utils.BytearrayStream((
+            b'\x42\x00\x79\x01\x00\x00\x00\x28\x42\x00\x81\x01\x00\x00\x00\x10'
+            b'\x42\x00\x82\x05\x00\x00\x00\x04\x00\x00\x00\x02\x00\x00\x00\x00'
+            b'\x42\x00\x21\x09\x00\x00\x00\x08\x00\x00\x00\x00\x00\x00\x00\x06'
+            )))
+
+        self.assertIsNone(payload.unique_identifier)
+        self.assertEqual(enums.RevocationReasonCode.KEY_COMPROMISE,
+                         payload.revocation_reason.revocation_code.enum)
+
     def test_write_with_known_uuid(self):
         """
         Test that a RevokeRequestPayload object with a known UUID can be
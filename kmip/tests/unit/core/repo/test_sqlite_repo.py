@@ -0,0 +1,132 @@
+# Copyright (c) 2014 The Johns Hopkins University/Applied Physics Laboratory
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from testtools import TestCase
+
+from kmip.core.attributes import CryptographicAlgorithm
+from kmip.core.enums import AttributeType
+from kmip.core.enums import CryptographicAlgorithm as CryptoAlgorithmEnum
+from kmip.core.factories.attributes import AttributeFactory
+from kmip.core.messages.payloads.locate import LocateRequestPayload
+from kmip.core.repo.sqlite_repo import SQLiteRepo
+from kmip.core.server import KMIPImpl
+from kmip.core.utils import BytearrayStream
+
+
+class TestSQLiteRepo(TestCase):
+
+    def setUp(self):
+        super(TestSQLiteRepo, self).setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'kmip.db')
+        self.repo = SQLiteRepo(self.path)
+
+        self.key = KMIPImpl()._gen_symmetric_key(
+            128, CryptographicAlgorithm(CryptoAlgorithmEnum.AES))
+        self.attributes = [AttributeFactory().create_attribute(
+            AttributeType.CRYPTOGRAPHIC_ALGORITHM, CryptoAlgorithmEnum.AES)]
+
+    def tearDown(self):
+        super(TestSQLiteRepo, self).tearDown()
+
+    def _encode(self, value):
+        stream = BytearrayStream()
+        value.write(stream)
+        return stream.buffer
+
+    def _assert_stored(self, uuid, key, attributes):
+        stored_key, stored_attributes = self.repo.get(uuid)
+        self.assertEqual(self._encode(key), self._encode(stored_key))
+        self.assertEqual([self._encode(a) for a in attributes],
+                         [self._encode(a) for a in stored_attributes])
+
+    def test_save_and_get(self):
+        uuid = self.repo.save(self.key, self.attributes)
+
+        self._assert_stored(uuid, self.key, self.attributes)
+
+    def test_get_from_another_instance(self):
+        uuid = self.repo.save(self.key, self.attributes)
+        self.repo = SQLiteRepo(self.path)
+
+        self._assert_stored(uuid, self.key, self.attributes)
+
+    def test_get_missing(self):
+        self.assertEqual((None, None), self.repo.get('1'))
+        self.assertEqual((None, None), self.repo.get('invalid'))
+
+    def test_update(self):
+        uuid = self.repo.save(self.key, self.attributes)
+        key = KMIPImpl()._gen_symmetric_key(
+            256, CryptographicAlgorithm(CryptoAlgorithmEnum.AES))
+
+        self.assertTrue(self.repo.update(uuid, key, []))
+        self._assert_stored(uuid, key, [])
+
+    def test_update_missing(self):
+        self.assertFalse(self.repo.update('1', self.key, self.attributes))
+        self.assertEqual((None, None), self.repo.get('1'))
+
+    def test_transaction(self):
+        uuid = self.repo.save(self.key, self.attributes)
+        other = SQLiteRepo(self.path, timeout=0.1)
+
+        with self.repo.transaction():
+            self.repo.update(uuid, self.key, [])
+            self.assertRaises(sqlite3.OperationalError, other.delete, uuid)
+
+        self._assert_stored(uuid, self.key, [])
+
+    def test_transaction_rolls_back(self):
+        uuid = self.repo.save(self.key, self.attributes)
+
+        def update_and_fail():
+            with self.repo.transaction():
+                self.repo.update(uuid, self.key, [])
+                raise ValueError()
+
+        self.assertRaises(ValueError, update_and_fail)
+        self._assert_stored(uuid, self.key, self.attributes)
+
+    def test_delete(self):
+        uuid = self.repo.save(self.key, self.attributes)
+
+        self.assertTrue(self.repo.delete(uuid))
+        self.assertEqual((None, None), self.repo.get(uuid))
+        self.assertFalse(self.repo.delete(uuid))
+
+    def test_locate(self):
+        other = [AttributeFactory().create_attribute(
+            AttributeType.CRYPTOGRAPHIC_LENGTH, 128)]
+        first = self.repo.save(self.key, self.attributes)
+        self.repo.save(self.key, other)
+        third = self.repo.save(self.key, self.attributes + other)
+
+        self.assertEqual([first, third],
+                         self.repo.locate(None, None, None, self.attributes))
+        self.assertEqual([first],
+                         self.repo.locate(LocateRequestPayload.MaximumItems(1),
+                                          None, None, self.attributes))
+
+    def test_kmip_impl_with_repo(self):
+        impl = KMIPImpl(repo=self.repo)
+
+        self.assertEqual(self.repo, impl.repo)
@@ -0,0 +1,105 @@
+# Copyright (c) 2015 Hewlett Packard Development Company, L.P.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import mock
+
+from testtools import TestCase
+
+from kmip.core.enums import CryptographicAlgorithm
+from kmip.core import key_pair_generator
+from kmip.core.key_pair_generator import KeyPairGenerator
+
+
+def generate(algorithm, length):
+    # Defined at module level so it can be sent to worker processes
+    return (b'public', '{0}-{1}'.format(algorithm.name, length).encode())
+
+
+class TestKeyPairGenerator(TestCase):
+
+    def setUp(self):
+        super(TestKeyPairGenerator, self).setUp()
+
+    def tearDown(self):
+        super(TestKeyPairGenerator, self).tearDown()
+
+    def test_generate_on_calling_thread(self):
+        generator = KeyPairGenerator(workers=0, function=generate)
+
+        key_pair = generator.generate(CryptographicAlgorithm.RSA, 2048)
+
+        self.assertEqual((b'public', b'RSA-2048'), key_pair)
+        self.assertIsNone(generator._executor)
+
+    def test_generate_in_worker_process(self):
+        generator = KeyPairGenerator(workers=1, function=generate)
+        self.addCleanup(generator.close)
+
+        key_pair = generator.generate(CryptographicAlgorithm.RSA, 1024)
+
+        self.assertEqual((b'public', b'RSA-1024'), key_pair)
+        self.assertIsNotNone(generator._executor)
+
+    def test_generate_from_pool(self):
+        generator = KeyPairGenerator(workers=0, pool_size=2,
+                                     low_water_mark=1, function=generate)
+        self.addCleanup(generator.close)
+
+        key_pair = generator.generate(CryptographicAlgorithm.RSA, 2048)
+
+        self.assertEqual((b'public', b'RSA-2048'), key_pair)
+        self.assertEqual(1, generator.pool.get_statistics()['misses'])
+
+    def test_broken_worker_pool_is_replaced(self):
+        generator = KeyPairGenerator(workers=1, function=generate)
+        executor = mock.MagicMock()
+        executor.submit.return_value.result.side_effect = \
+            key_pair_generator.BrokenProcessPool()
+        generator._executor = executor
+
+        self.assertRaises(key_pair_generator.BrokenProcessPool,
+                          generator.generate, CryptographicAlgorithm.RSA,
+                          2048)
+        self.assertIsNone(generator._executor)
+
+    def test_close(self):
+        generator = KeyPairGenerator(workers=1, pool_size=2,
+                                     function=generate)
+        executor = mock.MagicMock()
+        generator._executor = executor
+
+        generator.close()
+
+        executor.shutdown.assert_called_once_with(wait=False)
+        self.assertIsNone(generator._executor)
+
+    @mock.patch('kmip.core.key_pair_generator.rsa', None)
+    def test_init_without_backend(self):
+        generator = KeyPairGenerator(pool_size=4)
+
+        self.assertFalse(generator.available)
+        self.assertIsNone(generator.pool)
+
+    @mock.patch('kmip.core.key_pair_generator.rsa', None)
+    def test_generate_key_pair_without_backend(self):
+        self.assertRaises(NotImplementedError,
+                          key_pair_generator.generate_key_pair,
+                          CryptographicAlgorithm.RSA, 2048)
+
+    @mock.patch('kmip.core.key_pair_generator.rsa')
+    def test_generate_key_pair_unsupported_algorithm(self, rsa):
+        self.assertRaises(ValueError, key_pair_generator.generate_key_pair,
+                          CryptographicAlgorithm.AES, 256)
+        self.assertFalse(rsa.generate_private_key.called)
@@ -0,0 +1,129 @@
+# Copyright (c) 2015 Hewlett Packard Development Company, L.P.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import threading
+
+from testtools import TestCase
+
+from kmip.core.enums import CryptographicAlgorithm
+from kmip.core.key_pool import KeyPool
+
+
+class TestKeyPool(TestCase):
+
+    def setUp(self):
+        super(TestKeyPool, self).setUp()
+        self.generated = []
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        super(TestKeyPool, self).tearDown()
+
+    def _generate(self, algorithm, length):
+        with self.lock:
+            key = (algorithm, length, len(self.generated))
+            self.generated.append(key)
+            return key
+
+    def _build_pool(self, **kwargs):
+        pool = KeyPool(self._generate, **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def _wait_for(self, pool, pooled):
+        for _ in range(500):
+            if pool.get_statistics()['pooled'] >= pooled:
+                return
+            threading.Event().wait(0.01)
+        self.fail('pool was not refilled')
+
+    def test_init_invalid_size(self):
+        self.assertRaises(ValueError, KeyPool, self._generate, 0)
+
+    def test_init_invalid_low_water_mark(self):
+        self.assertRaises(ValueError, KeyPool, self._generate, 4, 5)
+
+    def test_get_generates_inline_when_empty(self):
+        pool = self._build_pool(size=4, low_water_mark=2)
+
+        key = pool.get(CryptographicAlgorithm.AES, 128)
+
+        self.assertEqual((CryptographicAlgorithm.AES, 128), key[:2])
+        self.assertEqual(1, pool.get_statistics()['misses'])
+
+    def test_warm_fills_pool(self):
+        pool = self._build_pool(size=4, low_water_mark=2)
+
+        pool.warm(CryptographicAlgorithm.AES, 256)
+        self._wait_for(pool, 4)
+        key = pool.get(CryptographicAlgorithm.AES, 256)
+
+        self.assertEqual((CryptographicAlgorithm.AES, 256), key[:2])
+        self.assertEqual({'hits': 1, 'misses': 0, 'pooled': 3},
+                         pool.get_statistics())
+
+    def test_keys_are_handed_out_once(self):
+        pool = self._build_pool(size=8, low_water_mark=4)
+        pool.warm(CryptographicAlgorithm.AES, 128)
+        self._wait_for(pool, 8)
+
+        keys = [pool.get(CryptographicAlgorithm.AES, 128) for _ in range(20)]
+
+        self.assertEqual(20, len(set(keys)))
+
+    def test_pools_are_kept_per_kind(self):
+        pool = self._build_pool(size=2, low_water_mark=1)
+        pool.warm(CryptographicAlgorithm.AES, 128)
+        pool.warm(CryptographicAlgorithm.AES, 256)
+        self._wait_for(pool, 4)
+
+        self.assertEqual(
+            (CryptographicAlgorithm.AES, 256),
+            pool.get(CryptographicAlgorithm.AES, 256)[:2])
+        self.assertEqual(
+            (CryptographicAlgorithm.AES, 128),
+            pool.get(CryptographicAlgorithm.AES, 128)[:2])
+
+    def test_refill_below_low_water_mark(self):
+        pool = self._build_pool(size=4, low_water_mark=2)
+        pool.warm(CryptographicAlgorithm.AES, 128)
+        self._wait_for(pool, 4)
+
+        for _ in range(3):
+            pool.get(CryptographicAlgorithm.AES, 128)
+        self._wait_for(pool, 4)
+
+        self.assertEqual(4, pool.get_statistics()['pooled'])
+
+    def test_refill_when_empty_without_low_water_mark(self):
+        pool = self._build_pool(size=4, low_water_mark=0)
+
+        pool.get(CryptographicAlgorithm.AES, 128)
+        self._wait_for(pool, 4)
+
+        pool.get(CryptographicAlgorithm.AES, 128)
+        self.assertEqual({'hits': 1, 'misses': 1, 'pooled': 3},
+                         pool.get_statistics())
+
+    def test_close(self):
+        pool = self._build_pool(size=4, low_water_mark=2)
+        pool.warm(CryptographicAlgorithm.AES, 128)
+        self._wait_for(pool, 4)
+
+        pool.close()
+        pool._refiller.join(5)
+
+        self.assertFalse(pool._refiller.is_alive())
+        self.assertEqual(0, pool.get_statistics()['pooled'])
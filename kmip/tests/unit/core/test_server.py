@@ -13,6 +13,10 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import mock
+import os
+import threading
+
 from testtools import TestCase
 
 from kmip.core.attributes import CryptographicAlgorithm
@@ -31,18 +35,27 @@ from kmip.core.enums import ObjectType as ObjectTypeEnum
 from kmip.core.enums import ResultReason
 from kmip.core.enums import ResultStatus
 from kmip.core.enums import NameType
+from kmip.core.enums import QueryFunction as QueryFunctionEnum
+from kmip.core.enums import RevocationReasonCode
+from kmip.core.enums import State
 
 from kmip.core.factories.attributes import AttributeFactory
+from kmip.core.key_pair_generator import KeyPairGenerator
 
 from kmip.core.messages.contents import KeyCompressionType
+from kmip.core.messages.contents import ProtocolVersion
+from kmip.core.messages.payloads.locate import LocateRequestPayload
 from kmip.core.misc import KeyFormatType
+from kmip.core.misc import QueryFunction
 
 from kmip.core.objects import KeyBlock
 from kmip.core.objects import KeyMaterial
 from kmip.core.objects import KeyValue
+from kmip.core.objects import RevocationReason
 from kmip.core.objects import TemplateAttribute
 
 from kmip.core.secrets import SymmetricKey
+from kmip.core.server import InvalidFieldException
 from kmip.core.server import KMIPImpl
 
 
@@ -69,6 +82,48 @@ class TestKMIPServer(TestCase):
         self.assertEqual(ResultStatus.SUCCESS, res.result_status.enum,
                          'result status did not return success')
 
+    def test_create_with_key_pool(self):
+        self.kmip = KMIPImpl(key_pool_size=4, key_pool_low_water_mark=2)
+        self.addCleanup(self.kmip.key_pool.close)
+
+        uuids = [self._create() for _ in range(6)]
+
+        keys = set()
+        for uuid in uuids:
+            res = self.kmip.get(uuid)
+            self.assertEqual(ResultStatus.SUCCESS, res.result_status.enum,
+                             'result status did not return success')
+            key_block = res.secret.key_block
+            self.assertEqual(256, key_block.cryptographic_length.value)
+            keys.add(bytes(key_block.key_value.key_material.value))
+        self.assertEqual(6, len(keys))
+        self.assertEqual(6, sum(self.kmip.key_pool.get_statistics()[name]
+                                for name in ('hits', 'misses')))
+
+    def test_create_fills_key_pool_without_low_water_mark(self):
+        self.kmip = KMIPImpl(key_pool_size=4)
+        self.addCleanup(self.kmip.key_pool.close)
+
+        self._create()
+        for _ in range(500):
+            if self.kmip.key_pool.get_statistics()['pooled'] == 4:
+                break
+            threading.Event().wait(0.01)
+
+        self._create()
+        self.assertEqual(1, self.kmip.key_pool.get_statistics()['hits'])
+
+    def test_close(self):
+        generator = mock.MagicMock()
+        self.kmip = KMIPImpl(key_pool_size=4, key_pair_generator=generator)
+        self.addCleanup(self.kmip.key_pool.close)
+
+        with mock.patch.object(self.kmip.key_pool, 'close') as pool_close:
+            self.kmip.close()
+
+        pool_close.assert_called_once_with()
+        generator.close.assert_called_once_with()
+
     def test_create_no_length(self):
         obj_type = ObjectType(ObjectTypeEnum.SYMMETRIC_KEY)
         attributes = self._get_attrs()[0:2]
@@ -458,6 +513,317 @@ class TestKMIPServer(TestCase):
                              res.result_reason.enum,
                              'result reason did not match')
 
+    def test_create_concurrent(self):
+        uuids = []
+
+        def create():
+            for _ in range(20):
+                uuids.append(self._create().value)
+
+        threads = [threading.Thread(target=create) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(80, len(set(uuids)))
+        for uuid in uuids:
+            res = self.kmip.get(UniqueIdentifier(uuid))
+            self.assertEqual(ResultStatus.SUCCESS, res.result_status.enum,
+                             'result status did not return success')
+
+    def test_activate(self):
+        uuid = self._create()
+        self.assertEqual(State.PRE_ACTIVE, self._get_state(uuid))
+
+        res = self.kmip.activate(uuid)
+        self.assertEqual(ResultStatus.SUCCESS, res.result_status.enum,
+                         'result status did not return success')
+        self.assertEqual(State.ACTIVE, self._get_state(uuid))
+
+        res = self.kmip.activate(uuid)
+        self.assertEqual(ResultStatus.OPERATION_FAILED,
+                         res.result_status.enum,
+                         'result status did not return failed')
+        self.assertEqual(ResultReason.PERMISSION_DENIED,
+                         res.result_reason.enum,
+                         'result reason did not match')
+
+    def test_activate_does_not_undo_destroy(self):
+        uuid = self._create()
+        get = self.kmip.repo.get
+        destroyers = []
+
+        def get_and_destroy(value):
+            result = get(value)
+            destroyer = threading.Thread(target=self.kmip.destroy,
+                                         args=(uuid,))
+            destroyer.start()
+            destroyer.join(0.1)
+            destroyers.append(destroyer)
+            return result
+
+        self.kmip.repo.get = get_and_destroy
+        res = self.kmip.activate(uuid)
+        self.kmip.repo.get = get
+        destroyers[0].join()
+
+        self.assertEqual(ResultStatus.SUCCESS, res.result_status.enum,
+                         'result status did not return success')
+        self.assertEqual((None, None), self.kmip.repo.get(uuid.value))
+
+    def test_activate_destroyed_object(self):
+        uuid = self._create()
+        self.kmip.repo.update = lambda *args: False
+
+        res = self.kmip.activate(uuid)
+        self.assertEqual(ResultReason.ITEM_NOT_FOUND,
+                         res.result_reason.enum,
+                         'result reason did not match')
+
+    def test_activate_unknown(self):
+        res = self.kmip.activate(UniqueIdentifier('no key here'))
+        self.assertEqual(ResultReason.ITEM_NOT_FOUND,
+                         res.result_reason.enum,
+                         'result reason did not match')
+
+    def test_revoke(self):
+        uuid = self._create()
+        reason = RevocationReason(RevocationReasonCode.CESSATION_OF_OPERATION)
+
+        res = self.kmip.revoke(reason, uuid)
+        self.assertEqual(ResultReason.PERMISSION_DENIED,
+                         res.result_reason.enum,
+                         'result reason did not match')
+
+        self.kmip.activate(uuid)
+        res = self.kmip.revoke(reason, uuid)
+        self.assertEqual(ResultStatus.SUCCESS, res.result_status.enum,
+                         'result status did not return success')
+        self.assertEqual(uuid, res.unique_identifier)
+        self.assertEqual(State.DEACTIVATED, self._get_state(uuid))
+
+    def test_revoke_compromised(self):
+        uuid = self._create()
+        reason = RevocationReason(RevocationReasonCode.KEY_COMPROMISE)
+
+        res = self.kmip.revoke(reason, uuid)
+        self.assertEqual(ResultStatus.SUCCESS, res.result_status.enum,
+                         'result status did not return success')
+        self.assertEqual(State.COMPROMISED, self._get_state(uuid))
+
+    def test_query(self):
+        functions = [QueryFunction(QueryFunctionEnum.QUERY_OBJECTS),
+                     QueryFunction(QueryFunctionEnum.QUERY_SERVER_INFORMATION)]
+        res = self.kmip.query(functions)
+        self.assertEqual(ResultStatus.SUCCESS, res.result_status.enum,
+                         'result status did not return success')
+        self.assertEqual([ObjectType(ObjectTypeEnum.SYMMETRIC_KEY)],
+                         res.object_types)
+        self.assertEqual('PyKMIP', res.vendor_identification.value)
+
+    def test_discover_versions(self):
+        res = self.kmip.discover_versions()
+        self.assertEqual([ProtocolVersion.create(1, 1),
+                          ProtocolVersion.create(1, 0)],
+                         res.protocol_versions)
+
+        res = self.kmip.discover_versions([ProtocolVersion.create(1, 2)])
+        self.assertEqual([], res.protocol_versions)
+
+    def test_validate_attributes(self):
+        attributes = self._get_attrs()[0:2] + [self._get_custom_attr(i)
+                                               for i in range(50)]
+
+        found = self.kmip._validate_attributes(attributes,
+                                               KMIPImpl.CREATE_RULES)
+
+        self.assertEqual(attributes[0],
+                         found[AttributeType.CRYPTOGRAPHIC_ALGORITHM.value])
+        self.assertEqual(attributes[1],
+                         found[AttributeType.CRYPTOGRAPHIC_USAGE_MASK.value])
+        self.assertIsNone(found[AttributeType.CRYPTOGRAPHIC_LENGTH.value])
+
+    def test_validate_attributes_logs_lazily(self):
+        attributes = self._get_attrs()
+
+        with mock.patch.object(self.kmip, 'logger') as logger:
+            self.kmip._validate_attributes(attributes, KMIPImpl.CREATE_RULES)
+
+        self.assertEqual(
+            [mock.call('validating attribute %s', rule.name)
+             for rule in KMIPImpl.CREATE_RULES],
+            logger.debug.call_args_list)
+
+    def test_validate_attributes_missing(self):
+        attributes = self._get_attrs()[1:]
+
+        e = self.assertRaises(InvalidFieldException,
+                              self.kmip._validate_attributes, attributes,
+                              KMIPImpl.CREATE_RULES)
+
+        self.assertEqual(ResultReason.ITEM_NOT_FOUND,
+                         e.result.result_reason.enum)
+
+    def test_validate_attributes_duplicate(self):
+        attributes = self._get_attrs() + [self._get_length_attr(128)]
+
+        e = self.assertRaises(InvalidFieldException,
+                              self.kmip._validate_attributes, attributes,
+                              KMIPImpl.CREATE_RULES)
+
+        self.assertEqual(ResultReason.INDEX_OUT_OF_BOUNDS,
+                         e.result.result_reason.enum)
+
+    def test_validate_attributes_invalid_value(self):
+        attributes = self._get_attrs() + [self._get_length_attr(100)]
+
+        e = self.assertRaises(InvalidFieldException,
+                              self.kmip._validate_attributes, attributes,
+                              KMIPImpl.CREATE_RULES)
+
+        self.assertEqual(ResultReason.INVALID_FIELD,
+                         e.result.result_reason.enum)
+        self.assertEqual('unsupported key length',
+                         e.result.result_message.value)
+
+    def test_create_key_pair(self):
+        res = self._create_key_pair()
+
+        private_key = self.kmip.get(res.private_key_uuid)
+        public_key = self.kmip.get(res.public_key_uuid)
+        self.assertEqual(ObjectTypeEnum.PRIVATE_KEY,
+                         private_key.object_type.enum)
+        self.assertEqual(ObjectTypeEnum.PUBLIC_KEY,
+                         public_key.object_type.enum)
+        key_block = private_key.secret.key_block
+        self.assertEqual(KeyFormatTypeEnum.PKCS_1,
+                         key_block.key_format_type.enum)
+        self.assertEqual(CryptoAlgorithmEnum.RSA,
+                         key_block.cryptographic_algorithm.enum)
+        self.assertEqual(2048, key_block.cryptographic_length.value)
+
+    def test_create_key_pair_unsupported_length(self):
+        self._use_key_pair_generator()
+        template = TemplateAttribute(attributes=[
+            self._get_alg_attr(CryptoAlgorithmEnum.RSA),
+            self._get_length_attr(1000), self._get_attrs()[1]])
+
+        res = self.kmip.create_key_pair(template, None, None)
+
+        self.assertEqual(ResultStatus.OPERATION_FAILED,
+                         res.result_status.enum)
+        self.assertEqual(ResultReason.INVALID_FIELD, res.result_reason.enum)
+
+    def test_create_key_pair_template_overrides_common(self):
+        self._use_key_pair_generator()
+        common = TemplateAttribute(attributes=self._get_key_pair_attrs())
+        public = TemplateAttribute(attributes=[self._get_length_attr(4096)])
+
+        res = self.kmip.create_key_pair(common, None, public)
+
+        self.assertEqual(ResultStatus.OPERATION_FAILED,
+                         res.result_status.enum)
+        self.assertEqual('private and public key attributes do not match',
+                         res.result_message.value)
+
+    def test_create_key_pair_without_backend(self):
+        self.kmip = KMIPImpl(key_pair_generator=KeyPairGenerator(workers=0))
+        self.kmip.key_pair_generator.available = False
+
+        self.assertRaises(NotImplementedError, self.kmip.create_key_pair,
+                          None, None, None)
+
+    def test_create_key_pair_generation_failure(self):
+        def fail(algorithm, length):
+            raise ValueError('generation failed')
+        self.kmip = KMIPImpl(key_pair_generator=KeyPairGenerator(
+            workers=0, function=fail))
+        template = TemplateAttribute(attributes=self._get_key_pair_attrs())
+
+        res = self.kmip.create_key_pair(template, None, None)
+
+        self.assertEqual(ResultReason.GENERAL_FAILURE,
+                         res.result_reason.enum)
+
+    def test_get_key_pair_wrong_key_format_type(self):
+        res = self._create_key_pair()
+
+        res = self.kmip.get(res.private_key_uuid,
+                            KeyFormatType(KeyFormatTypeEnum.RAW))
+
+        self.assertEqual(ResultReason.KEY_FORMAT_TYPE_NOT_SUPPORTED,
+                         res.result_reason.enum)
+
+    def test_rekey_key_pair(self):
+        old = self._create_key_pair()
+
+        res = self.kmip.rekey_key_pair(old.private_key_uuid, None, None,
+                                       None, None)
+
+        self.assertEqual(ResultStatus.SUCCESS, res.result_status.enum)
+        self.assertNotEqual(old.private_key_uuid.value,
+                            res.private_key_uuid.value)
+        old_key = self.kmip.get(old.private_key_uuid).secret
+        new_key = self.kmip.get(res.private_key_uuid).secret
+        self.assertEqual(2048,
+                         new_key.key_block.cryptographic_length.value)
+        self.assertNotEqual(
+            old_key.key_block.key_value.key_material.value,
+            new_key.key_block.key_value.key_material.value)
+        _, attributes = self.kmip.repo.get(res.private_key_uuid.value)
+        self.assertTrue(self._check_attr_exists(self._get_attrs()[1],
+                                                attributes))
+
+    def test_rekey_key_pair_with_offset(self):
+        old = self._create_key_pair()
+
+        res = self.kmip.rekey_key_pair(old.private_key_uuid, 60, None, None,
+                                       None)
+
+        self.assertEqual(ResultReason.FEATURE_NOT_SUPPORTED,
+                         res.result_reason.enum)
+
+    def test_rekey_key_pair_not_private_key(self):
+        self._use_key_pair_generator()
+        uuid = self._create()
+
+        res = self.kmip.rekey_key_pair(uuid, None, None, None, None)
+
+        self.assertEqual(ResultReason.INVALID_FIELD, res.result_reason.enum)
+
+    def test_rekey_key_pair_unknown(self):
+        self._use_key_pair_generator()
+
+        res = self.kmip.rekey_key_pair(UniqueIdentifier('no key here'),
+                                       None, None, None, None)
+
+        self.assertEqual(ResultReason.ITEM_NOT_FOUND, res.result_reason.enum)
+
+    def _use_key_pair_generator(self):
+        def generate(algorithm, length):
+            return (b'public' + os.urandom(8), b'private' + os.urandom(8))
+        self.kmip = KMIPImpl(key_pair_generator=KeyPairGenerator(
+            workers=0, function=generate))
+
+    def _create_key_pair(self):
+        self._use_key_pair_generator()
+        template = TemplateAttribute(attributes=self._get_key_pair_attrs())
+        res = self.kmip.create_key_pair(template, None, None)
+        self.assertEqual(ResultStatus.SUCCESS, res.result_status.enum,
+                         'result status did not return success')
+        return res
+
+    def _get_key_pair_attrs(self):
+        attributes = self._get_attrs()
+        attributes[0] = self._get_alg_attr(CryptoAlgorithmEnum.RSA)
+        attributes[2] = self._get_length_attr(2048)
+        return attributes
+
+    def _get_state(self, uuid):
+        _, attributes = self.kmip.repo.get(uuid.value)
+        return self.kmip._get_state(attributes)
+
     def _create(self):
         obj_type = ObjectType(ObjectTypeEnum.SYMMETRIC_KEY)
         attributes = self._get_attrs()
@@ -496,6 +862,11 @@ class TestKMIPServer(TestCase):
         nameattr = attr_factory.create_attribute(AttributeType.NAME, value)
         return [algorithm, usage_mask, length, nameattr]
 
+    def _get_custom_attr(self, number):
+        attr_factory = AttributeFactory()
+        return attr_factory.create_attribute(
+            AttributeType.CUSTOM_ATTRIBUTE, 'x-custom-{0}'.format(number))
+
     def _get_alg_attr(self, alg=None):
         if alg is None:
             alg = self.algorithm_name
@@ -519,7 +890,7 @@ class TestKMIPServer(TestCase):
         return False
 
     def test_locate(self):
-        self._create()
+        uuid = self._create()
 
         name_value = Name.NameValue(value='TESTNAME')
         name_type = Name.NameType(value=NameType.UNINTERPRETED_TEXT_STRING)
@@ -530,5 +901,21 @@ class TestKMIPServer(TestCase):
 
         attrs = [nameattr]
         res = self.kmip.locate(attributes=attrs)
-        self.assertEqual(ResultStatus.OPERATION_FAILED, res.result_status.enum,
+        self.assertEqual(ResultStatus.SUCCESS, res.result_status.enum,
                          'locate result status did not return success')
+        self.assertEqual([uuid], res.uuids)
+
+    def test_locate_without_match(self):
+        self._create()
+
+        res = self.kmip.locate(attributes=[self._get_length_attr(512)])
+        self.assertEqual(ResultStatus.SUCCESS, res.result_status.enum)
+        self.assertEqual([], res.uuids)
+
+    def test_locate_maximum_items(self):
+        self._create()
+        self._create()
+
+        res = self.kmip.locate(
+            maximum_items=LocateRequestPayload.MaximumItems(1))
+        self.assertEqual([UniqueIdentifier('1')], res.uuids)
@@ -0,0 +1,126 @@
+# Copyright (c) 2015 Hewlett Packard Development Company, L.P.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import threading
+
+from testtools import TestCase
+
+from kmip.core.enums import CancellationResult
+from kmip.core.enums import Operation
+
+from kmip.services import job_queue
+
+
+class TestJobQueue(TestCase):
+
+    def setUp(self):
+        super(TestJobQueue, self).setUp()
+        self.queue = job_queue.JobQueue(workers=1, max_jobs=2)
+        self.addCleanup(self.queue.close)
+
+        # Holds the single worker until released
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def tearDown(self):
+        super(TestJobQueue, self).tearDown()
+
+    def _block(self):
+        self.started.set()
+        self.release.wait(5)
+        return 'blocked'
+
+    def _wait(self, correlation_value):
+        # The single worker runs jobs in order, so this returns once every
+        # job submitted so far has finished.
+        self.queue._pool.apply(int)
+        return self.queue.poll(correlation_value)
+
+    def test_init_invalid_workers(self):
+        self.assertRaises(ValueError, job_queue.JobQueue, 0)
+
+    def test_submit_and_poll(self):
+        correlation_value = self.queue.submit(Operation.LOCATE, sum, [1, 2])
+
+        job = self._wait(correlation_value)
+
+        self.assertEqual(job_queue.COMPLETED, job.state)
+        self.assertEqual(Operation.LOCATE, job.operation)
+        self.assertEqual(3, job.result)
+        self.assertIsNone(self.queue.poll(correlation_value))
+
+    def test_poll_pending(self):
+        blocking = self.queue.submit(Operation.LOCATE, self._block)
+        self.started.wait(5)
+
+        job = self.queue.poll(blocking)
+        self.release.set()
+
+        self.assertEqual(job_queue.RUNNING, job.state)
+        self.assertIsNotNone(self.queue.poll(blocking))
+
+    def test_poll_unknown(self):
+        self.assertIsNone(self.queue.poll(b'\x00' * 16))
+
+    def test_job_error(self):
+        correlation_value = self.queue.submit(Operation.LOCATE, int, 'x')
+
+        job = self._wait(correlation_value)
+
+        self.assertIsInstance(job.error, ValueError)
+        self.assertIsNone(job.result)
+
+    def test_cancel(self):
+        blocking = self.queue.submit(Operation.LOCATE, self._block)
+        self.started.wait(5)
+        pending = self.queue.submit(Operation.LOCATE, sum, [1])
+
+        self.assertEqual(CancellationResult.UNABLE_TO_CANCEL,
+                         self.queue.cancel(blocking))
+        self.assertEqual(CancellationResult.CANCELED,
+                         self.queue.cancel(pending))
+        self.assertEqual(CancellationResult.UNAVAILABLE,
+                         self.queue.cancel(pending))
+        self.release.set()
+
+    def test_cancel_completed(self):
+        correlation_value = self.queue.submit(Operation.LOCATE, sum, [1])
+        failing = self.queue.submit(Operation.LOCATE, int, 'x')
+        self._wait(None)
+
+        self.assertEqual(CancellationResult.COMPLETED,
+                         self.queue.cancel(correlation_value))
+        self.assertEqual(CancellationResult.FAILED,
+                         self.queue.cancel(failing))
+
+    def test_submit_when_full(self):
+        blocking = self.queue.submit(Operation.LOCATE, self._block)
+        self.started.wait(5)
+        self.queue.submit(Operation.LOCATE, sum, [1])
+
+        self.assertIsNone(self.queue.submit(Operation.LOCATE, sum, [2]))
+        self.release.set()
+        self._wait(blocking)
+
+    def test_submit_evicts_oldest_result(self):
+        first = self.queue.submit(Operation.LOCATE, sum, [1])
+        second = self.queue.submit(Operation.LOCATE, sum, [2])
+        self._wait(None)
+
+        third = self.queue.submit(Operation.LOCATE, sum, [3])
+
+        self.assertIsNotNone(third)
+        self.assertIsNone(self.queue.poll(first))
+        self.assertEqual(2, self.queue.poll(second).result)
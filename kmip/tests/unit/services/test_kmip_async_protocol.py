@@ -0,0 +1,154 @@
+# Copyright (c) 2014 The Johns Hopkins University/Applied Physics Laboratory
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import asyncio
+import mock
+
+from testtools import TestCase
+
+from kmip.core.enums import Operation as OperationEnum
+
+from kmip.core.messages import contents
+from kmip.core.messages import messages
+from kmip.core.messages.payloads import query
+
+from kmip.core.utils import BytearrayStream
+
+from kmip.services.kmip_async_protocol import KMIPAsyncProtocol
+
+
+class FakeWriter(object):
+
+    def __init__(self):
+        self.data = b''
+        self.drained = 0
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        self.drained += 1
+
+    def close(self):
+        pass
+
+
+class TestKMIPAsyncProtocol(TestCase):
+
+    def setUp(self):
+        super(TestKMIPAsyncProtocol, self).setUp()
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def tearDown(self):
+        super(TestKMIPAsyncProtocol, self).tearDown()
+
+    def _run(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def _build_request(self):
+        batch_item = messages.RequestBatchItem(
+            operation=contents.Operation(OperationEnum.QUERY),
+            request_payload=query.QueryRequestPayload())
+        header = messages.RequestHeader(
+            protocol_version=contents.ProtocolVersion.create(1, 1),
+            batch_count=contents.BatchCount(1))
+        return messages.RequestMessage(request_header=header,
+                                       batch_items=[batch_item])
+
+    def _encode(self, message):
+        stream = BytearrayStream()
+        message.write(stream)
+        return bytes(stream.buffer)
+
+    def _build_protocol(self, data, eof=True):
+        async def build():
+            reader = asyncio.StreamReader()
+            reader.feed_data(data)
+            if eof:
+                reader.feed_eof()
+            return KMIPAsyncProtocol(reader, FakeWriter())
+        return self._run(build())
+
+    def test_read_sized_by_header(self):
+        first = self._encode(self._build_request())
+        second = self._encode(self._build_request())
+        protocol = self._build_protocol(first + second)
+
+        self.assertEqual(first, bytes(self._run(protocol.read()).buffer))
+        self.assertEqual(second, bytes(self._run(protocol.read()).buffer))
+
+    def test_read_incomplete_message(self):
+        data = self._encode(self._build_request())
+        protocol = self._build_protocol(data[:-4])
+
+        self.assertRaises(asyncio.IncompleteReadError, self._run,
+                          protocol.read())
+
+    def test_read_with_timeouts(self):
+        data = self._encode(self._build_request())
+        protocol = self._build_protocol(data)
+        protocol.idle_timeout = 60
+        protocol.read_timeout = 5
+
+        self.assertEqual(data, bytes(self._run(protocol.read()).buffer))
+
+    def test_read_idle_timeout(self):
+        protocol = self._build_protocol(b'', eof=False)
+        protocol.idle_timeout = 0.01
+
+        self.assertRaises(asyncio.TimeoutError, self._run, protocol.read())
+
+    def test_read_timeout_after_message_starts(self):
+        data = self._encode(self._build_request())
+        protocol = self._build_protocol(data[:-4], eof=False)
+        protocol.read_timeout = 0.01
+
+        self.assertRaises(asyncio.TimeoutError, self._run, protocol.read())
+
+    def test_read_message(self):
+        protocol = self._build_protocol(
+            self._encode(self._build_request()))
+
+        message = self._run(protocol.read_message(messages.RequestMessage))
+
+        self.assertIsInstance(message, messages.RequestMessage)
+        self.assertEqual(OperationEnum.QUERY,
+                         message.batch_items[0].operation.enum)
+
+    def test_write_message_drains(self):
+        protocol = self._build_protocol(b'')
+        request = self._build_request()
+
+        self._run(protocol.write_message(request))
+
+        self.assertEqual(self._encode(request), protocol.writer.data)
+        self.assertEqual(1, protocol.writer.drained)
+
+    def test_write_empty_data(self):
+        protocol = self._build_protocol(b'')
+
+        self._run(protocol.write(b''))
+
+        self.assertEqual(b'', protocol.writer.data)
+        self.assertEqual(0, protocol.writer.drained)
+
+    def test_close(self):
+        protocol = self._build_protocol(b'')
+        protocol.writer = mock.MagicMock()
+
+        protocol.close()
+
+        protocol.writer.close.assert_called_once_with()
@@ -0,0 +1,183 @@
+# Copyright (c) 2014 The Johns Hopkins University/Applied Physics Laboratory
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import asyncio
+import concurrent.futures
+import mock
+
+from testtools import TestCase
+
+from kmip.services.kmip_async_server import KMIPAsyncServer
+
+
+class FakeWriter(object):
+
+    def __init__(self, extra_info=None):
+        self.data = b''
+        self.closed = False
+        self.extra_info = extra_info or {}
+
+    def get_extra_info(self, name, default=None):
+        return self.extra_info.get(name, default)
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class TestKMIPAsyncServer(TestCase):
+
+    def setUp(self):
+        super(TestKMIPAsyncServer, self).setUp()
+
+        # The event loop creates its own sockets, so it is set up before
+        # socket.socket is patched.
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.addCleanup(asyncio.set_event_loop, None)
+        self.addCleanup(self.loop.close)
+
+        socket_patcher = mock.patch('kmip.services.kmip_server.socket.socket')
+        self.mock_socket = socket_patcher.start()
+        self.addCleanup(socket_patcher.stop)
+
+        context_patcher = mock.patch(
+            'kmip.services.kmip_server.ssl.SSLContext')
+        self.mock_context = context_patcher.start()
+        self.addCleanup(context_patcher.stop)
+
+        self.server = KMIPAsyncServer(host='127.0.0.1', port=5696,
+                                      keyfile='/test/server.key',
+                                      certfile='/test/server.crt',
+                                      shutdown_timeout=1)
+        self.server._processor = mock.MagicMock()
+        self.server._loop = self.loop
+        self.server._stopping = asyncio.Event()
+        self.server._executor = concurrent.futures.ThreadPoolExecutor(1)
+        self.addCleanup(self.server._executor.shutdown)
+
+    def tearDown(self):
+        super(TestKMIPAsyncServer, self).tearDown()
+
+    def _run(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_init_shutdown_timeout(self):
+        self.assertEqual(1.0, self.server.shutdown_timeout)
+
+    def test_handle_client(self):
+        frame = b'\x42\x00\x78\x01\x00\x00\x00\x02\xab\xcd'
+        reader = asyncio.StreamReader()
+        reader.feed_data(frame + frame)
+        reader.feed_eof()
+        writer = FakeWriter(
+            {'peercert': {'subject': ((('commonName', 'client'),),)}})
+        self.server._processor.process_stream.return_value = b'\x01\x02'
+
+        self._run(self.server._handle_client(reader, writer))
+
+        self.assertEqual(2, self.server._processor.process_stream.call_count)
+        stream, client = self.server._processor.process_stream.call_args[0]
+        self.assertEqual(frame, bytes(stream.buffer))
+        self.assertEqual('commonName=client', client)
+        self.assertEqual(b'\x01\x02\x01\x02', writer.data)
+        self.assertTrue(writer.closed)
+        self.assertEqual(set(), self.server._clients)
+
+    def test_handle_client_closes_on_error(self):
+        frame = b'\x42\x00\x78\x01\x00\x00\x00\x00'
+        reader = asyncio.StreamReader()
+        reader.feed_data(frame)
+        writer = FakeWriter()
+        self.server._processor.process_stream.side_effect = ValueError()
+
+        self._run(self.server._handle_client(reader, writer))
+
+        self.assertTrue(writer.closed)
+
+    def test_connection_limit_ignores_worker_capacity(self):
+        self.assertEqual(self.server.max_connections,
+                         self.server._get_connection_limit())
+
+    def test_handle_client_refused_at_capacity(self):
+        self.server.max_connections = 0
+        writer = FakeWriter()
+        writer.get_extra_info = mock.MagicMock()
+
+        self._run(self.server._handle_client(asyncio.StreamReader(), writer))
+
+        self.assertTrue(writer.closed)
+        self.assertFalse(self.server._processor.process_stream.called)
+        self.assertEqual({'active': 0, 'refused': 1},
+                         self.server.get_connection_statistics())
+
+    def test_handle_client_idle_timeout(self):
+        self.server.idle_timeout = 0.01
+        writer = FakeWriter()
+        writer.get_extra_info = mock.MagicMock()
+
+        self._run(self.server._handle_client(asyncio.StreamReader(), writer))
+
+        self.assertTrue(writer.closed)
+        self.assertEqual({'active': 0, 'refused': 0},
+                         self.server.get_connection_statistics())
+
+    def test_close_clients_drops_idle_clients(self):
+        reader = asyncio.StreamReader()
+        writer = FakeWriter()
+        task = self.loop.create_task(
+            self.server._handle_client(reader, writer))
+        self._run(asyncio.sleep(0))
+        self.assertEqual(set([task]), self.server._idle_clients)
+
+        self._run(self.server._close_clients())
+
+        self.assertTrue(task.done())
+        self.assertTrue(writer.closed)
+        self.assertEqual(set(), self.server._clients)
+
+    def test_close_before_serve_closes_socket(self):
+        self.server._loop = None
+
+        self.server.close()
+
+        self.mock_socket.return_value.close.assert_called_once_with()
+
+    def test_close_sets_stopping(self):
+        self.server.close()
+        self._run(asyncio.sleep(0))
+
+        self.assertTrue(self.server._stopping.is_set())
+
+    def test_request_drain_sets_stopping(self):
+        self.server.request_drain()
+        self._run(asyncio.sleep(0))
+
+        self.assertTrue(self.server._stopping.is_set())
+
+    def test_select_ssl_context_after_reload(self):
+        old_context = self.server._ssl_context
+        self.mock_context.return_value = mock.MagicMock()
+        self.server.reload_ssl_context()
+        ssl_object = mock.MagicMock()
+
+        self.server._select_ssl_context(ssl_object, None, old_context)
+
+        self.assertEqual(self.server._ssl_context, ssl_object.context)
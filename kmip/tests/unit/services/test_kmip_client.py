@@ -13,15 +13,22 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import mock
+import socket
+
 from testtools import TestCase
 
 from kmip.core.attributes import PrivateKeyUniqueIdentifier
+from kmip.core.attributes import UniqueIdentifier
 
 from kmip.core.enums import AuthenticationSuite
+from kmip.core.enums import CancellationResult as CancellationResultEnum
 from kmip.core.enums import ConformanceClause
 from kmip.core.enums import CredentialType
+from kmip.core.enums import ObjectType as ObjectTypeEnum
 from kmip.core.enums import Operation as OperationEnum
 from kmip.core.enums import QueryFunction as QueryFunctionEnum
+from kmip.core.enums import ResultStatus as ResultStatusEnum
 
 from kmip.core.factories.attributes import AttributeFactory
 from kmip.core.factories.credentials import CredentialFactory
@@ -30,10 +37,16 @@ from kmip.core.factories.secrets import SecretFactory
 from kmip.core.messages.messages import RequestBatchItem
 from kmip.core.messages.messages import ResponseBatchItem
 from kmip.core.messages.messages import ResponseMessage
+from kmip.core.messages.contents import AsynchronousCorrelationValue
 from kmip.core.messages.contents import Operation
 from kmip.core.messages.contents import ProtocolVersion
+from kmip.core.messages.contents import ResultStatus
+from kmip.core.messages.contents import UniqueBatchItemID
+from kmip.core.messages.payloads.activate import ActivateResponsePayload
+from kmip.core.messages.payloads.cancel import CancelResponsePayload
 from kmip.core.messages.payloads.create_key_pair import \
     CreateKeyPairRequestPayload, CreateKeyPairResponsePayload
+from kmip.core.messages.payloads.create import CreateResponsePayload
 from kmip.core.messages.payloads.discover_versions import \
     DiscoverVersionsRequestPayload, DiscoverVersionsResponsePayload
 from kmip.core.messages.payloads.query import \
@@ -41,6 +54,7 @@ from kmip.core.messages.payloads.query import \
 from kmip.core.messages.payloads.rekey_key_pair import \
     RekeyKeyPairRequestPayload, RekeyKeyPairResponsePayload
 
+from kmip.core.misc import CancellationResult
 from kmip.core.misc import Offset
 from kmip.core.misc import QueryFunction
 from kmip.core.misc import ServerInformation
@@ -49,10 +63,13 @@ from kmip.core.misc import VendorIdentification
 from kmip.core.objects import CommonTemplateAttribute
 from kmip.core.objects import PrivateKeyTemplateAttribute
 from kmip.core.objects import PublicKeyTemplateAttribute
+from kmip.core.objects import TemplateAttribute
 
 from kmip.services.kmip_client import KMIPProxy
 
+from kmip.services.results import ActivateResult
 from kmip.services.results import CreateKeyPairResult
+from kmip.services.results import CreateResult
 from kmip.services.results import DiscoverVersionsResult
 from kmip.services.results import QueryResult
 from kmip.services.results import RekeyKeyPairResult
@@ -468,6 +485,417 @@ class TestKMIPClient(TestCase):
         self._test_process_discover_versions_batch_item(protocol_versions)
 
 
+class TestClientPipelining(TestCase):
+    """
+    A test suite for pipelined request messages over one connection.
+    """
+
+    def setUp(self):
+        super(TestClientPipelining, self).setUp()
+
+        self.client = KMIPProxy(pipeline_window=2)
+        self.client.protocol = mock.MagicMock()
+        self.events = []
+
+        def send(message):
+            self.events.append('send')
+
+        def receive():
+            self.events.append('receive')
+            return ResponseMessage()
+
+        self.client._send_message = mock.MagicMock(side_effect=send)
+        self.client._receive_response = mock.MagicMock(side_effect=receive)
+
+    def tearDown(self):
+        super(TestClientPipelining, self).tearDown()
+
+    def _build_batches(self, count):
+        batches = []
+        for _ in range(count):
+            batches.append([self.client._build_query_batch_item()])
+        return batches
+
+    def test_send_pipelined_respects_window(self):
+        responses = self.client.send_pipelined(self._build_batches(4))
+
+        self.assertEqual(4, len(responses))
+        self.assertEqual(['send', 'send', 'receive', 'send', 'receive',
+                          'send', 'receive', 'receive'], self.events)
+
+    def test_send_pipelined_with_explicit_window(self):
+        self.client.send_pipelined(self._build_batches(3), window=1)
+
+        self.assertEqual(['send', 'receive', 'send', 'receive', 'send',
+                          'receive'], self.events)
+
+    def test_send_pipelined_with_invalid_window(self):
+        self.assertRaises(ValueError, self.client.send_pipelined,
+                          self._build_batches(1), 0)
+
+
+class TestClientAsynchronousOperations(TestCase):
+    """
+    A test suite for asynchronous requests, Poll and Cancel.
+    """
+
+    def setUp(self):
+        super(TestClientAsynchronousOperations, self).setUp()
+
+        self.client = KMIPProxy()
+        self.client._send_and_receive_message = mock.MagicMock()
+        self.correlation_value = AsynchronousCorrelationValue(b'\x01' * 16)
+
+    def tearDown(self):
+        super(TestClientAsynchronousOperations, self).tearDown()
+
+    def _get_request(self):
+        return self.client._send_and_receive_message.call_args[0][0]
+
+    def test_send_asynchronous(self):
+        batch_item = self.client._build_query_batch_item()
+        response = ResponseMessage(batch_items=[ResponseBatchItem()])
+        self.client._send_and_receive_message.return_value = response
+
+        batch_items = self.client.send_asynchronous([batch_item])
+
+        header = self._get_request().request_header
+        self.assertTrue(header.asynchronous_indicator.value)
+        self.assertEqual(response.batch_items, batch_items)
+
+    def test_build_request_message_is_synchronous_by_default(self):
+        request = self.client._build_request_message(None, [])
+
+        self.assertIsNone(request.request_header.asynchronous_indicator)
+
+    def test_build_request_message_stamps_unique_batch_item_ids(self):
+        batch_items = [self.client._build_query_batch_item(),
+                       self.client._build_query_batch_item()]
+
+        request = self.client._build_request_message(None, batch_items)
+        ids = [item.unique_batch_item_id.value
+               for item in request.batch_items]
+        other = self.client._build_request_message(None, batch_items)
+
+        self.assertEqual(16, len(ids[0]))
+        self.assertNotEqual(ids[0], ids[1])
+        self.assertNotEqual(ids, [item.unique_batch_item_id.value
+                                  for item in other.batch_items])
+        self.assertEqual([None, None], [item.unique_batch_item_id
+                                        for item in batch_items])
+
+    def test_build_request_message_keeps_unique_batch_item_ids(self):
+        batch_item = self.client._build_query_batch_item()
+        batch_item.unique_batch_item_id = UniqueBatchItemID(b'\x01' * 16)
+
+        request = self.client._build_request_message(None, [batch_item])
+
+        self.assertEqual([batch_item], request.batch_items)
+
+    def test_poll(self):
+        response = ResponseMessage(batch_items=[ResponseBatchItem()])
+        self.client._send_and_receive_message.return_value = response
+
+        batch_item = self.client.poll(b'\x01' * 16)
+
+        request_item = self._get_request().batch_items[0]
+        self.assertEqual(OperationEnum.POLL, request_item.operation.enum)
+        self.assertEqual(
+            self.correlation_value,
+            request_item.request_payload.asynchronous_correlation_value)
+        self.assertEqual(response.batch_items[0], batch_item)
+
+    def test_cancel(self):
+        payload = CancelResponsePayload(
+            self.correlation_value,
+            CancellationResult(CancellationResultEnum.CANCELED))
+        response = ResponseMessage(batch_items=[ResponseBatchItem(
+            operation=Operation(OperationEnum.CANCEL),
+            response_payload=payload)])
+        self.client._send_and_receive_message.return_value = response
+
+        result = self.client.cancel(self.correlation_value)
+
+        request_item = self._get_request().batch_items[0]
+        self.assertEqual(OperationEnum.CANCEL, request_item.operation.enum)
+        self.assertEqual(self.correlation_value,
+                         result.asynchronous_correlation_value)
+        self.assertEqual(CancellationResultEnum.CANCELED,
+                         result.cancellation_result.enum)
+
+
+class TestClientChainedBatches(TestCase):
+    """
+    A test suite for requests whose batch items refer to the object produced
+    by an earlier batch item.
+    """
+
+    def setUp(self):
+        super(TestClientChainedBatches, self).setUp()
+
+        self.client = KMIPProxy()
+        self.client._send_and_receive_message = mock.MagicMock()
+
+    def tearDown(self):
+        super(TestClientChainedBatches, self).tearDown()
+
+    def _get_request(self):
+        return self.client._send_and_receive_message.call_args[0][0]
+
+    def test_create_and_activate(self):
+        uuid = UniqueIdentifier('1')
+        status = ResultStatus(ResultStatusEnum.SUCCESS)
+        self.client._send_and_receive_message.return_value = ResponseMessage(
+            batch_items=[
+                ResponseBatchItem(
+                    operation=Operation(OperationEnum.CREATE),
+                    result_status=status,
+                    response_payload=CreateResponsePayload(
+                        unique_identifier=uuid)),
+                ResponseBatchItem(
+                    operation=Operation(OperationEnum.ACTIVATE),
+                    result_status=status,
+                    response_payload=ActivateResponsePayload(
+                        unique_identifier=uuid))])
+
+        results = self.client.create_and_activate(
+            ObjectTypeEnum.SYMMETRIC_KEY, TemplateAttribute())
+
+        request_items = self._get_request().batch_items
+        self.assertEqual([OperationEnum.CREATE, OperationEnum.ACTIVATE],
+                         [item.operation.enum for item in request_items])
+        self.assertIsNone(request_items[1].request_payload.unique_identifier)
+        self.assertIsInstance(results[0], CreateResult)
+        self.assertIsInstance(results[1], ActivateResult)
+        self.assertEqual('1', results[1].uuid.value)
+
+    def test_create_and_activate_with_failed_create(self):
+        self.client._send_and_receive_message.return_value = ResponseMessage(
+            batch_items=[ResponseBatchItem(
+                operation=Operation(OperationEnum.CREATE),
+                result_status=ResultStatus(
+                    ResultStatusEnum.OPERATION_FAILED))])
+
+        results = self.client.create_and_activate(
+            ObjectTypeEnum.SYMMETRIC_KEY, TemplateAttribute())
+
+        self.assertEqual(1, len(results))
+        self.assertIsNone(results[0].uuid)
+
+    def test_register_and_activate(self):
+        self.client._send_and_receive_message.return_value = ResponseMessage(
+            batch_items=[])
+
+        self.client.register_and_activate(
+            ObjectTypeEnum.SYMMETRIC_KEY, TemplateAttribute(), None)
+
+        request_items = self._get_request().batch_items
+        self.assertEqual([OperationEnum.REGISTER, OperationEnum.ACTIVATE],
+                         [item.operation.enum for item in request_items])
+
+    def test_locate_and_get(self):
+        self.client._send_and_receive_message.return_value = ResponseMessage(
+            batch_items=[])
+
+        self.client.locate_and_get(maximum_items=1)
+
+        request_items = self._get_request().batch_items
+        self.assertEqual([OperationEnum.LOCATE, OperationEnum.GET],
+                         [item.operation.enum for item in request_items])
+        self.assertIsNone(request_items[1].request_payload.unique_identifier)
+
+
+class TestClientRetries(TestCase):
+    """
+    A test suite for request messages sent again after a failure.
+    """
+
+    def setUp(self):
+        super(TestClientRetries, self).setUp()
+
+        self.response = ResponseMessage(batch_items=[])
+
+    def _build_client(self, retries, failures):
+        client = KMIPProxy(retries=retries)
+        client._send_message = mock.MagicMock()
+        client._receive_response = mock.MagicMock(
+            side_effect=[socket.timeout()] * failures + [self.response])
+        client._reconnect = mock.MagicMock()
+        return client
+
+    def test_send_and_receive_message_retries_same_message(self):
+        client = self._build_client(2, 2)
+        request = client._build_request_message(
+            None, [client._build_query_batch_item()])
+
+        response = client._send_and_receive_message(request)
+
+        self.assertEqual(self.response, response)
+        self.assertEqual([mock.call(request)] * 3,
+                         client._send_message.call_args_list)
+        self.assertEqual(2, client._reconnect.call_count)
+
+    def test_send_and_receive_message_gives_up_after_retries(self):
+        client = self._build_client(1, 2)
+
+        self.assertRaises(socket.timeout, client._send_and_receive_message,
+                          mock.MagicMock())
+        self.assertEqual(1, client._reconnect.call_count)
+
+    def test_send_and_receive_message_without_retries(self):
+        client = self._build_client(None, 1)
+
+        self.assertEqual(0, client.retries)
+        self.assertRaises(socket.timeout, client._send_and_receive_message,
+                          mock.MagicMock())
+        self.assertFalse(client._reconnect.called)
+
+    def test_create_with_unique_batch_item_id(self):
+        client = KMIPProxy()
+        client._send_and_receive_message = mock.MagicMock(
+            return_value=ResponseMessage(batch_items=[ResponseBatchItem(
+                operation=Operation(OperationEnum.CREATE),
+                result_status=ResultStatus(ResultStatusEnum.SUCCESS))]))
+
+        client.create(ObjectTypeEnum.SYMMETRIC_KEY, TemplateAttribute(),
+                      unique_batch_item_id=b'\x01' * 16)
+
+        request = client._send_and_receive_message.call_args[0][0]
+        self.assertEqual(b'\x01' * 16,
+                         request.batch_items[0].unique_batch_item_id.value)
+
+
+class TestClientSSLContextCache(TestCase):
+    """
+    A test suite for client SSL context and TLS session reuse.
+    """
+
+    def setUp(self):
+        super(TestClientSSLContextCache, self).setUp()
+
+        for name in ('_ssl_contexts', '_ssl_sessions', '_tls_statistics'):
+            patcher = mock.patch.object(KMIPProxy, name, {})
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        context_patcher = mock.patch(
+            'kmip.services.kmip_client.ssl.SSLContext')
+        self.mock_context = context_patcher.start()
+        self.addCleanup(context_patcher.stop)
+
+        self.client = KMIPProxy(host='127.0.0.1', port=5696)
+
+    def tearDown(self):
+        super(TestClientSSLContextCache, self).tearDown()
+
+    def test_get_ssl_context_is_cached(self):
+        context = self.client._get_ssl_context()
+        other = KMIPProxy(host='127.0.0.1', port=5696)
+
+        self.assertEqual(context, other._get_ssl_context())
+        self.assertEqual(1, self.mock_context.call_count)
+
+    def test_get_ssl_context_per_config(self):
+        self.client._get_ssl_context()
+        self.client.config = 'other'
+        self.client._get_ssl_context()
+
+        self.assertEqual(2, self.mock_context.call_count)
+
+    def test_get_tls_statistics_no_handshakes(self):
+        statistics = self.client.get_tls_statistics()
+
+        self.assertEqual({'handshakes': 0, 'resumed': 0,
+                          'resumption_rate': 0.0}, statistics)
+
+    def test_record_handshake(self):
+        self.client.socket = mock.MagicMock(session_reused=False)
+        self.client._record_handshake()
+        self.client.socket = mock.MagicMock(session_reused=True)
+        self.client._record_handshake()
+        self.client.socket = None
+
+        statistics = self.client.get_tls_statistics()
+
+        self.assertEqual(2, statistics['handshakes'])
+        self.assertEqual(1, statistics['resumed'])
+        self.assertEqual(0.5, statistics['resumption_rate'])
+
+    def test_save_ssl_session(self):
+        session = mock.MagicMock()
+        self.client.socket = mock.MagicMock(session=session)
+        self.client._save_ssl_session()
+        self.client.socket = None
+
+        self.assertEqual(
+            session,
+            KMIPProxy._ssl_sessions[self.client._get_ssl_session_key()])
+
+    def test_open_resumes_saved_session(self):
+        session = mock.MagicMock()
+        KMIPProxy._ssl_sessions[self.client._get_ssl_session_key()] = session
+        context = self.mock_context.return_value
+
+        with mock.patch('kmip.services.kmip_client.socket.socket'):
+            self.client.open()
+
+        self.assertEqual(
+            session, context.wrap_socket.call_args[1]['session'])
+        self.client.socket = None
+
+    def test_open_does_not_share_sessions_across_contexts(self):
+        self.mock_context.side_effect = lambda *args: mock.MagicMock()
+        session = mock.MagicMock()
+        first = KMIPProxy(host='127.0.0.1', port=5696, certfile='first.pem',
+                          keyfile='first.key')
+        second = KMIPProxy(host='127.0.0.1', port=5696,
+                           certfile='second.pem', keyfile='second.key')
+
+        with mock.patch('kmip.services.kmip_client.socket.socket'):
+            first.open()
+            first.socket.session = session
+            first.close()
+            second.open()
+            second_context = second._get_ssl_context()
+            second.socket = None
+            first.open()
+            first_context = first._get_ssl_context()
+            first.socket = None
+
+        self.assertNotEqual(first_context, second_context)
+        self.assertIsNone(
+            second_context.wrap_socket.call_args[1]['session'])
+        self.assertEqual(
+            session, first_context.wrap_socket.call_args[1]['session'])
+
+    def test_open_without_ssl_session_support(self):
+        ssl_module = mock.MagicMock(
+            spec=['SSLContext', 'CERT_REQUIRED', 'PROTOCOL_SSLv23'])
+        context = ssl_module.SSLContext.return_value
+
+        with mock.patch('kmip.services.kmip_client.socket.socket'):
+            with mock.patch('kmip.services.kmip_client.ssl', ssl_module):
+                self.client.open()
+                self.client.socket = None
+
+        self.assertNotIn('session', context.wrap_socket.call_args[1])
+
+    def test_open_without_ssl_context_support(self):
+        ssl_module = mock.MagicMock(
+            spec=['wrap_socket', 'CERT_REQUIRED', 'PROTOCOL_SSLv23'])
+
+        with mock.patch('kmip.services.kmip_client.socket.socket'):
+            with mock.patch('kmip.services.kmip_client.ssl', ssl_module):
+                self.client.open()
+                self.client.socket = None
+
+        self.assertEqual(0, self.mock_context.call_count)
+        self.assertEqual(1, ssl_module.wrap_socket.call_count)
+        self.assertEqual(
+            self.client.ca_certs,
+            ssl_module.wrap_socket.call_args[1]['ca_certs'])
+
+
 class TestClientProfileInformation(TestCase):
     """
     A test suite for client profile information support.
@@ -0,0 +1,58 @@
+# Copyright (c) 2014 The Johns Hopkins University/Applied Physics Laboratory
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import mock
+
+from testtools import TestCase
+
+from kmip.services.kmip_protocol import KMIPProtocol
+
+
+class TestKMIPProtocol(TestCase):
+
+    def setUp(self):
+        super(TestKMIPProtocol, self).setUp()
+        self.frame = b'\x42\x00\x78\x01\x00\x00\x00\x02\xab\xcd'
+        self.socket = mock.MagicMock()
+
+    def tearDown(self):
+        super(TestKMIPProtocol, self).tearDown()
+
+    def test_read(self):
+        self.socket.recv.side_effect = [self.frame[:8], self.frame[8:]]
+        protocol = KMIPProtocol(self.socket)
+
+        stream = protocol.read()
+
+        self.assertEqual(self.frame, bytes(stream.buffer))
+        self.assertFalse(self.socket.settimeout.called)
+
+    def test_read_with_timeouts(self):
+        self.socket.recv.side_effect = [
+            self.frame[:3], self.frame[3:8], self.frame[8:]]
+        protocol = KMIPProtocol(self.socket, idle_timeout=300,
+                                read_timeout=5)
+
+        stream = protocol.read()
+
+        self.assertEqual(self.frame, bytes(stream.buffer))
+        self.assertEqual([mock.call(300), mock.call(5)],
+                         self.socket.settimeout.call_args_list)
+
+    def test_read_closed_while_idle(self):
+        self.socket.recv.return_value = b''
+        protocol = KMIPProtocol(self.socket, read_timeout=5)
+
+        self.assertRaises(Exception, protocol.read)
@@ -0,0 +1,815 @@
+# Copyright (c) 2014 The Johns Hopkins University/Applied Physics Laboratory
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import errno
+import mock
+import signal
+import socket
+import ssl
+
+from testtools import TestCase
+
+from kmip.core.config_helper import ConfigHelper
+from kmip.core.enums import Operation
+
+from kmip.services import profiling
+from kmip.services.kmip_server import _ServedConnection
+from kmip.services.kmip_server import KMIPServer
+from kmip.services.kmip_server import KMIPServerSupervisor
+
+from six.moves import queue
+
+
+class TestKMIPServer(TestCase):
+
+    def setUp(self):
+        super(TestKMIPServer, self).setUp()
+
+        socket_patcher = mock.patch('kmip.services.kmip_server.socket.socket')
+        self.mock_socket = socket_patcher.start()
+        self.addCleanup(socket_patcher.stop)
+
+        context_patcher = mock.patch(
+            'kmip.services.kmip_server.ssl.SSLContext')
+        self.mock_context = context_patcher.start()
+        self.addCleanup(context_patcher.stop)
+
+    def tearDown(self):
+        super(TestKMIPServer, self).tearDown()
+
+    def _build_server(self, **kwargs):
+        return KMIPServer(host='127.0.0.1', port=5696,
+                          keyfile='/test/server.key',
+                          certfile='/test/server.crt',
+                          **kwargs)
+
+    def test_init_builds_ssl_context(self):
+        server = self._build_server()
+
+        self.mock_context.assert_called_once_with(server.ssl_version)
+        context = self.mock_context.return_value
+        context.load_cert_chain.assert_called_once_with(
+            '/test/server.crt', '/test/server.key')
+        self.assertEqual(context, server._ssl_context)
+
+    def test_init_with_ciphers(self):
+        self._build_server(ciphers='AES128-SHA')
+
+        context = self.mock_context.return_value
+        context.set_ciphers.assert_called_once_with('AES128-SHA')
+
+    def test_init_without_session_tickets(self):
+        self.mock_context.return_value.options = 0
+        self._build_server(session_tickets='False')
+
+        context = self.mock_context.return_value
+        self.assertTrue(context.options & ssl.OP_NO_TICKET)
+
+    def test_reload_ssl_context(self):
+        server = self._build_server()
+        old_context = server._ssl_context
+        new_context = mock.MagicMock()
+        self.mock_context.return_value = new_context
+
+        self.assertTrue(server.reload_ssl_context())
+        self.assertEqual(new_context, server._ssl_context)
+        self.assertNotEqual(old_context, server._ssl_context)
+
+    def test_reload_ssl_context_keeps_old_context_on_failure(self):
+        server = self._build_server()
+        old_context = server._ssl_context
+        self.mock_context.return_value.load_cert_chain.side_effect = IOError(
+            'missing certificate file')
+
+        self.assertFalse(server.reload_ssl_context())
+        self.assertEqual(old_context, server._ssl_context)
+
+    def test_start_workers(self):
+        server = self._build_server(max_workers=3)
+
+        with mock.patch.object(server, '_run_worker'):
+            server._start_workers()
+            server._start_workers()
+
+        self.assertEqual(3, len(server._workers))
+
+    def test_init_with_invalid_max_workers(self):
+        server = self._build_server(max_workers='-1')
+
+        self.assertEqual(8, server.max_workers)
+
+    def test_handle_connection_closes_on_error(self):
+        server = self._build_server()
+        connection = mock.MagicMock()
+        server._processor = mock.MagicMock()
+        server._processor.process.side_effect = [None, Exception('closed')]
+
+        server._handle_connection(connection, ('127.0.0.1', 40000))
+
+        self.assertEqual(2, server._processor.process.call_count)
+        tls_connection = server._ssl_context.wrap_socket.return_value
+        tls_connection.close.assert_called_once_with()
+
+    def test_handshake(self):
+        server = self._build_server(handshake_timeout=5)
+        connection = mock.MagicMock()
+
+        tls_connection = server._handshake(connection)
+
+        server._ssl_context.wrap_socket.assert_called_once_with(
+            connection, server_side=True, do_handshake_on_connect=False,
+            suppress_ragged_eofs=server.suppress_ragged_eofs)
+        tls_connection.settimeout.assert_any_call(5.0)
+        tls_connection.do_handshake.assert_called_once_with()
+        tls_connection.settimeout.assert_called_with(None)
+
+        statistics = server.get_handshake_statistics()
+        self.assertEqual(1, statistics['handshakes'])
+        self.assertEqual(0, statistics['failures'])
+
+    def test_handshake_timeout(self):
+        server = self._build_server()
+        tls_connection = server._ssl_context.wrap_socket.return_value
+        tls_connection.do_handshake.side_effect = socket.timeout()
+        server._processor = mock.MagicMock()
+
+        server._handle_connection(mock.MagicMock(), ('127.0.0.1', 40000))
+
+        tls_connection.close.assert_called_once_with()
+        self.assertFalse(server._processor.process.called)
+        statistics = server.get_handshake_statistics()
+        self.assertEqual(0, statistics['handshakes'])
+        self.assertEqual(1, statistics['timeouts'])
+
+    def test_handshake_failure(self):
+        server = self._build_server()
+        tls_connection = server._ssl_context.wrap_socket.return_value
+        tls_connection.do_handshake.side_effect = ssl.SSLError()
+
+        self.assertRaises(ssl.SSLError, server._handshake, mock.MagicMock())
+        tls_connection.close.assert_called_once_with()
+        self.assertEqual(1, server.get_handshake_statistics()['failures'])
+
+    def test_get_handshake_statistics(self):
+        server = self._build_server()
+        server._record_handshake('handshakes', 0.25)
+        server._record_handshake('handshakes', 0.75)
+        server._record_handshake('failures')
+
+        self.assertEqual({'handshakes': 2, 'failures': 1, 'timeouts': 0,
+                          'average_latency': 0.5, 'max_latency': 0.75},
+                         server.get_handshake_statistics())
+
+    def test_init_with_reuse_port(self):
+        self._build_server(reuse_port='True')
+
+        sock = self.mock_socket.return_value
+        sock.setsockopt.assert_any_call(
+            socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+
+    def test_init_without_reuse_port(self):
+        self._build_server(reuse_port='False')
+
+        sock = self.mock_socket.return_value
+        for args, kwargs in sock.setsockopt.call_args_list:
+            self.assertNotEqual(getattr(socket, 'SO_REUSEPORT', None),
+                                args[1])
+
+    @mock.patch('kmip.services.kmip_server.SQLiteRepo')
+    def test_init_with_database_path(self, mock_repo):
+        server = self._build_server(database_path='/test/kmip.db')
+
+        mock_repo.assert_called_once_with('/test/kmip.db')
+        self.assertEqual(mock_repo.return_value,
+                         server._processor._handler.repo)
+
+    def test_init_with_async_workers(self):
+        server = self._build_server(async_workers='1', max_async_jobs='16')
+        self.addCleanup(server._processor._jobs.close)
+
+        self.assertEqual(16, server._processor._jobs.max_jobs)
+
+    def test_init_without_async_workers(self):
+        server = self._build_server(async_workers='0')
+
+        self.assertIsNone(server._processor._jobs)
+
+    def test_init_with_key_pool(self):
+        server = self._build_server(key_pool_size='8',
+                                    key_pool_low_water_mark='16')
+        key_pool = server._processor._handler.key_pool
+        self.addCleanup(key_pool.close)
+
+        self.assertEqual(8, key_pool.size)
+        self.assertEqual(8, key_pool.low_water_mark)
+
+    def test_init_without_key_pool(self):
+        server = self._build_server(key_pool_size='0')
+
+        self.assertIsNone(server._processor._handler.key_pool)
+
+    def test_init_with_key_pair_generator(self):
+        server = self._build_server(key_pair_workers='0',
+                                    key_pair_pool_size='0',
+                                    key_pair_low_water_mark='4')
+        generator = server._processor._handler.key_pair_generator
+
+        self.assertEqual(0, generator.workers)
+        self.assertIsNone(generator.pool)
+        self.assertEqual(0, server.key_pair_low_water_mark)
+
+    def test_init_with_get_cache(self):
+        server = self._build_server(get_cache_size='32',
+                                    get_cache_max_bytes='1024')
+
+        cache = server._processor._get_cache
+        self.assertEqual(32, cache.max_entries)
+        self.assertEqual(1024, cache.max_bytes)
+
+    @mock.patch('kmip.services.kmip_server.SQLiteRepo')
+    def test_init_with_database_disables_get_cache(self, mock_repo):
+        server = self._build_server(database_path='/test/kmip.db',
+                                    get_cache_size='32')
+
+        self.assertEqual(0, server.get_cache_size)
+        self.assertIsNone(server._processor._get_cache)
+
+    def test_get_metrics(self):
+        server = self._build_server(key_pool_size='0')
+        server._admit_connection()
+        server._record_handshake('handshakes', 0.01)
+
+        snapshot = server.get_metrics()
+
+        self.assertEqual({(): 1}, snapshot['kmip_connections_active'])
+        self.assertEqual({(): 1}, snapshot['kmip_tls_handshakes_total'])
+        self.assertEqual(1, snapshot['kmip_handshake_seconds'][()]['count'])
+        self.assertNotIn('kmip_key_pool_keys', snapshot)
+
+    @mock.patch('kmip.services.kmip_server.metrics.MetricsServer')
+    def test_serve_starts_metrics_server(self, mock_metrics_server):
+        server = self._build_server(metrics_port='9696')
+        sock = self.mock_socket.return_value
+        sock.accept.side_effect = StopIteration()
+
+        with mock.patch.object(server, '_start_workers'):
+            self.assertRaises(StopIteration, server.serve)
+        server.close()
+
+        mock_metrics_server.assert_called_once_with(
+            server._processor.metrics, '127.0.0.1', 9696)
+        metrics_server = mock_metrics_server.return_value
+        metrics_server.start.assert_called_once_with()
+        metrics_server.close.assert_called_once_with()
+
+    @mock.patch('kmip.services.kmip_server.metrics.MetricsServer')
+    def test_serve_without_metrics_port(self, mock_metrics_server):
+        server = self._build_server()
+        server._start_metrics_server()
+
+        self.assertFalse(mock_metrics_server.called)
+
+    def test_serve_listens_with_backlog(self):
+        server = self._build_server(backlog=64)
+        sock = self.mock_socket.return_value
+        sock.accept.side_effect = StopIteration()
+
+        with mock.patch.object(server, '_start_workers'):
+            self.assertRaises(StopIteration, server.serve)
+
+        sock.listen.assert_called_once_with(64)
+
+    def test_serve_refuses_connections_at_capacity(self):
+        server = self._build_server(max_connections=1)
+        connections = [mock.MagicMock(), mock.MagicMock()]
+        sock = self.mock_socket.return_value
+        sock.accept.side_effect = [(connections[0], ('127.0.0.1', 40000)),
+                                   (connections[1], ('127.0.0.1', 40001)),
+                                   StopIteration()]
+
+        with mock.patch.object(server, '_start_workers'):
+            self.assertRaises(StopIteration, server.serve)
+
+        self.assertEqual(1, server._connections.qsize())
+        self.assertFalse(connections[0].close.called)
+        connections[1].close.assert_called_once_with()
+        self.assertEqual({'active': 1, 'refused': 1},
+                         server.get_connection_statistics())
+
+    def test_connection_limit_follows_capacity(self):
+        server = self._build_server(max_workers='2', max_queued='3')
+
+        self.assertEqual(1024, server.max_connections)
+        self.assertEqual(5, server._get_connection_limit())
+        server.max_connections = 4
+        self.assertEqual(4, server._get_connection_limit())
+
+    def test_serve_refuses_connections_when_queue_is_full(self):
+        server = self._build_server()
+        server._connections = queue.Queue(maxsize=1)
+        server._connections.put(None)
+        connection = mock.MagicMock()
+        sock = self.mock_socket.return_value
+        sock.accept.side_effect = [(connection, ('127.0.0.1', 40000)),
+                                   StopIteration()]
+
+        with mock.patch.object(server, '_start_workers'):
+            self.assertRaises(StopIteration, server.serve)
+
+        connection.close.assert_called_once_with()
+        self.assertEqual({'active': 0, 'refused': 1},
+                         server.get_connection_statistics())
+
+    def test_init_queue_and_idle_timeouts(self):
+        server = self._build_server()
+
+        self.assertEqual(5.0, server.queue_timeout)
+        self.assertEqual(60.0, server.idle_timeout)
+
+    def test_expire_queued_connections(self):
+        server = self._build_server(queue_timeout='1')
+        connections = [mock.MagicMock(), mock.MagicMock()]
+
+        with mock.patch('kmip.services.kmip_server.time.time') as clock:
+            for now, connection in zip((100.0, 105.0), connections):
+                clock.return_value = now
+                server._admit_connection()
+                server._connections.put_nowait(
+                    (connection, ('127.0.0.1', 40000)))
+            clock.return_value = 105.5
+            server._expire_queued_connections()
+
+        connections[0].close.assert_called_once_with()
+        self.assertFalse(connections[1].close.called)
+        self.assertEqual((connections[1], ('127.0.0.1', 40000)),
+                         server._connections.get_nowait())
+        self.assertEqual({'active': 1, 'refused': 1},
+                         server.get_connection_statistics())
+
+    def test_handle_connection_idle_timeout(self):
+        server = self._build_server(idle_timeout=60, read_timeout=5)
+        connection = mock.MagicMock()
+        tls_connection = server._ssl_context.wrap_socket.return_value
+        tls_connection.recv.side_effect = socket.timeout()
+
+        server._handle_connection(connection, ('127.0.0.1', 40000))
+
+        tls_connection.settimeout.assert_called_with(60.0)
+        tls_connection.close.assert_called_once_with()
+
+    def _serve_connection(self, server, busy=False):
+        served = _ServedConnection(mock.MagicMock(), mock.MagicMock(),
+                                   server._connection_lock)
+        served.busy = busy
+        server._served_connections.add(served)
+        server._admit_connection()
+        return served
+
+    def test_init_with_listen_fd(self):
+        with mock.patch('kmip.services.kmip_server.socket.fromfd') as fromfd:
+            with mock.patch('kmip.services.kmip_server.os.close') as close:
+                server = self._build_server(listen_fd='7')
+
+        fromfd.assert_called_once_with(7, socket.AF_INET, socket.SOCK_STREAM)
+        close.assert_called_once_with(7)
+        self.assertEqual(fromfd.return_value, server.socket)
+        self.assertFalse(self.mock_socket.return_value.bind.called)
+
+    def test_init_without_listen_fd(self):
+        server = self._build_server()
+
+        self.assertIsNone(server.listen_fd)
+        self.mock_socket.return_value.bind.assert_called_once_with(
+            ('127.0.0.1', 5696))
+
+    def test_drain_closes_idle_connections(self):
+        server = self._build_server()
+        served = self._serve_connection(server)
+
+        def shutdown():
+            # The worker serving the connection stops and releases it.
+            server._served_connections.discard(served)
+            server._release_connection()
+
+        served.shutdown = mock.MagicMock(side_effect=shutdown)
+
+        self.assertTrue(server.drain())
+
+        self.assertTrue(served.closing)
+        served.shutdown.assert_called_once_with()
+        sock = self.mock_socket.return_value
+        sock.shutdown.assert_called_once_with(socket.SHUT_RDWR)
+        sock.close.assert_called_once_with()
+
+    def test_drain_closes_busy_connections_after_timeout(self):
+        server = self._build_server(shutdown_timeout='0.01')
+        served = self._serve_connection(server, busy=True)
+
+        self.assertFalse(server.drain())
+
+        self.assertFalse(served.closing)
+        served.connection.shutdown.assert_called_once_with(socket.SHUT_RDWR)
+
+    def test_drain_closes_queued_connections(self):
+        server = self._build_server()
+        connection = mock.MagicMock()
+        server._admit_connection()
+        server._connections.put((connection, ('127.0.0.1', 40000)))
+
+        self.assertTrue(server.drain())
+
+        connection.close.assert_called_once_with()
+        self.assertEqual(0, server.get_connection_statistics()['active'])
+
+    def test_close_closes_processor(self):
+        server = self._build_server()
+
+        with mock.patch.object(server._processor, 'close') as close:
+            server.close()
+
+        close.assert_called_once_with()
+
+    def test_drain_closes_processor(self):
+        server = self._build_server()
+
+        with mock.patch.object(server._processor, 'close') as close:
+            server.drain()
+
+        close.assert_called_once_with()
+
+    def test_close_after_drain(self):
+        server = self._build_server()
+        server.drain()
+        server.close()
+
+        self.mock_socket.return_value.close.assert_called_once_with()
+
+    def test_serve_returns_when_drained(self):
+        server = self._build_server()
+        sock = self.mock_socket.return_value
+
+        def accept():
+            server._draining = True
+            raise socket.error(errno.EINVAL, 'invalid argument')
+
+        sock.accept.side_effect = accept
+
+        with mock.patch.object(server, '_start_workers'):
+            server.serve()
+
+    def test_serve_drains_when_requested(self):
+        server = self._build_server()
+        sock = self.mock_socket.return_value
+
+        def accept():
+            # The first accept() times out after the signal arrived; the
+            # second fails on the socket closed by the drain.
+            if not server._drain_requested:
+                server.request_drain(signal.SIGTERM, None)
+                raise socket.timeout()
+            raise socket.error(errno.EBADF, 'bad file descriptor')
+
+        sock.accept.side_effect = accept
+
+        with mock.patch.object(server, '_start_workers'):
+            server.serve()
+
+        self.assertTrue(server._draining)
+        self.assertEqual(2, sock.accept.call_count)
+        sock.settimeout.assert_called_once_with(server.ACCEPT_TIMEOUT)
+        sock.shutdown.assert_called_once_with(socket.SHUT_RDWR)
+
+    def test_request_drain_does_not_close_listener(self):
+        server = self._build_server()
+
+        server.request_drain(signal.SIGTERM, None)
+
+        self.assertFalse(server._draining)
+        self.assertFalse(self.mock_socket.return_value.close.called)
+
+    @mock.patch('kmip.services.kmip_server.subprocess.Popen')
+    def test_start_successor(self, mock_popen):
+        server = self._build_server()
+        sock = self.mock_socket.return_value
+        sock.fileno.return_value = 7
+
+        process = server.start_successor(
+            ['kmip-server', '--listen_fd', '{listen_fd}'])
+
+        self.assertEqual(mock_popen.return_value, process)
+        args, kwargs = mock_popen.call_args
+        self.assertEqual((['kmip-server', '--listen_fd', '7'],), args)
+        self.assertIn(kwargs, [{'pass_fds': (7,)}, {'close_fds': False}])
+
+        # The successor shares the socket, so draining must not shut it
+        # down.
+        server.drain()
+        self.assertFalse(sock.shutdown.called)
+        sock.close.assert_called_once_with()
+
+    def test_serve_raises_socket_errors(self):
+        server = self._build_server()
+        sock = self.mock_socket.return_value
+        sock.accept.side_effect = socket.error(errno.EMFILE, 'too many files')
+
+        with mock.patch.object(server, '_start_workers'):
+            self.assertRaises(socket.error, server.serve)
+
+    def test_handle_connection_closes_after_request_when_draining(self):
+        server = self._build_server()
+        server._processor = mock.MagicMock()
+
+        def process(istream, ostream):
+            server._draining = True
+
+        server._processor.process.side_effect = process
+
+        server._handle_connection(mock.MagicMock(), ('127.0.0.1', 40000))
+
+        self.assertEqual(1, server._processor.process.call_count)
+        tls_connection = server._ssl_context.wrap_socket.return_value
+        tls_connection.close.assert_called_once_with()
+        self.assertEqual(set(), server._served_connections)
+
+    def test_handle_connection_when_draining(self):
+        server = self._build_server()
+        server._draining = True
+        server._processor = mock.MagicMock()
+
+        server._handle_connection(mock.MagicMock(), ('127.0.0.1', 40000))
+
+        self.assertFalse(server._processor.process.called)
+        tls_connection = server._ssl_context.wrap_socket.return_value
+        tls_connection.close.assert_called_once_with()
+
+    def test_served_connection_read(self):
+        server = self._build_server()
+        served = self._serve_connection(server)
+
+        stream = served.read()
+
+        self.assertEqual(served.protocol.read.return_value, stream)
+        self.assertTrue(served.busy)
+
+    def test_served_connection_read_when_closing(self):
+        server = self._build_server()
+        served = self._serve_connection(server)
+        served.closing = True
+
+        self.assertRaises(socket.error, served.read)
+        self.assertFalse(served.busy)
+
+    def _reload_config(self, server, values):
+        def get_valid_value(direct_value, section, name, default_value):
+            if direct_value:
+                return direct_value
+            return values.get(name, default_value)
+
+        with mock.patch.object(ConfigHelper, 'get_valid_value',
+                               side_effect=get_valid_value):
+            return server.reload_config()
+
+    def test_reload_config(self):
+        server = self._build_server(max_connections='4')
+        new_context = mock.MagicMock()
+        self.mock_context.return_value = new_context
+
+        reloaded = self._reload_config(
+            server, {'idle_timeout': '120', 'max_connections': '16',
+                     'certfile': '/new/server.crt'})
+
+        self.assertTrue(reloaded)
+        self.assertEqual(120.0, server.idle_timeout)
+        self.assertEqual(4, server.max_connections)
+        self.assertEqual('/test/server.crt', server.certfile)
+        self.assertEqual(new_context, server._ssl_context)
+
+    def test_reload_config_keeps_settings_on_failure(self):
+        server = self._build_server()
+        old_context = server._ssl_context
+        self.mock_context.return_value.load_cert_chain.side_effect = IOError(
+            'missing certificate file')
+
+        reloaded = self._reload_config(
+            server, {'idle_timeout': '120', 'ciphers': 'AES128-SHA'})
+
+        self.assertFalse(reloaded)
+        self.assertEqual(60.0, server.idle_timeout)
+        self.assertIsNone(server.ciphers)
+        self.assertEqual(old_context, server._ssl_context)
+
+    def test_init_with_rate_limit(self):
+        server = self._build_server(
+            rate_limit='10', rate_limit_burst='20',
+            operation_weights='locate:4, GET:0.5,UNKNOWN:2,CREATE:x',
+            fair_queue_slots='2')
+
+        self.assertEqual({Operation.LOCATE: 4.0, Operation.GET: 0.5},
+                         server.operation_weights)
+        processor = server._processor
+        self.assertEqual(10.0, processor._rate_limiter.rate)
+        self.assertEqual(20.0, processor._rate_limiter.burst)
+        self.assertEqual(2, processor._fair_queue.slots)
+        self.assertEqual(server.operation_weights,
+                         processor._operation_weights)
+
+    def test_init_without_rate_limit(self):
+        server = self._build_server(fair_queue_slots='0')
+
+        self.assertIsNone(server._processor._rate_limiter)
+        self.assertIsNone(server._processor._fair_queue)
+
+    def test_init_with_max_response_size(self):
+        server = self._build_server(max_response_size='4096')
+
+        self.assertEqual(4096, server.max_response_size)
+        self.assertEqual(4096, server._processor._max_response_size)
+
+    def test_init_without_max_response_size(self):
+        server = self._build_server(max_response_size='None')
+
+        self.assertIsNone(server._processor._max_response_size)
+
+    def test_init_with_idempotency_cache(self):
+        server = self._build_server(idempotency_cache_size='8',
+                                    idempotency_cache_ttl='60')
+
+        cache = server._processor._idempotency_cache
+        self.assertEqual(8, cache.max_entries)
+        self.assertEqual(60.0, cache.ttl)
+
+    def test_init_without_idempotency_cache(self):
+        server = self._build_server(idempotency_cache_size='0')
+
+        self.assertIsNone(server._processor._idempotency_cache)
+
+    def test_init_idempotency_cache_disabled_by_default(self):
+        server = self._build_server()
+
+        self.assertEqual(0, server.idempotency_cache_size)
+        self.assertIsNone(server._processor._idempotency_cache)
+
+    def test_init_with_coalesce_reads(self):
+        server = self._build_server(coalesce_reads='True')
+
+        self.assertTrue(server.coalesce_reads)
+        self.assertIsNotNone(server._processor._coalescer)
+
+    def test_init_without_coalesce_reads(self):
+        server = self._build_server(coalesce_reads='False')
+
+        self.assertIsNone(server._processor._coalescer)
+
+    def test_init_optimizations_disabled_by_default(self):
+        server = self._build_server()
+        processor = server._processor
+
+        self.assertFalse(server.coalesce_reads)
+        self.assertIsNone(processor._coalescer)
+        self.assertIsNone(processor._pool)
+        self.assertIsNone(processor._get_cache)
+        self.assertIsNone(processor._fair_queue)
+        self.assertIsNone(processor._handler.key_pool)
+        self.assertIsNone(processor._handler.key_pair_generator.pool)
+
+    def test_get_client_identity(self):
+        server = self._build_server()
+        certificate = {'subject': ((('organizationName', 'Example'),),
+                                   (('commonName', 'client'),))}
+
+        self.assertEqual('organizationName=Example,commonName=client',
+                         server._get_client_identity(certificate))
+        self.assertIsNone(server._get_client_identity({}))
+        self.assertIsNone(server._get_client_identity(None))
+
+    def test_handle_connection_passes_client_identity(self):
+        server = self._build_server()
+        server._processor = mock.MagicMock()
+        server._processor.process.side_effect = Exception('closed')
+        tls_connection = server._ssl_context.wrap_socket.return_value
+        tls_connection.getpeercert.return_value = {
+            'subject': ((('commonName', 'client'),),)}
+
+        server._handle_connection(mock.MagicMock(), ('127.0.0.1', 40000))
+
+        self.assertEqual('commonName=client',
+                         server._processor.process.call_args[0][2])
+
+    def test_init_with_profile_mode(self):
+        self.addCleanup(profiling.disable)
+        self._build_server(profile_mode='stack', profile_sample_rate='5',
+                           profile_interval='60')
+
+        self.assertIsInstance(profiling.profiler, profiling.StackSampler)
+        self.assertEqual(5, profiling.profiler.sample_rate)
+        self.assertEqual(60.0, profiling.profiler.interval)
+
+    def test_init_with_invalid_profile_mode(self):
+        server = self._build_server(profile_mode='dtrace')
+
+        self.assertIsNone(server.profile_mode)
+        self.assertIsNone(profiling.profiler)
+
+    def test_toggle_profiling(self):
+        self.addCleanup(profiling.disable)
+        server = self._build_server(profile_sample_rate='3',
+                                    profile_file='/test/profile')
+
+        self.assertTrue(server.toggle_profiling())
+        profiler = profiling.profiler
+        self.assertIsInstance(profiler, profiling.CProfileSampler)
+        self.assertEqual(3, profiler.sample_rate)
+
+        with mock.patch.object(profiler, 'dump') as dump:
+            self.assertFalse(server.toggle_profiling())
+
+        dump.assert_called_once_with('/test/profile')
+        self.assertIsNone(profiling.profiler)
+
+    def test_dump_profile_when_disabled(self):
+        server = self._build_server()
+
+        self.assertIsNone(server.dump_profile())
+
+
+class TestKMIPServerSupervisor(TestCase):
+
+    def setUp(self):
+        super(TestKMIPServerSupervisor, self).setUp()
+
+        os_patcher = mock.patch('kmip.services.kmip_server.os')
+        self.mock_os = os_patcher.start()
+        self.addCleanup(os_patcher.stop)
+
+        signal_patcher = mock.patch('kmip.services.kmip_server.signal.signal')
+        self.mock_signal = signal_patcher.start()
+        self.addCleanup(signal_patcher.stop)
+
+    def tearDown(self):
+        super(TestKMIPServerSupervisor, self).tearDown()
+
+    def test_init_invalid_processes(self):
+        self.assertRaises(ValueError, KMIPServerSupervisor, mock.MagicMock(),
+                          0)
+
+    def test_serve_restarts_exited_workers(self):
+        supervisor = KMIPServerSupervisor(mock.MagicMock(), 2,
+                                          restart_delay=0)
+        self.mock_os.fork.side_effect = [101, 102, 103]
+
+        def wait():
+            if self.mock_os.wait.call_count == 1:
+                return (101, 256)
+            if self.mock_os.wait.call_count == 2:
+                supervisor.close()
+                return (102, 0)
+            return (103, 0)
+
+        self.mock_os.wait.side_effect = wait
+        supervisor.serve()
+
+        self.assertEqual(3, self.mock_os.fork.call_count)
+        self.mock_os.kill.assert_any_call(102, signal.SIGTERM)
+        self.mock_os.kill.assert_any_call(103, signal.SIGTERM)
+
+    def test_serve_stops_when_no_children_remain(self):
+        supervisor = KMIPServerSupervisor(mock.MagicMock(), 1)
+        self.mock_os.fork.return_value = 101
+        self.mock_os.wait.side_effect = OSError(errno.ECHILD, 'no children')
+
+        supervisor.serve()
+
+        self.assertEqual(1, self.mock_os.fork.call_count)
+
+    def test_spawn_runs_server_in_child(self):
+        factory = mock.MagicMock()
+        supervisor = KMIPServerSupervisor(factory, 1)
+        self.mock_os.fork.return_value = 0
+
+        supervisor._spawn(0)
+
+        factory.return_value.serve.assert_called_once_with()
+        self.mock_signal.assert_any_call(signal.SIGTERM,
+                                         factory.return_value.request_drain)
+        self.mock_os._exit.assert_called_once_with(0)
+
+    def test_spawn_exits_with_error_when_server_fails(self):
+        factory = mock.MagicMock(side_effect=IOError('bad certificate'))
+        supervisor = KMIPServerSupervisor(factory, 1)
+        self.mock_os.fork.return_value = 0
+
+        supervisor._spawn(0)
+
+        self.mock_os._exit.assert_called_once_with(1)
@@ -0,0 +1,146 @@
+# Copyright (c) 2015 Hewlett Packard Development Company, L.P.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from six.moves.urllib.error import HTTPError
+from six.moves.urllib.request import urlopen
+
+from testtools import TestCase
+
+from kmip.services import metrics
+from kmip.services.metrics import Histogram
+from kmip.services.metrics import Metrics
+from kmip.services.metrics import MetricsServer
+
+
+class TestHistogram(TestCase):
+
+    def setUp(self):
+        super(TestHistogram, self).setUp()
+
+    def tearDown(self):
+        super(TestHistogram, self).tearDown()
+
+    def test_observe(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+
+        self.assertEqual([2, 1, 1], histogram.counts)
+        self.assertEqual(4, histogram.count)
+        self.assertEqual(2.65, histogram.sum)
+        self.assertEqual([(0.1, 2), (1.0, 3), (None, 4)],
+                         histogram.get_cumulative_counts())
+
+
+class TestMetrics(TestCase):
+
+    def setUp(self):
+        super(TestMetrics, self).setUp()
+        self.metrics = Metrics(buckets=(0.1, 1.0))
+
+    def tearDown(self):
+        super(TestMetrics, self).tearDown()
+
+    def test_increment(self):
+        labels = (('operation', 'GET'),)
+        self.metrics.increment('requests', labels)
+        self.metrics.increment('requests', labels, 2)
+        self.metrics.increment('bytes', amount=10)
+
+        snapshot = self.metrics.snapshot()
+
+        self.assertEqual({labels: 3}, snapshot['requests'])
+        self.assertEqual({(): 10}, snapshot['bytes'])
+
+    def test_observe(self):
+        self.metrics.observe('latency', 0.5, (('operation', 'GET'),))
+
+        snapshot = self.metrics.snapshot()
+
+        self.assertEqual(
+            {'count': 1, 'sum': 0.5,
+             'buckets': [(0.1, 0), (1.0, 1), (None, 1)]},
+            snapshot['latency'][(('operation', 'GET'),)])
+
+    def test_register_gauge(self):
+        values = [1, 2]
+        self.metrics.register_gauge('active', values.pop)
+
+        self.assertEqual({(): 2}, self.metrics.snapshot()['active'])
+        self.assertEqual({(): 1}, self.metrics.snapshot()['active'])
+
+    def test_register_gauge_skips_failing_function(self):
+        def fail():
+            raise RuntimeError('closed')
+        self.metrics.register_gauge('active', fail)
+
+        self.assertNotIn('active', self.metrics.snapshot())
+
+    def test_render(self):
+        self.metrics.describe('requests', metrics.COUNTER, 'Requests')
+        self.metrics.increment('requests', (('operation', 'GET'),))
+        self.metrics.observe('latency', 0.05)
+        self.metrics.register_gauge('active', lambda: 4, 'Connections')
+
+        self.assertEqual(
+            '# HELP active Connections\n'
+            '# TYPE active gauge\n'
+            'active 4\n'
+            '# TYPE latency histogram\n'
+            'latency_bucket{le="0.1"} 1\n'
+            'latency_bucket{le="1.0"} 1\n'
+            'latency_bucket{le="+Inf"} 1\n'
+            'latency_sum 0.05\n'
+            'latency_count 1\n'
+            '# HELP requests Requests\n'
+            '# TYPE requests counter\n'
+            'requests{operation="GET"} 1\n',
+            self.metrics.render())
+
+    def test_render_escapes_label_values(self):
+        self.metrics.increment('requests', (('reason', 'a "b"\\'),))
+
+        self.assertIn('requests{reason="a \\"b\\"\\\\"} 1',
+                      self.metrics.render())
+
+
+class TestMetricsServer(TestCase):
+
+    def setUp(self):
+        super(TestMetricsServer, self).setUp()
+        self.metrics = Metrics()
+        self.server = MetricsServer(self.metrics, port=0)
+        self.server.start()
+        self.addCleanup(self.server.close)
+
+    def tearDown(self):
+        super(TestMetricsServer, self).tearDown()
+
+    def _url(self, path):
+        host, port = self.server.address
+        return 'http://{0}:{1}{2}'.format(host, port, path)
+
+    def test_scrape(self):
+        self.metrics.increment('requests')
+
+        response = urlopen(self._url('/metrics'))
+
+        self.assertEqual(MetricsServer.CONTENT_TYPE,
+                         response.headers['Content-Type'])
+        self.assertIn('requests 1', response.read().decode('utf-8'))
+
+    def test_unknown_path(self):
+        e = self.assertRaises(HTTPError, urlopen, self._url('/'))
+        self.assertEqual(404, e.code)
@@ -0,0 +1,1073 @@
+# Copyright (c) 2014 The Johns Hopkins University/Applied Physics Laboratory
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import mock
+
+from testtools import TestCase
+
+from kmip.core.attributes import ObjectType
+from kmip.core.attributes import PrivateKeyUniqueIdentifier
+from kmip.core.attributes import UniqueIdentifier
+
+from kmip.core.enums import AttributeType
+from kmip.core.enums import BatchErrorContinuationOption
+from kmip.core.enums import CancellationResult
+from kmip.core.enums import CredentialType
+from kmip.core.enums import CryptographicAlgorithm
+from kmip.core.enums import CryptographicUsageMask
+from kmip.core.enums import ObjectType as ObjectTypeEnum
+from kmip.core.enums import Operation as OperationEnum
+from kmip.core.enums import QueryFunction as QueryFunctionEnum
+from kmip.core.enums import ResultReason
+from kmip.core.enums import ResultStatus
+
+from kmip.core.factories.attributes import AttributeFactory
+from kmip.core.key_pair_generator import KeyPairGenerator
+
+from kmip.core.messages import contents
+from kmip.core.messages import messages
+from kmip.core.messages.payloads import activate
+from kmip.core.messages.payloads import cancel
+from kmip.core.messages.payloads import create
+from kmip.core.messages.payloads import create_key_pair
+from kmip.core.messages.payloads import destroy
+from kmip.core.messages.payloads import discover_versions
+from kmip.core.messages.payloads import get
+from kmip.core.messages.payloads import locate
+from kmip.core.messages.payloads import poll
+from kmip.core.messages.payloads import query
+from kmip.core.messages.payloads import rekey_key_pair
+
+from kmip.core.misc import QueryFunction
+
+from kmip.core.objects import CommonTemplateAttribute
+from kmip.core.objects import Credential
+from kmip.core.objects import TemplateAttribute
+from kmip.core.server import KMIPImpl
+
+from kmip.core.utils import BytearrayStream
+
+from kmip.services import profiling
+from kmip.services.processor import Processor
+from kmip.services.response_cache import _Flight
+
+
+class FakeStream(object):
+    """
+    A stand-in for KMIPProtocol that replays queued request frames and
+    collects the response frames written by the processor.
+    """
+
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.written = []
+
+    def read(self):
+        return BytearrayStream(self.frames.pop(0))
+
+    def write(self, data):
+        self.written.append(bytes(data))
+
+
+class TestProcessor(TestCase):
+
+    def setUp(self):
+        super(TestProcessor, self).setUp()
+        self.attribute_factory = AttributeFactory()
+        self.processor = Processor(KMIPImpl())
+
+    def tearDown(self):
+        super(TestProcessor, self).tearDown()
+
+    def _build_request(self, batch_items, batch_order_option=None,
+                       batch_error_cont_option=None,
+                       asynchronous_indicator=None, authentication=None,
+                       maximum_response_size=None):
+        if batch_order_option is not None:
+            batch_order_option = contents.BatchOrderOption(
+                batch_order_option)
+        if batch_error_cont_option is not None:
+            batch_error_cont_option = contents.BatchErrorContinuationOption(
+                batch_error_cont_option)
+        if asynchronous_indicator is not None:
+            asynchronous_indicator = contents.AsynchronousIndicator(
+                asynchronous_indicator)
+        if maximum_response_size is not None:
+            maximum_response_size = contents.MaximumResponseSize(
+                maximum_response_size)
+        header = messages.RequestHeader(
+            protocol_version=contents.ProtocolVersion.create(1, 1),
+            asynchronous_indicator=asynchronous_indicator,
+            batch_order_option=batch_order_option,
+            batch_error_cont_option=batch_error_cont_option,
+            authentication=authentication,
+            maximum_response_size=maximum_response_size,
+            batch_count=contents.BatchCount(len(batch_items)))
+        message = messages.RequestMessage(request_header=header,
+                                          batch_items=batch_items)
+        stream = BytearrayStream()
+        message.write(stream)
+        return bytes(stream.buffer)
+
+    def _build_create_item(self):
+        attributes = [
+            self.attribute_factory.create_attribute(
+                AttributeType.CRYPTOGRAPHIC_ALGORITHM,
+                CryptographicAlgorithm.AES),
+            self.attribute_factory.create_attribute(
+                AttributeType.CRYPTOGRAPHIC_USAGE_MASK,
+                [CryptographicUsageMask.ENCRYPT]),
+            self.attribute_factory.create_attribute(
+                AttributeType.CRYPTOGRAPHIC_LENGTH, 128)]
+        payload = create.CreateRequestPayload(
+            object_type=ObjectType(ObjectTypeEnum.SYMMETRIC_KEY),
+            template_attribute=TemplateAttribute(attributes=attributes))
+        return messages.RequestBatchItem(
+            operation=contents.Operation(OperationEnum.CREATE),
+            request_payload=payload)
+
+    def _build_get_item(self, uuid):
+        payload = get.GetRequestPayload(
+            unique_identifier=UniqueIdentifier(uuid))
+        return messages.RequestBatchItem(
+            operation=contents.Operation(OperationEnum.GET),
+            request_payload=payload)
+
+    def _read_response(self, data):
+        response = messages.ResponseMessage()
+        response.read(BytearrayStream(data))
+        return response
+
+    def test_process_pipelined_messages_in_order(self):
+        frames = [self._build_request([self._build_create_item()]),
+                  self._build_request([self._build_get_item('1')]),
+                  self._build_request([self._build_get_item('2')])]
+        stream = FakeStream(frames)
+
+        for _ in frames:
+            self.processor.process(stream, stream)
+
+        self.assertEqual(3, len(stream.written))
+        responses = [self._read_response(data) for data in stream.written]
+
+        operations = [r.batch_items[0].operation.enum for r in responses]
+        self.assertEqual([OperationEnum.CREATE, OperationEnum.GET,
+                          OperationEnum.GET], operations)
+
+        statuses = [r.batch_items[0].result_status.enum for r in responses]
+        self.assertEqual([ResultStatus.SUCCESS, ResultStatus.SUCCESS,
+                          ResultStatus.OPERATION_FAILED], statuses)
+
+    def _process_batch(self, processor, batch_items, **kwargs):
+        stream = FakeStream([self._build_request(batch_items, **kwargs)])
+        processor.process(stream, stream)
+        return self._read_response(stream.written[0]).batch_items
+
+    def _build_parallel_processor(self):
+        processor = Processor(KMIPImpl(), batch_parallelism=4)
+        self.addCleanup(processor._pool.terminate)
+        map_patcher = mock.patch.object(processor._pool, 'map',
+                                        wraps=processor._pool.map)
+        map_patcher.start()
+        self.addCleanup(map_patcher.stop)
+        return processor
+
+    def test_process_unordered_batch_in_parallel(self):
+        processor = self._build_parallel_processor()
+        self._process_batch(processor, [self._build_create_item()])
+
+        items = self._process_batch(
+            processor,
+            [self._build_get_item('1'), self._build_get_item('2'),
+             self._build_get_item('1')],
+            batch_order_option=False)
+
+        self.assertTrue(processor._pool.map.called)
+        statuses = [item.result_status.enum for item in items]
+        self.assertEqual([ResultStatus.SUCCESS, ResultStatus.OPERATION_FAILED],
+                         statuses)
+
+    def test_close(self):
+        handler = KMIPImpl()
+        processor = Processor(handler, batch_parallelism=4, async_workers=1)
+        pool = processor._pool
+        self.addCleanup(pool.terminate)
+        self.addCleanup(processor._jobs.close)
+
+        with mock.patch.object(processor._jobs, 'close') as jobs_close, \
+                mock.patch.object(handler, 'close') as handler_close:
+            processor.close()
+            processor.close()
+
+        self.assertIsNone(processor._pool)
+        self.assertRaises(ValueError, pool.map, len, [])
+        self.assertEqual(2, jobs_close.call_count)
+        self.assertEqual(2, handler_close.call_count)
+
+    def test_process_unordered_batch_continue_in_parallel(self):
+        processor = self._build_parallel_processor()
+
+        items = self._process_batch(
+            processor, [self._build_create_item() for _ in range(4)],
+            batch_order_option=False,
+            batch_error_cont_option=BatchErrorContinuationOption.CONTINUE)
+
+        self.assertTrue(processor._pool.map.called)
+        uuids = set(item.response_payload.unique_identifier.value
+                    for item in items)
+        self.assertEqual(set(['1', '2', '3', '4']), uuids)
+
+    def test_process_unordered_batch_with_side_effects_in_order(self):
+        processor = self._build_parallel_processor()
+
+        items = self._process_batch(
+            processor,
+            [self._build_create_item(), self._build_create_item()],
+            batch_order_option=False)
+
+        self.assertFalse(processor._pool.map.called)
+        uuids = [item.response_payload.unique_identifier.value
+                 for item in items]
+        self.assertEqual(['1', '2'], uuids)
+
+    def test_process_ordered_batch_in_order(self):
+        processor = self._build_parallel_processor()
+
+        self._process_batch(
+            processor,
+            [self._build_get_item('1'), self._build_get_item('2')],
+            batch_order_option=True,
+            batch_error_cont_option=BatchErrorContinuationOption.CONTINUE)
+
+        self.assertFalse(processor._pool.map.called)
+
+    def test_process_unsupported_operation(self):
+        # Check has no payload support; the item is rejected on its own and
+        # the rest of the batch is still processed.
+        unsupported = self._build_get_item('1')
+        unsupported.operation = contents.Operation(OperationEnum.CHECK)
+
+        items = self._process_batch(
+            self.processor, [unsupported, self._build_create_item()],
+            batch_error_cont_option=BatchErrorContinuationOption.CONTINUE)
+
+        self.assertEqual(OperationEnum.CHECK, items[0].operation.enum)
+        self.assertEqual(ResultStatus.OPERATION_FAILED,
+                         items[0].result_status.enum)
+        self.assertEqual(ResultReason.OPERATION_NOT_SUPPORTED,
+                         items[0].result_reason.enum)
+        self.assertEqual(ResultStatus.SUCCESS, items[1].result_status.enum)
+
+    def test_process_unimplemented_operation(self):
+        self.processor.register_operation(
+            OperationEnum.ACTIVATE, mock.MagicMock(
+                side_effect=NotImplementedError()), mock.MagicMock())
+        item = messages.RequestBatchItem(
+            operation=contents.Operation(OperationEnum.ACTIVATE),
+            request_payload=activate.ActivateRequestPayload(
+                unique_identifier=UniqueIdentifier('1')))
+
+        items = self._process_batch(self.processor, [item])
+
+        self.assertEqual(ResultReason.OPERATION_NOT_SUPPORTED,
+                         items[0].result_reason.enum)
+
+    def test_register_operation(self):
+        result = mock.MagicMock()
+        result.result_status = contents.ResultStatus(ResultStatus.SUCCESS)
+        result.result_reason = None
+        result.result_message = None
+        handler = mock.MagicMock(return_value=result)
+        builder = mock.MagicMock(
+            return_value=get.GetRequestPayload(
+                unique_identifier=UniqueIdentifier('1')))
+        self.processor.register_operation(OperationEnum.GET, handler, builder)
+
+        self.processor._process_operation(
+            contents.Operation(OperationEnum.GET), mock.sentinel.payload)
+
+        handler.assert_called_once_with(mock.sentinel.payload)
+        builder.assert_called_once_with(result)
+
+    def test_process_activate(self):
+        item = messages.RequestBatchItem(
+            operation=contents.Operation(OperationEnum.ACTIVATE),
+            request_payload=activate.ActivateRequestPayload(
+                unique_identifier=UniqueIdentifier('1')))
+
+        items = self._process_batch(
+            self.processor, [self._build_create_item(), item, item],
+            batch_error_cont_option=BatchErrorContinuationOption.CONTINUE)
+
+        self.assertEqual(ResultStatus.SUCCESS, items[1].result_status.enum)
+        payload = items[1].response_payload
+        self.assertEqual('1', payload.unique_identifier.value)
+        self.assertEqual(ResultReason.PERMISSION_DENIED,
+                         items[2].result_reason.enum)
+
+    def test_process_create_and_rekey_key_pair(self):
+        def generate(algorithm, length):
+            return (b'public', b'private')
+        processor = Processor(KMIPImpl(key_pair_generator=KeyPairGenerator(
+            workers=0, function=generate)))
+        attributes = [
+            self.attribute_factory.create_attribute(
+                AttributeType.CRYPTOGRAPHIC_ALGORITHM,
+                CryptographicAlgorithm.RSA),
+            self.attribute_factory.create_attribute(
+                AttributeType.CRYPTOGRAPHIC_USAGE_MASK,
+                [CryptographicUsageMask.SIGN]),
+            self.attribute_factory.create_attribute(
+                AttributeType.CRYPTOGRAPHIC_LENGTH, 2048)]
+        create_item = messages.RequestBatchItem(
+            operation=contents.Operation(OperationEnum.CREATE_KEY_PAIR),
+            request_payload=create_key_pair.CreateKeyPairRequestPayload(
+                common_template_attribute=CommonTemplateAttribute(
+                    attributes=attributes)))
+        rekey_item = messages.RequestBatchItem(
+            operation=contents.Operation(OperationEnum.REKEY_KEY_PAIR),
+            request_payload=rekey_key_pair.RekeyKeyPairRequestPayload(
+                private_key_uuid=PrivateKeyUniqueIdentifier('1')))
+
+        items = self._process_batch(
+            processor, [create_item, rekey_item, self._build_get_item('3')])
+
+        self.assertEqual('1', items[0].response_payload.private_key_uuid.value)
+        self.assertEqual('2', items[0].response_payload.public_key_uuid.value)
+        self.assertEqual(OperationEnum.REKEY_KEY_PAIR,
+                         items[1].operation.enum)
+        self.assertEqual('3', items[1].response_payload.private_key_uuid.value)
+        self.assertEqual(ObjectTypeEnum.PRIVATE_KEY,
+                         items[2].response_payload.object_type.enum)
+        key_value = items[2].response_payload.secret.key_block.key_value
+        self.assertEqual(b'private', bytes(key_value.key_material.value))
+
+    def test_process_get_from_cache(self):
+        processor = Processor(KMIPImpl(), get_cache_size=16)
+        self._process_batch(processor, [self._build_create_item()])
+
+        first = self._process_batch(processor, [self._build_get_item('1')])
+        with mock.patch.object(processor._handler, 'get') as get_mock:
+            second = self._process_batch(processor,
+                                         [self._build_get_item('1')])
+
+        self.assertFalse(get_mock.called)
+        key_value = second[0].response_payload.secret.key_block.key_value
+        self.assertEqual(
+            first[0].response_payload.secret.key_block.key_value
+            .key_material.value, key_value.key_material.value)
+        self.assertEqual('1',
+                         second[0].response_payload.unique_identifier.value)
+        self.assertEqual({'hits': 1, 'misses': 1, 'entries': 1},
+                         dict((name, value) for name, value in
+                              processor.get_cache_statistics().items()
+                              if name != 'bytes'))
+
+    def test_process_destroy_invalidates_cached_get(self):
+        processor = Processor(KMIPImpl(), get_cache_size=16)
+        destroy_item = messages.RequestBatchItem(
+            operation=contents.Operation(OperationEnum.DESTROY),
+            request_payload=destroy.DestroyRequestPayload(
+                unique_identifier=UniqueIdentifier('1')))
+
+        items = self._process_batch(
+            processor, [self._build_create_item(), self._build_get_item('1'),
+                        destroy_item, self._build_get_item('1')],
+            batch_error_cont_option=BatchErrorContinuationOption.CONTINUE)
+
+        self.assertEqual(ResultStatus.SUCCESS, items[1].result_status.enum)
+        self.assertEqual(ResultStatus.SUCCESS, items[2].result_status.enum)
+        self.assertEqual(ResultReason.ITEM_NOT_FOUND,
+                         items[3].result_reason.enum)
+        self.assertEqual(0, processor.get_cache_statistics()['entries'])
+
+    def test_process_get_during_destroy_skips_cache(self):
+        processor = Processor(KMIPImpl(), get_cache_size=16)
+        self._process_batch(
+            processor, [self._build_create_item(), self._build_get_item('1')])
+        destroy_item = messages.RequestBatchItem(
+            operation=contents.Operation(OperationEnum.DESTROY),
+            request_payload=destroy.DestroyRequestPayload(
+                unique_identifier=UniqueIdentifier('1')))
+        destroy_object = processor._handler.destroy
+        items = []
+
+        def destroy_and_get(uuid):
+            result = destroy_object(uuid)
+            # A Get arriving once the object is gone, before Destroy returns
+            items.extend(self._process_batch(processor,
+                                             [self._build_get_item('1')]))
+            return result
+
+        with mock.patch.object(processor._handler, 'destroy',
+                               side_effect=destroy_and_get):
+            self._process_batch(processor, [destroy_item])
+
+        self.assertEqual(ResultReason.ITEM_NOT_FOUND,
+                         items[0].result_reason.enum)
+
+    def test_process_get_without_cache(self):
+        self.assertIsNone(self.processor.get_cache_statistics())
+
+    def _build_coalescing_processor(self, **kwargs):
+        processor = Processor(KMIPImpl(), coalesce_reads=True, **kwargs)
+        patcher = mock.patch.object(processor._coalescer, 'call',
+                                    wraps=processor._coalescer.call)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return processor
+
+    def test_process_get_coalesces_reads(self):
+        processor = self._build_coalescing_processor()
+
+        items = self._process_batch(
+            processor, [self._build_create_item(), self._build_get_item('1')])
+
+        self.assertEqual('1',
+                         items[1].response_payload.unique_identifier.value)
+        key = processor._coalescer.call.call_args[0][0]
+        self.assertEqual(('1', None, None), key)
+
+    def test_process_get_coalesces_cache_misses(self):
+        processor = self._build_coalescing_processor(get_cache_size=16)
+
+        self._process_batch(
+            processor, [self._build_create_item(), self._build_get_item('1'),
+                        self._build_get_item('1')])
+
+        self.assertEqual(1, processor._coalescer.call.call_count)
+        self.assertEqual(1, processor.get_cache_statistics()['hits'])
+
+    def test_process_locate_coalesces_reads(self):
+        processor = self._build_coalescing_processor()
+
+        items = self._process_batch(processor, [self._build_locate_item()])
+
+        self.assertEqual(ResultStatus.SUCCESS, items[0].result_status.enum)
+        key = processor._coalescer.call.call_args[0][0]
+        self.assertIsNone(key[0])
+
+    def test_process_writes_detach_coalesced_reads(self):
+        processor = self._build_coalescing_processor()
+
+        coalescer = processor._coalescer
+        with mock.patch.object(coalescer, 'begin_write',
+                               wraps=coalescer.begin_write) as begin_write:
+            with mock.patch.object(coalescer, 'end_write',
+                                   wraps=coalescer.end_write) as end_write:
+                self._process_batch(
+                    processor, [self._build_create_item(),
+                                self._build_destroy_item('1')])
+
+        self.assertEqual([mock.call(None), mock.call('1')],
+                         begin_write.call_args_list)
+        self.assertEqual([mock.call(None), mock.call('1')],
+                         end_write.call_args_list)
+
+    def test_process_get_during_destroy_is_not_shared(self):
+        processor = self._build_coalescing_processor()
+        self._process_batch(processor, [self._build_create_item()])
+        # A Get that read the object before the Destroy and is still
+        # attached when the Destroy runs
+        flight = _Flight()
+        flight.result = processor._get(
+            self._build_get_item('1').request_payload)
+        flight.done.set()
+        processor._coalescer._flights[('1', None, None)] = flight
+        destroy_object = processor._handler.destroy
+        items = []
+
+        def destroy_and_get(uuid):
+            result = destroy_object(uuid)
+            items.extend(self._process_batch(processor,
+                                             [self._build_get_item('1')]))
+            return result
+
+        with mock.patch.object(processor._handler, 'destroy',
+                               side_effect=destroy_and_get):
+            self._process_batch(processor, [self._build_destroy_item('1')])
+
+        self.assertEqual(ResultReason.ITEM_NOT_FOUND,
+                         items[0].result_reason.enum)
+
+    def test_process_records_metrics(self):
+        self._process_batch(self.processor, [self._build_create_item()])
+        self._process_batch(
+            self.processor, [self._build_get_item('1'),
+                             self._build_get_item('2')],
+            batch_error_cont_option=BatchErrorContinuationOption.CONTINUE)
+
+        snapshot = self.processor.metrics.snapshot()
+        get = (('operation', 'GET'),)
+        self.assertEqual({(('operation', 'CREATE'),): 1, get: 1},
+                         snapshot['kmip_requests_total'])
+        self.assertEqual(
+            {(('operation', 'CREATE'), ('status', 'SUCCESS'),
+              ('reason', '')): 1,
+             (('operation', 'GET'), ('status', 'SUCCESS'),
+              ('reason', '')): 1,
+             (('operation', 'GET'), ('status', 'OPERATION_FAILED'),
+              ('reason', 'ITEM_NOT_FOUND')): 1},
+            snapshot['kmip_results_total'])
+        self.assertEqual(2, snapshot['kmip_handler_seconds'][get]['count'])
+        self.assertEqual(1, snapshot['kmip_decode_seconds'][get]['count'])
+        self.assertEqual(1, snapshot['kmip_encode_seconds'][get]['count'])
+        self.assertTrue(snapshot['kmip_received_bytes_total'][()] > 0)
+        self.assertTrue(snapshot['kmip_sent_bytes_total'][()] > 0)
+
+    def _build_authentication(self, username):
+        value = Credential.UsernamePasswordCredential(
+            username=Credential.UsernamePasswordCredential.Username(username))
+        credential = Credential(
+            credential_type=Credential.CredentialType(
+                CredentialType.USERNAME_AND_PASSWORD),
+            credential_value=value)
+        return contents.Authentication(credential)
+
+    def test_process_rate_limited_request(self):
+        processor = Processor(
+            KMIPImpl(), rate_limit=1, rate_limit_burst=4,
+            operation_weights={OperationEnum.LOCATE: 4})
+        self._process_batch(processor, [self._build_create_item()])
+
+        items = self._process_batch(
+            processor, [self._build_locate_item(), self._build_get_item('1')],
+            batch_error_cont_option=BatchErrorContinuationOption.CONTINUE)
+
+        self.assertEqual(2, len(items))
+        for item in items:
+            self.assertEqual(ResultStatus.OPERATION_FAILED,
+                             item.result_status.enum)
+            self.assertEqual(ResultReason.GENERAL_FAILURE,
+                             item.result_reason.enum)
+        self.assertEqual(OperationEnum.LOCATE, items[0].operation.enum)
+        self.assertEqual(
+            {(): 1}, processor.metrics.snapshot()['kmip_rate_limited_total'])
+        self.assertEqual({'allowed': 1, 'rejected': 1, 'clients': 1},
+                         processor._rate_limiter.get_statistics())
+
+    def test_process_rate_limits_clients_separately(self):
+        processor = Processor(KMIPImpl(), rate_limit=1, rate_limit_burst=1)
+
+        for username in ('alice', 'bob'):
+            items = self._process_batch(
+                processor, [self._build_create_item()],
+                authentication=self._build_authentication(username))
+            self.assertEqual(ResultStatus.SUCCESS, items[0].result_status.enum)
+
+        stream = FakeStream([self._build_request(
+            [self._build_create_item()],
+            authentication=self._build_authentication('alice'))])
+        processor.process(stream, stream, 'commonName=carol')
+
+        items = self._read_response(stream.written[0]).batch_items
+        self.assertEqual(ResultStatus.SUCCESS, items[0].result_status.enum)
+        statistics = processor._rate_limiter.get_statistics()
+        self.assertEqual(3, statistics['clients'])
+
+    def test_get_client_identity(self):
+        header = messages.RequestHeader(
+            authentication=self._build_authentication('alice'))
+
+        self.assertEqual(
+            'alice', self.processor._get_client_identity(header, None))
+        self.assertEqual(
+            'commonName=carol',
+            self.processor._get_client_identity(header, 'commonName=carol'))
+        self.assertIsNone(self.processor._get_client_identity(
+            messages.RequestHeader(), None))
+
+    def test_process_with_fair_queue(self):
+        processor = Processor(KMIPImpl(), fair_queue_slots=1,
+                              operation_weights={OperationEnum.GET: 2})
+
+        with mock.patch.object(processor._fair_queue, 'acquire') as acquire:
+            with mock.patch.object(processor._fair_queue,
+                                   'release') as release:
+                self._process_batch(
+                    processor, [self._build_get_item('1'),
+                                self._build_create_item()],
+                    batch_error_cont_option=(
+                        BatchErrorContinuationOption.CONTINUE),
+                    authentication=self._build_authentication('alice'))
+
+        acquire.assert_called_once_with('alice', 3)
+        release.assert_called_once_with()
+        snapshot = processor.metrics.snapshot()
+        self.assertEqual(0, snapshot['kmip_fair_queue_waiting'][()])
+        self.assertEqual(1, snapshot['kmip_fair_queue_seconds'][()]['count'])
+
+    def test_process_releases_fair_queue_on_error(self):
+        processor = Processor(KMIPImpl(), fair_queue_slots=1)
+        processor.register_operation(
+            OperationEnum.GET, mock.MagicMock(side_effect=RuntimeError()),
+            mock.MagicMock())
+        stream = FakeStream([self._build_request([self._build_get_item('1')])])
+
+        self.assertRaises(RuntimeError, processor.process, stream, stream)
+        self.assertEqual({'running': 0, 'waiting': 0},
+                         processor._fair_queue.get_statistics())
+
+    def test_process_with_profiling(self):
+        self.addCleanup(profiling.disable)
+        profiler = profiling.enable(profiling.CPROFILE, sample_rate=1)
+
+        self._process_batch(self.processor, [self._build_create_item()])
+        self._process_batch(self.processor, [self._build_get_item('1')])
+
+        self.assertEqual(['CREATE', 'GET'], profiler.labels())
+
+    def test_process_with_profiling_on_error(self):
+        self.addCleanup(profiling.disable)
+        profiler = profiling.enable(profiling.CPROFILE, sample_rate=1)
+        stream = FakeStream([b'\x42\x00\x78\x01\x00\x00\x00\x00'])
+
+        self.assertRaises(Exception, self.processor.process, stream, stream)
+        self.assertEqual(['UNKNOWN'], profiler.labels())
+
+    def _process_sized_batch(self, processor, **kwargs):
+        self._process_batch(processor, [self._build_create_item()])
+        stream = FakeStream([self._build_request(
+            [self._build_get_item('1'), self._build_get_item('1'),
+             self._build_get_item('2')], **kwargs)])
+        processor.process(stream, stream)
+        return stream.written[0]
+
+    def test_process_with_maximum_response_size(self):
+        # A successful Get of the key takes 176 bytes and a failed one 64
+        # bytes, over 88 bytes for the response header.
+        data = self._process_sized_batch(
+            self.processor, maximum_response_size=88 + 176 + 150,
+            batch_error_cont_option=BatchErrorContinuationOption.CONTINUE)
+
+        self.assertTrue(len(data) <= 88 + 176 + 150)
+        items = self._read_response(data).batch_items
+        self.assertEqual(
+            [(ResultStatus.SUCCESS, None),
+             (ResultStatus.OPERATION_FAILED, ResultReason.RESPONSE_TOO_LARGE),
+             (ResultStatus.OPERATION_FAILED, ResultReason.ITEM_NOT_FOUND)],
+            [(item.result_status.enum,
+              item.result_reason and item.result_reason.enum)
+             for item in items])
+
+        results = self.processor.metrics.snapshot()['kmip_results_total']
+        self.assertEqual(1, results[(('operation', 'GET'),
+                                     ('status', 'OPERATION_FAILED'),
+                                     ('reason', 'RESPONSE_TOO_LARGE'))])
+        self.assertEqual(1, results[(('operation', 'GET'),
+                                     ('status', 'SUCCESS'), ('reason', ''))])
+
+    def test_process_with_maximum_response_size_stops_batch(self):
+        data = self._process_sized_batch(self.processor,
+                                         maximum_response_size=100)
+
+        items = self._read_response(data).batch_items
+        self.assertEqual(1, len(items))
+        self.assertEqual(ResultReason.RESPONSE_TOO_LARGE,
+                         items[0].result_reason.enum)
+
+    def test_process_ends_response_when_failure_does_not_fit(self):
+        data = self._process_sized_batch(
+            self.processor, maximum_response_size=88 + 176 + 10,
+            batch_error_cont_option=BatchErrorContinuationOption.CONTINUE)
+
+        self.assertTrue(len(data) <= 88 + 176 + 10)
+        items = self._read_response(data).batch_items
+        self.assertEqual(1, len(items))
+        self.assertEqual(ResultStatus.SUCCESS, items[0].result_status.enum)
+
+    def test_process_with_server_max_response_size(self):
+        processor = Processor(KMIPImpl(), max_response_size=88 + 176 + 150)
+
+        data = self._process_sized_batch(
+            processor, maximum_response_size=4096,
+            batch_error_cont_option=BatchErrorContinuationOption.CONTINUE)
+
+        items = self._read_response(data).batch_items
+        self.assertEqual(
+            [ResultStatus.SUCCESS, ResultStatus.OPERATION_FAILED,
+             ResultStatus.OPERATION_FAILED],
+            [item.result_status.enum for item in items])
+        self.assertEqual(ResultReason.RESPONSE_TOO_LARGE,
+                         items[1].result_reason.enum)
+
+    def _process_sized_creates(self, maximum_response_size):
+        processor = Processor(KMIPImpl())
+        stream = FakeStream([self._build_request(
+            [self._build_create_item(), self._build_create_item()],
+            maximum_response_size=maximum_response_size,
+            batch_error_cont_option=BatchErrorContinuationOption.CONTINUE)])
+        processor.process(stream, stream)
+        return (self._read_response(stream.written[0]).batch_items,
+                sorted(processor._handler.repo.repo))
+
+    def test_process_create_that_does_not_fit_is_not_run(self):
+        items, uuids = self._process_sized_creates(150)
+
+        self.assertEqual(1, len(items))
+        self.assertEqual(ResultReason.RESPONSE_TOO_LARGE,
+                         items[0].result_reason.enum)
+        self.assertEqual([], uuids)
+
+    def test_process_create_is_answered_without_template_attribute(self):
+        # The full answer to a Create takes 144 bytes, its identifiers
+        # alone 80 bytes; the second Create is not run.
+        items, uuids = self._process_sized_creates(200)
+
+        self.assertEqual(1, len(items))
+        self.assertEqual(ResultStatus.SUCCESS, items[0].result_status.enum)
+        payload = items[0].response_payload
+        self.assertEqual('1', payload.unique_identifier.value)
+        self.assertIsNone(payload.template_attribute)
+        self.assertEqual(['1'], uuids)
+
+    def test_process_create_with_room_keeps_template_attribute(self):
+        items, uuids = self._process_sized_creates(4096)
+
+        self.assertEqual(2, len(items))
+        self.assertIsNotNone(items[0].response_payload.template_attribute)
+        self.assertEqual(['1', '2'], uuids)
+
+    def _build_idempotent_item(self, item, ubi_id=b'\x01' * 16):
+        item.unique_batch_item_id = contents.UniqueBatchItemID(ubi_id)
+        return item
+
+    def _build_destroy_item(self, uuid):
+        return messages.RequestBatchItem(
+            operation=contents.Operation(OperationEnum.DESTROY),
+            request_payload=destroy.DestroyRequestPayload(
+                unique_identifier=UniqueIdentifier(uuid)))
+
+    def test_process_replays_retried_batch_item(self):
+        processor = Processor(KMIPImpl(), idempotency_cache_size=16)
+        item = self._build_idempotent_item(self._build_create_item())
+        authentication = self._build_authentication('a')
+
+        first = self._process_batch(processor, [item],
+                                    authentication=authentication)
+        second = self._process_batch(processor, [item],
+                                     authentication=authentication)
+
+        self.assertEqual('1',
+                         first[0].response_payload.unique_identifier.value)
+        self.assertEqual('1',
+                         second[0].response_payload.unique_identifier.value)
+        self.assertEqual(b'\x01' * 16, second[0].unique_batch_item_id.value)
+        self.assertEqual(
+            {(('operation', 'CREATE'),): 1},
+            processor.metrics.snapshot()['kmip_replayed_total'])
+        self.assertEqual({'hits': 1, 'misses': 1, 'entries': 1},
+                         processor.get_idempotency_statistics())
+
+    def test_process_runs_batch_items_of_other_clients(self):
+        processor = Processor(KMIPImpl(), idempotency_cache_size=16)
+        item = self._build_idempotent_item(self._build_create_item())
+
+        self._process_batch(processor, [item],
+                            authentication=self._build_authentication('a'))
+        items = self._process_batch(
+            processor, [item], authentication=self._build_authentication('b'))
+
+        self.assertEqual('2',
+                         items[0].response_payload.unique_identifier.value)
+
+    def test_process_runs_batch_items_of_anonymous_clients(self):
+        processor = Processor(KMIPImpl(), idempotency_cache_size=16)
+        item = self._build_idempotent_item(self._build_create_item())
+
+        self._process_batch(processor, [item])
+        items = self._process_batch(processor, [item])
+
+        self.assertEqual('2',
+                         items[0].response_payload.unique_identifier.value)
+        self.assertEqual({'hits': 0, 'misses': 0, 'entries': 0},
+                         processor.get_idempotency_statistics())
+
+    def test_process_runs_reused_identifier_with_other_payload(self):
+        processor = Processor(KMIPImpl(), idempotency_cache_size=16)
+        authentication = self._build_authentication('a')
+        self._process_batch(processor, [self._build_create_item()])
+        self._process_batch(processor, [self._build_create_item()])
+
+        items = self._process_batch(processor, [
+            self._build_idempotent_item(self._build_destroy_item('1'))],
+            authentication=authentication)
+        items += self._process_batch(processor, [
+            self._build_idempotent_item(self._build_destroy_item('2'))],
+            authentication=authentication)
+
+        self.assertEqual(['1', '2'],
+                         [item.response_payload.unique_identifier.value
+                          for item in items])
+
+    def test_process_runs_failed_batch_item_again(self):
+        processor = Processor(KMIPImpl(), idempotency_cache_size=16)
+        item = self._build_idempotent_item(self._build_destroy_item('1'))
+        authentication = self._build_authentication('a')
+
+        first = self._process_batch(processor, [item],
+                                    authentication=authentication)
+        self._process_batch(processor, [self._build_create_item()])
+        second = self._process_batch(processor, [item],
+                                     authentication=authentication)
+
+        self.assertEqual(ResultStatus.OPERATION_FAILED,
+                         first[0].result_status.enum)
+        self.assertEqual(ResultStatus.SUCCESS, second[0].result_status.enum)
+        self.assertEqual({'hits': 0, 'misses': 2, 'entries': 1},
+                         processor.get_idempotency_statistics())
+
+    def test_process_without_idempotency_cache(self):
+        item = self._build_idempotent_item(self._build_create_item())
+
+        self._process_batch(self.processor, [item])
+        items = self._process_batch(self.processor, [item])
+
+        self.assertEqual('2',
+                         items[0].response_payload.unique_identifier.value)
+        self.assertIsNone(self.processor.get_idempotency_statistics())
+
+    def test_process_runs_identical_batch_items_by_default(self):
+        authentication = self._build_authentication('a')
+
+        items = self._process_batch(self.processor, [
+            self._build_idempotent_item(self._build_create_item(), b'\x01')],
+            authentication=authentication)
+        items += self._process_batch(self.processor, [
+            self._build_idempotent_item(self._build_create_item(), b'\x01')],
+            authentication=authentication)
+
+        self.assertEqual(['1', '2'],
+                         [item.response_payload.unique_identifier.value
+                          for item in items])
+
+    def _build_activate_item(self, uuid=None):
+        if uuid is not None:
+            uuid = UniqueIdentifier(uuid)
+        return messages.RequestBatchItem(
+            operation=contents.Operation(OperationEnum.ACTIVATE),
+            request_payload=activate.ActivateRequestPayload(
+                unique_identifier=uuid))
+
+    def test_process_uses_id_placeholder(self):
+        items = self._process_batch(
+            self.processor,
+            [self._build_create_item(), self._build_create_item(),
+             self._build_activate_item(),
+             messages.RequestBatchItem(
+                 operation=contents.Operation(OperationEnum.GET),
+                 request_payload=get.GetRequestPayload())])
+
+        self.assertEqual([ResultStatus.SUCCESS] * 4,
+                         [item.result_status.enum for item in items])
+        self.assertEqual(['2', '2'],
+                         [item.response_payload.unique_identifier.value
+                          for item in items[2:]])
+
+    def test_process_uses_id_placeholder_of_single_located_object(self):
+        self._process_batch(self.processor, [self._build_create_item()])
+
+        items = self._process_batch(
+            self.processor,
+            [self._build_locate_item(),
+             messages.RequestBatchItem(
+                 operation=contents.Operation(OperationEnum.GET),
+                 request_payload=get.GetRequestPayload())])
+
+        self.assertEqual(['1'], [uuid.value for uuid in
+                                 items[0].response_payload.unique_identifiers])
+        self.assertEqual('1',
+                         items[1].response_payload.unique_identifier.value)
+
+    def test_process_locate_of_several_objects_clears_id_placeholder(self):
+        self._process_batch(self.processor, [self._build_create_item()])
+
+        items = self._process_batch(
+            self.processor,
+            [self._build_create_item(), self._build_locate_item(),
+             self._build_activate_item()])
+
+        self.assertEqual(2, len(items[1].response_payload.unique_identifiers))
+        self.assertEqual(ResultStatus.OPERATION_FAILED,
+                         items[2].result_status.enum)
+        self.assertEqual(ResultReason.ITEM_NOT_FOUND,
+                         items[2].result_reason.enum)
+
+    def test_process_keeps_explicit_unique_identifier(self):
+        items = self._process_batch(
+            self.processor,
+            [self._build_create_item(), self._build_create_item(),
+             self._build_activate_item('1')])
+
+        self.assertEqual('1',
+                         items[2].response_payload.unique_identifier.value)
+
+    def test_process_without_id_placeholder(self):
+        items = self._process_batch(self.processor,
+                                    [self._build_activate_item()])
+
+        self.assertEqual(ResultStatus.OPERATION_FAILED,
+                         items[0].result_status.enum)
+
+    def test_process_id_placeholder_batch_in_order(self):
+        processor = self._build_parallel_processor()
+
+        items = self._process_batch(
+            processor, [self._build_create_item(),
+                        self._build_activate_item()],
+            batch_order_option=False,
+            batch_error_cont_option=BatchErrorContinuationOption.CONTINUE)
+
+        self.assertFalse(processor._pool.map.called)
+        self.assertEqual(ResultStatus.SUCCESS, items[1].result_status.enum)
+
+    def test_process_replays_chained_batch_items(self):
+        processor = Processor(KMIPImpl(), idempotency_cache_size=16)
+        batch_items = [
+            self._build_idempotent_item(self._build_create_item()),
+            self._build_idempotent_item(self._build_activate_item(),
+                                        b'\x02' * 16)]
+        request = self._build_request(
+            batch_items, authentication=self._build_authentication('a'))
+
+        stream = FakeStream([request, request])
+        processor.process(stream, stream)
+        processor.process(stream, stream)
+
+        for data in stream.written:
+            self.assertEqual(
+                [('1', ResultStatus.SUCCESS)] * 2,
+                [(item.response_payload.unique_identifier.value,
+                  item.result_status.enum)
+                 for item in self._read_response(data).batch_items])
+        self.assertEqual(
+            {(('operation', 'CREATE'),): 1, (('operation', 'ACTIVATE'),): 1},
+            processor.metrics.snapshot()['kmip_replayed_total'])
+
+    def test_process_query(self):
+        functions = [QueryFunction(QueryFunctionEnum.QUERY_OPERATIONS),
+                     QueryFunction(QueryFunctionEnum.QUERY_SERVER_INFORMATION)]
+        item = messages.RequestBatchItem(
+            operation=contents.Operation(OperationEnum.QUERY),
+            request_payload=query.QueryRequestPayload(
+                query_functions=functions))
+
+        items = self._process_batch(self.processor, [item])
+
+        payload = items[0].response_payload
+        operations = [op.enum for op in payload.operations]
+        self.assertIn(OperationEnum.QUERY, operations)
+        self.assertIn(OperationEnum.REVOKE, operations)
+        self.assertNotIn(OperationEnum.CHECK, operations)
+        self.assertEqual('PyKMIP', payload.vendor_identification.value)
+
+    def test_process_discover_versions(self):
+        versions = [contents.ProtocolVersion.create(1, 2),
+                    contents.ProtocolVersion.create(1, 0)]
+        item = messages.RequestBatchItem(
+            operation=contents.Operation(OperationEnum.DISCOVER_VERSIONS),
+            request_payload=discover_versions.DiscoverVersionsRequestPayload(
+                protocol_versions=versions))
+
+        items = self._process_batch(self.processor, [item])
+
+        self.assertEqual([contents.ProtocolVersion.create(1, 0)],
+                         items[0].response_payload.protocol_versions)
+
+    def test_get_operation_statistics(self):
+        self.processor._record_operation(OperationEnum.GET, 0.25)
+        self.processor._record_operation(OperationEnum.GET, 0.75)
+
+        self.assertEqual(
+            {'GET': {'count': 2, 'average_latency': 0.5,
+                     'max_latency': 0.75}},
+            self.processor.get_operation_statistics())
+
+    def _build_asynchronous_processor(self):
+        processor = Processor(KMIPImpl(), async_workers=1)
+        self.addCleanup(processor._jobs.close)
+        return processor
+
+    def _build_locate_item(self):
+        return messages.RequestBatchItem(
+            operation=contents.Operation(OperationEnum.LOCATE),
+            request_payload=locate.LocateRequestPayload())
+
+    def _build_poll_item(self, correlation_value):
+        return messages.RequestBatchItem(
+            operation=contents.Operation(OperationEnum.POLL),
+            request_payload=poll.PollRequestPayload(correlation_value))
+
+    def test_process_asynchronous_operation(self):
+        processor = self._build_asynchronous_processor()
+        expected = self._process_batch(processor, [self._build_locate_item()])
+
+        items = self._process_batch(processor, [self._build_locate_item()],
+                                    asynchronous_indicator=True)
+
+        self.assertEqual(ResultStatus.OPERATION_PENDING,
+                         items[0].result_status.enum)
+        correlation_value = items[0].async_correlation_value
+        self.assertIsNotNone(correlation_value)
+
+        # Wait for the job to finish on the single worker
+        processor._jobs._pool.apply(int)
+        items = self._process_batch(
+            processor, [self._build_poll_item(correlation_value)])
+
+        self.assertEqual(OperationEnum.LOCATE, items[0].operation.enum)
+        self.assertEqual(expected[0].result_status.enum,
+                         items[0].result_status.enum)
+
+        items = self._process_batch(
+            processor, [self._build_poll_item(correlation_value)])
+
+        self.assertEqual(OperationEnum.POLL, items[0].operation.enum)
+        self.assertEqual(ResultReason.ITEM_NOT_FOUND,
+                         items[0].result_reason.enum)
+
+    def test_process_asynchronous_indicator_for_quick_operation(self):
+        processor = self._build_asynchronous_processor()
+
+        items = self._process_batch(processor, [self._build_create_item()],
+                                    asynchronous_indicator=True)
+
+        self.assertEqual(ResultStatus.SUCCESS, items[0].result_status.enum)
+
+    def test_process_asynchronous_indicator_without_workers(self):
+        items = self._process_batch(
+            self.processor, [self._build_locate_item()],
+            asynchronous_indicator=True)
+
+        self.assertNotEqual(ResultStatus.OPERATION_PENDING,
+                            items[0].result_status.enum)
+        self.assertIsNone(items[0].async_correlation_value)
+
+    def test_process_cancel(self):
+        processor = self._build_asynchronous_processor()
+        correlation_value = contents.AsynchronousCorrelationValue(
+            b'\x01' * 16)
+        item = messages.RequestBatchItem(
+            operation=contents.Operation(OperationEnum.CANCEL),
+            request_payload=cancel.CancelRequestPayload(correlation_value))
+
+        items = self._process_batch(processor, [item])
+
+        self.assertEqual(ResultStatus.SUCCESS, items[0].result_status.enum)
+        payload = items[0].response_payload
+        self.assertEqual(correlation_value,
+                         payload.asynchronous_correlation_value)
+        self.assertEqual(CancellationResult.UNAVAILABLE,
+                         payload.cancellation_result.enum)
@@ -0,0 +1,171 @@
+# Copyright (c) 2015 Hewlett Packard Development Company, L.P.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import pstats
+import shutil
+import tempfile
+
+from testtools import TestCase
+
+from kmip.services import profiling
+
+
+class TestCProfileSampler(TestCase):
+
+    def setUp(self):
+        super(TestCProfileSampler, self).setUp()
+
+    def tearDown(self):
+        super(TestCProfileSampler, self).tearDown()
+
+    def test_init_invalid_sample_rate(self):
+        self.assertRaises(ValueError, profiling.CProfileSampler, 0)
+
+    def test_begin_samples_one_request_in_n(self):
+        sampler = profiling.CProfileSampler(sample_rate=2)
+
+        sample = sampler.begin()
+        self.assertIsNotNone(sample)
+        sampler.end(sample, 'GET')
+
+        self.assertIsNone(sampler.begin())
+        sample = sampler.begin()
+        self.assertIsNotNone(sample)
+        sampler.end(sample, 'LOCATE')
+
+        self.assertEqual(['GET', 'LOCATE'], sampler.labels())
+
+    def test_begin_skips_while_profiling(self):
+        sampler = profiling.CProfileSampler(sample_rate=1)
+        sample = sampler.begin()
+
+        self.assertIsNone(sampler.begin())
+
+        sampler.end(sample, 'GET')
+
+    def test_dump(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'profile')
+
+        sampler = profiling.CProfileSampler(sample_rate=1)
+        for label in ('GET', 'GET', 'CREATE'):
+            sample = sampler.begin()
+            sorted(range(100))
+            sampler.end(sample, label)
+        count = sampler.dump(path)
+
+        self.assertEqual(2, count)
+        self.assertEqual(['profile.CREATE.pstats', 'profile.GET.pstats'],
+                         sorted(os.listdir(directory)))
+        stats = pstats.Stats(path + '.GET.pstats')
+        calls = [entry[1] for function, entry in stats.stats.items()
+                 if function[2] == '<built-in method builtins.sorted>']
+        self.assertEqual([2], calls)
+
+    def test_clear(self):
+        sampler = profiling.CProfileSampler(sample_rate=1)
+        sampler.end(sampler.begin(), 'GET')
+        sampler.clear()
+
+        self.assertEqual([], sampler.labels())
+
+
+class TestStackSampler(TestCase):
+
+    def setUp(self):
+        super(TestStackSampler, self).setUp()
+        self.sampler = profiling.StackSampler(interval=60)
+        self.addCleanup(self.sampler.close)
+
+    def tearDown(self):
+        super(TestStackSampler, self).tearDown()
+
+    def test_init_invalid_sample_rate(self):
+        self.assertRaises(ValueError, profiling.StackSampler, 0)
+
+    def _work(self):
+        self.sampler.sample()
+
+    def test_sample(self):
+        sample = self.sampler.begin()
+        self._work()
+        self._work()
+        self.sampler.end(sample, 'GET')
+
+        self.assertEqual(
+            {('GET', 'test_profiling.py:_work', 'profiling.py:sample'): 2},
+            dict(self.sampler._stacks))
+
+    def test_sample_skips_requests_not_sampled(self):
+        self.sampler.sample()
+
+        self.assertEqual([], self.sampler.labels())
+
+    def test_dump(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'profile')
+
+        sample = self.sampler.begin()
+        self._work()
+        self.sampler.end(sample, 'GET')
+        count = self.sampler.dump(path)
+
+        with open(path + '.folded') as dump_file:
+            lines = dump_file.readlines()
+
+        self.assertEqual(1, count)
+        self.assertEqual(
+            ['GET;test_profiling.py:_work;profiling.py:sample 1\n'], lines)
+
+    def test_clear(self):
+        sample = self.sampler.begin()
+        self._work()
+        self.sampler.end(sample, 'GET')
+        self.sampler.clear()
+
+        self.assertEqual([], self.sampler.labels())
+
+
+class TestProfiling(TestCase):
+
+    def setUp(self):
+        super(TestProfiling, self).setUp()
+        self.addCleanup(profiling.disable)
+
+    def tearDown(self):
+        super(TestProfiling, self).tearDown()
+
+    def test_enable_disable(self):
+        profiler = profiling.enable(profiling.CPROFILE, sample_rate=10)
+
+        self.assertEqual(profiler, profiling.profiler)
+        self.assertEqual(10, profiler.sample_rate)
+
+        profiling.disable()
+
+        self.assertIsNone(profiling.profiler)
+
+    def test_enable_replaces_stack_sampler(self):
+        sampler = profiling.enable(profiling.STACK, interval=60)
+        profiling.enable(profiling.CPROFILE)
+
+        self.assertTrue(sampler._stopped.is_set())
+
+    def test_enable_invalid_mode(self):
+        self.assertRaises(ValueError, profiling.enable, 'dtrace')
+        self.assertIsNone(profiling.profiler)
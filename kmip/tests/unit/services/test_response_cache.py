@@ -0,0 +1,315 @@
+# Copyright (c) 2015 Hewlett Packard Development Company, L.P.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import threading
+import time
+
+from testtools import TestCase
+
+from kmip.core.utils import BytearrayStream
+
+from kmip.services.response_cache import EncodedPayload
+from kmip.services.response_cache import IdempotencyCache
+from kmip.services.response_cache import RequestCoalescer
+from kmip.services.response_cache import ResponseCache
+
+
+class TestResponseCache(TestCase):
+
+    def setUp(self):
+        super(TestResponseCache, self).setUp()
+        self.cache = ResponseCache(max_entries=2, max_bytes=8)
+
+    def tearDown(self):
+        super(TestResponseCache, self).tearDown()
+
+    def _put(self, key, data):
+        _, generation = self.cache.get(key)
+        return self.cache.put(key, data, generation)
+
+    def test_init_invalid_max_entries(self):
+        self.assertRaises(ValueError, ResponseCache, 0)
+
+    def test_get_and_put(self):
+        self.assertTrue(self._put(('1', None, None), b'abc'))
+
+        data, _ = self.cache.get(('1', None, None))
+
+        self.assertEqual(b'abc', data)
+        self.assertEqual({'hits': 1, 'misses': 1, 'entries': 1, 'bytes': 3},
+                         self.cache.get_statistics())
+
+    def test_evicts_least_recently_used_entry(self):
+        self._put(('1', None, None), b'a')
+        self._put(('2', None, None), b'b')
+        self.cache.get(('1', None, None))
+        self._put(('3', None, None), b'c')
+
+        self.assertEqual(b'a', self.cache.get(('1', None, None))[0])
+        self.assertIsNone(self.cache.get(('2', None, None))[0])
+        self.assertEqual(b'c', self.cache.get(('3', None, None))[0])
+
+    def test_evicts_entries_over_max_bytes(self):
+        self._put(('1', None, None), b'12345')
+        self._put(('2', None, None), b'6789')
+
+        self.assertIsNone(self.cache.get(('1', None, None))[0])
+        self.assertEqual(4, self.cache.get_statistics()['bytes'])
+
+    def test_put_skips_oversized_payload(self):
+        self.assertFalse(self._put(('1', None, None), b'123456789'))
+        self.assertEqual(0, self.cache.get_statistics()['entries'])
+
+    def test_invalidate(self):
+        self._put(('1', None, None), b'a')
+        self._put(('1', 1, None), b'b')
+
+        self.cache.invalidate('1')
+
+        self.assertIsNone(self.cache.get(('1', None, None))[0])
+        self.assertIsNone(self.cache.get(('1', 1, None))[0])
+        self.assertEqual({}, self.cache._keys)
+
+    def test_put_after_invalidation_is_skipped(self):
+        _, generation = self.cache.get(('1', None, None))
+        self.cache.invalidate('1')
+
+        self.assertFalse(self.cache.put(('1', None, None), b'a', generation))
+        self.assertIsNone(self.cache.get(('1', None, None))[0])
+
+    def test_put_during_write_is_skipped(self):
+        self._put(('1', None, None), b'a')
+
+        self.cache.begin_write('1')
+        self.assertIsNone(self.cache.get(('1', None, None))[0])
+        self.assertFalse(self._put(('1', None, None), b'b'))
+        self.assertTrue(self._put(('2', None, None), b'c'))
+        self.cache.end_write('1')
+
+        self.assertTrue(self._put(('1', None, None), b'd'))
+        self.assertEqual({}, self.cache._writes)
+
+    def test_put_of_read_during_write_is_skipped(self):
+        self.cache.begin_write()
+        _, generation = self.cache.get(('1', None, None))
+        self.cache.end_write()
+
+        self.assertFalse(self.cache.put(('1', None, None), b'a', generation))
+
+    def test_clear(self):
+        self._put(('1', None, None), b'a')
+
+        self.cache.clear()
+
+        self.assertEqual({'hits': 0, 'misses': 1, 'entries': 0, 'bytes': 0},
+                         self.cache.get_statistics())
+
+    def test_encoded_payload_write(self):
+        stream = BytearrayStream()
+
+        EncodedPayload(b'\x42\x00\x7c').write(stream)
+
+        self.assertEqual(b'\x42\x00\x7c', stream.buffer)
+
+
+class TestIdempotencyCache(TestCase):
+
+    def setUp(self):
+        super(TestIdempotencyCache, self).setUp()
+        self.now = 0
+        self.cache = IdempotencyCache(max_entries=2, ttl=10,
+                                      clock=lambda: self.now)
+
+    def tearDown(self):
+        super(TestIdempotencyCache, self).tearDown()
+
+    def test_init_invalid_max_entries(self):
+        self.assertRaises(ValueError, IdempotencyCache, 0)
+
+    def test_claim_and_put(self):
+        self.assertIsNone(self.cache.claim('a'))
+        self.cache.put('a', b'response')
+
+        self.assertEqual(b'response', self.cache.claim('a'))
+        self.assertEqual({'hits': 1, 'misses': 1, 'entries': 1},
+                         self.cache.get_statistics())
+
+    def test_entries_expire(self):
+        self.cache.claim('a')
+        self.cache.put('a', b'response')
+        self.now = 10
+
+        self.assertIsNone(self.cache.claim('a'))
+        self.assertEqual(0, self.cache.get_statistics()['entries'])
+
+    def test_evicts_oldest_entry(self):
+        for key in ('a', 'b', 'c'):
+            self.cache.claim(key)
+            self.cache.put(key, key)
+
+        self.assertIsNone(self.cache.claim('a'))
+        self.assertEqual('c', self.cache.claim('c'))
+
+    def test_release(self):
+        self.cache.claim('a')
+        self.cache.release('a')
+
+        self.assertIsNone(self.cache.claim('a'))
+        self.assertEqual(0, self.cache.get_statistics()['entries'])
+
+    def test_claim_waits_for_pending_entry(self):
+        self.cache.claim('a')
+        results = []
+        thread = threading.Thread(
+            target=lambda: results.append(self.cache.claim('a')))
+        thread.start()
+        thread.join(0.05)
+
+        self.assertTrue(thread.is_alive())
+
+        self.cache.put('a', b'response')
+        thread.join(5)
+
+        self.assertEqual([b'response'], results)
+
+
+class TestRequestCoalescer(TestCase):
+
+    def setUp(self):
+        super(TestRequestCoalescer, self).setUp()
+        self.coalescer = RequestCoalescer()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = []
+
+    def tearDown(self):
+        super(TestRequestCoalescer, self).tearDown()
+
+    def _read(self, value):
+        self.calls.append(value)
+        self.started.set()
+        self.release.wait(5)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def _start(self, key, value, results):
+        def run():
+            try:
+                results.append(self.coalescer.call(key, self._read, value))
+            except Exception as e:
+                results.append(e)
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        return thread
+
+    def _wait_for_waiters(self, count):
+        for _ in range(500):
+            if self.coalescer.get_statistics()['shared'] >= count:
+                return
+            time.sleep(0.01)
+
+    def test_call_shares_request_in_progress(self):
+        results = []
+        first = self._start(('1', None, None), 'a', results)
+        self.started.wait(5)
+        second = self._start(('1', None, None), 'b', results)
+        self._wait_for_waiters(1)
+
+        self.release.set()
+        first.join(5)
+        second.join(5)
+
+        self.assertEqual(['a'], self.calls)
+        self.assertEqual(['a', 'a'], results)
+        self.assertEqual({'executions': 1, 'shared': 1, 'in_flight': 0},
+                         self.coalescer.get_statistics())
+
+    def test_call_shares_exception(self):
+        error = ValueError('repository unavailable')
+        results = []
+        first = self._start(('1', None, None), error, results)
+        self.started.wait(5)
+        second = self._start(('1', None, None), 'b', results)
+        self._wait_for_waiters(1)
+
+        self.release.set()
+        first.join(5)
+        second.join(5)
+
+        self.assertEqual([error, error], results)
+
+    def test_call_runs_finished_request_again(self):
+        self.release.set()
+
+        self.coalescer.call(('1', None, None), self._read, 'a')
+        self.coalescer.call(('1', None, None), self._read, 'b')
+
+        self.assertEqual(['a', 'b'], self.calls)
+
+    def test_invalidate_detaches_request_in_progress(self):
+        results = []
+        first = self._start(('1', None, None), 'a', results)
+        self.started.wait(5)
+
+        self.coalescer.invalidate('1')
+        self.release.set()
+        self.coalescer.call(('1', None, None), self._read, 'b')
+        first.join(5)
+
+        self.assertEqual(['a', 'b'], self.calls)
+
+    def test_call_during_write_runs_on_its_own(self):
+        results = []
+        first = self._start(('1', None, None), 'a', results)
+        self.started.wait(5)
+
+        self.coalescer.begin_write('1')
+        self.release.set()
+        self.coalescer.call(('1', None, None), self._read, 'b')
+        self.coalescer.call((None, b'criteria'), self._read, 'c')
+        self.coalescer.end_write('1')
+        first.join(5)
+
+        self.assertEqual(['a', 'b', 'c'], self.calls)
+        self.assertEqual({'executions': 3, 'shared': 0, 'in_flight': 0},
+                         self.coalescer.get_statistics())
+        self.assertEqual({}, self.coalescer._writes)
+
+    def test_begin_write_of_new_object_keeps_other_objects(self):
+        self.coalescer._flights[('1', None, None)] = object()
+        self.coalescer._flights[(None, b'criteria')] = object()
+
+        self.coalescer.begin_write()
+
+        self.assertEqual([('1', None, None)], list(self.coalescer._flights))
+        self.assertFalse(self.coalescer._is_written('1'))
+        self.assertTrue(self.coalescer._is_written(None))
+        self.coalescer.end_write()
+        self.assertFalse(self.coalescer._is_written(None))
+
+    def test_invalidate_detaches_searches(self):
+        self.coalescer._flights[('1', None, None)] = object()
+        self.coalescer._flights[('2', None, None)] = object()
+        self.coalescer._flights[(None, b'criteria')] = object()
+
+        self.coalescer.invalidate('1')
+
+        self.assertEqual([('2', None, None)], list(self.coalescer._flights))
+
+        self.coalescer.clear()
+
+        self.assertEqual(0, self.coalescer.get_statistics()['in_flight'])
@@ -0,0 +1,180 @@
+# Copyright (c) 2015 Hewlett Packard Development Company, L.P.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import threading
+import time
+
+from testtools import TestCase
+
+from kmip.services.scheduling import FairQueue
+from kmip.services.scheduling import RateLimiter
+from kmip.services.scheduling import TokenBucket
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket(TestCase):
+
+    def setUp(self):
+        super(TestTokenBucket, self).setUp()
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        super(TestTokenBucket, self).tearDown()
+
+    def test_consume(self):
+        bucket = TokenBucket(1, 2, self.clock)
+
+        self.assertTrue(bucket.consume(1))
+        self.assertTrue(bucket.consume(1))
+        self.assertFalse(bucket.consume(1))
+
+    def test_consume_refills_over_time(self):
+        bucket = TokenBucket(2, 4, self.clock)
+        bucket.consume(4)
+
+        self.clock.now = 1.0
+
+        self.assertTrue(bucket.consume(2))
+        self.assertFalse(bucket.consume(1))
+
+    def test_refill_is_bounded_by_burst(self):
+        bucket = TokenBucket(10, 3, self.clock)
+
+        self.clock.now = 60.0
+        bucket.consume(0)
+
+        self.assertEqual(3, bucket.tokens)
+
+    def test_consume_more_than_burst(self):
+        bucket = TokenBucket(1, 2, self.clock)
+
+        self.assertTrue(bucket.consume(5))
+        self.assertEqual(0, bucket.tokens)
+        self.assertFalse(bucket.consume(5))
+
+
+class TestRateLimiter(TestCase):
+
+    def setUp(self):
+        super(TestRateLimiter, self).setUp()
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        super(TestRateLimiter, self).tearDown()
+
+    def test_init_invalid_rate(self):
+        self.assertRaises(ValueError, RateLimiter, 0, 10)
+
+    def test_acquire_per_client(self):
+        limiter = RateLimiter(1, 2, clock=self.clock)
+
+        self.assertTrue(limiter.acquire('a', 2))
+        self.assertFalse(limiter.acquire('a', 1))
+        self.assertTrue(limiter.acquire('b', 1))
+
+        self.assertEqual({'allowed': 2, 'rejected': 1, 'clients': 2},
+                         limiter.get_statistics())
+
+    def test_acquire_drops_least_recently_used_client(self):
+        limiter = RateLimiter(1, 1, max_clients=2, clock=self.clock)
+        limiter.acquire('a')
+        limiter.acquire('b')
+        limiter.acquire('c')
+
+        self.assertEqual(2, limiter.get_statistics()['clients'])
+        self.assertTrue(limiter.acquire('a'))
+        self.assertFalse(limiter.acquire('c'))
+
+
+class TestFairQueue(TestCase):
+
+    def setUp(self):
+        super(TestFairQueue, self).setUp()
+
+    def tearDown(self):
+        super(TestFairQueue, self).tearDown()
+
+    def test_init_invalid_slots(self):
+        self.assertRaises(ValueError, FairQueue, 0)
+
+    def test_acquire_free_slots(self):
+        queue = FairQueue(2)
+        queue.acquire('a')
+        queue.acquire('a')
+
+        self.assertEqual({'running': 2, 'waiting': 0},
+                         queue.get_statistics())
+
+        queue.release()
+        queue.release()
+
+        self.assertEqual({'running': 0, 'waiting': 0},
+                         queue.get_statistics())
+
+    def _wait_for_waiters(self, queue, count):
+        deadline = time.time() + 5
+        while queue.get_statistics()['waiting'] < count:
+            if time.time() > deadline:
+                self.fail('requests did not queue')
+            time.sleep(0.001)
+
+    def test_release_grants_in_fair_order(self):
+        queue = FairQueue(1)
+        queue.acquire('heavy', 10)
+        order = []
+
+        def request(client, cost):
+            queue.acquire(client, cost)
+            order.append(client)
+            queue.release()
+
+        threads = []
+        for client, cost in (('heavy', 10), ('heavy', 10), ('light', 1)):
+            thread = threading.Thread(target=request, args=(client, cost))
+            thread.start()
+            threads.append(thread)
+            self._wait_for_waiters(queue, len(threads))
+
+        queue.release()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(['light', 'heavy', 'heavy'], order)
+        self.assertEqual({'running': 0, 'waiting': 0},
+                         queue.get_statistics())
+
+    def test_release_forgets_idle_clients(self):
+        queue = FairQueue(1, max_clients=1)
+        queue.acquire('a')
+
+        # Each of b's requests waits for the previous one; granting the
+        # second one moves the virtual time past a's finish time.
+        for _ in range(2):
+            waiter = threading.Thread(target=queue.acquire, args=('b',))
+            waiter.start()
+            self._wait_for_waiters(queue, 1)
+            queue.release()
+            waiter.join(5)
+        queue.release()
+
+        self.assertEqual(['b'], list(queue._finish_times))
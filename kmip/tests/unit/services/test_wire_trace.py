@@ -0,0 +1,109 @@
+# Copyright (c) 2014 The Johns Hopkins University/Applied Physics Laboratory
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import mock
+import os
+import shutil
+import tempfile
+
+from testtools import TestCase
+
+from kmip.services import wire_trace
+from kmip.services.kmip_protocol import KMIPProtocol
+
+
+class TestWireTrace(TestCase):
+
+    def setUp(self):
+        super(TestWireTrace, self).setUp()
+        self.addCleanup(wire_trace.disable)
+
+    def tearDown(self):
+        super(TestWireTrace, self).tearDown()
+
+    def test_init_invalid_capacity(self):
+        self.assertRaises(ValueError, wire_trace.WireTrace, 0)
+
+    def test_record_is_bounded(self):
+        trace = wire_trace.WireTrace(capacity=2)
+        trace.record(1, wire_trace.SEND, b'\x01')
+        trace.record(1, wire_trace.RECV, b'\x02')
+        trace.record(2, wire_trace.SEND, b'\x03')
+
+        frames = trace.frames()
+
+        self.assertEqual(2, len(frames))
+        self.assertEqual((1, wire_trace.RECV, b'\x02'), frames[0][1:])
+        self.assertEqual((2, wire_trace.SEND, b'\x03'), frames[1][1:])
+
+    def test_clear(self):
+        trace = wire_trace.WireTrace()
+        trace.record(1, wire_trace.SEND, b'\x01')
+        trace.clear()
+
+        self.assertEqual([], trace.frames())
+
+    def test_dump(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'trace.log')
+
+        trace = wire_trace.WireTrace()
+        trace.record(7, wire_trace.SEND, b'\x42\x00\x78')
+        count = trace.dump(path)
+
+        with open(path) as dump_file:
+            lines = dump_file.readlines()
+
+        self.assertEqual(1, count)
+        self.assertEqual(1, len(lines))
+        self.assertEqual(['7', 'send', '420078'], lines[0].split()[1:])
+
+    def test_enable_disable(self):
+        trace = wire_trace.enable(16)
+
+        self.assertEqual(trace, wire_trace.tracer)
+        self.assertEqual(16, trace.capacity)
+
+        wire_trace.disable()
+
+        self.assertIsNone(wire_trace.tracer)
+
+    def test_protocol_records_frames_when_enabled(self):
+        trace = wire_trace.enable()
+        frame = b'\x42\x00\x78\x01\x00\x00\x00\x02\xab\xcd'
+        sock = mock.MagicMock()
+        sock.recv.side_effect = [frame[:8], frame[8:]]
+        protocol = KMIPProtocol(sock)
+
+        protocol.write(b'\x01\x02')
+        protocol.read()
+
+        frames = trace.frames()
+        self.assertEqual(
+            (protocol.connection_id, wire_trace.SEND, b'\x01\x02'),
+            frames[0][1:])
+        self.assertEqual(
+            (protocol.connection_id, wire_trace.RECV, frame), frames[1][1:])
+
+    def test_protocol_skips_trace_when_disabled(self):
+        sock = mock.MagicMock()
+        protocol = KMIPProtocol(sock)
+
+        with mock.patch('kmip.services.kmip_protocol.binascii') as binascii:
+            protocol.write(b'\x01\x02')
+
+        self.assertFalse(binascii.hexlify.called)
+        sock.sendall.assert_called_once_with(b'\x01\x02')